@@ -0,0 +1,107 @@
+"""
+Aquecimento do processo (warm-up) para workers do Passenger.
+
+O Passenger cria e encerra workers com frequência; sem aquecimento a primeira
+requisição de cada worker paga imports, montagem do resolvedor de URLs,
+compilação de templates e caches frios. ``aquecer()`` roda as tarefas listadas
+em ``settings.AQUECIMENTO_TAREFAS`` logo após ``get_wsgi_application()``.
+
+Cada tarefa é uma função sem argumentos; falhas são registradas no log e
+nunca impedem o worker de subir.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import translation
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def aquecer():
+    """Executa as tarefas de aquecimento e retorna {tarefa: tempo em ms}."""
+    if not getattr(settings, "AQUECIMENTO_ATIVO", True):
+        return {}
+
+    tempos = {}
+    inicio_total = time.perf_counter()
+    with translation.override(settings.LANGUAGE_CODE):
+        for caminho in getattr(settings, "AQUECIMENTO_TAREFAS", ()):
+            inicio = time.perf_counter()
+            try:
+                import_string(caminho)()
+            except Exception:
+                logger.exception("Falha no aquecimento: %s", caminho)
+                continue
+            tempos[caminho] = (time.perf_counter() - inicio) * 1000
+
+    logger.info(
+        "Worker aquecido em %.1f ms (%s)",
+        (time.perf_counter() - inicio_total) * 1000,
+        ", ".join(f"{nome.rsplit('.', 1)[-1]} {ms:.1f} ms" for nome, ms in tempos.items()),
+    )
+    return tempos
+
+
+# ------------------- Tarefas -------------------
+
+def carregar_urls():
+    """Monta o resolvedor raiz e os de cada namespace (reverse/resolve prontos)."""
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    pendentes = [resolver]
+    while pendentes:
+        atual = pendentes.pop()
+        atual.reverse_dict  # força _populate()
+        pendentes.extend(sub for _prefixo, sub in atual.namespace_dict.values())
+
+
+def diretorios_templates():
+    """Pastas de templates do projeto: templates/ e <app>/templates (sem as do Django)."""
+    from django.template.utils import get_app_template_dirs
+
+    base = Path(settings.BASE_DIR)
+    pastas = [Path(d) for config in settings.TEMPLATES for d in config.get("DIRS", [])]
+    pastas += [Path(d) for d in get_app_template_dirs("templates")]
+    return [p for p in pastas if p.is_dir() and p.is_relative_to(base)]
+
+
+def compilar_templates():
+    """Compila os templates do projeto para o cache do loader."""
+    from django.template.loader import get_template
+
+    for pasta in diretorios_templates():
+        for arquivo in sorted(pasta.rglob("*.html")):
+            get_template(arquivo.relative_to(pasta).as_posix())
+
+
+def carregar_referencias():
+    """Abre a conexão e carrega os caches de referência do worker (categorias, funções, rótulos)."""
+    from cozinha.referencias import CATEGORIAS, FUNCOES
+    from fichas.busca import ROTULOS
+    from fichas.models import Ingrediente
+
+    CATEGORIAS.obter()
+    FUNCOES.obter()
+    ROTULOS.carregar(Ingrediente.objects.all())
+
+
+def carregar_catalogo():
+    """Carrega o catálogo de custos do worker (prévia, escala, explicação de custos)."""
+    from fichas.custos import CATALOGO
+
+    CATALOGO.obter()
+
+
+def calcular_custos():
+    """Calcula o custo de algumas receitas para exercitar o caminho de custos."""
+    from fichas.models import Receita
+
+    limite = getattr(settings, "AQUECIMENTO_RECEITAS", 20)
+    receitas = (Receita.objects.prefetch_related("itens__ingrediente", "componentes__sub_receita")
+                .order_by("pk")[:limite])
+    for receita in receitas:
+        receita.custo_por_porcao
@@ -0,0 +1,188 @@
+"""
+Pipeline de arquivos estáticos para produção.
+
+- ``ArmazenamentoEstaticos``: nomes com hash via manifest (cache-busting) e
+  variantes .gz/.br geradas no ``collectstatic``.
+- ``ServidorEstaticos``: middleware WSGI que serve STATIC_ROOT direto do disco,
+  com cache de longo prazo para arquivos com hash, ETag e negociação
+  de Content-Encoding (br > gzip > identidade).
+- ``assets_locais``: context processor que diz ao base.html se usa os assets
+  construídos localmente ou os CDNs (desenvolvimento).
+"""
+import gzip
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só há variantes .gz
+    brotli = None
+
+
+EXTENSOES_COMPRIMIVEIS = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".xml", ".ico"}
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_CURTO = "public, max-age=300"
+TAMANHO_BLOCO = 64 * 1024
+
+
+# ------------------- Armazenamento -------------------
+
+class ArmazenamentoEstaticos(ManifestStaticFilesStorage):
+    """Manifest com hash + variantes gzip/brotli pré-geradas."""
+    manifest_strict = False
+
+    def stored_name(self, name):
+        """Sem o arquivo coletado (dev, testes) usa o nome original em vez de quebrar o template."""
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        nomes = set(self.hashed_files.values()) | set(self.hashed_files.keys())
+        for nome in sorted(nomes):
+            if Path(nome).suffix.lower() in EXTENSOES_COMPRIMIVEIS and self.exists(nome):
+                self.comprimir(nome)
+
+    def comprimir(self, nome):
+        """Grava nome.gz e nome.br quando a compressão compensa (≥ 5% menor)."""
+        caminho = Path(self.path(nome))
+        dados = caminho.read_bytes()
+        variantes = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append((".br", lambda d: brotli.compress(d, quality=11)))
+        for sufixo, compressor in variantes:
+            comprimido = compressor(dados)
+            if len(comprimido) < len(dados) * 0.95:
+                caminho.with_name(caminho.name + sufixo).write_bytes(comprimido)
+
+
+# ------------------- Context processor -------------------
+
+def assets_locais(request):
+    """
+    Expõe ``assets_locais`` (CSS/JS construídos localmente × CDN) aos templates.
+    O site estático (tablets offline) usa sempre os locais.
+    """
+    return {"assets_locais": getattr(settings, "ASSETS_LOCAIS", False) or getattr(request, "site_estatico", False)}
+
+
+# ------------------- Servidor WSGI -------------------
+
+class ArquivoEstatico:
+    """Metadados de um arquivo em STATIC_ROOT e de suas variantes comprimidas."""
+
+    def __init__(self, caminho, imutavel):
+        info = caminho.stat()
+        self.caminho = caminho
+        self.tamanho = info.st_size
+        self.etag = f'"{int(info.st_mtime):x}-{info.st_size:x}"'
+        self.modificado = formatdate(info.st_mtime, usegmt=True)
+        self.tipo = mimetypes.guess_type(caminho.name)[0] or "application/octet-stream"
+        if self.tipo.startswith("text/") or self.tipo in ("application/javascript", "image/svg+xml"):
+            self.tipo += "; charset=utf-8"
+        self.cache = CACHE_IMUTAVEL if imutavel else CACHE_CURTO
+        self.variantes = {}
+        for codificacao, sufixo in (("br", ".br"), ("gzip", ".gz")):
+            variante = caminho.with_name(caminho.name + sufixo)
+            if variante.is_file():
+                self.variantes[codificacao] = (variante, variante.stat().st_size)
+
+    def escolher(self, accept_encoding):
+        """Retorna (caminho, tamanho, codificação) conforme o Accept-Encoding do cliente."""
+        aceitas = aceitas_por_cliente(accept_encoding)
+        for codificacao in ("br", "gzip"):
+            if codificacao in aceitas and codificacao in self.variantes:
+                caminho, tamanho = self.variantes[codificacao]
+                return caminho, tamanho, codificacao
+        return self.caminho, self.tamanho, None
+
+
+def aceitas_por_cliente(accept_encoding):
+    """Codificações aceitas (q > 0) de um cabeçalho Accept-Encoding."""
+    aceitas = set()
+    for parte in (accept_encoding or "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        if parametros.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if nome:
+            aceitas.add(nome.strip().lower())
+    return aceitas
+
+
+class ServidorEstaticos:
+    """
+    Serve STATIC_ROOT antes do Django, sem passar por URLconf, middleware e ORM.
+    Os arquivos são indexados uma vez na criação do worker.
+    """
+
+    def __init__(self, application, raiz=None, prefixo=None):
+        self.application = application
+        self.raiz = Path(raiz or settings.STATIC_ROOT)
+        self.prefixo = "/" + (prefixo or settings.STATIC_URL).strip("/") + "/"
+        self.arquivos = self.indexar()
+
+    def indexar(self):
+        if not self.raiz.is_dir():
+            return {}
+        imutaveis = set()
+        manifest = self.raiz / ArmazenamentoEstaticos.manifest_name
+        if manifest.is_file():
+            imutaveis = set(json.loads(manifest.read_text(encoding="utf-8")).get("paths", {}).values())
+
+        arquivos = {}
+        for pasta, _subpastas, nomes in os.walk(self.raiz):
+            for nome in nomes:
+                if nome.endswith((".gz", ".br")):
+                    continue
+                caminho = Path(pasta, nome)
+                relativo = caminho.relative_to(self.raiz).as_posix()
+                arquivos[self.prefixo + relativo] = ArquivoEstatico(caminho, relativo in imutaveis)
+        return arquivos
+
+    def __call__(self, environ, start_response):
+        arquivo = self.arquivos.get(environ.get("PATH_INFO", ""))
+        if arquivo is None or environ.get("REQUEST_METHOD") not in ("GET", "HEAD"):
+            return self.application(environ, start_response)
+
+        caminho, tamanho, codificacao = arquivo.escolher(environ.get("HTTP_ACCEPT_ENCODING"))
+        etag = arquivo.etag if codificacao is None else f'{arquivo.etag[:-1]}-{codificacao}"'
+        cabecalhos = [
+            ("Cache-Control", arquivo.cache),
+            ("ETag", etag),
+            ("Last-Modified", arquivo.modificado),
+            ("Vary", "Accept-Encoding"),
+        ]
+
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH", "")
+        if etag in if_none_match or if_none_match.strip() == "*":
+            start_response("304 Not Modified", cabecalhos)
+            return []
+
+        cabecalhos += [("Content-Type", arquivo.tipo), ("Content-Length", str(tamanho))]
+        if codificacao:
+            cabecalhos.append(("Content-Encoding", codificacao))
+        start_response("200 OK", cabecalhos)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+
+        conteudo = open(caminho, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            return file_wrapper(conteudo, TAMANHO_BLOCO)
+        return ler_em_blocos(conteudo)
+
+
+def ler_em_blocos(arquivo):
+    with arquivo:
+        while bloco := arquivo.read(TAMANHO_BLOCO):
+            yield bloco
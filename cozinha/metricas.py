@@ -0,0 +1,240 @@
+"""
+Métricas no formato texto do Prometheus, somadas entre os workers do Passenger.
+
+Cada worker acumula em memória só os incrementos (``METRICAS.somar`` para
+contadores, ``METRICAS.observar`` para histogramas) e, no máximo a cada
+``METRICAS_INTERVALO`` segundos, descarrega-os num SQLite local
+(``METRICAS_ARQUIVO``) com ``INSERT ... ON CONFLICT DO UPDATE valor = valor +
+incremento``: uma transação curta por worker, nunca por requisição. Uma
+coleta em ``/metrics`` descarrega o worker que a atende e lê o arquivo
+inteiro, então enxerga o app todo e não um worker qualquer.
+
+O arquivo é separado do banco da aplicação (sem disputar travas com ele e sem
+entrar na contagem de consultas das requisições). Contadores só crescem;
+apagar o arquivo zera tudo, o que o Prometheus trata como reinício.
+
+Métricas:
+
+- ``cozinha_requisicao_segundos`` e ``cozinha_requisicao_consultas``:
+  histogramas por rota (``fichas:ficha``...), do ``MetricasMiddleware``;
+- ``cozinha_requisicoes_total``: por rota e status;
+- ``cozinha_custos_avaliacoes_total`` / ``cozinha_custos_avaliacao_segundos``:
+  receitas avaliadas pelo motor de custos (``fichas.custos``) e duração;
+- ``cozinha_cache_acertos_total``, ``..._falhas_total``,
+  ``..._carga_segundos_total`` e a taxa de acerto (calculada na coleta), por
+  cache compartilhado (``cozinha.referencias``);
+- ``cozinha_fila_*``: trabalho à espera dos comandos periódicos, medido na
+  coleta (eventos a fechar e a arquivar).
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BALDES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# nome: (tipo, ajuda)
+DESCRICOES = {
+    "cozinha_requisicao_segundos": ("histogram", "Duração das requisições por rota."),
+    "cozinha_requisicao_consultas": ("histogram", "Consultas SQL por requisição, por rota."),
+    "cozinha_requisicoes_total": ("counter", "Requisições atendidas por rota e status."),
+    "cozinha_custos_avaliacoes_total": ("counter", "Receitas avaliadas pelo motor de custos."),
+    "cozinha_custos_avaliacao_segundos": ("histogram", "Duração de cada avaliação do motor de custos."),
+    "cozinha_cache_acertos_total": ("counter", "Leituras atendidas pela cópia do worker."),
+    "cozinha_cache_falhas_total": ("counter", "Leituras que recarregaram o cache."),
+    "cozinha_cache_carga_segundos_total": ("counter", "Tempo gasto recarregando o cache."),
+    "cozinha_cache_taxa_acerto": ("gauge", "Acertos / leituras, somados entre os workers."),
+    "cozinha_fila_eventos_a_fechar": ("gauge", "Eventos passados ainda abertos (manage.py fechar_eventos)."),
+    "cozinha_fila_eventos_a_arquivar": ("gauge", "Eventos além do horizonte de arquivo (manage.py arquivar_eventos)."),
+}
+
+
+def rotulos(**valores):
+    """'rota="fichas:ficha",status="200"' (ordem alfabética, valores escapados)."""
+    return ",".join(f'{chave}="{escapar(valor)}"' for chave, valor in sorted(valores.items()))
+
+
+def escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def formatar_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+# ------------------- Registro do worker -------------------
+
+class Registro:
+    """Incrementos pendentes deste worker, descarregados no arquivo compartilhado."""
+
+    def __init__(self):
+        self._pendentes = defaultdict(float)  # (nome, rótulos) → incremento
+        self._trava = threading.Lock()
+        self._ultimo_envio = time.monotonic()
+        self._caches = {}  # nome do cache → (acertos, falhas, segundos) já enviados
+
+    def somar(self, nome, valor=1, **valores):
+        if not settings.METRICAS_ATIVAS:
+            return
+        chave = (nome, rotulos(**valores))
+        with self._trava:
+            self._pendentes[chave] += valor
+        self.talvez_descarregar()
+
+    def observar(self, nome, valor, baldes, **valores):
+        """Observação de histograma: baldes cumulativos (``le``), ``_sum`` e ``_count``."""
+        if not settings.METRICAS_ATIVAS:
+            return
+        # todos os baldes recebem incremento (0 ou 1): a série fica completa desde a primeira observação
+        incrementos = [((f"{nome}_bucket", rotulos(le=formatar_numero(limite), **valores)), int(valor <= limite))
+                       for limite in baldes]
+        incrementos.append(((f"{nome}_bucket", rotulos(le="+Inf", **valores)), 1))
+        base = rotulos(**valores)
+        with self._trava:
+            for chave, incremento in incrementos:
+                self._pendentes[chave] += incremento
+            self._pendentes[(f"{nome}_count", base)] += 1
+            self._pendentes[(f"{nome}_sum", base)] += valor
+        self.talvez_descarregar()
+
+    def talvez_descarregar(self):
+        if time.monotonic() - self._ultimo_envio >= settings.METRICAS_INTERVALO:
+            self.descarregar()
+
+    def coletar_caches(self):
+        """Diferença dos contadores dos caches compartilhados desde o último envio."""
+        for cache, atuais in contadores_caches():
+            enviados = self._caches.get(cache.nome, (0, 0, 0.0))
+            self._caches[cache.nome] = atuais
+            for nome, atual, enviado in zip(
+                ("cozinha_cache_acertos_total", "cozinha_cache_falhas_total", "cozinha_cache_carga_segundos_total"),
+                atuais, enviados,
+            ):
+                self._pendentes[(nome, rotulos(cache=cache.nome))] += atual - enviado
+
+    def descarregar(self):
+        """Soma os incrementos pendentes no arquivo compartilhado (uma transação)."""
+        with self._trava:
+            self._ultimo_envio = time.monotonic()
+            self.coletar_caches()
+            pendentes, self._pendentes = self._pendentes, defaultdict(float)
+        if not pendentes:
+            return
+        try:
+            with conectar() as conexao:
+                conexao.executemany(
+                    "INSERT INTO metricas (nome, rotulos, valor) VALUES (?, ?, ?) "
+                    "ON CONFLICT (nome, rotulos) DO UPDATE SET valor = valor + excluded.valor",
+                    [(nome, chave, valor) for (nome, chave), valor in pendentes.items()],
+                )
+        except sqlite3.Error:
+            # Métricas nunca derrubam requisições: os incrementos voltam para o próximo envio
+            logger.warning("Falha ao gravar métricas em %s", settings.METRICAS_ARQUIVO, exc_info=True)
+            with self._trava:
+                for chave, valor in pendentes.items():
+                    self._pendentes[chave] += valor
+
+    def limpar(self):
+        """No processo filho (fork): os pendentes e os contadores herdados pertencem ao pai."""
+        self._pendentes = defaultdict(float)
+        self._trava = threading.Lock()
+        self._caches = {cache.nome: atuais for cache, atuais in contadores_caches()}
+
+
+def contadores_caches():
+    from .referencias import CacheCompartilhado
+
+    return [(cache, (cache.acertos, cache.falhas, cache.segundos_carga)) for cache in CacheCompartilhado.TODOS]
+
+
+METRICAS = Registro()
+atexit.register(lambda: METRICAS.descarregar() if settings.METRICAS_ATIVAS else None)
+os.register_at_fork(after_in_child=METRICAS.limpar)
+
+
+# ------------------- Arquivo compartilhado -------------------
+
+@contextmanager
+def conectar():
+    """Conexão curta ao arquivo compartilhado, numa transação (criando a tabela na primeira vez)."""
+    caminho = settings.METRICAS_ARQUIVO
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(caminho, timeout=5)) as conexao:
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS metricas ("
+            "nome TEXT NOT NULL, rotulos TEXT NOT NULL, valor REAL NOT NULL, PRIMARY KEY (nome, rotulos))"
+        )
+        with conexao:
+            yield conexao
+
+
+def ler():
+    """[(nome, rótulos, valor)] de todos os workers."""
+    with conectar() as conexao:
+        return conexao.execute("SELECT nome, rotulos, valor FROM metricas").fetchall()
+
+
+# ------------------- Exposição -------------------
+
+def nome_base(nome):
+    for sufixo in ("_bucket", "_sum", "_count"):
+        if nome.endswith(sufixo) and DESCRICOES.get(nome[:-len(sufixo)], ("",))[0] == "histogram":
+            return nome[:-len(sufixo)]
+    return nome
+
+
+ORDEM_SUFIXOS = {"_bucket": 0, "_sum": 1, "_count": 2}
+
+
+def ordem_linha(linha):
+    """Agrupa por métrica e série; baldes em ordem crescente de ``le``, depois ``_sum`` e ``_count``."""
+    nome, chave, _ = linha
+    base = nome_base(nome)
+    sufixo = nome[len(base):]
+    serie, limite = chave, 0.0
+    if sufixo == "_bucket":
+        partes = chave.split(",")
+        serie = ",".join(p for p in partes if not p.startswith("le="))
+        limite = float(next(p for p in partes if p.startswith("le="))[4:-1])  # float("+Inf") é infinito
+    return base, serie, ORDEM_SUFIXOS.get(sufixo, 0), limite
+
+
+def taxas_acerto(linhas):
+    acertos, falhas = defaultdict(float), defaultdict(float)
+    for nome, chave, valor in linhas:
+        if nome == "cozinha_cache_acertos_total":
+            acertos[chave] += valor
+        elif nome == "cozinha_cache_falhas_total":
+            falhas[chave] += valor
+    return [("cozinha_cache_taxa_acerto", chave, acertos[chave] / (acertos[chave] + falhas[chave]))
+            for chave in sorted(set(acertos) | set(falhas)) if acertos[chave] + falhas[chave]]
+
+
+def texto_prometheus(extras=()):
+    """Todas as métricas (arquivo + ``extras`` medidos na coleta) no formato texto 0.0.4."""
+    METRICAS.descarregar()
+    linhas = ler()
+    linhas += taxas_acerto(linhas)
+    linhas += list(extras)
+    saida, anterior = [], None
+    for nome, chave, valor in sorted(linhas, key=ordem_linha):
+        base = nome_base(nome)
+        if base != anterior:
+            tipo, ajuda = DESCRICOES.get(base, ("untyped", ""))
+            saida.append(f"# HELP {base} {ajuda}")
+            saida.append(f"# TYPE {base} {tipo}")
+            anterior = base
+        saida.append(f"{nome}{{{chave}}} {formatar_numero(valor)}" if chave else f"{nome} {formatar_numero(valor)}")
+    return "\n".join(saida) + "\n"
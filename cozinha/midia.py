@@ -0,0 +1,156 @@
+"""
+Servidor de mídia (uploads) para produção.
+
+Fotos de ``ingredientes/``, ``receitas/`` e ``itens_cardapio/`` são servidas
+em blocos, sem carregar o arquivo inteiro na memória:
+
+- ``MIDIA_SENDFILE = "x-sendfile"``: delega ao Apache (mod_xsendfile);
+- ``MIDIA_SENDFILE = "x-accel-redirect"``: delega ao nginx (location interna
+  em ``MIDIA_ACCEL_PREFIXO``);
+- sem front-end: ``FileResponse`` (usa ``wsgi.file_wrapper``/sendfile quando o
+  servidor oferece) ou resposta parcial 206 para ``Range``.
+
+O ETag é o hash do conteúdo (calculado uma vez por arquivo/mtime em cada
+worker); ``?v=<hash>`` na URL habilita cache imutável. ``url_midia`` (filtro
+``url_midia`` em templates, ``{% load midia %}``) monta essa URL.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+TAMANHO_BLOCO = 64 * 1024
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+RE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@lru_cache(maxsize=4096)
+def hash_arquivo(caminho, mtime_ns, tamanho):
+    """Hash do conteúdo, lido em blocos; a chave inclui mtime/tamanho para invalidar."""
+    with open(caminho, "rb") as arquivo:
+        return hashlib.file_digest(arquivo, "blake2b").hexdigest()[:20]
+
+
+def url_midia(arquivo):
+    """URL de um FileField com ``?v=<hash>``; sem o arquivo no disco, a URL pura."""
+    if not arquivo:
+        return ""
+    try:
+        caminho = arquivo.path
+        info = os.stat(caminho)
+    except (OSError, NotImplementedError, ValueError):
+        return arquivo.url
+    return f"{arquivo.url}?v={hash_arquivo(caminho, info.st_mtime_ns, info.st_size)}"
+
+
+def intervalo_pedido(cabecalho, tamanho):
+    """
+    Interpreta um Range de intervalo único. Retorna (inicio, fim) inclusivo,
+    None para ignorar o cabeçalho (resposta completa) ou False se insatisfazível.
+    """
+    encontrado = RE_RANGE.match(cabecalho.strip())
+    if not encontrado or encontrado.groups() == ("", ""):
+        return None
+    inicio, fim = encontrado.groups()
+    if inicio == "":
+        sufixo = int(fim)
+        if sufixo == 0:
+            return False
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def ler_intervalo(caminho, inicio, quantidade):
+    """Gera blocos de ``quantidade`` bytes a partir de ``inicio``."""
+    with open(caminho, "rb") as arquivo:
+        arquivo.seek(inicio)
+        while quantidade > 0:
+            bloco = arquivo.read(min(TAMANHO_BLOCO, quantidade))
+            if not bloco:
+                break
+            quantidade -= len(bloco)
+            yield bloco
+
+
+def etag_confere(if_none_match, etag):
+    """Compara If-None-Match (lista, W/ ou *) com o ETag atual."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+@require_safe
+def servir_midia(request, caminho):
+    """Entrega um arquivo de MEDIA_ROOT com cache, ETag, Range e sendfile."""
+    try:
+        completo = safe_join(settings.MEDIA_ROOT, caminho)
+    except SuspiciousFileOperation:
+        raise Http404("Arquivo não encontrado")
+    try:
+        info = os.stat(completo)
+    except OSError:
+        raise Http404("Arquivo não encontrado")
+    if not os.path.isfile(completo):
+        raise Http404("Arquivo não encontrado")
+
+    tamanho = info.st_size
+    digest = hash_arquivo(completo, info.st_mtime_ns, tamanho)
+    etag = f'"{digest}"'
+    tipo = mimetypes.guess_type(completo)[0] or "application/octet-stream"
+    cache = CACHE_IMUTAVEL if request.GET.get("v") == digest else f"public, max-age={settings.MIDIA_MAX_AGE}"
+
+    def cabecalhos(resposta):
+        resposta["ETag"] = etag
+        resposta["Cache-Control"] = cache
+        resposta["Last-Modified"] = http_date(info.st_mtime)
+        resposta["Accept-Ranges"] = "bytes"
+        return resposta
+
+    if etag_confere(request.headers.get("If-None-Match"), etag):
+        return cabecalhos(HttpResponseNotModified())
+
+    # Front-end (Apache/nginx) envia o arquivo e trata Range por conta própria
+    modo = settings.MIDIA_SENDFILE
+    if modo == "x-sendfile":
+        resposta = HttpResponse(content_type=tipo)
+        resposta["X-Sendfile"] = completo
+        return cabecalhos(resposta)
+    if modo == "x-accel-redirect":
+        resposta = HttpResponse(content_type=tipo)
+        resposta["X-Accel-Redirect"] = settings.MIDIA_ACCEL_PREFIXO.rstrip("/") + "/" + caminho.lstrip("/")
+        return cabecalhos(resposta)
+
+    faixa = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if faixa and (not if_range or if_range.strip() == etag):
+        intervalo = intervalo_pedido(faixa, tamanho)
+        if intervalo is False:
+            resposta = HttpResponse(status=416)
+            resposta["Content-Range"] = f"bytes */{tamanho}"
+            return cabecalhos(resposta)
+        if intervalo is not None:
+            inicio, fim = intervalo
+            quantidade = fim - inicio + 1
+            resposta = StreamingHttpResponse(ler_intervalo(completo, inicio, quantidade),
+                                             status=206, content_type=tipo)
+            resposta["Content-Range"] = f"bytes {inicio}-{fim}/{tamanho}"
+            resposta["Content-Length"] = str(quantidade)
+            return cabecalhos(resposta)
+
+    resposta = FileResponse(open(completo, "rb"), content_type=tipo)
+    resposta.block_size = TAMANHO_BLOCO
+    return cabecalhos(resposta)
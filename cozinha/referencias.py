@@ -0,0 +1,178 @@
+"""
+Cache de dados de referência compartilhado entre os workers do Passenger.
+
+Cada worker guarda em memória tabelas que mudam pouco (categorias, funções da
+equipe, o catálogo de custos, os rótulos dos seletores do admin). Para que
+uma edição feita em um worker valha para todos, cada grupo de dados tem um
+carimbo de versão em arquivo (``settings.CACHE_VERSOES_DIR/<nome>.versao``):
+
+- ``CacheCompartilhado.obter()`` lê o carimbo (um ``read`` de poucos bytes,
+  sem consulta ao banco) e só recarrega se ele mudou desde a última carga;
+- ``invalidar()`` anota a troca; quando a transação é confirmada, o callback
+  descarta a cópia local e troca o carimbo, de modo que a próxima requisição
+  de qualquer worker já enxerga a alteração. Até lá, leituras na própria
+  transação carregam dados novos sem guardá-los: dados não confirmados nunca
+  ficam no cache (sobreviveriam a um rollback sob o carimbo antigo).
+
+Os contadores de acertos/falhas de cada cache ficam em ``estatisticas()`` (e,
+somados entre os workers, em ``/metrics``: ``cozinha.metricas``).
+"""
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+
+# ------------------- Carimbos de versão -------------------
+
+class Versao:
+    """Carimbo de versão em arquivo, trocado atomicamente (``os.replace``)."""
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    @property
+    def caminho(self):
+        return Path(settings.CACHE_VERSOES_DIR) / f"{self.nome}.versao"
+
+    def atual(self):
+        try:
+            return self.caminho.read_bytes()
+        except FileNotFoundError:
+            return b""
+
+    def avancar(self):
+        caminho = self.caminho
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.{threading.get_ident()}")
+        temporario.write_bytes(uuid.uuid4().hex.encode())
+        os.replace(temporario, caminho)
+
+
+class Pendentes(threading.local):
+    """Carimbos a trocar quando a transação corrente for confirmada (por thread)."""
+
+    def __init__(self):
+        self.versoes = {}
+
+
+PENDENTES = Pendentes()
+
+
+def avancar_no_commit(versao):
+    """Troca o carimbo após o commit (uma vez por transação, mesmo com vários sinais)."""
+    PENDENTES.versoes[versao.nome] = versao
+    # O primeiro callback troca tudo e os demais saem cedo. Se a transação (ou o savepoint) for
+    # desfeita, o Django descarta o callback mas a anotação fica: ``pendente`` percebe e troca na
+    # hora; o custo é só uma recarga a mais em cada worker.
+    transaction.on_commit(trocar_pendentes)
+
+
+def pendente(versao):
+    """Se há troca de ``versao`` anotada por uma transação desta thread ainda não confirmada."""
+    if versao.nome not in PENDENTES.versoes:
+        return False
+    conexao = transaction.get_connection()
+    if conexao.in_atomic_block and any(func is trocar_pendentes for _, func, _ in conexao.run_on_commit):
+        return True
+    trocar_pendentes()  # callback descartado por rollback, ou ainda na fila após o commit
+    return False
+
+
+def trocar_pendentes():
+    versoes = list(PENDENTES.versoes.values())
+    PENDENTES.versoes.clear()
+    nomes = {versao.nome for versao in versoes}
+    for cache in CacheCompartilhado.TODOS:
+        if cache.versao.nome in nomes:
+            cache._entrada = None
+    for versao in versoes:
+        versao.avancar()
+
+
+# ------------------- Cache por worker -------------------
+
+class CacheCompartilhado:
+    """Valor carregado uma vez por worker e recarregado quando o carimbo ``versao`` muda."""
+
+    TODOS = []
+
+    def __init__(self, nome, carregar, versao=None):
+        self.nome = nome
+        self.carregar = carregar
+        self.versao = Versao(versao or nome)
+        self.acertos = 0
+        self.falhas = 0
+        self.segundos_carga = 0.0
+        self._entrada = None  # (carimbo, valor)
+        self._trava = threading.Lock()
+        CacheCompartilhado.TODOS.append(self)
+
+    def obter(self):
+        if pendente(self.versao):
+            self.falhas += 1
+            return self.carregar()  # alterações desta transação: não guarda antes do commit
+        carimbo = self.versao.atual()
+        entrada = self._entrada
+        if entrada is None or entrada[0] != carimbo:
+            with self._trava:
+                entrada = self._entrada
+                if entrada is None or entrada[0] != carimbo:
+                    self.falhas += 1
+                    inicio = time.perf_counter()
+                    entrada = self._entrada = (carimbo, self.carregar())
+                    self.segundos_carga += time.perf_counter() - inicio
+                    return entrada[1]
+        self.acertos += 1
+        return entrada[1]
+
+    def invalidar(self, sender=None, **kwargs):
+        """Receptor de post_save/post_delete: descarta e avisa todos os workers no commit."""
+        avancar_no_commit(self.versao)
+
+
+def invalidar_todos():
+    """Descarta todos os caches em todos os workers (após bulk_create/SQL direto, que não disparam sinais)."""
+    for cache in CacheCompartilhado.TODOS:
+        cache.invalidar()  # ROTULOS acompanha o carimbo do catálogo
+
+
+def estatisticas():
+    """{nome: {acertos, falhas, taxa_acerto}} dos caches deste worker."""
+    resultado = {}
+    for cache in CacheCompartilhado.TODOS:
+        total = cache.acertos + cache.falhas
+        resultado[cache.nome] = {
+            "acertos": cache.acertos,
+            "falhas": cache.falhas,
+            "taxa_acerto": round(cache.acertos / total, 4) if total else None,
+        }
+    return resultado
+
+
+# ------------------- Tabelas de referência -------------------
+
+def carregar_categorias():
+    from fichas.models import Categoria
+
+    return list(Categoria.objects.order_by("nome"))
+
+
+def carregar_funcoes():
+    from equipe.models import FuncaoEquipe
+
+    return list(FuncaoEquipe.objects.order_by("nome"))
+
+
+CATEGORIAS = CacheCompartilhado("categorias", carregar_categorias)
+FUNCOES = CacheCompartilhado("funcoes", carregar_funcoes)
+
+
+def escolhas(cache, vazio="---------"):
+    """Choices (pk, rótulo) de um cache de instâncias, para selects de formulário (``vazio=None``: sem opção vazia)."""
+    opcoes = [(obj.pk, str(obj)) for obj in cache.obter()]
+    return opcoes if vazio is None else [("", vazio)] + opcoes
@@ -52,14 +52,18 @@ INSTALLED_APPS = [
     "fichas",
     "eventos",
     "equipe",
+    "estoque",
+    "diagnostico",
 ]
 
 MIDDLEWARE = [
+    "diagnostico.middleware.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "diagnostico.middleware.PerfilMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -84,6 +88,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "cozinha.estaticos.assets_locais",
             ],
         },
     },
@@ -145,12 +150,64 @@ USE_THOUSAND_SEPARATOR = True
 
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
+STATICFILES_DIRS = [BASE_DIR / "static"]
+
+# 🔹 nomes com hash (manifest) + variantes .gz/.br geradas no collectstatic
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "cozinha.estaticos.ArmazenamentoEstaticos"},
+}
+
+# 🔹 CSS/JS construídos localmente (manage.py construir_estaticos) em vez dos CDNs
+ASSETS_LOCAIS = os.getenv('ASSETS_LOCAIS', str(not DEBUG)) == 'True'
+TAILWIND_CLI = os.getenv('TAILWIND_CLI', 'tailwindcss')
+ALPINE_VERSAO = "3.14.1"
 
 # Media files (uploads)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# 🔹 entrega de mídia em produção (cozinha/midia.py): "", "x-sendfile" ou "x-accel-redirect"
+MIDIA_SENDFILE = os.getenv('MIDIA_SENDFILE', '')
+MIDIA_ACCEL_PREFIXO = "/midia-protegida/"
+MIDIA_MAX_AGE = 7 * 24 * 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Carimbos de versão dos caches compartilhados entre workers (cozinha/referencias.py)
+CACHE_VERSOES_DIR = Path(os.getenv('CACHE_VERSOES_DIR', BASE_DIR / "tmp" / "versoes"))
+
+# Site estático dos tablets da cozinha (cozinha/site_estatico.py, manage.py gerar_site)
+SITE_ESTATICO_DIR = Path(os.getenv('SITE_ESTATICO_DIR', BASE_DIR / "site_estatico"))
+
+# Perfil de requisições sob demanda para a equipe (diagnostico/perfil.py)
+PERFIL_VALIDADE = int(os.getenv('PERFIL_VALIDADE', 8 * 3600))  # segundos de validade do token
+PERFIL_INTERVALO_MS = float(os.getenv('PERFIL_INTERVALO_MS', 2))
+PERFIS_RETIDOS = int(os.getenv('PERFIS_RETIDOS', 50))
+PERFIS_DIAS = int(os.getenv('PERFIS_DIAS', 7))
+
+# Métricas Prometheus em /metrics, somadas entre os workers num SQLite local (cozinha/metricas.py)
+METRICAS_ATIVAS = os.getenv('METRICAS_ATIVAS', 'True') == 'True'
+METRICAS_ARQUIVO = Path(os.getenv('METRICAS_ARQUIVO', BASE_DIR / "tmp" / "metricas.sqlite3"))
+METRICAS_INTERVALO = float(os.getenv('METRICAS_INTERVALO', 10))  # segundos entre envios de cada worker
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')  # se definido, a coleta exige "Authorization: Bearer <token>"
+
+# Arquivo de eventos antigos (eventos/arquivo.py, manage.py arquivar_eventos)
+EVENTOS_HORIZONTE_DIAS = int(os.getenv('EVENTOS_HORIZONTE_DIAS', 2 * 365))
+
+# Auditoria de custos (eventos/auditoria.py, manage.py auditar_custos)
+AUDITORIA_MEMORIA_MB = int(os.getenv('AUDITORIA_MEMORIA_MB', 1024))  # teto da execução inteira, dividido entre os processos
+
+# Aquecimento dos workers do Passenger (cozinha/aquecimento.py)
+AQUECIMENTO_ATIVO = os.getenv('AQUECIMENTO', 'True') == 'True'
+AQUECIMENTO_RECEITAS = 20
+AQUECIMENTO_TAREFAS = [
+    "cozinha.aquecimento.carregar_urls",
+    "cozinha.aquecimento.compilar_templates",
+    "cozinha.aquecimento.carregar_referencias",
+    "cozinha.aquecimento.carregar_catalogo",
+    "cozinha.aquecimento.calcular_custos",
+]
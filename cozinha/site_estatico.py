@@ -0,0 +1,276 @@
+"""
+Site estático para os tablets da cozinha (somente leitura, sem Python).
+
+``gerar_site()`` renderiza as mesmas views do Django para arquivos HTML em
+``settings.SITE_ESTATICO_DIR``, no mesmo caminho da URL (``fichas/12/`` →
+``fichas/12/index.html``), e copia as imagens e os assets referenciados
+(``/static/...``, ``/media/...``). Qualquer servidor web que sirva
+``index.html`` de diretórios publica o site.
+
+Páginas geradas:
+
+- a lista de fichas e a lista de cada ``Categoria`` (sem paginação);
+- cada ficha técnica (``ReceitaDetailView``);
+- os eventos a partir de hoje (``EventoDetailView``).
+
+Cada página tem uma impressão digital das suas dependências (a árvore de
+sub-receitas e ingredientes pelo ``Catalogo``, cardápio e equipe do evento,
+estoque e embalagens, e o conteúdo dos templates). As impressões da última
+geração ficam em ``.impressoes.json``: só as páginas cuja impressão mudou são
+renderizadas de novo, e as de objetos removidos são apagadas. A geração
+completa (ou com muitas páginas pendentes) é dividida entre processos.
+"""
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import shutil
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles import finders
+from django.db import connections
+from django.db.models import Max
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+Pagina = namedtuple("Pagina", "caminho view kwargs impressao")
+
+ARQUIVO_IMPRESSOES = ".impressoes.json"
+REFERENCIAS = re.compile(r'(?:src|href)="(/(?:static|media)/[^"?#]+)')
+REDIRECIONAMENTO = '<!DOCTYPE html><meta charset="utf-8"><meta http-equiv="refresh" content="0; url={}">'
+
+
+# ------------------- Impressões digitais -------------------
+
+def impressao(*partes):
+    return hashlib.blake2b(repr(partes).encode(), digest_size=16).hexdigest()
+
+
+def impressao_templates():
+    """Conteúdo de todos os templates do projeto: mudou um, muda tudo."""
+    from cozinha.aquecimento import diretorios_templates
+
+    resumo = hashlib.blake2b(digest_size=16)
+    for pasta in diretorios_templates():
+        for arquivo in sorted(pasta.rglob("*.html")):
+            resumo.update(arquivo.relative_to(pasta).as_posix().encode())
+            resumo.update(arquivo.read_bytes())
+    return resumo.hexdigest()
+
+
+class Dependencias:
+    """Tudo de que as páginas dependem, lido de uma vez (catálogo + poucas consultas)."""
+
+    def __init__(self):
+        from estoque.models import MovimentoEstoque
+        from eventos.embalagens import EMBALAGENS
+        from fichas.custos import CATALOGO
+        from fichas.models import ItemReceita, Receita
+        from cozinha.referencias import CATEGORIAS
+
+        self.catalogo = CATALOGO.obter()
+        self.embalagens = EMBALAGENS.obter()
+        self.categorias = [(c.pk, c.nome) for c in CATEGORIAS.obter()]
+        self.receitas = {
+            linha[0]: linha for linha in Receita.objects.values_list(
+                "pk", "titulo", "categoria_id", "categoria__nome", "disciplina", "tipo_coccao",
+                "tempo_preparo_min", "tempo_coccao_min", "foto_preparo", "modo_preparo", "observacoes",
+            )
+        }
+        self.medidas = defaultdict(list)
+        for receita_id, item_id, medida in ItemReceita.objects.values_list("receita_id", "pk", "medida_caseira"):
+            self.medidas[receita_id].append((item_id, medida))
+        self.estoque = MovimentoEstoque.objects.aggregate(ultimo=Max("id"))["ultimo"]
+        self.embalagens_todas = impressao(sorted(self.embalagens.por_ingrediente.items()))
+        self.salt = (impressao_templates(), settings.STATIC_URL, settings.MEDIA_URL)
+        self._arvores = {}
+
+    def arvore(self, receita_id):
+        """Impressão da receita com toda a árvore de sub-receitas e ingredientes (memorizada)."""
+        if receita_id not in self._arvores:
+            catalogo, partes = self.catalogo, []
+            pendentes, vistas = [receita_id], set()
+            while pendentes:
+                atual = pendentes.pop()
+                if atual in vistas:
+                    continue
+                vistas.add(atual)
+                itens = catalogo.itens_por_receita.get(atual, ())
+                componentes = catalogo.componentes_por_receita.get(atual, ())
+                partes.append((self.receitas.get(atual), catalogo.receitas.get(atual), itens, componentes,
+                               [catalogo.ingredientes[i.ingrediente_id] for i in itens], self.medidas.get(atual)))
+                pendentes.extend(c.sub_receita_id for c in componentes)
+            self._arvores[receita_id] = impressao(partes)
+        return self._arvores[receita_id]
+
+    def cartao(self, receita_id):
+        """O que a lista de fichas mostra de cada receita."""
+        linha = self.receitas[receita_id]
+        return (linha[:4], linha[8], self.catalogo.custo_total(receita_id), self.catalogo.custo_por_porcao(receita_id))
+
+
+# ------------------- Páginas -------------------
+
+def paginas(dependencias=None):
+    """Todas as páginas do site, com a impressão digital de cada uma."""
+    from eventos.models import Evento, ItemCardapio, ParticipacaoEquipe
+
+    dep = dependencias or Dependencias()
+    lista = "fichas.views.ReceitaListView"
+    ordenadas = sorted(dep.receitas.values(), key=lambda r: (r[3], r[1]))
+
+    resultado = [Pagina(reverse("fichas:lista_fichas"), lista, {},
+                        impressao(dep.salt, dep.categorias, [dep.cartao(r[0]) for r in ordenadas]))]
+    for categoria_id, _nome in dep.categorias:
+        cartoes = [dep.cartao(r[0]) for r in ordenadas if r[2] == categoria_id]
+        resultado.append(Pagina(reverse("fichas:lista_categoria", args=[categoria_id]), lista,
+                                {"categoria_id": categoria_id}, impressao(dep.salt, dep.categorias, cartoes)))
+    for receita_id in sorted(dep.receitas):
+        resultado.append(Pagina(reverse("fichas:ficha", args=[receita_id]), "fichas.views.ReceitaDetailView",
+                                {"pk": receita_id}, impressao(dep.salt, dep.arvore(receita_id))))
+
+    eventos = list(Evento.objects.filter(data__gte=timezone.localdate()).order_by("pk").values_list(
+        "pk", "nome", "data", "hora_inicio", "hora_fim", "numero_pessoas", "custo_indireto", "margem_lucro",
+        "fechamento__fechado_em",
+    ))
+    ids = [e[0] for e in eventos]
+    itens, equipe = defaultdict(list), defaultdict(list)
+    for linha in ItemCardapio.objects.filter(evento_id__in=ids).order_by("pk").values_list(
+            "evento_id", "pk", "receita_id", "porcoes_por_pessoa"):
+        itens[linha[0]].append(linha)
+    for linha in ParticipacaoEquipe.objects.filter(evento_id__in=ids).order_by("pk").values_list(
+            "evento_id", "pk", "funcao__nome", "funcao__valor_hora_padrao", "quantidade", "horas", "valor_hora"):
+        equipe[linha[0]].append(linha)
+    for evento in eventos:
+        arvores = [dep.arvore(item[2]) for item in itens[evento[0]]]
+        resultado.append(Pagina(
+            reverse("eventos:detalhe_evento", args=[evento[0]]), "eventos.views.EventoDetailView", {"pk": evento[0]},
+            impressao(dep.salt, evento, itens[evento[0]], equipe[evento[0]], arvores, dep.estoque, dep.embalagens_todas),
+        ))
+    return resultado
+
+
+# ------------------- Renderização -------------------
+
+def destino(saida, caminho):
+    return Path(saida) / caminho.strip("/") / "index.html"
+
+
+def gravar(arquivo, conteudo):
+    """Grava de forma atômica (o servidor web nunca vê um arquivo pela metade)."""
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    temporario = arquivo.with_name(f".{arquivo.name}.{os.getpid()}")
+    temporario.write_bytes(conteudo)
+    os.replace(temporario, arquivo)
+
+
+def renderizar(paginas_lote, saida):
+    """Renderiza um lote de páginas; devolve os caminhos /static e /media referenciados."""
+    fabrica = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost")
+    referencias = set()
+    for pagina in paginas_lote:
+        request = fabrica.get(pagina.caminho)
+        request.user = AnonymousUser()
+        request.site_estatico = True
+        resposta = import_string(pagina.view).as_view()(request, **pagina.kwargs)
+        resposta.render()
+        if resposta.status_code != 200:
+            raise RuntimeError(f"{pagina.caminho}: resposta {resposta.status_code}")
+        gravar(destino(saida, pagina.caminho), resposta.content)
+        referencias.update(REFERENCIAS.findall(resposta.content.decode(resposta.charset)))
+    return referencias
+
+
+def iniciar_processo():
+    """Cada processo abre a própria conexão (e configura o Django, se iniciado por spawn)."""
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+def renderizar_em_paralelo(pendentes, saida, processos):
+    lotes = [pendentes[i::processos] for i in range(processos) if pendentes[i::processos]]
+    connections.close_all()  # nada de conexão herdada pelos processos filhos
+    contexto = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    referencias = set()
+    with ProcessPoolExecutor(len(lotes), mp_context=contexto, initializer=iniciar_processo) as executor:
+        for achadas in executor.map(renderizar, lotes, [saida] * len(lotes)):
+            referencias |= achadas
+    return referencias
+
+
+def copiar_arquivos(referencias, saida):
+    """Copia os assets e imagens referenciados que faltam ou mudaram; devolve os não encontrados."""
+    faltando = []
+    for url in sorted(referencias):
+        if url.startswith(settings.MEDIA_URL):
+            origem = Path(settings.MEDIA_ROOT) / url[len(settings.MEDIA_URL):]
+        else:
+            relativo = url.split("/", 2)[2]
+            coletado = Path(settings.STATIC_ROOT) / relativo
+            origem = coletado if coletado.is_file() else Path(finders.find(relativo) or coletado)
+        if not origem.is_file():
+            faltando.append(url)
+            continue
+        alvo = Path(saida) / url.lstrip("/")
+        info = origem.stat()
+        if alvo.is_file() and alvo.stat().st_size == info.st_size and alvo.stat().st_mtime == info.st_mtime:
+            continue
+        alvo.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(origem, alvo)
+    return faltando
+
+
+# ------------------- Geração -------------------
+
+def gerar_site(saida=None, completo=False, processos=None):
+    """
+    Gera (ou atualiza) o site estático; devolve um resumo com as páginas
+    renderizadas, mantidas e removidas e os arquivos referenciados não encontrados.
+    """
+    saida = Path(saida or settings.SITE_ESTATICO_DIR)
+    processos = processos or os.cpu_count() or 1
+    arquivo_impressoes = saida / ARQUIVO_IMPRESSOES
+    anteriores = {}
+    if arquivo_impressoes.is_file() and not completo:
+        anteriores = json.loads(arquivo_impressoes.read_text(encoding="utf-8"))
+
+    todas = paginas()
+    pendentes = [p for p in todas if completo or anteriores.get(p.caminho) != p.impressao
+                 or not destino(saida, p.caminho).is_file()]
+    # Processos só compensam com várias páginas por processo (cada um carrega o próprio catálogo)
+    processos = min(processos, math.ceil(len(pendentes) / 4))
+    if processos > 1:
+        referencias = renderizar_em_paralelo(pendentes, saida, processos)
+    else:
+        referencias = renderizar(pendentes, saida)
+
+    atuais = {p.caminho for p in todas}
+    removidas = sorted(set(anteriores) - atuais)
+    for caminho in removidas:
+        arquivo = destino(saida, caminho)
+        arquivo.unlink(missing_ok=True)
+        try:
+            arquivo.parent.rmdir()
+        except OSError:  # não existe ou tem outras páginas dentro
+            pass
+
+    gravar(saida / "index.html", REDIRECIONAMENTO.format(reverse("fichas:lista_fichas")).encode())
+    faltando = copiar_arquivos(referencias, saida)
+    gravar(arquivo_impressoes, json.dumps({p.caminho: p.impressao for p in todas}, indent=0).encode())
+    return {
+        "renderizadas": len(pendentes),
+        "mantidas": len(todas) - len(pendentes),
+        "removidas": removidas,
+        "processos": max(processos, 1),
+        "faltando": faltando,
+    }
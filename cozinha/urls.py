@@ -1,16 +1,21 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.generic import RedirectView
 from django.conf import settings
-from django.conf.urls.static import static
+
+from diagnostico.views import metricas
+from .midia import servir_midia
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("fichas/", include("fichas.urls")),
     path("eventos/", include("eventos.urls")),  # 👈 Adiciona o app de eventos
+    path("equipe/", include("equipe.urls")),
+    path("metrics", metricas, name="metricas"),  # Prometheus (cozinha/metricas.py)
     path("", RedirectView.as_view(url="/fichas/", permanent=False)),  # redireciona raiz
 ]
 
-# Exibe imagens (media) no modo de desenvolvimento
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Imagens (media) em desenvolvimento e produção: blocos, Range, ETag e X-Sendfile/X-Accel-Redirect
+urlpatterns += [
+    re_path(r"^%s(?P<caminho>.+)$" % settings.MEDIA_URL.lstrip("/"), servir_midia, name="midia"),
+]
@@ -13,4 +13,6 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cozinha.settings")
 
-application = get_wsgi_application()
+from cozinha.estaticos import ServidorEstaticos  # noqa: E402
+
+application = ServidorEstaticos(get_wsgi_application())
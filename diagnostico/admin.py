@@ -0,0 +1,84 @@
+import zlib
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from .models import PerfilRequisicao
+from .perfil import gerar_token
+
+
+# ------------------- PERFIS -------------------
+
+@admin.register(PerfilRequisicao)
+class PerfilRequisicaoAdmin(admin.ModelAdmin):
+    """Perfis capturados (somente leitura), com as funções mais caras e os arquivos para flamegraph/snakeviz."""
+    list_display = ("criado_em", "metodo", "caminho", "status", "duracao_ms", "consultas", "usuario")
+    list_filter = ("metodo", "status")
+    search_fields = ("caminho",)
+    list_select_related = ("usuario",)
+    date_hierarchy = "criado_em"
+    exclude = ("funcoes", "pilhas", "estatisticas")
+    readonly_fields = ("criado_em", "usuario", "metodo", "caminho", "status", "duracao_ms", "consultas", "amostras",
+                       "arquivos", "tabela_funcoes")
+    change_list_template = "admin/diagnostico/perfilrequisicao/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path("<int:pk>/collapsed/", self.admin_site.admin_view(self.collapsed_view),
+                 name="diagnostico_perfilrequisicao_collapsed"),
+            path("<int:pk>/pstats/", self.admin_site.admin_view(self.pstats_view),
+                 name="diagnostico_perfilrequisicao_pstats"),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        """Mostra o token de perfil do usuário logado acima da lista."""
+        extra_context = dict(extra_context or {}, token_perfil=gerar_token(request.user))
+        return super().changelist_view(request, extra_context)
+
+    def arquivos(self, obj):
+        return format_html(
+            '<a href="{}">pilhas (collapsed, {} amostras)</a> · <a href="{}">pstats (snakeviz)</a>',
+            reverse("admin:diagnostico_perfilrequisicao_collapsed", args=[obj.pk]), obj.amostras,
+            reverse("admin:diagnostico_perfilrequisicao_pstats", args=[obj.pk]),
+        )
+    arquivos.short_description = "Arquivos"
+
+    def tabela_funcoes(self, obj):
+        linhas = format_html_join(
+            "", "<tr><td>{}</td><td><code>{}</code></td><td>{}</td><td>{}</td><td>{}</td></tr>",
+            ((f["funcao"], f["local"], f["chamadas"], f["proprio_ms"], f["acumulado_ms"]) for f in obj.funcoes),
+        )
+        return format_html(
+            "<table><thead><tr><th>Função</th><th>Local</th><th>Chamadas</th><th>Próprio (ms)</th>"
+            "<th>Acumulado (ms)</th></tr></thead><tbody>{}</tbody></table>", linhas,
+        )
+    tabela_funcoes.short_description = "Funções mais caras"
+
+    def perfil_visivel(self, request, pk):
+        """Perfil ``pk`` se o usuário pode vê-lo no admin (``admin_view`` só confere ``is_staff``)."""
+        perfil = get_object_or_404(PerfilRequisicao, pk=pk)
+        if not self.has_view_permission(request, perfil):
+            raise PermissionDenied
+        return perfil
+
+    def collapsed_view(self, request, pk):
+        perfil = self.perfil_visivel(request, pk)
+        resposta = HttpResponse(perfil.pilhas, content_type="text/plain; charset=utf-8")
+        resposta["Content-Disposition"] = f'attachment; filename="perfil-{pk}.folded"'
+        return resposta
+
+    def pstats_view(self, request, pk):
+        perfil = self.perfil_visivel(request, pk)
+        resposta = HttpResponse(zlib.decompress(bytes(perfil.estatisticas)), content_type="application/octet-stream")
+        resposta["Content-Disposition"] = f'attachment; filename="perfil-{pk}.prof"'
+        return resposta
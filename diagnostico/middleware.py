@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from cozinha.metricas import BALDES_CONSULTAS, BALDES_SEGUNDOS, METRICAS
+from .perfil import perfilar, token_da_requisicao, token_valido
+
+
+class MetricasMiddleware:
+    """
+    Duração, consultas SQL e status de cada requisição, por nome de rota
+    (``cozinha.metricas``). Fica no topo da lista, para medir a pilha inteira.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICAS_ATIVAS:
+            return self.get_response(request)
+        consultas = []
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(lambda executar, *args: consultas.append(1) or executar(*args)):
+            resposta = self.get_response(request)
+        duracao = time.perf_counter() - inicio
+
+        rota = getattr(request.resolver_match, "view_name", None) or "sem_rota"
+        METRICAS.observar("cozinha_requisicao_segundos", duracao, BALDES_SEGUNDOS, rota=rota)
+        METRICAS.observar("cozinha_requisicao_consultas", len(consultas), BALDES_CONSULTAS, rota=rota)
+        METRICAS.somar("cozinha_requisicoes_total", rota=rota, status=resposta.status_code)
+        return resposta
+
+
+class PerfilMiddleware:
+    """
+    Perfila a requisição quando ela traz um token de perfil válido do próprio
+    usuário da equipe (``?perfil=`` ou ``X-Perfil``); as demais passam direto.
+    Fica depois do ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if token_valido(token_da_requisicao(request), request.user):
+            return perfilar(request, self.get_response)
+        return self.get_response(request)
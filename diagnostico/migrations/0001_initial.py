@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PerfilRequisicao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("criado_em", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("metodo", models.CharField(max_length=10)),
+                ("caminho", models.CharField(max_length=500)),
+                ("status", models.PositiveSmallIntegerField()),
+                (
+                    "duracao_ms",
+                    models.DecimalField(
+                        decimal_places=1, max_digits=10, verbose_name="Duração (ms)"
+                    ),
+                ),
+                ("consultas", models.PositiveIntegerField(default=0)),
+                ("amostras", models.PositiveIntegerField(default=0)),
+                (
+                    "funcoes",
+                    models.JSONField(
+                        default=list,
+                        help_text="Funções mais caras (tempo próprio e acumulado)",
+                    ),
+                ),
+                (
+                    "pilhas",
+                    models.TextField(
+                        blank=True,
+                        help_text="Pilhas amostradas no formato collapsed (flamegraph.pl, speedscope)",
+                    ),
+                ),
+                (
+                    "estatisticas",
+                    models.BinaryField(help_text="pstats completo (marshal + zlib)"),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "perfil de requisição",
+                "verbose_name_plural": "perfis de requisição",
+                "ordering": ["-criado_em"],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import models
+
+
+# ------------------- Perfis de requisição -------------------
+class PerfilRequisicao(models.Model):
+    """
+    Perfil de uma requisição capturado sob demanda pela equipe
+    (``diagnostico.middleware.PerfilMiddleware``). Guarda as funções mais
+    caras (cProfile), as pilhas amostradas no formato "collapsed" dos
+    flamegraphs e o pstats completo, comprimido.
+    """
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                                related_name="+")
+    metodo = models.CharField(max_length=10)
+    caminho = models.CharField(max_length=500)
+    status = models.PositiveSmallIntegerField()
+    duracao_ms = models.DecimalField("Duração (ms)", max_digits=10, decimal_places=1)
+    consultas = models.PositiveIntegerField(default=0)
+    amostras = models.PositiveIntegerField(default=0)
+    funcoes = models.JSONField(default=list, help_text="Funções mais caras (tempo próprio e acumulado)")
+    pilhas = models.TextField(blank=True, help_text="Pilhas amostradas no formato collapsed (flamegraph.pl, speedscope)")
+    estatisticas = models.BinaryField(help_text="pstats completo (marshal + zlib)")
+
+    class Meta:
+        ordering = ["-criado_em"]
+        verbose_name = "perfil de requisição"
+        verbose_name_plural = "perfis de requisição"
+
+    def __str__(self):
+        return f"{self.metodo} {self.caminho} ({self.duracao_ms} ms)"
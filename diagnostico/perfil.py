@@ -0,0 +1,182 @@
+"""
+Perfil de requisições sob demanda, para a equipe.
+
+Uma requisição é perfilada quando traz um token assinado (``?perfil=<token>``
+ou o cabeçalho ``X-Perfil``) emitido para o próprio usuário, que precisa ser
+da equipe. O token expira (``PERFIL_VALIDADE``), então um link copiado não
+liga o perfil para sempre nem para outra pessoa.
+
+Durante a requisição rodam juntos:
+
+- ``cProfile``: tempo próprio e acumulado de cada função (``funcoes`` e o
+  pstats completo, para abrir no snakeviz);
+- ``Amostrador``: uma thread que lê a pilha da thread da requisição a cada
+  ``PERFIL_INTERVALO_MS`` e conta as pilhas no formato "collapsed"
+  (``a;b;c 12``) que flamegraph.pl e speedscope leem.
+
+Só um perfil por processo de cada vez; as outras requisições seguem normais.
+O resultado vai para ``PerfilRequisicao`` e os mais antigos são descartados
+(``PERFIS_RETIDOS``, ``PERFIS_DIAS``).
+"""
+import cProfile
+import marshal
+import pstats
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.utils import timezone
+
+from .models import PerfilRequisicao
+
+SAL = "diagnostico.perfil"
+FUNCOES_GUARDADAS = 40
+
+_capturando = threading.Lock()
+
+
+# ------------------- Token -------------------
+
+def gerar_token(usuario):
+    """Token assinado que liga o perfil para ``usuario`` até expirar."""
+    return signing.dumps(usuario.pk, salt=SAL)
+
+
+def token_valido(token, usuario):
+    """Indica se o token é válido, não expirou e foi emitido para ``usuario`` (da equipe)."""
+    if not token or not getattr(usuario, "is_staff", False):
+        return False
+    try:
+        return signing.loads(token, salt=SAL, max_age=settings.PERFIL_VALIDADE) == usuario.pk
+    except signing.BadSignature:
+        return False
+
+
+def token_da_requisicao(request):
+    return request.GET.get("perfil") or request.headers.get("X-Perfil")
+
+
+# ------------------- Amostragem -------------------
+
+def nome_arquivo(caminho):
+    """Caminho curto: relativo ao projeto ou a partir do pacote em site-packages."""
+    caminho = Path(caminho)
+    try:
+        return str(caminho.relative_to(settings.BASE_DIR))
+    except ValueError:
+        partes = caminho.parts
+        for marco in ("site-packages", "dist-packages"):
+            if marco in partes:
+                return "/".join(partes[partes.index(marco) + 1:])
+        return caminho.name
+
+
+class Amostrador(threading.Thread):
+    """Conta as pilhas de uma thread a cada ``intervalo`` segundos, do quadro ``raiz`` para dentro."""
+
+    def __init__(self, thread_id, intervalo, raiz=None):
+        super().__init__(name="perfil-amostrador", daemon=True)
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.raiz = raiz
+        self.pilhas = Counter()
+        self.parar = threading.Event()
+        self._rotulos = {}
+
+    def rotulo(self, codigo):
+        rotulo = self._rotulos.get(codigo)
+        if rotulo is None:
+            rotulo = self._rotulos[codigo] = f"{nome_arquivo(codigo.co_filename)}:{codigo.co_qualname}"
+        return rotulo
+
+    def run(self):
+        while not self.parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None:
+                pilha.append(self.rotulo(frame.f_code))
+                if frame.f_code is self.raiz:
+                    break
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{pilha} {contagem}" for pilha, contagem in self.pilhas.most_common())
+
+
+# ------------------- Captura -------------------
+
+def funcoes_mais_caras(estatisticas, quantidade=FUNCOES_GUARDADAS):
+    """As ``quantidade`` funções com mais tempo próprio, com tempos em ms."""
+    linhas = []
+    for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in estatisticas.stats.items():
+        linhas.append({
+            "funcao": funcao,
+            "local": f"{nome_arquivo(arquivo)}:{linha}" if linha else arquivo,
+            "chamadas": chamadas,
+            "proprio_ms": round(proprio * 1000, 2),
+            "acumulado_ms": round(acumulado * 1000, 2),
+        })
+    linhas.sort(key=lambda l: l["proprio_ms"], reverse=True)
+    return linhas[:quantidade]
+
+
+def perfilar(request, get_response):
+    """
+    Atende a requisição sob cProfile e amostragem e grava o perfil.
+    Se outro perfil está em andamento no processo, só atende.
+    """
+    if not _capturando.acquire(blocking=False):
+        return get_response(request)
+    try:
+        contador = []
+        amostrador = Amostrador(threading.get_ident(), settings.PERFIL_INTERVALO_MS / 1000, perfilar.__code__)
+        perfil = cProfile.Profile()
+        amostrador.start()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(lambda executar, *args: contador.append(1) or executar(*args)):
+            perfil.enable()
+            try:
+                resposta = get_response(request)
+            finally:
+                perfil.disable()
+                duracao = time.perf_counter() - inicio
+                amostrador.parar.set()
+                amostrador.join()
+
+        estatisticas = pstats.Stats(perfil)
+        registro = PerfilRequisicao.objects.create(
+            usuario=request.user if request.user.is_authenticated else None,
+            metodo=request.method,
+            caminho=request.get_full_path()[:500],
+            status=resposta.status_code,
+            duracao_ms=round(duracao * 1000, 1),
+            consultas=len(contador),
+            amostras=sum(amostrador.pilhas.values()),
+            funcoes=funcoes_mais_caras(estatisticas),
+            pilhas=amostrador.collapsed(),
+            estatisticas=zlib.compress(marshal.dumps(estatisticas.stats), 6),
+        )
+        limpar()
+        resposta["X-Perfil-Id"] = str(registro.pk)
+        return resposta
+    finally:
+        _capturando.release()
+
+
+def limpar():
+    """Descarta perfis além dos ``PERFIS_RETIDOS`` mais recentes e os mais velhos que ``PERFIS_DIAS``."""
+    antigos = PerfilRequisicao.objects.filter(criado_em__lt=timezone.now() - timedelta(days=settings.PERFIS_DIAS))
+    removidos, _ = antigos.delete()
+    excedentes = list(PerfilRequisicao.objects.values_list("pk", flat=True)[settings.PERFIS_RETIDOS:])
+    if excedentes:
+        removidos += PerfilRequisicao.objects.filter(pk__in=excedentes).delete()[0]
+    return removidos
@@ -0,0 +1,164 @@
+"""
+Perfil sob demanda: o token liga o ``PerfilMiddleware`` só para o próprio
+usuário da equipe, e os arquivos do perfil exigem a permissão de ver perfis.
+Métricas: ``/metrics`` soma os workers e só atende quem ``coleta_autorizada``
+aceita.
+"""
+import marshal
+import multiprocessing
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cozinha.metricas import BALDES_SEGUNDOS, METRICAS
+from .models import PerfilRequisicao
+from .perfil import gerar_token
+
+Usuario = get_user_model()
+
+
+class PerfilMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.equipe = Usuario.objects.create_user("equipe", password="senha", is_staff=True)
+        self.url = reverse("fichas:lista_fichas")
+
+    def abrir(self, usuario, token, cabecalho=False):
+        self.client.force_login(usuario)
+        if cabecalho:
+            return self.client.get(self.url, headers={"X-Perfil": token})
+        return self.client.get(self.url, {"perfil": token})
+
+    def test_token_do_proprio_usuario_liga_o_perfil(self):
+        resposta = self.abrir(self.equipe, gerar_token(self.equipe))
+        self.assertEqual(resposta.status_code, 200)
+        perfil = PerfilRequisicao.objects.get()
+        self.assertEqual(resposta["X-Perfil-Id"], str(perfil.pk))
+        self.assertEqual((perfil.usuario, perfil.status, perfil.metodo), (self.equipe, 200, "GET"))
+        self.assertTrue(perfil.funcoes)
+        self.assertTrue(marshal.loads(zlib.decompress(bytes(perfil.estatisticas))))
+
+        self.abrir(self.equipe, gerar_token(self.equipe), cabecalho=True)
+        self.assertEqual(PerfilRequisicao.objects.count(), 2)
+
+    def test_sem_token_valido_nao_perfila(self):
+        outro = Usuario.objects.create_user("outro", password="senha", is_staff=True)
+        cliente = Usuario.objects.create_user("cliente", password="senha")
+        casos = [
+            (self.equipe, ""),
+            (self.equipe, "lixo"),
+            (self.equipe, gerar_token(outro)),  # token emitido para outra pessoa
+            (cliente, gerar_token(cliente)),  # fora da equipe
+        ]
+        for usuario, token in casos:
+            resposta = self.abrir(usuario, token)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertNotIn("X-Perfil-Id", resposta)
+        with override_settings(PERFIL_VALIDADE=-1):  # expirado
+            self.assertNotIn("X-Perfil-Id", self.abrir(self.equipe, gerar_token(self.equipe)))
+        self.assertFalse(PerfilRequisicao.objects.exists())
+
+
+class PerfilAdminTests(TestCase):
+
+    def setUp(self):
+        self.perfil = PerfilRequisicao.objects.create(
+            metodo="GET", caminho="/", status=200, duracao_ms=12.5, consultas=3, amostras=2,
+            funcoes=[], pilhas="a;b 2\n", estatisticas=zlib.compress(marshal.dumps({})),
+        )
+        self.urls = [reverse(f"admin:diagnostico_perfilrequisicao_{nome}", args=[self.perfil.pk])
+                     for nome in ("collapsed", "pstats")]
+        self.equipe = Usuario.objects.create_user("equipe", password="senha", is_staff=True)
+        self.client.force_login(self.equipe)
+
+    def test_equipe_sem_permissao_recebe_403(self):
+        for url in self.urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_permissao_de_ver_libera_os_arquivos(self):
+        self.equipe.user_permissions.add(Permission.objects.get(codename="view_perfilrequisicao"))
+        collapsed, pstats = (self.client.get(url) for url in self.urls)
+        self.assertEqual((collapsed.status_code, collapsed.content), (200, b"a;b 2\n"))
+        self.assertEqual(collapsed["Content-Disposition"], f'attachment; filename="perfil-{self.perfil.pk}.folded"')
+        self.assertEqual(marshal.loads(pstats.content), {})
+
+    def test_fora_da_equipe_vai_para_o_login(self):
+        self.client.force_login(Usuario.objects.create_user("cliente", password="senha"))
+        for url in self.urls:
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+
+def worker_metricas(requisicoes):
+    """Um "worker" do Passenger: acumula só os próprios incrementos e descarrega no arquivo compartilhado."""
+    for _ in range(requisicoes):
+        METRICAS.somar("cozinha_requisicoes_total", rota="teste:rota", status=200)
+    METRICAS.observar("cozinha_custos_avaliacao_segundos", 0.02, BALDES_SEGUNDOS)
+    METRICAS.descarregar()
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        configuracao = override_settings(METRICAS_ARQUIVO=Path(pasta) / "metricas.sqlite3", METRICAS_INTERVALO=3600,
+                                         METRICAS_TOKEN="")
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        METRICAS.limpar()  # incrementos de outros testes deste processo não entram no arquivo temporário
+        self.url = reverse("metricas")
+
+    def serie(self, texto, linha):
+        valores = [l.rsplit(" ", 1)[1] for l in texto.splitlines() if l.rsplit(" ", 1)[0] == linha]
+        self.assertEqual(len(valores), 1, linha)
+        return valores[0]
+
+    def test_soma_os_workers(self):
+        METRICAS.somar("cozinha_requisicoes_total", rota="teste:rota", status=200)  # pendente no "pai"
+        contexto = multiprocessing.get_context("fork")
+        workers = [contexto.Process(target=worker_metricas, args=(requisicoes,)) for requisicoes in (3, 4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+        texto = self.client.get(self.url).content.decode()  # a coleta descarrega o worker que a atende
+        self.assertEqual(self.serie(texto, 'cozinha_requisicoes_total{rota="teste:rota",status="200"}'), "8")
+        self.assertEqual(self.serie(texto, "cozinha_custos_avaliacao_segundos_count"), "2")
+        self.assertEqual(self.serie(texto, 'cozinha_custos_avaliacao_segundos_bucket{le="0.025"}'), "2")
+        self.assertEqual(self.serie(texto, 'cozinha_custos_avaliacao_segundos_bucket{le="0.01"}'), "0")
+        self.assertEqual(texto.count("# TYPE cozinha_requisicoes_total counter"), 1)
+
+        texto = self.client.get(self.url).content.decode()  # nada pendente: o arquivo não soma de novo
+        self.assertEqual(self.serie(texto, 'cozinha_requisicoes_total{rota="teste:rota",status="200"}'), "8")
+
+    def test_coleta_sem_token(self):
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="127.0.0.1").status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="::1").status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="203.0.113.7").status_code, 403)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="203.0.113.7",
+                                         headers={"Authorization": "Bearer qualquer"}).status_code, 403)
+
+        self.client.force_login(Usuario.objects.create_user("cliente", password="senha"))
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="203.0.113.7").status_code, 403)
+        self.client.force_login(Usuario.objects.create_user("equipe", password="senha", is_staff=True))
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="203.0.113.7").status_code, 200)
+
+    @override_settings(METRICAS_TOKEN="segredo")
+    def test_coleta_com_token(self):
+        remoto = {"REMOTE_ADDR": "203.0.113.7"}
+        self.assertEqual(self.client.get(self.url, headers={"Authorization": "Bearer segredo"}, **remoto).status_code,
+                         200)
+        for cabecalho in ({}, {"Authorization": "Bearer errado"}, {"Authorization": "segredo"}):
+            self.assertEqual(self.client.get(self.url, headers=cabecalho, **remoto).status_code, 403)
+        # com token configurado, nem o próprio servidor nem a equipe passam sem ele
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="127.0.0.1").status_code, 403)
+        self.client.force_login(Usuario.objects.create_user("equipe", password="senha", is_staff=True))
+        self.assertEqual(self.client.get(self.url, **remoto).status_code, 403)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from cozinha.metricas import texto_prometheus
+from eventos.arquivo import data_limite
+from eventos.models import Evento
+
+LOCAIS = ("127.0.0.1", "::1")
+
+
+def coleta_autorizada(request):
+    """Com ``METRICAS_TOKEN``, só com o token; sem ele, a equipe logada ou o próprio servidor."""
+    if settings.METRICAS_TOKEN:
+        return constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {settings.METRICAS_TOKEN}")
+    return request.user.is_staff or request.META.get("REMOTE_ADDR") in LOCAIS
+
+
+def filas():
+    """Trabalho à espera dos comandos periódicos (medido na coleta, não acumulado)."""
+    hoje = timezone.localdate()
+    return [
+        ("cozinha_fila_eventos_a_fechar", "",
+         Evento.objects.filter(data__lt=hoje, fechamento__isnull=True).count()),
+        ("cozinha_fila_eventos_a_arquivar", "", Evento.objects.filter(data__lt=data_limite()).count()),
+    ]
+
+
+@require_GET
+def metricas(request):
+    """Métricas de todos os workers no formato texto do Prometheus."""
+    if not coleta_autorizada(request):
+        return HttpResponseForbidden("Coleta de métricas não autorizada.\n", content_type="text/plain")
+    return HttpResponse(texto_prometheus(filas()), content_type="text/plain; version=0.0.4; charset=utf-8")
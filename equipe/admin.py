@@ -3,5 +3,5 @@ from .models import FuncaoEquipe
 
 @admin.register(FuncaoEquipe)
 class FuncaoEquipeAdmin(admin.ModelAdmin):
-    list_display = ("nome", "valor_hora_padrao")
+    list_display = ("nome", "valor_hora_padrao", "quadro", "horas_semana")
     search_fields = ("nome",)
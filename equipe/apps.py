@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class EquipeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "equipe"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from cozinha.referencias import FUNCOES
+        from .models import FuncaoEquipe
+
+        # Funções da equipe (selects do admin): recarregadas em todos os workers
+        post_save.connect(FUNCOES.invalidar, sender=FuncaoEquipe, dispatch_uid="funcoes_save")
+        post_delete.connect(FUNCOES.invalidar, sender=FuncaoEquipe, dispatch_uid="funcoes_delete")
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from equipe.planejamento import planejar
+
+
+class Command(BaseCommand):
+    help = "Mostra horas necessárias × planejadas, conflitos de alocação e utilização semanal dos próximos eventos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=28, help="Quantos dias à frente analisar (padrão: 28).")
+
+    def handle(self, *args, **options):
+        if options["dias"] < 0:
+            raise CommandError("--dias deve ser zero ou positivo.")
+        de = timezone.localdate()
+        plano = planejar(de, de + timedelta(days=options["dias"]))
+
+        for evento in plano["eventos"]:
+            estilo = self.style.WARNING if evento["saldo_horas"] < 0 else self.style.SUCCESS
+            self.stdout.write(
+                f"{evento['inicio']:%d/%m %H:%M} {evento['nome']}: necessárias {evento['horas_necessarias']} h, "
+                f"planejadas {evento['horas_planejadas']} h " + estilo(f"(saldo {evento['saldo_horas']} h)")
+            )
+        for conflito in plano["conflitos"]:
+            self.stdout.write(self.style.ERROR(
+                f"Conflito {conflito['funcao']} em {conflito['inicio']:%d/%m %H:%M}: {conflito['pessoas']} pessoas "
+                f"para um quadro de {conflito['quadro']} ({', '.join(conflito['eventos'])})"
+            ))
+        for linha in plano["utilizacao"]:
+            uso = f"{linha['utilizacao']}%" if linha["utilizacao"] is not None else "sem quadro"
+            self.stdout.write(f"Semana {linha['semana']:%d/%m} {linha['funcao__nome']}: {linha['horas']} h ({uso})")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(plano['eventos'])} eventos, {len(plano['conflitos'])} conflitos."
+        ))
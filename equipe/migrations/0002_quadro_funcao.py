@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:20
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("equipe", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="funcaoequipe",
+            name="horas_semana",
+            field=models.DecimalField(
+                decimal_places=1,
+                default=Decimal("44.0"),
+                help_text="Horas semanais de cada pessoa, para o cálculo de utilização",
+                max_digits=5,
+            ),
+        ),
+        migrations.AddField(
+            model_name="funcaoequipe",
+            name="quadro",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Pessoas disponíveis nessa função ao mesmo tempo (0 = sem controle de conflitos)",
+            ),
+        ),
+    ]
@@ -9,6 +9,15 @@ class FuncaoEquipe(models.Model):
         default=Decimal("20.00"),
         help_text="Valor/hora padrão dessa função"
     )
+    quadro = models.PositiveIntegerField(
+        default=0,
+        help_text="Pessoas disponíveis nessa função ao mesmo tempo (0 = sem controle de conflitos)"
+    )
+    horas_semana = models.DecimalField(
+        max_digits=5, decimal_places=1,
+        default=Decimal("44.0"),
+        help_text="Horas semanais de cada pessoa, para o cálculo de utilização"
+    )
 
     def __str__(self):
         return f"{self.nome} (R$ {self.valor_hora_padrao}/h)"
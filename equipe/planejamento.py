@@ -0,0 +1,188 @@
+"""
+Planejamento de equipe: horas necessárias × horas planejadas e conflitos de
+alocação entre eventos.
+
+- Horas necessárias de um evento: para cada receita do cardápio, o número de
+  lotes (porções servidas ÷ porções da ficha) × ``tempo_preparo_min`` mais
+  ``tempo_coccao_min`` por lote iniciado (cada fornada/panela cozinha uma vez).
+- Horas planejadas: Σ quantidade × horas das ``ParticipacaoEquipe``.
+- Conflitos: cada evento ocupa um intervalo (``data`` + ``hora_inicio``/
+  ``hora_fim``, ou o dia inteiro). Uma varredura sobre os intervalos de cada
+  função encontra os instantes em que a soma das pessoas alocadas passa do
+  ``quadro`` da função; ``IndiceIntervalos`` responde "quais eventos se
+  sobrepõem a este" em O(log n + k).
+- Utilização semanal: uma consulta agregada por semana e função.
+
+Tudo é carregado com um número fixo de consultas, independente do número de eventos.
+"""
+import math
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncWeek
+
+from eventos.models import Evento, ItemCardapio, ParticipacaoEquipe
+from fichas.aritmetica import q, ZERO
+from fichas.models import calcular_numero_porcoes, Receita
+from .models import FuncaoEquipe
+
+Intervalo = namedtuple("Intervalo", "inicio fim evento_id")
+
+# Último dia planejável: o intervalo de um evento termina no máximo no dia seguinte
+ULTIMO_DIA = date.max - timedelta(days=1)
+
+
+def intervalo_evento(data, hora_inicio=None, hora_fim=None):
+    """(início, fim) do trabalho no evento; sem horário ocupa o dia inteiro."""
+    inicio = datetime.combine(data, hora_inicio or time.min)
+    fim = datetime.combine(data, hora_fim) if hora_fim else datetime.combine(data + timedelta(days=1), time.min)
+    if fim <= inicio:  # termina depois da meia-noite
+        fim += timedelta(days=1)
+    return inicio, fim
+
+
+class IndiceIntervalos:
+    """
+    Intervalos ordenados pelo início com o maior fim acumulado: a consulta de
+    sobreposição faz uma busca binária e volta só enquanto algum intervalo
+    anterior ainda pode alcançar o início pedido.
+    """
+
+    def __init__(self, intervalos):
+        self.intervalos = sorted(intervalos)
+        self.inicios = [i.inicio for i in self.intervalos]
+        self.maior_fim = []
+        maior = None
+        for intervalo in self.intervalos:
+            maior = intervalo.fim if maior is None else max(maior, intervalo.fim)
+            self.maior_fim.append(maior)
+
+    def sobrepostos(self, inicio, fim):
+        """Intervalos com interseção não vazia com [inicio, fim)."""
+        encontrados = []
+        i = bisect_left(self.inicios, fim) - 1
+        while i >= 0 and self.maior_fim[i] > inicio:
+            if self.intervalos[i].fim > inicio:
+                encontrados.append(self.intervalos[i])
+            i -= 1
+        encontrados.reverse()
+        return encontrados
+
+
+def excessos(alocacoes, capacidade):
+    """
+    Varredura sobre [(Intervalo, pessoas)] de uma função: devolve os trechos em
+    que a soma das pessoas ultrapassa ``capacidade`` — [(início, pessoas, {evento_id})].
+    """
+    pontos = []
+    for intervalo, pessoas in alocacoes:
+        pontos.append((intervalo.inicio, 1, intervalo.evento_id, pessoas))
+        pontos.append((intervalo.fim, 0, intervalo.evento_id, pessoas))  # fim antes de início no mesmo instante
+    pontos.sort()
+
+    ativos, carga, trechos, ultimo = {}, 0, [], None
+    for instante, entra, evento_id, pessoas in pontos:
+        if entra:
+            ativos[evento_id] = ativos.get(evento_id, 0) + pessoas
+            carga += pessoas
+            if carga > capacidade:
+                grupo = frozenset(ativos)
+                if grupo != ultimo:
+                    trechos.append((instante, carga, grupo))
+                    ultimo = grupo
+        else:
+            ativos[evento_id] -= pessoas
+            if not ativos[evento_id]:
+                del ativos[evento_id]
+            carga -= pessoas
+            if carga <= capacidade:
+                ultimo = None
+    return trechos
+
+
+def horas_receita(tempo_preparo_min, tempo_coccao_min, lotes):
+    """Preparo proporcional aos lotes; cocção uma vez por lote iniciado."""
+    if lotes <= 0:
+        return ZERO
+    minutos = Decimal(tempo_preparo_min or 0) * lotes + Decimal(tempo_coccao_min or 0) * math.ceil(lotes)
+    return minutos / 60
+
+
+def planejar(de, ate):
+    """Relatório do período [de, ate]: eventos (horas e sobreposições), conflitos por função e utilização semanal."""
+    eventos = list(Evento.objects.filter(data__range=(de, ate)).order_by("data", "hora_inicio", "pk")
+                   .values("pk", "nome", "data", "hora_inicio", "hora_fim", "numero_pessoas"))
+    ids = [e["pk"] for e in eventos]
+    funcoes = {f["pk"]: f for f in FuncaoEquipe.objects.values("pk", "nome", "quadro", "horas_semana")}
+
+    cardapio = defaultdict(list)
+    for evento_id, receita_id, porcoes in (ItemCardapio.objects.filter(evento_id__in=ids)
+                                           .values_list("evento_id", "receita_id", "porcoes_por_pessoa")):
+        cardapio[evento_id].append((receita_id, porcoes))
+    receitas = {
+        r[0]: r for r in Receita.objects.filter(pk__in={rid for itens in cardapio.values() for rid, _ in itens})
+        .values_list("pk", "tempo_preparo_min", "tempo_coccao_min", "rendimento_total", "peso_por_porcao")
+    }
+    equipe = defaultdict(list)
+    for evento_id, funcao_id, quantidade, horas in (ParticipacaoEquipe.objects.filter(evento_id__in=ids)
+                                                    .values_list("evento_id", "funcao_id", "quantidade", "horas")):
+        equipe[evento_id].append((funcao_id, quantidade, horas))
+
+    intervalos = {}
+    por_funcao = defaultdict(list)
+    for evento in eventos:
+        inicio, fim = intervalo_evento(evento["data"], evento["hora_inicio"], evento["hora_fim"])
+        intervalo = intervalos[evento["pk"]] = Intervalo(inicio, fim, evento["pk"])
+        necessarias = ZERO
+        for receita_id, porcoes_por_pessoa in cardapio[evento["pk"]]:
+            _, preparo, coccao, rendimento, peso_porcao = receitas[receita_id]
+            porcoes = Decimal(evento["numero_pessoas"]) * porcoes_por_pessoa
+            porcoes_ficha = calcular_numero_porcoes(rendimento, peso_porcao)
+            lotes = porcoes / porcoes_ficha if porcoes_ficha else porcoes / (rendimento or 1)
+            necessarias += horas_receita(preparo, coccao, lotes)
+        planejadas = sum((quantidade * horas for _, quantidade, horas in equipe[evento["pk"]]), ZERO)
+        evento.update(inicio=inicio, fim=fim, horas_necessarias=q(necessarias, 1), horas_planejadas=q(planejadas, 1),
+                      saldo_horas=q(planejadas - necessarias, 1))
+        for funcao_id, quantidade, _ in equipe[evento["pk"]]:
+            por_funcao[funcao_id].append((intervalo, quantidade))
+
+    indice = IndiceIntervalos(intervalos.values())
+    nomes = {e["pk"]: e["nome"] for e in eventos}
+    for evento in eventos:
+        evento["sobrepostos"] = [nomes[i.evento_id] for i in indice.sobrepostos(evento["inicio"], evento["fim"])
+                                 if i.evento_id != evento["pk"]]
+
+    conflitos = []
+    for funcao_id, alocacoes in por_funcao.items():
+        funcao = funcoes[funcao_id]
+        if not funcao["quadro"]:
+            continue
+        for inicio, pessoas, grupo in excessos(alocacoes, funcao["quadro"]):
+            conflitos.append({
+                "funcao": funcao["nome"], "inicio": inicio, "pessoas": pessoas, "quadro": funcao["quadro"],
+                "eventos": sorted(nomes[i] for i in grupo),
+            })
+    conflitos.sort(key=lambda c: (c["inicio"], c["funcao"]))
+
+    return {"eventos": eventos, "conflitos": conflitos, "utilizacao": utilizacao_semanal(de, ate)}
+
+
+def utilizacao_semanal(de, ate):
+    """Horas planejadas por semana e função (uma consulta) e % do quadro × horas semanais."""
+    horas = ExpressionWrapper(F("quantidade") * F("horas"), output_field=DecimalField(max_digits=12, decimal_places=2))
+    linhas = list(
+        ParticipacaoEquipe.objects.filter(evento__data__range=(de, ate))
+        .annotate(semana=TruncWeek("evento__data"))
+        .values("semana", "funcao__nome", "funcao__quadro", "funcao__horas_semana")
+        .annotate(horas=Sum(horas))
+        .order_by("semana", "funcao__nome")
+    )
+    for linha in linhas:
+        disponivel = (linha["funcao__quadro"] or 0) * linha["funcao__horas_semana"]
+        linha["horas"] = q(linha["horas"], 1)
+        linha["disponivel"] = q(disponivel, 1) if disponivel else None
+        linha["utilizacao"] = q(linha["horas"] * 100 / disponivel, 1) if disponivel else None
+    return linhas
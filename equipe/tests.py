@@ -1,3 +1,71 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+
+from eventos.models import Evento, ItemCardapio, ParticipacaoEquipe
+from fichas.models import Categoria, Receita
+from .models import FuncaoEquipe
+from .planejamento import planejar
+
+
+class PlanejamentoTests(TestCase):
+    """Horas das fichas, sobreposição de eventos, conflitos com o quadro e utilização semanal."""
+
+    def setUp(self):
+        self.cozinheiro = FuncaoEquipe.objects.create(nome="Cozinheiro", quadro=3, horas_semana=Decimal("44.0"))
+        self.molho = Receita.objects.create(
+            titulo="Molho", categoria=Categoria.objects.create(nome="Molhos"), rendimento_total=Decimal("2.000"),
+            unidade_rendimento="kg", peso_por_porcao=Decimal("0.100"), tempo_preparo_min=30, tempo_coccao_min=45,
+        )
+
+    def evento(self, nome, dia, inicio=None, fim=None, pessoas=2, horas="4.00"):
+        evento = Evento.objects.create(nome=nome, data=dia, hora_inicio=inicio, hora_fim=fim, numero_pessoas=50,
+                                       custo_indireto=Decimal("0.00"), margem_lucro=Decimal("0.00"))
+        ParticipacaoEquipe.objects.create(evento=evento, funcao=self.cozinheiro, quantidade=pessoas,
+                                          horas=Decimal(horas))
+        return evento
+
+    def test_horas_necessarias_pelos_lotes(self):
+        evento = self.evento("Jantar", date(2026, 11, 5), pessoas=2, horas="6.00")
+        ItemCardapio.objects.create(evento=evento, receita=self.molho, porcoes_por_pessoa=Decimal("0.50"))
+        [linha] = planejar(date(2026, 11, 1), date(2026, 11, 30))["eventos"]
+        # 25 porções ÷ 20 da ficha = 1,25 lote: 30 × 1,25 de preparo + 45 × 2 de cocção = 127,5 min
+        self.assertEqual(linha["horas_necessarias"], Decimal("2.1"))
+        self.assertEqual(linha["horas_planejadas"], Decimal("12.0"))
+        self.assertEqual(linha["saldo_horas"], Decimal("9.9"))
+
+    def test_sobreposicoes_e_conflitos(self):
+        dia = date(2026, 11, 5)
+        self.evento("Almoço", dia, time(10), time(14))
+        self.evento("Coquetel", dia, time(13), time(18), horas="5.00")
+        self.evento("Jantar", dia, time(18), time(22))  # começa quando o coquetel termina: sem conflito
+        self.evento("Feira", date(2026, 11, 12), pessoas=1, horas="8.00")  # sem horário: o dia inteiro
+        relatorio = planejar(date(2026, 11, 1), date(2026, 11, 30))
+
+        sobrepostos = {e["nome"]: e["sobrepostos"] for e in relatorio["eventos"]}
+        self.assertEqual(sobrepostos, {"Almoço": ["Coquetel"], "Coquetel": ["Almoço"], "Jantar": [], "Feira": []})
+        self.assertEqual(relatorio["conflitos"], [{
+            "funcao": "Cozinheiro", "inicio": datetime(2026, 11, 5, 13), "pessoas": 4, "quadro": 3,
+            "eventos": ["Almoço", "Coquetel"],
+        }])
+
+        # semana de 02/11: 2 × (4 + 5 + 4) = 26 h de 3 × 44 = 132 h; semana de 09/11: 8 h
+        utilizacao = [(linha["semana"], linha["horas"], linha["utilizacao"]) for linha in relatorio["utilizacao"]]
+        self.assertEqual(utilizacao, [(date(2026, 11, 2), Decimal("26.0"), Decimal("19.7")),
+                                      (date(2026, 11, 9), Decimal("8.0"), Decimal("6.1"))])
+
+    def test_virada_da_noite(self):
+        self.evento("Festa", date(2026, 11, 5), time(20), time(2))
+        self.evento("Café", date(2026, 11, 6), time(1), time(5))
+        relatorio = planejar(date(2026, 11, 5), date(2026, 11, 6))
+        self.assertEqual([c["inicio"] for c in relatorio["conflitos"]], [datetime(2026, 11, 6, 1)])
 
-# Create your tests here.
+    def test_intervalo_nos_limites_do_calendario(self):
+        self.evento("Último", date(9999, 12, 30))
+        url = reverse("equipe:planejamento")
+        for parametros in ({"de": "9999-12-31"}, {"ate": "9999-12-31"}, {"de": "0001-01-01", "ate": "9999-12-31"}):
+            resposta = self.client.get(url, parametros)
+            self.assertEqual(resposta.status_code, 200, parametros)
+        self.assertEqual([e["nome"] for e in resposta.context["eventos"]], ["Último"])
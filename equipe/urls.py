@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = "equipe"
+
+urlpatterns = [
+    # Planejamento de equipe (horas, conflitos e utilização)
+    path("planejamento/", views.PlanejamentoEquipeView.as_view(), name="planejamento"),
+]
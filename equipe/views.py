@@ -1,3 +1,35 @@
-from django.shortcuts import render
+from datetime import datetime, timedelta
 
-# Create your views here.
+from django.utils import timezone
+from django.views.generic import TemplateView
+
+from .planejamento import ULTIMO_DIA, planejar
+
+
+# ---------------------------------------------------------------------
+# 👥 PLANEJAMENTO DE EQUIPE
+# ---------------------------------------------------------------------
+class PlanejamentoEquipeView(TemplateView):
+    """
+    Horas de equipe necessárias (tempos das fichas) × planejadas por evento,
+    conflitos de alocação por função e utilização semanal do quadro.
+    Intervalo em ?de=AAAA-MM-DD&ate=AAAA-MM-DD; padrão: próximos 28 dias.
+    """
+    template_name = "equipe/planejamento.html"
+
+    def data_param(self, nome, padrao):
+        try:
+            return datetime.strptime(self.request.GET.get(nome, ""), "%Y-%m-%d").date()
+        except ValueError:
+            return padrao
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        hoje = timezone.localdate()
+        de = min(self.data_param("de", hoje), ULTIMO_DIA)
+        ate = min(self.data_param("ate", None) or de + min(timedelta(days=28), ULTIMO_DIA - de), ULTIMO_DIA)
+        if de > ate:
+            de, ate = ate, de
+        context.update(planejar(de, ate))
+        context["de"], context["ate"] = de, ate
+        return context
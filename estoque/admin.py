@@ -0,0 +1,37 @@
+from django.contrib import admin
+from .models import MovimentoEstoque, SaldoEstoque
+
+
+# ------------------- MOVIMENTOS -------------------
+
+@admin.register(MovimentoEstoque)
+class MovimentoEstoqueAdmin(admin.ModelAdmin):
+    """Livro-razão: só inclusão. Correções são feitas com lançamentos de ajuste."""
+    list_display = ("data", "tipo", "ingrediente", "quantidade", "custo_total", "evento")
+    list_filter = ("tipo", "data")
+    search_fields = ("ingrediente__nome", "evento__nome", "observacao")
+    raw_id_fields = ("ingrediente", "evento")
+    list_select_related = ("ingrediente", "evento")
+    date_hierarchy = "data"
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ------------------- SALDOS -------------------
+
+@admin.register(SaldoEstoque)
+class SaldoEstoqueAdmin(admin.ModelAdmin):
+    """Fotografias de saldo geradas por `manage.py fechar_saldos` (somente leitura)."""
+    list_display = ("ingrediente", "saldo", "ate_movimento", "criado_em")
+    search_fields = ("ingrediente__nome",)
+    list_select_related = ("ingrediente",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,21 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from estoque.operacoes import fechar_saldos
+
+
+class Command(BaseCommand):
+    help = "Grava a fotografia dos saldos de estoque (rodar periodicamente, ex.: diariamente via cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--manter", type=int, default=12, help="Quantos fechamentos antigos manter.")
+
+    def handle(self, *args, **options):
+        try:
+            gravados = fechar_saldos(manter=options["manter"])
+        except ValidationError as erro:
+            raise CommandError(erro.messages[0])
+        if gravados:
+            self.stdout.write(self.style.SUCCESS(f"{gravados} saldos gravados."))
+        else:
+            self.stdout.write("Nenhum movimento novo desde o último fechamento.")
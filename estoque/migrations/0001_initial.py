@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('eventos', '0002_itemcardapio_foto_item'),
+        ('fichas', '0002_remove_receita_foto_ingrediente_foto_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimentoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('compra', 'Compra'), ('consumo', 'Consumo em evento'), ('perda', 'Perda'), ('ajuste', 'Ajuste de inventário')], max_length=10)),
+                ('quantidade', models.DecimalField(decimal_places=3, help_text='Na unidade base do ingrediente', max_digits=12)),
+                ('custo_total', models.DecimalField(blank=True, decimal_places=2, help_text='Valor pago (compras)', max_digits=12, null=True)),
+                ('data', models.DateField(default=django.utils.timezone.localdate)),
+                ('observacao', models.CharField(blank=True, max_length=255)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('evento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movimentos_estoque', to='eventos.evento')),
+                ('ingrediente', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimentos', to='fichas.ingrediente')),
+            ],
+            options={
+                'verbose_name': 'movimento de estoque',
+                'verbose_name_plural': 'movimentos de estoque',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['ingrediente', 'id'], name='estoque_mov_ingredi_ee397e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ate_movimento', models.PositiveBigIntegerField(help_text='Id do último movimento incluído')),
+                ('saldo', models.DecimalField(decimal_places=3, default=Decimal('0'), max_digits=14)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('ingrediente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='fichas.ingrediente')),
+            ],
+            options={
+                'verbose_name': 'saldo de estoque',
+                'verbose_name_plural': 'saldos de estoque',
+                'ordering': ['-ate_movimento'],
+                'constraints': [models.UniqueConstraint(fields=('ate_movimento', 'ingrediente'), name='saldo_unico_por_fechamento')],
+            },
+        ),
+    ]
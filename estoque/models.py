@@ -0,0 +1,79 @@
+from decimal import Decimal
+from django.db import models
+from django.utils import timezone
+from fichas.models import Ingrediente
+
+
+# ------------------- Movimentos (livro-razão) -------------------
+class MovimentoEstoque(models.Model):
+    """
+    Lançamento imutável (append-only) no estoque de um ingrediente.
+    Quantidades na unidade base do ingrediente: positivas entram, negativas saem.
+    Correções são feitas com um novo lançamento de ajuste, nunca editando.
+    """
+
+    class Tipo(models.TextChoices):
+        COMPRA = "compra", "Compra"
+        CONSUMO = "consumo", "Consumo em evento"
+        PERDA = "perda", "Perda"
+        AJUSTE = "ajuste", "Ajuste de inventário"
+
+    ingrediente = models.ForeignKey(Ingrediente, on_delete=models.PROTECT, related_name="movimentos")
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    quantidade = models.DecimalField(max_digits=12, decimal_places=3,
+                                     help_text="Na unidade base do ingrediente")
+    custo_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                      help_text="Valor pago (compras)")
+    evento = models.ForeignKey("eventos.Evento", on_delete=models.PROTECT, null=True, blank=True,
+                               related_name="movimentos_estoque")
+    data = models.DateField(default=timezone.localdate)
+    observacao = models.CharField(max_length=255, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["ingrediente", "id"])]
+        verbose_name = "movimento de estoque"
+        verbose_name_plural = "movimentos de estoque"
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.quantidade} {self.ingrediente.unidade_base} de {self.ingrediente}"
+
+    def normalizar_sinal(self):
+        """Compras entram (+), consumo e perdas saem (−); ajustes mantêm o sinal informado."""
+        if self.tipo == self.Tipo.COMPRA:
+            self.quantidade = abs(self.quantidade)
+        elif self.tipo in (self.Tipo.CONSUMO, self.Tipo.PERDA):
+            self.quantidade = -abs(self.quantidade)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Movimentos de estoque são imutáveis; registre um ajuste.")
+        self.normalizar_sinal()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Movimentos de estoque são imutáveis; registre um ajuste.")
+
+
+# ------------------- Saldos (fotografias periódicas) -------------------
+class SaldoEstoque(models.Model):
+    """
+    Fotografia do saldo de um ingrediente até um movimento.
+    Saldo atual = última fotografia + movimentos com id > ate_movimento.
+    """
+    ingrediente = models.ForeignKey(Ingrediente, on_delete=models.CASCADE, related_name="saldos")
+    ate_movimento = models.PositiveBigIntegerField(help_text="Id do último movimento incluído")
+    saldo = models.DecimalField(max_digits=14, decimal_places=3, default=Decimal("0"))
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-ate_movimento"]
+        constraints = [
+            models.UniqueConstraint(fields=["ate_movimento", "ingrediente"], name="saldo_unico_por_fechamento"),
+        ]
+        verbose_name = "saldo de estoque"
+        verbose_name_plural = "saldos de estoque"
+
+    def __str__(self):
+        return f"{self.ingrediente}: {self.saldo} (até #{self.ate_movimento})"
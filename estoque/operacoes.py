@@ -0,0 +1,98 @@
+"""
+Operações sobre o livro-razão de estoque.
+
+O saldo atual nunca soma o histórico inteiro: parte do último fechamento
+(``SaldoEstoque``) e soma só os movimentos posteriores, em duas consultas
+agregadas para qualquer quantidade de ingredientes.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from fichas.aritmetica import q
+from .models import MovimentoEstoque, SaldoEstoque
+
+
+def ultimo_fechamento():
+    """Id do último movimento coberto por fotografia (0 se nunca houve fechamento)."""
+    return SaldoEstoque.objects.aggregate(corte=Max("ate_movimento"))["corte"] or 0
+
+
+def saldos_atuais(ingrediente_ids=None, ate_movimento=None):
+    """{ingrediente_id: saldo} = última fotografia + movimentos posteriores."""
+    corte = ultimo_fechamento()
+    fotos = SaldoEstoque.objects.filter(ate_movimento=corte)
+    movimentos = MovimentoEstoque.objects.filter(id__gt=corte)
+    if ate_movimento is not None:
+        movimentos = movimentos.filter(id__lte=ate_movimento)
+    if ingrediente_ids is not None:
+        ingrediente_ids = list(ingrediente_ids)
+        fotos = fotos.filter(ingrediente_id__in=ingrediente_ids)
+        movimentos = movimentos.filter(ingrediente_id__in=ingrediente_ids)
+
+    saldos = defaultdict(lambda: Decimal("0"))
+    if corte:
+        for ing_id, saldo in fotos.values_list("ingrediente_id", "saldo"):
+            saldos[ing_id] = saldo
+    for ing_id, total in (movimentos.order_by().values("ingrediente_id")
+                          .annotate(total=Sum("quantidade")).values_list("ingrediente_id", "total")):
+        saldos[ing_id] += total
+    return {ing_id: q(saldo, 3) for ing_id, saldo in saldos.items()}
+
+
+def saldo_atual(ingrediente):
+    """Saldo de um único ingrediente na unidade base."""
+    return saldos_atuais([ingrediente.pk]).get(ingrediente.pk, Decimal("0"))
+
+
+@transaction.atomic
+def fechar_saldos(manter=12):
+    """
+    Grava uma fotografia de todos os saldos até o último movimento e
+    descarta fotografias antigas, mantendo os ``manter`` fechamentos mais recentes.
+    Retorna a quantidade de saldos gravados.
+    """
+    if manter < 1:
+        raise ValidationError("É preciso manter ao menos o fechamento mais recente (manter >= 1).")
+    corte_anterior = ultimo_fechamento()
+    corte = MovimentoEstoque.objects.aggregate(ultimo=Max("id"))["ultimo"] or 0
+    if corte <= corte_anterior:
+        return 0
+
+    saldos = saldos_atuais(ate_movimento=corte)
+    SaldoEstoque.objects.bulk_create([
+        SaldoEstoque(ingrediente_id=ing_id, ate_movimento=corte, saldo=saldo)
+        for ing_id, saldo in saldos.items()
+    ])
+
+    cortes = list(SaldoEstoque.objects.order_by("-ate_movimento")
+                  .values_list("ate_movimento", flat=True).distinct()[:manter])
+    SaldoEstoque.objects.filter(ate_movimento__lt=cortes[-1]).delete()
+    return len(saldos)
+
+
+@transaction.atomic
+def registrar_consumo_evento(evento):
+    """Lança em lote o consumo de todos os ingredientes da árvore de receitas do evento."""
+    from eventos.compras import necessidades_evento  # evita import circular
+
+    if evento.movimentos_estoque.filter(tipo=MovimentoEstoque.Tipo.CONSUMO).exists():
+        raise ValidationError(f"O consumo do evento '{evento.nome}' já foi registrado.")
+
+    movimentos = [
+        MovimentoEstoque(
+            ingrediente_id=dados["ingrediente"].id,
+            tipo=MovimentoEstoque.Tipo.CONSUMO,
+            quantidade=-q(dados["quantidade"], 3),
+            evento=evento,
+            data=evento.data,
+            observacao=f"Consumo do evento {evento.nome}",
+        )
+        for dados in necessidades_evento(evento).values()
+        if q(dados["quantidade"], 3) > 0
+    ]
+    # bulk_create não passa por save(): o sinal negativo já vai definido acima
+    return MovimentoEstoque.objects.bulk_create(movimentos)
@@ -0,0 +1,99 @@
+"""
+Livro-razão de estoque: saldos por fotografia + movimentos, consumo de
+eventos e desconto do estoque nas listas de compras.
+"""
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from eventos.compras import lista_compras
+from eventos.models import Evento, ItemCardapio
+from fichas.models import Categoria, Ingrediente, ItemReceita, Receita
+from .models import MovimentoEstoque, SaldoEstoque
+from .operacoes import fechar_saldos, registrar_consumo_evento, saldos_atuais
+
+Tipo = MovimentoEstoque.Tipo
+
+
+def movimentar(ingrediente, tipo, quantidade, **campos):
+    return MovimentoEstoque.objects.create(ingrediente=ingrediente, tipo=tipo, quantidade=Decimal(quantidade), **campos)
+
+
+class EstoqueTests(TestCase):
+
+    def setUp(self):
+        self.tomate = Ingrediente.objects.create(nome="Tomate", unidade_base="kg", custo_por_unidade=Decimal("6.5000"))
+        self.sal = Ingrediente.objects.create(nome="Sal", unidade_base="g", custo_por_unidade=Decimal("0.0030"))
+        molho = Receita.objects.create(titulo="Molho", categoria=Categoria.objects.create(nome="Molhos"),
+                                       rendimento_total=Decimal("2.000"), unidade_rendimento="kg",
+                                       peso_por_porcao=Decimal("0.100"))
+        ItemReceita.objects.create(receita=molho, ingrediente=self.tomate, unidade="kg", peso_liquido=Decimal("2.500"))
+        ItemReceita.objects.create(receita=molho, ingrediente=self.sal, unidade="g", peso_liquido=Decimal("12"))
+        self.evento = Evento.objects.create(nome="Jantar", data=date(2026, 11, 5), numero_pessoas=40)
+        ItemCardapio.objects.create(evento=self.evento, receita=molho, porcoes_por_pessoa=Decimal("1"))
+
+    def soma_do_historico(self):
+        return {ing_id: total for ing_id, total in MovimentoEstoque.objects.order_by().values("ingrediente_id")
+                .annotate(total=Sum("quantidade")).values_list("ingrediente_id", "total")}
+
+    def test_fotografia_mais_movimentos_igual_ao_historico(self):
+        movimentar(self.tomate, Tipo.COMPRA, "10.000", custo_total=Decimal("65.00"))
+        movimentar(self.sal, Tipo.COMPRA, "1000")
+        movimentar(self.tomate, Tipo.PERDA, "0.750")  # save() grava negativo
+        self.assertEqual(fechar_saldos(), 2)
+
+        movimentar(self.tomate, Tipo.AJUSTE, "-0.250")
+        movimentar(self.sal, Tipo.CONSUMO, "30")
+        self.assertEqual(saldos_atuais(), self.soma_do_historico())
+        self.assertEqual(saldos_atuais()[self.tomate.pk], Decimal("9.000"))
+
+        # um segundo fechamento descarta o primeiro (manter=1) e o saldo não muda
+        self.assertEqual(fechar_saldos(manter=1), 2)
+        movimentar(self.tomate, Tipo.COMPRA, "1.000")
+        self.assertEqual(SaldoEstoque.objects.values("ate_movimento").distinct().count(), 1)
+        self.assertEqual(saldos_atuais(), self.soma_do_historico())
+        self.assertEqual(fechar_saldos(), 2)
+        self.assertEqual(fechar_saldos(), 0)  # nada novo desde o último fechamento
+
+    def test_fechamento_sem_manter_nenhum(self):
+        movimentar(self.tomate, Tipo.COMPRA, "10.000", custo_total=Decimal("65.00"))
+        with self.assertRaises(ValidationError):
+            fechar_saldos(manter=0)
+        with self.assertRaises(CommandError):
+            call_command("fechar_saldos", manter=0, stdout=io.StringIO())
+        self.assertFalse(SaldoEstoque.objects.exists())
+
+    def test_consumo_do_evento_registrado_uma_vez(self):
+        necessidades = {linha["ingrediente_id"]: linha["quantidade"] for linha in lista_compras(self.evento)}
+        movimentos = registrar_consumo_evento(self.evento)
+        self.assertEqual({m.ingrediente_id: -m.quantidade for m in movimentos}, necessidades)
+
+        with self.assertRaises(ValidationError):
+            registrar_consumo_evento(self.evento)
+        self.assertEqual(MovimentoEstoque.objects.filter(evento=self.evento).count(), len(movimentos))
+
+    def test_lista_de_compras_desconta_o_estoque(self):
+        linhas = {linha["ingrediente_id"]: linha for linha in lista_compras(self.evento)}
+        necessario = linhas[self.tomate.pk]["quantidade"]
+        self.assertEqual(linhas[self.tomate.pk]["a_comprar"], necessario)
+
+        movimentar(self.tomate, Tipo.COMPRA, "1.500")
+        fechar_saldos()
+        movimentar(self.tomate, Tipo.PERDA, "0.500")
+        linha = {linha["ingrediente_id"]: linha for linha in lista_compras(self.evento)}[self.tomate.pk]
+        self.assertEqual(linha["em_estoque"], Decimal("1.000"))
+        self.assertEqual(linha["a_comprar"], necessario - Decimal("1.000"))
+        self.assertEqual(linha["custo_compra"], round(linha["a_comprar"] * Decimal("6.5000"), 2))
+
+        movimentar(self.tomate, Tipo.COMPRA, "100")
+        linha = {linha["ingrediente_id"]: linha for linha in lista_compras(self.evento)}[self.tomate.pk]
+        self.assertEqual((linha["em_estoque"], linha["a_comprar"]), (necessario, Decimal("0")))
+
+        movimentar(self.sal, Tipo.AJUSTE, "-50")  # estoque negativo não aumenta a compra
+        linha = {linha["ingrediente_id"]: linha for linha in lista_compras(self.evento)}[self.sal.pk]
+        self.assertEqual(linha["a_comprar"], linha["quantidade"])
@@ -1,50 +1,99 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
 from django.utils.html import format_html
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.formats import number_format
-from .models import Evento, ItemCardapio, ParticipacaoEquipe
+from estoque.operacoes import registrar_consumo_evento
+from cozinha.midia import url_midia
+from cozinha.referencias import FUNCOES
+from fichas.admin import AutocompleteComCacheMixin, EscolhasEmCacheMixin
+from fichas.custos import CATALOGO
+from .arquivo import arquivar_eventos, restaurar
+from .fechamento import custo_item_cardapio, fechar_evento, ler_fotografia, reabrir_evento, totais_evento
+from .models import Evento, EventoArquivado, ItemCardapio, ParticipacaoEquipe
+
+
+def formatar_reais(valor):
+    return f"R$ {number_format(valor, decimal_pos=2, use_l10n=True)}"
 
 
 # ------------------- INLINES -------------------
 
-class ItemCardapioInline(admin.TabularInline):
+class FechamentoInlineMixin:
+    """Linhas de evento fechado: somente leitura, com o custo congelado na fotografia."""
+    tabela_fotografia = None
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("evento__fechamento")
+
+    def has_add_permission(self, request, obj=None):
+        return not (obj is not None and obj.fechado) and super().has_add_permission(request, obj)
+
+    def has_change_permission(self, request, obj=None):
+        return not (obj is not None and obj.fechado) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not (obj is not None and obj.fechado) and super().has_delete_permission(request, obj)
+
+    def custo_total_formatado(self, obj):
+        """Formata o custo total da linha (da fotografia, se o evento estiver fechado)."""
+        fotografia = ler_fotografia(obj.evento) if obj.pk else None
+        if fotografia is not None:
+            for linha in fotografia[self.tabela_fotografia]:
+                if linha["id"] == obj.pk:
+                    return formatar_reais(linha["custo_total"])
+        return formatar_reais(self.custo_ao_vivo(obj))
+    custo_total_formatado.short_description = "Custo total"
+
+    def custo_ao_vivo(self, obj):
+        return obj.custo_total
+
+class ItemCardapioInline(FechamentoInlineMixin, AutocompleteComCacheMixin, admin.TabularInline):
     """Permite editar receitas associadas diretamente dentro do evento."""
     model = ItemCardapio
     extra = 1
+    tabela_fotografia = "itens"
+    autocomplete_fields = ("receita",)
     fields = ("foto_preview", "receita", "porcoes_por_pessoa", "custo_total_formatado")
     readonly_fields = ("foto_preview", "custo_total_formatado")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("receita")
+
+    def custo_ao_vivo(self, obj):
+        """Custo pelo catálogo do processo (sem percorrer a árvore da receita no banco)."""
+        if obj.pk is None:
+            return obj.custo_total
+        return custo_item_cardapio(CATALOGO.obter(), obj, obj.evento.numero_pessoas)
+
     def foto_preview(self, obj):
         """Exibe miniatura da foto do prato (ou da receita se o item não tiver)."""
         if obj.foto_item:
             return format_html(
                 '<img src="{}" width="70" height="70" style="object-fit:cover;border-radius:6px"/>',
-                obj.foto_item.url
+                url_midia(obj.foto_item)
             )
         elif obj.receita and obj.receita.foto_preparo:
             return format_html(
                 '<img src="{}" width="70" height="70" style="object-fit:cover;border-radius:6px"/>',
-                obj.receita.foto_preparo.url
+                url_midia(obj.receita.foto_preparo)
             )
         return "(sem imagem)"
     foto_preview.short_description = "Foto do prato"
 
-    def custo_total_formatado(self, obj):
-        """Formata o custo total do item."""
-        return f"R$ {number_format(obj.custo_total, decimal_pos=2, use_l10n=True)}"
-    custo_total_formatado.short_description = "Custo total"
-
 
-class ParticipacaoEquipeInline(admin.TabularInline):
+class ParticipacaoEquipeInline(FechamentoInlineMixin, EscolhasEmCacheMixin, admin.TabularInline):
     """Permite editar a equipe participante diretamente dentro do evento."""
     model = ParticipacaoEquipe
     extra = 1
+    tabela_fotografia = "equipe"
+    escolhas_em_cache = {"funcao": FUNCOES}
     fields = ("funcao", "quantidade", "horas", "valor_hora", "custo_total_formatado")
     readonly_fields = ("custo_total_formatado",)
 
-    def custo_total_formatado(self, obj):
-        """Formata o custo total da equipe."""
-        return f"R$ {number_format(obj.custo_total, decimal_pos=2, use_l10n=True)}"
-    custo_total_formatado.short_description = "Custo total"
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("funcao")
 
 
 # ------------------- EVENTO -------------------
@@ -61,10 +110,12 @@ class EventoAdmin(admin.ModelAdmin):
         "custo_por_pessoa_formatado",
         "preco_venda_por_pessoa_formatado",
         "lucro_estimado_formatado",
+        "fechado_icone",
     )
     list_filter = ("data",)
     search_fields = ("nome",)
     inlines = [ItemCardapioInline, ParticipacaoEquipeInline]
+    actions = ["registrar_consumo", "fechar_eventos", "reabrir_eventos", "arquivar"]
 
     readonly_fields = (
         "custo_receitas_formatado",
@@ -74,11 +125,12 @@ class EventoAdmin(admin.ModelAdmin):
         "custo_por_pessoa_formatado",
         "preco_venda_por_pessoa_formatado",
         "lucro_estimado_formatado",
+        "fechamento_info",
     )
 
     fieldsets = (
         ("📅 Informações do Evento", {
-            "fields": ("nome", "data", "numero_pessoas")
+            "fields": ("nome", "data", ("hora_inicio", "hora_fim"), "numero_pessoas", "fechamento_info")
         }),
         ("💰 Custos e Margem de Lucro", {
             "fields": (
@@ -95,32 +147,150 @@ class EventoAdmin(admin.ModelAdmin):
         }),
     )
 
+    # ------------------- AÇÕES -------------------
+
+    def registrar_consumo(self, request, queryset):
+        """Lança no estoque, em lote, o consumo da árvore de receitas de cada evento."""
+        for evento in queryset:
+            try:
+                movimentos = registrar_consumo_evento(evento)
+            except ValidationError as erro:
+                self.message_user(request, erro.messages[0], messages.WARNING)
+            else:
+                self.message_user(request, f"{evento.nome}: {len(movimentos)} ingredientes baixados do estoque.")
+    registrar_consumo.short_description = "Baixar ingredientes do estoque (consumo do evento)"
+
+    def fechar_eventos(self, request, queryset):
+        """Congela os números dos eventos selecionados (fotografia do fechamento)."""
+        for evento in queryset:
+            fechar_evento(evento)
+        self.message_user(request, f"{queryset.count()} evento(s) fechado(s).")
+    fechar_eventos.short_description = "Fechar eventos (congelar custos e lista de compras)"
+
+    def reabrir_eventos(self, request, queryset):
+        """Descarta a fotografia: os eventos voltam a ser calculados ao vivo."""
+        reabertos = sum(reabrir_evento(evento) for evento in queryset)
+        self.message_user(request, f"{reabertos} evento(s) reaberto(s).")
+    reabrir_eventos.short_description = "Reabrir eventos fechados"
+
+    def arquivar(self, request, queryset):
+        """Move os eventos para o arquivo (totais congelados; restauráveis em "Eventos arquivados")."""
+        arquivados = arquivar_eventos(queryset.values_list("pk", flat=True))
+        self.message_user(request, f"{arquivados} evento(s) arquivado(s).")
+    arquivar.short_description = "Arquivar eventos (tirar das listas; restauráveis)"
+
+    # ------------------- FECHAMENTO -------------------
+
+    def get_queryset(self, request):
+        return (super().get_queryset(request).select_related("fechamento")
+                .prefetch_related("itens", "participacoes__funcao"))
+
+    def has_change_permission(self, request, obj=None):
+        """Evento fechado só pode ser visto (reabra para editar)."""
+        return not (obj is not None and obj.fechado) and super().has_change_permission(request, obj)
+
+    def valor(self, obj, campo):
+        """Total da fotografia, se o evento estiver fechado; senão, calculado ao vivo (uma vez por linha)."""
+        if not hasattr(obj, "_totais"):
+            obj._totais = totais_evento(obj)
+        return obj._totais[campo]
+
+    def fechado_icone(self, obj):
+        return obj.fechado
+    fechado_icone.boolean = True
+    fechado_icone.short_description = "Fechado"
+
+    def fechamento_info(self, obj):
+        if obj is None or not obj.fechado:
+            return "Aberto (valores calculados ao vivo)"
+        return format_html(
+            '🔒 Fechado em {} — <a href="{}?comparar=1">comparar com os valores atuais</a>',
+            timezone.localtime(obj.fechamento.fechado_em).strftime("%d/%m/%Y %H:%M"),
+            reverse("eventos:detalhe_evento", args=[obj.pk]),
+        )
+    fechamento_info.short_description = "Fechamento"
+
     # ------------------- CAMPOS FORMATADOS -------------------
 
     def custo_receitas_formatado(self, obj):
-        return f"R$ {number_format(obj.custo_receitas, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "custo_receitas"))
     custo_receitas_formatado.short_description = "Custo das receitas"
 
     def custo_mao_obra_total_formatado(self, obj):
-        return f"R$ {number_format(obj.custo_mao_obra_total, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "custo_mao_obra_total"))
     custo_mao_obra_total_formatado.short_description = "Custo da equipe"
 
     def custo_total_formatado(self, obj):
-        return f"R$ {number_format(obj.custo_total, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "custo_total"))
     custo_total_formatado.short_description = "Custo total"
 
     def preco_venda_total_formatado(self, obj):
-        return f"R$ {number_format(obj.preco_venda_total, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "preco_venda_total"))
     preco_venda_total_formatado.short_description = "Preço de venda total"
 
     def custo_por_pessoa_formatado(self, obj):
-        return f"R$ {number_format(obj.custo_por_pessoa, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "custo_por_pessoa"))
     custo_por_pessoa_formatado.short_description = "Custo por pessoa"
 
     def preco_venda_por_pessoa_formatado(self, obj):
-        return f"R$ {number_format(obj.preco_venda_por_pessoa, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "preco_venda_por_pessoa"))
     preco_venda_por_pessoa_formatado.short_description = "Preço por pessoa"
 
     def lucro_estimado_formatado(self, obj):
-        return f"R$ {number_format(obj.lucro_estimado, decimal_pos=2, use_l10n=True)}"
+        return formatar_reais(self.valor(obj, "lucro_estimado"))
     lucro_estimado_formatado.short_description = "Lucro estimado"
+
+
+# ------------------- ARQUIVO -------------------
+
+@admin.register(EventoArquivado)
+class EventoArquivadoAdmin(admin.ModelAdmin):
+    """Eventos arquivados: somente leitura, com a ficha congelada e a ação de restaurar."""
+    list_display = ("nome", "data", "numero_pessoas", "custo_total_formatado", "preco_venda_total_formatado",
+                    "lucro_estimado_formatado", "arquivado_em", "ficha")
+    list_filter = ("mes",)
+    search_fields = ("nome",)
+    date_hierarchy = "data"
+    exclude = ("fotografia", "dados")
+    actions = ["restaurar_eventos"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("fotografia", "dados")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def custo_total_formatado(self, obj):
+        return formatar_reais(obj.custo_total)
+    custo_total_formatado.short_description = "Custo total"
+
+    def preco_venda_total_formatado(self, obj):
+        return formatar_reais(obj.preco_venda_total)
+    preco_venda_total_formatado.short_description = "Preço de venda total"
+
+    def lucro_estimado_formatado(self, obj):
+        return formatar_reais(obj.lucro_estimado)
+    lucro_estimado_formatado.short_description = "Lucro estimado"
+
+    def ficha(self, obj):
+        return format_html('<a href="{}">ver</a>', reverse("eventos:detalhe_evento", args=[obj.pk]))
+    ficha.short_description = "Ficha"
+
+    def restaurar_eventos(self, request, queryset):
+        """Recria os eventos nas tabelas do dia a dia (fechados, com a mesma fotografia)."""
+        restaurados = 0
+        for arquivo in queryset:
+            try:
+                fora = restaurar(arquivo)
+            except ValidationError as erro:
+                self.message_user(request, erro.messages[0], messages.WARNING)
+                continue
+            restaurados += 1
+            if fora:
+                self.message_user(request, f"{arquivo.nome}: {fora} linha(s) com receita ou função excluída "
+                                           "não voltaram (os totais da fotografia ficam).", messages.WARNING)
+        self.message_user(request, f"{restaurados} evento(s) restaurado(s).")
+    restaurar_eventos.short_description = "Restaurar eventos arquivados"
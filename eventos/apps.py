@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class EventosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "eventos"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from fichas.models import EmbalagemIngrediente
+        from .embalagens import EMBALAGENS
+        from .resumos import RECEPTORES
+
+        # Resumos financeiros: recalculados após o commit de qualquer alteração que mude custos
+        for modelo, ao_salvar, ao_excluir in RECEPTORES:
+            post_save.connect(ao_salvar, sender=modelo, dispatch_uid=f"resumos_save_{modelo.__name__}")
+            post_delete.connect(ao_excluir, sender=modelo, dispatch_uid=f"resumos_delete_{modelo.__name__}")
+
+        # Embalagens do fornecedor (compra em embalagens): recarregadas em todos os workers
+        post_save.connect(EMBALAGENS.invalidar, sender=EmbalagemIngrediente, dispatch_uid="embalagens_save")
+        post_delete.connect(EMBALAGENS.invalidar, sender=EmbalagemIngrediente, dispatch_uid="embalagens_delete")
@@ -0,0 +1,210 @@
+"""
+Arquivo de eventos antigos: tabelas do dia a dia pequenas, histórico preservado.
+
+``arquivar`` tira de ``Evento``, ``ItemCardapio``, ``ParticipacaoEquipe``,
+``FechamentoEvento`` e dos resumos por evento os eventos anteriores ao
+horizonte (``EVENTOS_HORIZONTE_DIAS``), em lotes de ``LOTE`` com uma
+transação por lote. Cada evento vira um ``EventoArquivado``:
+
+- linha de resumo com os totais congelados (os da fotografia do fechamento;
+  eventos ainda abertos são fotografados na hora, com os preços atuais) e
+  ``EventoArquivadoCategoria``; ``resumos.atualizar_meses`` soma essas linhas
+  às dos eventos ativos, então o painel financeiro não muda;
+- ``fotografia``: os próprios bytes de ``FechamentoEvento.dados``, exibidos
+  em ``/eventos/<id>/`` como um evento fechado, somente leitura;
+- ``dados``: JSON colunar comprimido com os campos do evento, as linhas do
+  cardápio e da equipe e os movimentos de estoque que apontavam para o
+  evento (desligados, ``evento = NULL``), para ``restaurar`` recriar tudo
+  com os mesmos ids.
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from equipe.models import FuncaoEquipe
+from estoque.models import MovimentoEstoque
+from fichas.aritmetica import q, ZERO
+from fichas.custos import CATALOGO
+from fichas.models import Receita
+from .fechamento import FORMATO, calcular_fotografia, compactar, descompactar, para_colunas, para_linhas
+from .models import (
+    Evento, EventoArquivado, EventoArquivadoCategoria, FechamentoEvento, ItemCardapio, ParticipacaoEquipe,
+)
+from .resumos import resumo_fechado
+
+LOTE = 200
+
+CAMPOS_EVENTO = ("nome", "data", "hora_inicio", "hora_fim", "numero_pessoas", "custo_indireto", "margem_lucro")
+COLUNAS = {
+    "itens": ("id", "receita_id", "porcoes_por_pessoa", "foto_item"),
+    "equipe": ("id", "funcao_id", "quantidade", "horas", "valor_hora"),
+}
+
+
+def data_limite(dias=None):
+    """Eventos com data anterior a esta são arquivados (padrão: ``EVENTOS_HORIZONTE_DIAS`` atrás)."""
+    dias = settings.EVENTOS_HORIZONTE_DIAS if dias is None else dias
+    return timezone.localdate() - timedelta(days=dias)
+
+
+# ------------------- Linhas originais -------------------
+
+def compactar_dados(evento, movimentos):
+    """Campos do evento, cardápio, equipe e ids dos movimentos de estoque → bytes."""
+    itens = [{"id": i.pk, "receita_id": i.receita_id, "porcoes_por_pessoa": i.porcoes_por_pessoa,
+              "foto_item": i.foto_item.name or ""} for i in evento.itens.all()]
+    equipe = [{c: getattr(p, c) for c in COLUNAS["equipe"]} for p in evento.participacoes.all()]
+    dados = {
+        "formato": FORMATO,
+        "evento": {campo: getattr(evento, campo) for campo in CAMPOS_EVENTO},
+        "itens": para_colunas(itens, COLUNAS["itens"]),
+        "equipe": para_colunas(equipe, COLUNAS["equipe"]),
+        "movimentos": movimentos,
+    }
+    texto = json.dumps(dados, cls=DjangoJSONEncoder, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(texto.encode(), 9)
+
+
+def instanciar(modelo, valores):
+    """Instância de ``modelo`` a partir de valores em texto do JSON (datas, decimais...)."""
+    campos = modelo._meta
+    return modelo(**{nome: campos.get_field(nome).to_python(valor) for nome, valor in valores.items()})
+
+
+def descompactar_dados(blob):
+    dados = json.loads(zlib.decompress(bytes(blob)))
+    for nome, colunas in COLUNAS.items():
+        dados[nome] = para_linhas(dados[nome], colunas)
+    return dados
+
+
+def ler_arquivo(arquivo):
+    """Fotografia do evento arquivado (memorizada na instância)."""
+    if not hasattr(arquivo, "_fotografia"):
+        arquivo._fotografia = descompactar(arquivo.fotografia)
+    return arquivo._fotografia
+
+
+def totais_arquivo(arquivo):
+    """Totais da linha de resumo, com as chaves de ``fechamento.TOTAIS`` usadas nas listas."""
+    pessoas = arquivo.numero_pessoas
+    return {
+        "custo_receitas": arquivo.custo_receitas,
+        "custo_mao_obra_total": arquivo.custo_mao_obra,
+        "custo_indireto": arquivo.custo_indireto,
+        "custo_total": arquivo.custo_total,
+        "preco_venda_total": arquivo.preco_venda_total,
+        "custo_por_pessoa": q(arquivo.custo_total / pessoas, 2) if pessoas else ZERO,
+        "preco_venda_por_pessoa": q(arquivo.preco_venda_total / pessoas, 2) if pessoas else ZERO,
+        "lucro_estimado": arquivo.lucro_estimado,
+    }
+
+
+# ------------------- Arquivar -------------------
+
+def arquivar(antes=None, limite=None):
+    """
+    Arquiva os eventos com data anterior a ``antes`` (padrão: ``data_limite()``),
+    os mais antigos primeiro, até ``limite`` eventos. Devolve quantos arquivou.
+    """
+    antes = antes or data_limite()
+    ids = list(Evento.objects.filter(data__lt=antes).order_by("data", "pk").values_list("pk", flat=True)[:limite])
+    return arquivar_eventos(ids)
+
+
+def arquivar_eventos(ids):
+    """Arquiva os eventos ``ids`` (qualquer data), em lotes; devolve quantos arquivou."""
+    ids = list(ids)
+    catalogo = CATALOGO.obter()
+    total = 0
+    for inicio in range(0, len(ids), LOTE):
+        total += len(arquivar_lote(ids[inicio:inicio + LOTE], catalogo))
+    return total
+
+
+@transaction.atomic
+def arquivar_lote(ids, catalogo):
+    eventos = (Evento.objects.filter(pk__in=ids).select_related("fechamento")
+               .prefetch_related("itens", "participacoes__funcao"))
+    movimentos = {}
+    for evento_id, movimento_id in MovimentoEstoque.objects.filter(evento_id__in=ids).values_list("evento_id", "pk"):
+        movimentos.setdefault(evento_id, []).append(movimento_id)
+
+    arquivos, categorias = [], []
+    agora = timezone.now()
+    for evento in eventos:
+        fechamento = getattr(evento, "fechamento", None)
+        blob = fechamento.dados if fechamento else compactar(calcular_fotografia(evento, catalogo))
+        resumo, linhas = resumo_fechado(evento, descompactar(blob))
+        arquivo = EventoArquivado(
+            id=evento.pk,
+            nome=evento.nome,
+            data=evento.data,
+            mes=resumo.mes,
+            numero_pessoas=resumo.numero_pessoas,
+            custo_receitas=resumo.custo_receitas,
+            custo_mao_obra=resumo.custo_mao_obra,
+            custo_indireto=resumo.custo_indireto,
+            custo_total=resumo.custo_total,
+            preco_venda_total=resumo.preco_venda_total,
+            lucro_estimado=resumo.lucro_estimado,
+            fechado_em=fechamento.fechado_em if fechamento else agora,
+            formato=fechamento.formato if fechamento else FORMATO,
+            fotografia=bytes(blob),
+            dados=compactar_dados(evento, movimentos.get(evento.pk, [])),
+        )
+        arquivos.append(arquivo)
+        categorias.extend(
+            EventoArquivadoCategoria(arquivo=arquivo, mes=linha.mes, categoria_id=linha.categoria_id,
+                                     custo=linha.custo, preco_venda=linha.preco_venda, lucro=linha.lucro)
+            for linha in linhas
+        )
+    EventoArquivado.objects.bulk_create(arquivos)
+    EventoArquivadoCategoria.objects.bulk_create(categorias)
+
+    # Movimentos são imutáveis por save(); o vínculo volta na restauração
+    MovimentoEstoque.objects.filter(evento_id__in=ids).update(evento=None)
+    # Os sinais de exclusão reagregam os meses após o commit (agora somando os arquivados)
+    Evento.objects.filter(pk__in=ids).delete()
+    return arquivos
+
+
+# ------------------- Restaurar -------------------
+
+@transaction.atomic
+def restaurar(arquivo):
+    """
+    Recria o evento arquivado (mesmos ids), fechado com a fotografia do
+    arquivo. Linhas cuja receita ou função foi excluída depois do
+    arquivamento não voltam; devolve quantas ficaram de fora.
+    """
+    if Evento.objects.filter(pk=arquivo.pk).exists():
+        raise ValidationError(f"Já existe um evento com o id {arquivo.pk}.")
+    dados = descompactar_dados(arquivo.dados)
+    evento = instanciar(Evento, dados["evento"])
+    evento.pk = arquivo.pk
+    evento.save(force_insert=True)
+
+    receitas = set(Receita.objects.filter(pk__in=[i["receita_id"] for i in dados["itens"]])
+                   .values_list("pk", flat=True))
+    funcoes = set(FuncaoEquipe.objects.filter(pk__in=[p["funcao_id"] for p in dados["equipe"]])
+                  .values_list("pk", flat=True))
+    itens = [instanciar(ItemCardapio, dict(linha, evento_id=evento.pk))
+             for linha in dados["itens"] if linha["receita_id"] in receitas]
+    equipe = [instanciar(ParticipacaoEquipe, dict(linha, evento_id=evento.pk))
+              for linha in dados["equipe"] if linha["funcao_id"] in funcoes]
+    ItemCardapio.objects.bulk_create(itens)
+    ParticipacaoEquipe.objects.bulk_create(equipe)
+
+    FechamentoEvento.objects.create(evento=evento, formato=arquivo.formato, dados=arquivo.fotografia)
+    FechamentoEvento.objects.filter(evento=evento).update(fechado_em=arquivo.fechado_em)
+    MovimentoEstoque.objects.filter(pk__in=dados["movimentos"], evento__isnull=True).update(evento=evento)
+
+    arquivo.delete()  # o resumo do evento é recalculado pelos sinais, após o commit
+    return len(dados["itens"]) - len(itens) + len(dados["equipe"]) - len(equipe)
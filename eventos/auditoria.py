@@ -0,0 +1,358 @@
+"""
+Auditoria de custos do catálogo inteiro (``manage.py auditar_custos``).
+
+Depois de uma alteração de preços em lote (``update()``, carga direta no
+banco) ou de uma correção no motor de custos, confere tudo sem abrir páginas:
+
+1. receitas: o grafo de sub-receitas é dividido nas suas árvores
+   independentes (componentes conexos: receitas que compartilham uma
+   sub-receita ficam juntas), agrupadas em lotes de até ``LOTE_RECEITAS``
+   e recalculadas num pool de processos. Cada processo carrega só as suas
+   árvores (``Catalogo.carregar(ids)``) e avalia as receitas em ordem
+   topológica (``Catalogo.alturas``, folhas primeiro), então cada
+   sub-receita é calculada uma vez e sem recursão profunda. Linhas que o
+   motor calcula por aproximação (unidade sem conversão) viram avisos;
+2. eventos: os resumos gravados (``ResumoEvento``/``ResumoEventoCategoria``)
+   são comparados com os recalculados pelos custos da etapa 1 (eventos
+   fechados, pela fotografia), em lotes de ``LOTE_EVENTOS``, no mesmo pool;
+3. meses: ``ResumoMensal``/``ResumoMensalCategoria`` são comparados com a
+   soma dos resumos dos eventos e dos arquivados.
+
+Diferenças acima da tolerância são relatadas; ``corrigir`` recalcula os
+resumos divergentes (``resumos.atualizar_resumos``) e descarta os caches
+compartilhados de todos os workers, que não enxergam alterações feitas sem
+passar pelos models.
+
+Memória: o teto (``AUDITORIA_MEMORIA_MB``) é dividido entre o processo
+principal e os do pool, e cada processo roda limitado à sua parte
+(``RLIMIT_AS``). Um lote que estoura o limite é dividido ao meio e refeito;
+o processo principal guarda só ids, custos e diferenças.
+"""
+import multiprocessing
+import os
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+
+from cozinha.referencias import invalidar_todos
+from fichas.custos import Catalogo
+from fichas.models import ComponenteReceita, Receita, Unidade, converter, fracao_componente
+from .models import (
+    Evento, EventoArquivado, ItemCardapio, ResumoEvento, ResumoEventoCategoria, ResumoMensal, ResumoMensalCategoria,
+)
+from .resumos import SOMAS, SOMAS_CATEGORIA, atualizar_resumos, calcular_resumo, somas_mensais
+
+try:
+    import resource
+except ImportError:  # Windows: sem teto de memória por processo
+    resource = None
+
+LOTE_RECEITAS = 2000
+LOTE_EVENTOS = 200
+MINIMO_PROCESSO_MB = 256  # Django + catálogo parcial; abaixo disso um processo nem sobe
+
+CAMPOS_EVENTO = ("mes", "numero_pessoas") + SOMAS
+
+Custo = namedtuple("Custo", "custo_total custo_por_porcao categoria_id")
+Aviso = namedtuple("Aviso", "receita_id receita mensagem")
+Divergencia = namedtuple("Divergencia", "tipo chave campo gravado calculado")
+
+
+# ------------------- Memória -------------------
+
+def limitar_memoria(megabytes):
+    """Limita o espaço de endereçamento deste processo (limite flexível; o rígido fica). Devolve o anterior."""
+    if resource is None or not megabytes:
+        return None
+    flexivel, rigido = resource.getrlimit(resource.RLIMIT_AS)
+    teto = megabytes * 1024 * 1024
+    if rigido != resource.RLIM_INFINITY:
+        teto = min(teto, rigido)
+    resource.setrlimit(resource.RLIMIT_AS, (teto, rigido))
+    return flexivel
+
+
+@contextmanager
+def teto_memoria(megabytes):
+    """``limitar_memoria`` só durante o bloco (o processo principal volta ao limite anterior)."""
+    anterior = limitar_memoria(megabytes)
+    try:
+        yield
+    finally:
+        if anterior is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (anterior, resource.getrlimit(resource.RLIMIT_AS)[1]))
+
+
+def pico_memoria():
+    """Maior memória residente deste processo até agora, em MB (0 sem ``resource``)."""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024  # KB no Linux
+
+
+def dividir_memoria(memoria_mb, processos):
+    """
+    (processos, MB por processo). Com um processo tudo roda no principal, com
+    o teto inteiro; com mais, o principal conta como um deles. Processos que
+    não caberiam com ``MINIMO_PROCESSO_MB`` cada são cortados.
+    """
+    if not memoria_mb:
+        return processos, None
+    processos = max(1, min(processos, memoria_mb // MINIMO_PROCESSO_MB - 1))
+    return processos, memoria_mb if processos == 1 else memoria_mb // (processos + 1)
+
+
+# ------------------- Receitas -------------------
+
+def arvores_independentes():
+    """Ids das receitas agrupados por componente conexo do grafo de sub-receitas."""
+    pai = {}
+
+    def raiz(x):
+        while pai.setdefault(x, x) != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    for receita_id in Receita.objects.values_list("pk", flat=True):
+        raiz(receita_id)
+    for receita_id, sub_id in ComponenteReceita.objects.values_list("receita_id", "sub_receita_id"):
+        pai[raiz(receita_id)] = raiz(sub_id)
+    arvores = defaultdict(list)
+    for receita_id in pai:
+        arvores[raiz(receita_id)].append(receita_id)
+    return sorted(arvores.values(), key=len, reverse=True)
+
+
+def empacotar(arvores, tamanho):
+    """Junta árvores em lotes de até ``tamanho`` receitas (uma árvore maior fica sozinha)."""
+    lotes, atual = [], []
+    for arvore in arvores:
+        if atual and len(atual) + len(arvore) > tamanho:
+            lotes.append(atual)
+            atual = []
+        atual.extend(arvore)
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def avisos_receita(catalogo, receita_id):
+    """Linhas cujo custo o motor aproxima: unidade sem conversão ou sub-receita sem fração."""
+    titulo = catalogo.receitas[receita_id].titulo
+    for item in catalogo.itens_por_receita.get(receita_id, ()):
+        ing = catalogo.ingredientes[item.ingrediente_id]
+        if item.unidade in (Unidade.QB, ing.unidade_base):
+            continue
+        try:
+            converter(Decimal(1), item.unidade, ing.unidade_base)
+        except ValidationError:
+            yield Aviso(receita_id, titulo, f"{ing.nome}: {item.unidade} não converte para {ing.unidade_base}; "
+                                            f"custo calculado como se fosse {ing.unidade_base}.")
+    for comp in catalogo.componentes_por_receita.get(receita_id, ()):
+        sub = catalogo.receitas[comp.sub_receita_id]
+        if fracao_componente(comp.quantidade, comp.unidade, sub.unidade_rendimento, sub.rendimento_total) is None:
+            yield Aviso(receita_id, titulo, f"{sub.titulo}: {comp.quantidade} {comp.unidade} não converte para o "
+                                            f"rendimento ({sub.unidade_rendimento}); custo zero.")
+
+
+def recalcular_receitas(receita_ids):
+    """({id: Custo}, [Aviso], pico de memória) das árvores ``receita_ids``, folhas primeiro."""
+    catalogo = Catalogo.carregar(receita_ids)
+    alturas = catalogo.alturas()
+    custos, avisos = {}, []
+    for receita_id in sorted(catalogo.receitas, key=alturas.__getitem__):
+        custos[receita_id] = Custo(catalogo.custo_total(receita_id), catalogo.custo_por_porcao(receita_id),
+                                   catalogo.receitas[receita_id].categoria_id)
+        avisos.extend(avisos_receita(catalogo, receita_id))
+    return custos, avisos, pico_memoria()
+
+
+# ------------------- Eventos -------------------
+
+class CustosCalculados:
+    """Custos da etapa de receitas com a interface do ``Catalogo`` usada por ``calcular_resumo``."""
+
+    def __init__(self, custos):
+        self.receitas = custos
+
+    def custo_por_porcao(self, receita_id):
+        return self.receitas[receita_id].custo_por_porcao
+
+
+def diferentes(gravado, calculado, tolerancia):
+    if gravado is None or calculado is None:
+        return gravado != calculado
+    if isinstance(gravado, (int, Decimal)) and isinstance(calculado, (int, Decimal)):
+        return abs(gravado - calculado) > tolerancia
+    return gravado != calculado
+
+
+def conferir_eventos(evento_ids, custos, tolerancia):
+    """([Divergencia], pico de memória) entre os resumos gravados e os recalculados."""
+    catalogo = CustosCalculados(custos)
+    gravados = ResumoEvento.objects.in_bulk(evento_ids, field_name="evento_id")
+    categorias = defaultdict(dict)
+    for linha in ResumoEventoCategoria.objects.filter(evento_id__in=evento_ids):
+        categorias[linha.evento_id][linha.categoria_id] = linha
+    eventos = (Evento.objects.filter(pk__in=evento_ids).select_related("fechamento")
+               .prefetch_related("itens", "participacoes__funcao"))
+    divergencias = []
+    for evento in eventos:
+        resumo, linhas = calcular_resumo(evento, catalogo)
+        gravado = gravados.get(evento.pk)
+        if gravado is None:
+            divergencias.append(Divergencia("evento", evento.pk, "resumo", None, resumo.custo_total))
+            continue
+        for campo in CAMPOS_EVENTO:
+            if diferentes(getattr(gravado, campo), getattr(resumo, campo), tolerancia):
+                divergencias.append(Divergencia("evento", evento.pk, campo,
+                                                getattr(gravado, campo), getattr(resumo, campo)))
+        calculadas = {linha.categoria_id: linha for linha in linhas}
+        gravadas = categorias[evento.pk]
+        for categoria_id in gravadas.keys() | calculadas.keys():
+            for campo in SOMAS_CATEGORIA:
+                antes = getattr(gravadas.get(categoria_id), campo, None)
+                depois = getattr(calculadas.get(categoria_id), campo, None)
+                if diferentes(antes, depois, tolerancia):
+                    divergencias.append(Divergencia("evento", evento.pk, f"categoria {categoria_id}: {campo}",
+                                                    antes, depois))
+    return divergencias, pico_memoria()
+
+
+def lotes_eventos(custos, tamanho):
+    """[(ids dos eventos, {receita_id: Custo} só das receitas do lote)]."""
+    evento_ids = list(Evento.objects.order_by("pk").values_list("pk", flat=True))
+    receitas = defaultdict(set)
+    for evento_id, receita_id in ItemCardapio.objects.values_list("evento_id", "receita_id"):
+        receitas[evento_id].add(receita_id)
+    lotes = []
+    for inicio in range(0, len(evento_ids), tamanho):
+        ids = evento_ids[inicio:inicio + tamanho]
+        usadas = set().union(*(receitas[evento_id] for evento_id in ids))
+        lotes.append((ids, {receita_id: custos[receita_id] for receita_id in usadas}))
+    return lotes
+
+
+# ------------------- Meses -------------------
+
+def conferir_meses(tolerancia):
+    """[Divergencia] entre os resumos mensais gravados e a soma dos resumos dos eventos."""
+    meses = set(ResumoMensal.objects.values_list("mes", flat=True))
+    for origem in (ResumoEvento, EventoArquivado):
+        meses.update(origem.objects.order_by().values_list("mes", flat=True).distinct())
+    mensais, por_categoria = somas_mensais(meses)
+    divergencias = []
+    gravados = {linha.mes: linha for linha in ResumoMensal.objects.all()}
+    for mes in sorted(gravados.keys() | mensais.keys()):
+        gravado, calculado = gravados.get(mes), mensais.get(mes)
+        for campo in ("eventos", "pessoas") + SOMAS:
+            antes = getattr(gravado, campo) if gravado else None
+            depois = calculado[campo] if calculado else None
+            if diferentes(antes, depois, tolerancia):
+                divergencias.append(Divergencia("mes", mes, campo, antes, depois))
+    gravadas = {(linha.mes, linha.categoria_id): linha for linha in ResumoMensalCategoria.objects.all()}
+    for chave in sorted(gravadas.keys() | por_categoria.keys()):
+        gravado, calculado = gravadas.get(chave), por_categoria.get(chave)
+        for campo in SOMAS_CATEGORIA:
+            antes = getattr(gravado, campo) if gravado else None
+            depois = calculado[campo] if calculado else None
+            if diferentes(antes, depois, tolerancia):
+                divergencias.append(Divergencia("mes", chave[0], f"categoria {chave[1]}: {campo}", antes, depois))
+    return divergencias
+
+
+# ------------------- Execução -------------------
+
+def iniciar_processo(memoria_mb):
+    """Cada processo do pool: teto de memória, Django configurado (spawn) e conexão própria."""
+    import django
+
+    limitar_memoria(memoria_mb)
+    django.setup()
+    connections.close_all()
+
+
+def dividir(funcao, ids, *args):
+    """Tarefa que estourou a memória → duas com metade dos ids (None se não dá para dividir)."""
+    if len(ids) < 2:
+        return None
+    meio = len(ids) // 2
+    return [(funcao, ids[:meio], *args), (funcao, ids[meio:], *args)]
+
+
+def executar(tarefas, executor):
+    """Resultados das ``tarefas`` [(função, ids, *args)], refazendo ao meio as que estouram a memória."""
+    resultados, pendentes = [], list(tarefas)
+    while pendentes:
+        futuros = [(tarefa, executor.submit(*tarefa) if executor else None) for tarefa in pendentes]
+        pendentes = []
+        for tarefa, futuro in futuros:
+            try:
+                resultados.append(futuro.result() if futuro else tarefa[0](*tarefa[1:]))
+            except MemoryError:
+                metades = dividir(*tarefa)
+                if metades is None:
+                    raise
+                pendentes.extend(metades)
+    return resultados
+
+
+def auditar(tolerancia=Decimal("0"), corrigir=False, processos=None, memoria_mb=None,
+            lote_receitas=LOTE_RECEITAS, lote_eventos=LOTE_EVENTOS):
+    """
+    Recalcula receitas e resumos e devolve um dicionário com ``receitas``
+    (quantas), ``custos`` ({id: Custo}), ``avisos``, ``divergencias``,
+    ``corrigidos`` (eventos recalculados), ``processos`` e ``pico_mb``.
+    Lança ``ValidationError`` se há ciclo de sub-receitas e ``MemoryError``
+    se uma única árvore ou evento não cabe na parte de memória de um processo.
+    """
+    processos, parte_mb = dividir_memoria(memoria_mb, processos or os.cpu_count() or 1)
+    lotes = empacotar(arvores_independentes(), lote_receitas)
+    processos = max(1, min(processos, len(lotes)))
+
+    with teto_memoria(parte_mb):
+        executor = None
+        if processos > 1:
+            connections.close_all()  # nada de conexão herdada pelos processos filhos
+            contexto = (multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods()
+                        else None)
+            executor = ProcessPoolExecutor(processos, mp_context=contexto, initializer=iniciar_processo,
+                                           initargs=(parte_mb,))
+        try:
+            custos, avisos, picos = {}, [], [pico_memoria()]
+            for parciais, avisos_lote, pico in executar([(recalcular_receitas, lote) for lote in lotes], executor):
+                custos.update(parciais)
+                avisos.extend(avisos_lote)
+                picos.append(pico)
+
+            divergencias = []
+            tarefas = [(conferir_eventos, ids, parciais, tolerancia)
+                       for ids, parciais in lotes_eventos(custos, lote_eventos)]
+            for divergencias_lote, pico in executar(tarefas, executor):
+                divergencias.extend(divergencias_lote)
+                picos.append(pico)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        divergencias.extend(conferir_meses(tolerancia))
+
+    corrigidos = 0
+    if corrigir and divergencias:
+        evento_ids = {d.chave for d in divergencias if d.tipo == "evento"}
+        meses = {d.chave for d in divergencias if d.tipo == "mes"}
+        invalidar_todos()  # este processo também recarrega o catálogo antes de recalcular
+        corrigidos = atualizar_resumos(evento_ids, meses)
+    return {
+        "receitas": len(custos),
+        "custos": custos,
+        "avisos": avisos,
+        "divergencias": divergencias,
+        "corrigidos": corrigidos,
+        "processos": processos,
+        "pico_mb": max(picos),
+    }
@@ -0,0 +1,121 @@
+"""
+Expansão da árvore de receitas de um evento em ingredientes (lista de compras).
+
+Cada ``ItemCardapio`` rende ``porcoes_por_pessoa × numero_pessoas`` porções;
+o fator sobre a receita é esse total ÷ ``rendimento_total``. Sub-receitas são
+expandidas recursivamente pela quantidade do componente ÷ rendimento da
+sub-receita, e as quantidades vão para a unidade base do ingrediente.
+
+A árvore vem do ``Catalogo`` do processo (``fichas.custos.CATALOGO``): montar a
+lista não consulta receitas nem ingredientes, só o cardápio e o estoque.
+"""
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from fichas.custos import CATALOGO
+from fichas.models import Unidade, converter, quantidade_liquida
+
+
+def fator_item(item_cardapio, evento, rendimento_total):
+    """Porções por pessoa × nº de pessoas ÷ rendimento da receita."""
+    rendimento = rendimento_total or Decimal("1.0")
+    return (
+        Decimal(item_cardapio.porcoes_por_pessoa or 0)
+        * Decimal(evento.numero_pessoas or 0)
+        / Decimal(rendimento)
+    )
+
+
+def na_unidade_base(qtd, unidade, unidade_base):
+    """Converte para a unidade base; sem conversão conhecida assume proporção direta."""
+    if unidade == unidade_base:
+        return qtd
+    try:
+        return converter(qtd, unidade, unidade_base)
+    except ValidationError:
+        return qtd
+
+
+class Expansor:
+    """Expande receitas em ingredientes a partir de um catálogo em memória."""
+
+    def __init__(self, catalogo=None):
+        self.catalogo = catalogo or CATALOGO.obter()
+
+    def expandir(self, receita_id, fator, acumulado, caminho=()):
+        """Soma em ``acumulado`` os ingredientes de ``fator`` × receita (rendimento inteiro)."""
+        if receita_id in caminho:
+            raise ValidationError("Ciclo de sub-receitas detectado.")
+        catalogo = self.catalogo
+
+        for item in catalogo.itens_por_receita.get(receita_id, ()):
+            qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+            if item.unidade == Unidade.QB or qtd is None:
+                continue
+            ing = catalogo.ingredientes[item.ingrediente_id]
+            linha = acumulado.setdefault(ing.id, {
+                "ingrediente": ing,
+                "quantidade": Decimal("0.0"),
+                "unidade": ing.unidade_base,
+                "custo_unit": Decimal(ing.custo_por_unidade or 0),
+            })
+            linha["quantidade"] += na_unidade_base(Decimal(qtd), item.unidade, ing.unidade_base) * fator
+
+        for componente in catalogo.componentes_por_receita.get(receita_id, ()):
+            sub = catalogo.receitas[componente.sub_receita_id]
+            if not sub.rendimento_total:
+                continue
+            qtd = na_unidade_base(Decimal(componente.quantidade or 0), componente.unidade, sub.unidade_rendimento)
+            self.expandir(sub.id, fator * qtd / Decimal(sub.rendimento_total), acumulado, caminho + (receita_id,))
+        return acumulado
+
+
+def necessidades_evento(evento, expansor=None):
+    """{ingrediente_id: linha} com as quantidades totais do evento na unidade base."""
+    expansor = expansor or Expansor()
+    acumulado = OrderedDict()
+    for item_evento in evento.itens.all():
+        rendimento = expansor.catalogo.receitas[item_evento.receita_id].rendimento_total
+        expansor.expandir(item_evento.receita_id, fator_item(item_evento, evento, rendimento), acumulado)
+    return acumulado
+
+
+def descontar_estoque(necessidades):
+    """Converte necessidades em linhas da lista de compras, descontando o estoque disponível."""
+    from estoque.operacoes import saldos_atuais  # evita import circular
+
+    estoque = saldos_atuais(necessidades.keys())
+    linhas = []
+    for ing_id, dados in necessidades.items():
+        quantidade = dados["quantidade"]
+        em_estoque = max(estoque.get(ing_id, Decimal("0")), Decimal("0"))
+        a_comprar = max(quantidade - em_estoque, Decimal("0"))
+        linhas.append({
+            "ingrediente": dados["ingrediente"].nome,
+            "ingrediente_id": ing_id,
+            "quantidade": round(quantidade, 3),
+            "unidade": dados["unidade"],
+            "em_estoque": round(min(em_estoque, quantidade), 3),
+            "a_comprar": round(a_comprar, 3),
+            "custo_total": round(quantidade * dados["custo_unit"], 2),
+            "custo_compra": round(a_comprar * dados["custo_unit"], 2),
+        })
+    return sorted(linhas, key=lambda linha: linha["ingrediente"])
+
+
+def lista_compras(evento, catalogo=None):
+    """Lista de compras do evento ordenada por nome, já descontando o estoque."""
+    return descontar_estoque(necessidades_evento(evento, Expansor(catalogo)))
+
+
+def plano_compras(eventos):
+    """Necessidades somadas de vários eventos, descontando o estoque uma única vez."""
+    expansor = Expansor()
+    total = OrderedDict()
+    for evento in eventos:
+        for ing_id, dados in necessidades_evento(evento, expansor).items():
+            linha = total.setdefault(ing_id, dict(dados, quantidade=Decimal("0.0")))
+            linha["quantidade"] += dados["quantidade"]
+    return descontar_estoque(total)
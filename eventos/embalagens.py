@@ -0,0 +1,150 @@
+"""
+Compra em embalagens do fornecedor.
+
+A lista de compras dá quantidades exatas (3,217 kg), mas compramos sacos de
+1, 5 e 25 kg ou caixas com 12. Para cada ingrediente com embalagens
+cadastradas (``EmbalagemIngrediente``), ``Tabela`` resolve uma vez, por
+programação dinâmica no estilo "troco de moedas", o menor custo para cobrir
+cada quantidade da grade comum das embalagens (o mdc dos tamanhos); depois
+qualquer pedido é só uma leitura da tabela.
+
+Pedidos acima da tabela são completados com a embalagem de melhor preço por
+unidade: numa solução ótima as outras embalagens somam menos que
+``maior tamanho × tamanho da melhor`` (troca por múltiplos da melhor), então
+uma tabela até esse tamanho basta. Tabelas maiores que ``LIMITE_TABELA``
+posições são cortadas e o resultado acima delas deixa de ser garantidamente
+o mais barato (continua cobrindo a quantidade).
+
+``embalar`` percorre a lista de um evento (``lista_compras``) ou de vários
+(``plano_compras``) em uma passada e informa sobras e a diferença de custo
+em relação à estimativa pela quantidade exata.
+"""
+import math
+from collections import defaultdict, namedtuple
+from functools import reduce
+
+from cozinha.referencias import CacheCompartilhado
+from fichas.aritmetica import q, ZERO
+from fichas.models import EmbalagemIngrediente
+
+Embalagem = namedtuple("Embalagem", "id descricao fornecedor quantidade preco")
+
+LIMITE_TABELA = 200_000
+
+
+# ------------------- Tabela por ingrediente -------------------
+
+class Tabela:
+    """Menor custo (centavos) para cobrir pelo menos ``x`` passos da grade, para cada ``x`` da tabela."""
+
+    def __init__(self, embalagens):
+        self.embalagens = embalagens
+        milesimos = [int(e.quantidade * 1000) for e in embalagens]
+        self.passo = reduce(math.gcd, milesimos)  # grade comum, em milésimos da unidade base
+        self.tamanhos = [m // self.passo for m in milesimos]
+        self.precos = [int(e.preco * 100) for e in embalagens]
+        self.melhor = min(range(len(embalagens)),
+                          key=lambda i: (self.precos[i] / self.tamanhos[i], -self.tamanhos[i]))
+
+        melhor = self.tamanhos[self.melhor]
+        posicoes = min(max(self.tamanhos) * melhor + melhor, LIMITE_TABELA)
+        custo, total, escolha = [0] * (posicoes + 1), [0] * (posicoes + 1), [-1] * (posicoes + 1)
+        opcoes = list(enumerate(zip(self.tamanhos, self.precos)))
+        for x in range(1, posicoes + 1):
+            achado = None
+            for i, (tamanho, preco) in opcoes:
+                resto = x - tamanho if x > tamanho else 0
+                candidato = (custo[resto] + preco, total[resto] + tamanho)  # empate: menor sobra
+                if achado is None or candidato < achado:
+                    achado, escolhida = candidato, i
+            custo[x], total[x] = achado
+            escolha[x] = escolhida
+        self.custo, self.escolha = custo, escolha
+
+    def resolver(self, quantidade):
+        """{índice da embalagem: unidades} de menor custo que cobre ``quantidade`` (unidade base)."""
+        passos = math.ceil(quantidade * 1000 / self.passo)
+        contagem = defaultdict(int)
+        excesso = passos - (len(self.custo) - 1)
+        if excesso > 0:
+            extras = math.ceil(excesso / self.tamanhos[self.melhor])
+            contagem[self.melhor] += extras
+            passos -= extras * self.tamanhos[self.melhor]
+        while passos > 0:
+            i = self.escolha[passos]
+            contagem[i] += 1
+            passos -= self.tamanhos[i]
+        return dict(contagem)
+
+
+class Embalagens:
+    """Embalagens de todos os ingredientes (uma consulta), com as tabelas montadas sob demanda."""
+
+    def __init__(self, por_ingrediente):
+        self.por_ingrediente = por_ingrediente
+        self.tabelas = {}
+
+    @classmethod
+    def carregar(cls):
+        por_ingrediente = defaultdict(list)
+        for ingrediente_id, *linha in (EmbalagemIngrediente.objects.order_by("ingrediente_id", "quantidade", "preco")
+                                       .values_list("ingrediente_id", *Embalagem._fields)):
+            por_ingrediente[ingrediente_id].append(Embalagem(*linha))
+        return cls(dict(por_ingrediente))
+
+    def tabela(self, ingrediente_id):
+        """Tabela do ingrediente (memorizada) ou None se ele não tem embalagens."""
+        if ingrediente_id not in self.tabelas:
+            embalagens = self.por_ingrediente.get(ingrediente_id)
+            self.tabelas[ingrediente_id] = Tabela(embalagens) if embalagens else None
+        return self.tabelas[ingrediente_id]
+
+
+# Recarregado em todos os workers quando uma embalagem muda (eventos/apps.py)
+EMBALAGENS = CacheCompartilhado("embalagens", Embalagens.carregar)
+
+
+# ------------------- Lista de compras em embalagens -------------------
+
+def embalar(linhas, embalagens=None):
+    """
+    Linhas da lista de compras com as embalagens de menor custo que cobrem
+    ``a_comprar`` (``embalagens``, ``comprar``, ``sobra``, ``custo_embalagens``,
+    ``diferenca``) e os totais exato × em embalagens. Ingredientes sem
+    embalagem cadastrada ficam pela quantidade exata.
+    """
+    embalagens = embalagens or EMBALAGENS.obter()
+    resultado = []
+    for linha in linhas:
+        linha = dict(linha)
+        tabela = embalagens.tabela(linha["ingrediente_id"]) if linha["a_comprar"] > 0 else None
+        if tabela is None:
+            linha.update(embalado=False, embalagens=[], comprar=linha["a_comprar"], sobra=ZERO,
+                         custo_embalagens=linha["custo_compra"])
+        else:
+            escolhidas = []
+            for indice, unidades in sorted(tabela.resolver(linha["a_comprar"]).items()):
+                embalagem = tabela.embalagens[indice]
+                escolhidas.append({
+                    "descricao": embalagem.descricao,
+                    "fornecedor": embalagem.fornecedor,
+                    "quantidade": embalagem.quantidade,
+                    "unidades": unidades,
+                    "custo": q(embalagem.preco * unidades, 2),
+                })
+            comprar = sum((e["quantidade"] * e["unidades"] for e in escolhidas), ZERO)
+            linha.update(embalado=True, embalagens=escolhidas, comprar=comprar,
+                         sobra=round(comprar - linha["a_comprar"], 3),
+                         custo_embalagens=sum((e["custo"] for e in escolhidas), ZERO))
+        linha["diferenca"] = linha["custo_embalagens"] - linha["custo_compra"]
+        resultado.append(linha)
+
+    custo_exato = sum((linha["custo_compra"] for linha in resultado), ZERO)
+    custo_embalagens = sum((linha["custo_embalagens"] for linha in resultado), ZERO)
+    return {
+        "linhas": resultado,
+        "custo_exato": custo_exato,
+        "custo_embalagens": custo_embalagens,
+        "diferenca": custo_embalagens - custo_exato,
+        "embalados": sum(linha["embalado"] for linha in resultado),
+    }
@@ -0,0 +1,88 @@
+"""
+Explicação do custo de um evento: cada item do cardápio com a árvore da
+receita na proporção servida, a equipe e os custos indiretos, com os mesmos
+campos de ``fichas.explicacao``.
+"""
+import time
+from decimal import Decimal
+
+from fichas.aritmetica import q, ZERO
+from fichas.custos import CATALOGO
+from fichas.explicacao import Explicador, definir_percentuais
+
+
+def _ms(inicio):
+    return round((time.perf_counter() - inicio) * 1000, 3)
+
+
+def explicar_evento(evento, catalogo=None):
+    """Árvore explicada do custo total do evento (receitas + equipe + indiretos)."""
+    inicio = time.perf_counter()
+    explicador = Explicador(catalogo or CATALOGO.obter())
+    pessoas = Decimal(evento.numero_pessoas or 0)
+    filhos = []
+
+    for item in evento.itens.all():
+        inicio_item = time.perf_counter()
+        rec_id = item.receita_id
+        em_cache = rec_id in explicador.memorizadas
+        custo_porcao = explicador.catalogo.custo_por_porcao(rec_id)
+        avaliacao_ms = _ms(inicio_item)
+        porcoes = pessoas * item.porcoes_por_pessoa
+        no = {
+            "tipo": "cardapio",
+            "id": item.pk,
+            "receita_id": rec_id,
+            "nome": explicador.catalogo.receitas[rec_id].titulo,
+            "quantidade": q(porcoes, 2),
+            "unidade": "porções",
+            "conversao": f"{item.porcoes_por_pessoa} porção(ões) × {evento.numero_pessoas} pessoas",
+            "fallback": False,
+            "custo": q(custo_porcao * porcoes, 2) if custo_porcao else ZERO,
+            "cache": em_cache,
+            "avaliacao_ms": avaliacao_ms,
+            "filhos": [],
+        }
+        numero_porcoes = explicador.catalogo.numero_porcoes(rec_id)
+        if custo_porcao and numero_porcoes:
+            no["filhos"] = explicador.filhos(rec_id, porcoes / numero_porcoes, (rec_id,))
+        no["tempo_ms"] = _ms(inicio_item)
+        filhos.append(no)
+
+    for participacao in evento.participacoes.select_related("funcao"):
+        filhos.append({
+            "tipo": "equipe",
+            "id": participacao.pk,
+            "nome": participacao.funcao.nome,
+            "quantidade": q(participacao.horas * participacao.quantidade, 2),
+            "unidade": "h",
+            "conversao": f"{participacao.quantidade} × {participacao.horas} h",
+            "fallback": False,
+            "custo": participacao.custo_total,
+            "cache": False,
+            "tempo_ms": 0,
+        })
+
+    filhos.append({
+        "tipo": "indireto",
+        "id": None,
+        "nome": "Custos indiretos",
+        "custo": q(evento.custo_indireto, 2),
+        "cache": False,
+        "tempo_ms": 0,
+    })
+
+    total = q(sum((filho["custo"] for filho in filhos), ZERO), 2)
+    raiz = {
+        "tipo": "evento",
+        "id": evento.pk,
+        "nome": evento.nome,
+        "quantidade": evento.numero_pessoas,
+        "unidade": "pessoas",
+        "custo": total,
+        "cache": False,
+        "filhos": filhos,
+        "tempo_ms": _ms(inicio),
+    }
+    definir_percentuais(raiz, total)
+    return raiz
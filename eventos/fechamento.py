@@ -0,0 +1,247 @@
+"""
+Fechamento de eventos: números congelados depois que o evento acontece.
+
+``fechar_evento`` calcula uma fotografia do evento (totais, custo de cada
+``ItemCardapio``, linhas de equipe e lista de compras expandida) e a grava em
+``FechamentoEvento.dados`` como JSON colunar (uma lista por coluna) comprimido
+com zlib. Eventos fechados são exibidos a partir da fotografia, sem percorrer
+receitas nem preços atuais; ``comparar`` confronta a fotografia com um
+recálculo ao vivo. Eventos abertos usam a mesma estrutura, calculada na hora
+pelo catálogo do processo.
+"""
+import json
+import zlib
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from fichas.aritmetica import q, ZERO
+from fichas.custos import CATALOGO
+from .compras import lista_compras
+from .models import FechamentoEvento
+
+FORMATO = 1
+
+TOTAIS = (
+    "custo_receitas", "custo_mao_obra_total", "custo_indireto", "custo_total", "margem_lucro",
+    "preco_venda_total", "custo_por_pessoa", "preco_venda_por_pessoa", "lucro_estimado",
+)
+COLUNAS = {
+    "itens": ("id", "receita_id", "receita", "categoria_id", "porcoes_por_pessoa", "custo_por_porcao", "custo_total"),
+    "equipe": ("id", "funcao_id", "funcao", "quantidade", "horas", "valor_hora", "custo_total"),
+    "compras": ("ingrediente_id", "ingrediente", "quantidade", "unidade", "em_estoque", "a_comprar",
+                "custo_total", "custo_compra"),
+}
+# Coluna-chave e coluna de nome de cada tabela (comparação) e colunas decimais (gravadas como texto)
+CHAVES = {"itens": "id", "equipe": "id", "compras": "ingrediente_id"}
+NOMES = {"itens": "receita", "equipe": "funcao", "compras": "ingrediente"}
+ROTULOS_CAMPOS = {
+    "custo_receitas": "Custo de receitas", "custo_mao_obra_total": "Custo de mão de obra",
+    "custo_indireto": "Custo indireto", "custo_total": "Custo total", "margem_lucro": "Margem de lucro (%)",
+    "preco_venda_total": "Preço de venda total", "custo_por_pessoa": "Custo por pessoa",
+    "preco_venda_por_pessoa": "Preço por pessoa", "lucro_estimado": "Lucro estimado",
+    "receita": "Receita", "categoria_id": "Categoria", "porcoes_por_pessoa": "Porções/pessoa",
+    "custo_por_porcao": "Custo por porção", "funcao": "Função", "quantidade": "Quantidade", "horas": "Horas",
+    "valor_hora": "Valor/hora", "ingrediente": "Ingrediente", "unidade": "Unidade", "em_estoque": "Em estoque",
+    "a_comprar": "A comprar", "custo_compra": "Custo compra", "receita_id": "Receita", "funcao_id": "Função",
+}
+DECIMAIS = {
+    "porcoes_por_pessoa", "custo_por_porcao", "custo_total", "horas", "valor_hora",
+    "quantidade", "em_estoque", "a_comprar", "custo_compra",
+}
+
+
+# ------------------- Fotografia -------------------
+
+def para_colunas(linhas, colunas):
+    return {coluna: [linha[coluna] for linha in linhas] for coluna in colunas}
+
+
+def para_linhas(tabela, colunas):
+    return [dict(zip(colunas, valores)) for valores in zip(*(tabela[c] for c in colunas))]
+
+
+def custo_item_cardapio(catalogo, item, numero_pessoas):
+    """Custo de um ``ItemCardapio`` pelo catálogo (igual a ``ItemCardapio.custo_total``)."""
+    custo_porcao = catalogo.custo_por_porcao(item.receita_id)
+    return q(custo_porcao * numero_pessoas * item.porcoes_por_pessoa, 2) if custo_porcao else ZERO
+
+
+def linhas_evento(evento, catalogo=None):
+    """
+    (itens, equipe, totais) do evento calculados ao vivo pelo catálogo.
+    Cardápio e equipe vêm do prefetch do evento, se houver (listas de eventos).
+    """
+    catalogo = catalogo or CATALOGO.obter()
+    prefetch_related_objects([evento], "itens", "participacoes__funcao")
+    itens = []
+    for item in evento.itens.all():
+        receita = catalogo.receitas[item.receita_id]
+        itens.append({
+            "id": item.pk,
+            "receita_id": item.receita_id,
+            "receita": receita.titulo,
+            "categoria_id": receita.categoria_id,
+            "porcoes_por_pessoa": item.porcoes_por_pessoa,
+            "custo_por_porcao": catalogo.custo_por_porcao(item.receita_id),
+            "custo_total": custo_item_cardapio(catalogo, item, evento.numero_pessoas),
+        })
+
+    equipe = []
+    for participacao in evento.participacoes.all():
+        equipe.append({
+            "id": participacao.pk,
+            "funcao_id": participacao.funcao_id,
+            "funcao": participacao.funcao.nome,
+            "quantidade": Decimal(participacao.quantidade),
+            "horas": participacao.horas,
+            "valor_hora": participacao.valor_hora or participacao.funcao.valor_hora_padrao,
+            "custo_total": participacao.custo_total,
+        })
+
+    custo_receitas = q(sum((i["custo_total"] for i in itens), ZERO), 2)
+    custo_mao_obra = q(sum((e["custo_total"] for e in equipe), ZERO), 2)
+    custo_total = q(custo_receitas + custo_mao_obra + evento.custo_indireto, 2)
+    preco_venda = q(custo_total * (1 + evento.margem_lucro / 100), 2)
+    pessoas = Decimal(evento.numero_pessoas or 0)
+    totais = {
+        "custo_receitas": custo_receitas,
+        "custo_mao_obra_total": custo_mao_obra,
+        "custo_indireto": q(evento.custo_indireto, 2),
+        "custo_total": custo_total,
+        "margem_lucro": evento.margem_lucro,
+        "preco_venda_total": preco_venda,
+        "custo_por_pessoa": q(custo_total / pessoas, 2) if pessoas else ZERO,
+        "preco_venda_por_pessoa": q(preco_venda / pessoas, 2) if pessoas else ZERO,
+        "lucro_estimado": q(preco_venda - custo_total, 2),
+    }
+    return itens, equipe, totais
+
+
+def calcular_fotografia(evento, catalogo=None):
+    """Fotografia do evento com os preços e receitas atuais (ainda não gravada)."""
+    catalogo = catalogo or CATALOGO.obter()
+    itens, equipe, totais = linhas_evento(evento, catalogo)
+    return {
+        "formato": FORMATO,
+        "numero_pessoas": evento.numero_pessoas,
+        "totais": totais,
+        "itens": itens,
+        "equipe": equipe,
+        "compras": lista_compras(evento, catalogo),
+    }
+
+
+def compactar(fotografia):
+    """Fotografia → bytes (tabelas em colunas, JSON sem espaços, zlib)."""
+    dados = dict(fotografia, **{nome: para_colunas(fotografia[nome], COLUNAS[nome]) for nome in COLUNAS})
+    texto = json.dumps(dados, cls=DjangoJSONEncoder, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(texto.encode(), 9)
+
+
+def descompactar(blob):
+    """bytes → fotografia com listas de linhas e Decimals (inverso de ``compactar``)."""
+    dados = json.loads(zlib.decompress(bytes(blob)))
+    dados["totais"] = {campo: Decimal(valor) for campo, valor in dados["totais"].items()}
+    for nome, colunas in COLUNAS.items():
+        linhas = para_linhas(dados[nome], colunas)
+        for linha in linhas:
+            for coluna in DECIMAIS.intersection(linha):
+                if linha[coluna] is not None:
+                    linha[coluna] = Decimal(linha[coluna])
+        dados[nome] = linhas
+    return dados
+
+
+def ler_fotografia(evento):
+    """Fotografia gravada do evento (memorizada no fechamento) ou None se o evento está aberto."""
+    fechamento = getattr(evento, "fechamento", None)
+    if fechamento is None:
+        return None
+    if not hasattr(fechamento, "_fotografia"):
+        fechamento._fotografia = descompactar(fechamento.dados)
+    return fechamento._fotografia
+
+
+def totais_evento(evento, catalogo=None):
+    """Totais do evento: da fotografia, se fechado; senão, calculados ao vivo (sem a lista de compras)."""
+    fotografia = ler_fotografia(evento)
+    if fotografia is not None:
+        return fotografia["totais"]
+    return linhas_evento(evento, catalogo)[2]
+
+
+# ------------------- Fechar / reabrir -------------------
+
+@transaction.atomic
+def fechar_evento(evento, catalogo=None):
+    """Grava (ou regrava) a fotografia do evento; devolve o ``FechamentoEvento``."""
+    FechamentoEvento.objects.filter(evento=evento).delete()
+    fotografia = calcular_fotografia(evento, catalogo)
+    fechamento = FechamentoEvento.objects.create(evento=evento, formato=FORMATO, dados=compactar(fotografia))
+    evento.fechamento = fechamento
+    return fechamento
+
+
+@transaction.atomic
+def reabrir_evento(evento):
+    """Remove a fotografia: o evento volta a ser calculado ao vivo."""
+    removidos, _ = FechamentoEvento.objects.filter(evento=evento).delete()
+    evento._state.fields_cache.pop("fechamento", None)
+    return bool(removidos)
+
+
+# ------------------- Exibição e comparação -------------------
+
+def contexto_fotografia(fotografia):
+    """Linhas de uma fotografia (gravada ou recém-calculada) no formato que ``evento.html`` espera."""
+    itens = [dict(linha, receita={"titulo": linha["receita"]}) for linha in fotografia["itens"]]
+    equipe = [dict(linha, funcao={"nome": linha["funcao"], "valor_hora_padrao": linha["valor_hora"]})
+              for linha in fotografia["equipe"]]
+    return {
+        "itens": itens,
+        "participacoes": equipe,
+        "lista_compras": fotografia["compras"],
+        "totais": fotografia["totais"],
+    }
+
+
+def comparar(evento, catalogo=None):
+    """Diferenças entre a fotografia gravada e um recálculo ao vivo (None se o evento está aberto)."""
+    fechada = ler_fotografia(evento)
+    if fechada is None:
+        return None
+    atual = calcular_fotografia(evento, catalogo)
+
+    totais = []
+    for campo in TOTAIS:
+        antes, agora = fechada["totais"].get(campo), atual["totais"][campo]
+        if antes != agora:
+            totais.append({"campo": ROTULOS_CAMPOS[campo], "fechado": antes, "atual": agora,
+                           "diferenca": agora - (antes or ZERO)})
+
+    tabelas = {}
+    for nome, chave in CHAVES.items():
+        antes = {linha[chave]: linha for linha in fechada[nome]}
+        agora = {linha[chave]: linha for linha in atual[nome]}
+        diferencas = []
+        for valor_chave in list(antes) + [k for k in agora if k not in antes]:
+            linha_antes, linha_agora = antes.get(valor_chave), agora.get(valor_chave)
+            if linha_antes is None or linha_agora is None:
+                diferencas.append({
+                    "situacao": "novo" if linha_antes is None else "removido",
+                    "nome": (linha_antes or linha_agora)[NOMES[nome]],
+                    "campos": [],
+                })
+                continue
+            campos = [
+                {"campo": ROTULOS_CAMPOS[coluna], "fechado": linha_antes[coluna], "atual": linha_agora[coluna]}
+                for coluna in COLUNAS[nome] if coluna != chave and linha_antes[coluna] != linha_agora[coluna]
+            ]
+            if campos:
+                diferencas.append({"situacao": "alterado", "nome": linha_agora[NOMES[nome]], "campos": campos})
+        tabelas[nome] = diferencas
+
+    return {"totais": totais, "tabelas": tabelas, "igual": not totais and not any(tabelas.values())}
@@ -0,0 +1,49 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from eventos.arquivo import arquivar, data_limite, restaurar
+from eventos.management.commands.fechar_eventos import ler_data
+from eventos.models import Evento, EventoArquivado
+
+
+class Command(BaseCommand):
+    help = (
+        "Move para o arquivo os eventos anteriores ao horizonte (EVENTOS_HORIZONTE_DIAS), com os totais "
+        "congelados; o painel continua somando-os. Com --restaurar, traz eventos arquivados de volta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, help="Horizonte em dias (padrão: EVENTOS_HORIZONTE_DIAS).")
+        parser.add_argument("--antes", type=ler_data, help="Arquiva eventos anteriores a esta data (AAAA-MM-DD).")
+        parser.add_argument("--limite", type=int, help="Arquiva no máximo este número de eventos.")
+        parser.add_argument("--simular", action="store_true", help="Só conta os eventos que seriam arquivados.")
+        parser.add_argument("--restaurar", nargs="+", type=int, metavar="ID",
+                            help="Ids dos eventos arquivados a restaurar.")
+
+    def handle(self, *args, **options):
+        if options["restaurar"]:
+            return self.restaurar(options["restaurar"])
+
+        antes = options["antes"] or data_limite(options["dias"])
+        if options["simular"]:
+            total = Evento.objects.filter(data__lt=antes).count()
+            limite = options["limite"]
+            total = min(total, limite) if limite else total
+            self.stdout.write(self.style.WARNING(f"Simulação: {total} evento(s) anteriores a {antes:%d/%m/%Y}."))
+            return
+        total = arquivar(antes, options["limite"])
+        self.stdout.write(self.style.SUCCESS(f"{total} evento(s) anteriores a {antes:%d/%m/%Y} arquivado(s)."))
+
+    def restaurar(self, ids):
+        arquivos = EventoArquivado.objects.in_bulk(ids)
+        faltando = [str(id_) for id_ in ids if id_ not in arquivos]
+        if faltando:
+            raise CommandError(f"Eventos arquivados não encontrados: {', '.join(faltando)}.")
+        for id_ in ids:
+            try:
+                fora = restaurar(arquivos[id_])
+            except ValidationError as erro:
+                raise CommandError(erro.messages[0])
+            aviso = f" ({fora} linha(s) com receita ou função excluída ficaram de fora)" if fora else ""
+            self.stdout.write(f"  {arquivos[id_].nome} [{id_}] restaurado{aviso}")
+        self.stdout.write(self.style.SUCCESS(f"{len(ids)} evento(s) restaurado(s)."))
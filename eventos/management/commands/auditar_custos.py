@@ -0,0 +1,80 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from eventos.auditoria import LOTE_EVENTOS, LOTE_RECEITAS, auditar
+
+
+def ler_decimal(texto):
+    try:
+        return Decimal(texto.replace(",", "."))
+    except InvalidOperation:
+        raise CommandError(f"Valor inválido: {texto!r}.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os custos de todas as receitas (árvores independentes em paralelo, sub-receitas primeiro) "
+        "e confere os resumos gravados de eventos e meses; --corrigir recalcula os divergentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tolerancia", type=ler_decimal, default=Decimal("0"),
+                            help="Diferença (R$) acima da qual um valor gravado é relatado (padrão: 0).")
+        parser.add_argument("--corrigir", action="store_true",
+                            help="Recalcula os resumos divergentes e descarta os caches de todos os workers.")
+        parser.add_argument("--processos", type=int, default=None,
+                            help="Processos em paralelo (padrão: número de CPUs, limitado pela memória).")
+        parser.add_argument("--memoria", type=int, default=settings.AUDITORIA_MEMORIA_MB,
+                            help="Teto de memória da execução inteira, em MB (padrão: AUDITORIA_MEMORIA_MB; "
+                                 "0 sem teto).")
+        parser.add_argument("--lote-receitas", type=int, default=LOTE_RECEITAS,
+                            help="Receitas por tarefa do pool.")
+        parser.add_argument("--lote-eventos", type=int, default=LOTE_EVENTOS, help="Eventos por tarefa do pool.")
+        parser.add_argument("--detalhes", type=int, default=50,
+                            help="Quantas divergências e avisos listar (padrão: 50).")
+
+    def handle(self, *args, **options):
+        try:
+            resultado = auditar(
+                tolerancia=options["tolerancia"], corrigir=options["corrigir"], processos=options["processos"],
+                memoria_mb=options["memoria"], lote_receitas=options["lote_receitas"],
+                lote_eventos=options["lote_eventos"],
+            )
+        except ValidationError as erro:
+            raise CommandError(erro.messages[0])
+        except MemoryError:
+            raise CommandError(f"Uma única árvore de receitas ou evento não coube em --memoria {options['memoria']} "
+                               f"MB dividido entre os processos; use --processos 1 ou aumente --memoria.")
+
+        detalhes = options["detalhes"]
+        avisos, divergencias = resultado["avisos"], resultado["divergencias"]
+        for aviso in avisos[:detalhes]:
+            self.stdout.write(self.style.WARNING(f"  {aviso.receita} [{aviso.receita_id}]: {aviso.mensagem}"))
+        for divergencia in divergencias[:detalhes]:
+            chave = f"{divergencia.chave:%m/%Y}" if divergencia.tipo == "mes" else divergencia.chave
+            self.stdout.write(
+                f"  {divergencia.tipo} {chave} {divergencia.campo}: "
+                f"gravado {divergencia.gravado}, recalculado {divergencia.calculado}"
+            )
+        omitidos = max(len(avisos) - detalhes, 0) + max(len(divergencias) - detalhes, 0)
+        if omitidos:
+            self.stdout.write(f"  ... mais {omitidos} linha(s) (--detalhes).")
+
+        self.stdout.write(
+            f"{resultado['receitas']} receita(s) recalculada(s) em {resultado['processos']} processo(s), "
+            f"pico de {resultado['pico_mb']} MB por processo; {len(avisos)} aviso(s)."
+        )
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS("Resumos gravados conferem com os custos recalculados."))
+        elif options["corrigir"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(divergencias)} divergência(s); {resultado['corrigidos']} evento(s) recalculado(s) "
+                f"e caches descartados."
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"{len(divergencias)} divergência(s) acima de R$ {options['tolerancia']}; use --corrigir."
+            ))
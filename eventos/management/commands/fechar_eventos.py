@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from eventos.fechamento import fechar_evento
+from eventos.models import Evento
+from fichas.custos import CATALOGO
+
+
+def ler_data(texto):
+    try:
+        return datetime.strptime(texto, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Data inválida: {texto!r} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = "Fecha (congela custos, equipe e lista de compras de) os eventos ainda abertos até uma data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ate", type=ler_data, help="Último dia (AAAA-MM-DD). Padrão: ontem.")
+        parser.add_argument("--refazer", action="store_true",
+                            help="Regrava também a fotografia de eventos já fechados.")
+
+    def handle(self, *args, **options):
+        ate = options["ate"] or timezone.localdate() - timedelta(days=1)
+        eventos = Evento.objects.filter(data__lte=ate).order_by("data", "pk")
+        if not options["refazer"]:
+            eventos = eventos.filter(fechamento__isnull=True)
+        catalogo = CATALOGO.obter()
+        total = 0
+        for evento in eventos.iterator():
+            fechar_evento(evento, catalogo)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} evento(s) fechado(s) até {ate:%d/%m/%Y}."))
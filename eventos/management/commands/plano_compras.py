@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from eventos.compras import plano_compras
+from eventos.embalagens import embalar
+from eventos.models import Evento
+
+
+class Command(BaseCommand):
+    help = "Plano de compras dos próximos eventos, descontando o estoque atual."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=7, help="Janela de eventos a partir de hoje.")
+        parser.add_argument("--embalagens", action="store_true",
+                            help="Arredonda as compras para as embalagens do fornecedor (sobras e diferença de custo).")
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        eventos = list(Evento.objects.filter(data__range=(hoje, hoje + timedelta(days=options["dias"])))
+                       .order_by("data"))
+        if not eventos:
+            self.stdout.write("Nenhum evento na janela.")
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(eventos)} eventos até {hoje + timedelta(days=options['dias']):%d/%m/%Y}"
+        ))
+        linhas = plano_compras(eventos)
+        if options["embalagens"]:
+            self.escrever_embalagens(embalar(linhas))
+            return
+
+        total = 0
+        for linha in linhas:
+            if linha["a_comprar"] <= 0:
+                continue
+            total += linha["custo_compra"]
+            self.stdout.write(
+                f"  {linha['ingrediente']:<40} {linha['a_comprar']:>12} {linha['unidade']:<4}"
+                f" (estoque {linha['em_estoque']})  R$ {linha['custo_compra']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Total a comprar: R$ {total}"))
+
+    def escrever_embalagens(self, compra):
+        for linha in compra["linhas"]:
+            if linha["a_comprar"] <= 0:
+                continue
+            if linha["embalado"]:
+                embalagens = ", ".join(f"{e['unidades']}× {e['descricao']}" for e in linha["embalagens"])
+                detalhe = f"{embalagens} (sobra {linha['sobra']} {linha['unidade']})"
+            else:
+                detalhe = f"{linha['a_comprar']} {linha['unidade']} (sem embalagem cadastrada)"
+            self.stdout.write(f"  {linha['ingrediente']:<40} {detalhe}  R$ {linha['custo_embalagens']}")
+        self.stdout.write(f"Pela quantidade exata: R$ {compra['custo_exato']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Em embalagens: R$ {compra['custo_embalagens']} (diferença R$ {compra['diferenca']})"
+        ))
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eventos.resumos import reconstruir
+
+
+def ler_mes(texto):
+    try:
+        return datetime.strptime(texto, "%Y-%m").date()
+    except ValueError:
+        raise CommandError(f"Mês inválido: {texto!r} (use AAAA-MM).")
+
+
+class Command(BaseCommand):
+    help = "Recalcula os resumos financeiros (por evento, mês e categoria) de um intervalo de meses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--de", type=ler_mes, help="Primeiro mês (AAAA-MM). Sem ele, desde o início.")
+        parser.add_argument("--ate", type=ler_mes, help="Último mês (AAAA-MM). Sem ele, até o fim.")
+
+    def handle(self, *args, **options):
+        de, ate = options["de"], options["ate"]
+        if de and ate and de > ate:
+            raise CommandError("--de deve ser anterior ou igual a --ate.")
+        total = reconstruir(de, ate)
+        intervalo = f"{de:%m/%Y}" if de else "início"
+        intervalo += f" a {ate:%m/%Y}" if ate else " ao fim"
+        self.stdout.write(self.style.SUCCESS(f"{total} eventos resumidos ({intervalo})."))
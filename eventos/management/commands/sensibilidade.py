@@ -0,0 +1,44 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from eventos.sensibilidade import proximos_eventos, simular_eventos
+from fichas.custos import CATALOGO
+from fichas.sensibilidade import ler_choque, simular_receitas
+
+
+class Command(BaseCommand):
+    help = "Efeito de choques de preço (ex.: Tomate=+20%) nas receitas e nos próximos eventos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("choques", nargs="+", help="ingrediente=percentual, pelo nome ou id (ex.: Tomate=+20%).")
+        parser.add_argument("--limite", type=int, default=20, help="Quantas receitas mais expostas listar.")
+        parser.add_argument("--dias", type=int, default=None, help="Só eventos até N dias à frente.")
+
+    def handle(self, *args, **options):
+        catalogo = CATALOGO.obter()
+        try:
+            choques = [ler_choque(texto, catalogo) for texto in options["choques"]]
+        except ValidationError as erro:
+            raise CommandError(erro.messages[0])
+
+        for choque in choques:
+            ing = catalogo.ingredientes[choque.ingrediente_id]
+            self.stdout.write(f"{ing.nome}: {choque.percentual:+}% sobre R$ {ing.custo_por_unidade}/{ing.unidade_base}")
+
+        receitas = simular_receitas(choques, catalogo, limite=options["limite"])
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Receitas mais expostas ({len(receitas)})"))
+        for linha in receitas:
+            percentual = f"{linha['percentual']:+}%" if linha["percentual"] is not None else "-"
+            porcao = (f"porção R$ {linha['custo_por_porcao']} → {linha['novo_por_porcao']}"
+                      if linha["novo_por_porcao"] is not None else "sem porções")
+            self.stdout.write(f"  {linha['titulo']:<40} {percentual:>8}  total R$ {linha['custo_total']}"
+                              f" → {linha['novo_total']}  {porcao}")
+
+        eventos = simular_eventos(choques, proximos_eventos(options["dias"]), catalogo)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Próximos eventos afetados ({len(eventos)})"))
+        for linha in eventos:
+            evento = linha["evento"]
+            self.stdout.write(f"  {evento.data:%d/%m/%Y} {evento.nome:<30} {linha['variacao']:+}  custo R$"
+                              f" {linha['custo_total']} → {linha['novo_custo']}  venda R$ {linha['novo_preco_venda']}")
+        total = sum(linha["variacao"] for linha in eventos)
+        self.stdout.write(self.style.SUCCESS(f"Variação total nos próximos eventos: R$ {total:+}"))
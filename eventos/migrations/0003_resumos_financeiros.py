@@ -0,0 +1,208 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventos", "0002_itemcardapio_foto_item"),
+        ("fichas", "0003_busca_normalizada"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumoMensal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField(unique=True)),
+                ("eventos", models.PositiveIntegerField(default=0)),
+                ("pessoas", models.PositiveIntegerField(default=0)),
+                (
+                    "custo_receitas",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "custo_mao_obra",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "custo_indireto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "custo_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "preco_venda_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "lucro_estimado",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["mes"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ResumoEvento",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "mes",
+                    models.DateField(
+                        db_index=True, help_text="Primeiro dia do mês do evento"
+                    ),
+                ),
+                ("numero_pessoas", models.PositiveIntegerField(default=0)),
+                (
+                    "custo_receitas",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "custo_mao_obra",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "custo_indireto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "custo_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "preco_venda_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "lucro_estimado",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                (
+                    "evento",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumo",
+                        to="eventos.evento",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ResumoEventoCategoria",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField(db_index=True)),
+                (
+                    "custo",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "preco_venda",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "lucro",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "categoria",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="fichas.categoria",
+                    ),
+                ),
+                (
+                    "evento",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumos_categoria",
+                        to="eventos.evento",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("evento", "categoria"),
+                        name="resumo_evento_categoria_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ResumoMensalCategoria",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField()),
+                (
+                    "custo",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "preco_venda",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "lucro",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "categoria",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="fichas.categoria",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("mes", "categoria"),
+                        name="resumo_mensal_categoria_unico",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventos", "0003_resumos_financeiros"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="evento",
+            name="hora_fim",
+            field=models.TimeField(
+                blank=True,
+                help_text="Fim do trabalho da equipe (antes do início = termina no dia seguinte)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="evento",
+            name="hora_inicio",
+            field=models.TimeField(
+                blank=True,
+                help_text="Início do trabalho da equipe (vazio = dia inteiro)",
+                null=True,
+            ),
+        ),
+    ]
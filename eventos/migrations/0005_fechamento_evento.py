@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventos", "0004_horario_evento"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FechamentoEvento",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fechado_em", models.DateTimeField(auto_now_add=True)),
+                ("formato", models.PositiveSmallIntegerField(default=1)),
+                ("dados", models.BinaryField()),
+                (
+                    "evento",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fechamento",
+                        to="eventos.evento",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Fechamento de evento",
+                "verbose_name_plural": "Fechamentos de eventos",
+            },
+        ),
+    ]
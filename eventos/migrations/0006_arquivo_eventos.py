@@ -0,0 +1,134 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventos", "0005_fechamento_evento"),
+        ("fichas", "0005_nutricao_ingrediente"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoArquivado",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        help_text="Id original do evento",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("nome", models.CharField(max_length=150)),
+                ("data", models.DateField(db_index=True)),
+                (
+                    "mes",
+                    models.DateField(
+                        db_index=True, help_text="Primeiro dia do mês do evento"
+                    ),
+                ),
+                ("numero_pessoas", models.PositiveIntegerField(default=0)),
+                (
+                    "custo_receitas",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "custo_mao_obra",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "custo_indireto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "custo_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "preco_venda_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "lucro_estimado",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "fechado_em",
+                    models.DateTimeField(
+                        help_text="Quando os números foram congelados"
+                    ),
+                ),
+                ("arquivado_em", models.DateTimeField(auto_now_add=True)),
+                ("formato", models.PositiveSmallIntegerField(default=1)),
+                (
+                    "fotografia",
+                    models.BinaryField(help_text="FechamentoEvento.dados do evento"),
+                ),
+                (
+                    "dados",
+                    models.BinaryField(
+                        help_text="Evento, cardápio, equipe e movimentos de estoque, para restaurar"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "evento arquivado",
+                "verbose_name_plural": "eventos arquivados",
+                "ordering": ["-data"],
+            },
+        ),
+        migrations.CreateModel(
+            name="EventoArquivadoCategoria",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mes", models.DateField(db_index=True)),
+                (
+                    "custo",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "preco_venda",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "lucro",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "arquivo",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="categorias",
+                        to="eventos.eventoarquivado",
+                    ),
+                ),
+                (
+                    "categoria",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="fichas.categoria",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("arquivo", "categoria"), name="arquivo_categoria_unico"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventos", "0006_arquivo_eventos"),
+        ("fichas", "0005_nutricao_ingrediente"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="eventoarquivadocategoria",
+            name="categoria",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="fichas.categoria",
+            ),
+        ),
+    ]
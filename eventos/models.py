@@ -1,17 +1,10 @@
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from django.db import models
+from fichas.aritmetica import q
 from fichas.models import Receita
 from equipe.models import FuncaoEquipe
 
 
-# ------------------- Função utilitária -------------------
-def q(value, places=2):
-    """Arredonda valores decimais com precisão definida."""
-    if value is None:
-        return None
-    return Decimal(value).quantize(Decimal(10) ** -places, rounding=ROUND_HALF_UP)
-
-
 # ------------------- Modelo principal -------------------
 class Evento(models.Model):
     """
@@ -21,6 +14,10 @@ class Evento(models.Model):
     """
     nome = models.CharField(max_length=150)
     data = models.DateField()
+    hora_inicio = models.TimeField(null=True, blank=True,
+                                   help_text="Início do trabalho da equipe (vazio = dia inteiro)")
+    hora_fim = models.TimeField(null=True, blank=True,
+                                help_text="Fim do trabalho da equipe (antes do início = termina no dia seguinte)")
     numero_pessoas = models.PositiveIntegerField()
     custo_indireto = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     margem_lucro = models.DecimalField(max_digits=5, decimal_places=2, default=30)
@@ -78,6 +75,11 @@ class Evento(models.Model):
             return q(self.preco_venda_total / Decimal(self.numero_pessoas), 2)
         return Decimal("0.00")
 
+    @property
+    def fechado(self):
+        """Indica se o evento foi fechado (números congelados em ``FechamentoEvento``)."""
+        return hasattr(self, "fechamento")
+
 
 # ------------------- Item de Cardápio -------------------
 class ItemCardapio(models.Model):
@@ -134,3 +136,149 @@ class ParticipacaoEquipe(models.Model):
     def custo_total(self):
         """Custo total considerando a quantidade e horas."""
         return q(self.custo_unitario * self.quantidade, 2)
+
+
+# ------------------- Fechamento -------------------
+class FechamentoEvento(models.Model):
+    """
+    Fotografia congelada de um evento realizado: totais, custo de cada item do
+    cardápio, equipe e lista de compras, em JSON colunar comprimido (zlib).
+    Montada e lida por eventos/fechamento.py.
+    """
+    evento = models.OneToOneField(Evento, on_delete=models.CASCADE, related_name="fechamento")
+    fechado_em = models.DateTimeField(auto_now_add=True)
+    formato = models.PositiveSmallIntegerField(default=1)
+    dados = models.BinaryField()
+
+    class Meta:
+        verbose_name = "Fechamento de evento"
+        verbose_name_plural = "Fechamentos de eventos"
+
+    def __str__(self):
+        return f"Fechamento de {self.evento_id} em {self.fechado_em:%d/%m/%Y}"
+
+
+# ------------------- Resumos financeiros (rollup) -------------------
+# Mantidos por eventos/resumos.py a cada alteração de eventos, cardápios, equipe
+# e fichas; reconstruídos com "manage.py reconstruir_resumos".
+
+class ResumoEvento(models.Model):
+    """Totais financeiros de um evento, já calculados pela árvore de receitas."""
+    evento = models.OneToOneField(Evento, on_delete=models.CASCADE, related_name="resumo")
+    mes = models.DateField(db_index=True, help_text="Primeiro dia do mês do evento")
+    numero_pessoas = models.PositiveIntegerField(default=0)
+    custo_receitas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_mao_obra = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_indireto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    preco_venda_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lucro_estimado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Resumo de {self.evento_id} ({self.mes:%m/%Y})"
+
+
+class ResumoEventoCategoria(models.Model):
+    """Custo e venda das receitas de um evento por categoria (margem do evento sobre o custo)."""
+    evento = models.ForeignKey(Evento, on_delete=models.CASCADE, related_name="resumos_categoria")
+    mes = models.DateField(db_index=True)
+    categoria = models.ForeignKey("fichas.Categoria", on_delete=models.CASCADE, related_name="+")
+    custo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    preco_venda = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lucro = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["evento", "categoria"], name="resumo_evento_categoria_unico"),
+        ]
+
+
+class ResumoMensal(models.Model):
+    """Soma dos resumos de eventos de um mês."""
+    mes = models.DateField(unique=True)
+    eventos = models.PositiveIntegerField(default=0)
+    pessoas = models.PositiveIntegerField(default=0)
+    custo_receitas = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    custo_mao_obra = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    custo_indireto = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    custo_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    preco_venda_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    lucro_estimado = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["mes"]
+
+    def __str__(self):
+        return f"Resumo {self.mes:%m/%Y}"
+
+
+class ResumoMensalCategoria(models.Model):
+    """Soma mensal por categoria de receita."""
+    mes = models.DateField()
+    categoria = models.ForeignKey("fichas.Categoria", on_delete=models.CASCADE, related_name="+")
+    custo = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    preco_venda = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    lucro = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mes", "categoria"], name="resumo_mensal_categoria_unico"),
+        ]
+
+
+# ------------------- Arquivo de eventos antigos -------------------
+# Mantido por eventos/arquivo.py ("manage.py arquivar_eventos"): eventos além do
+# horizonte saem de Evento/ItemCardapio/ParticipacaoEquipe e ficam aqui, com os
+# totais congelados, até serem restaurados.
+
+class EventoArquivado(models.Model):
+    """
+    Evento antigo fora das tabelas do dia a dia: uma linha de resumo (para
+    relatórios e listas) e dois blobs comprimidos, a fotografia do fechamento
+    (exibição) e as linhas originais do evento (restauração).
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Id original do evento")
+    nome = models.CharField(max_length=150)
+    data = models.DateField(db_index=True)
+    mes = models.DateField(db_index=True, help_text="Primeiro dia do mês do evento")
+    numero_pessoas = models.PositiveIntegerField(default=0)
+    custo_receitas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_mao_obra = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_indireto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    preco_venda_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lucro_estimado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fechado_em = models.DateTimeField(help_text="Quando os números foram congelados")
+    arquivado_em = models.DateTimeField(auto_now_add=True)
+    formato = models.PositiveSmallIntegerField(default=1)
+    fotografia = models.BinaryField(help_text="FechamentoEvento.dados do evento")
+    dados = models.BinaryField(help_text="Evento, cardápio, equipe e movimentos de estoque, para restaurar")
+
+    class Meta:
+        ordering = ["-data"]
+        verbose_name = "evento arquivado"
+        verbose_name_plural = "eventos arquivados"
+
+    def __str__(self):
+        return f"{self.nome} ({self.numero_pessoas} pessoas)"
+
+
+class EventoArquivadoCategoria(models.Model):
+    """
+    Custo e venda das receitas de um evento arquivado por categoria (como
+    ``ResumoEventoCategoria``). A categoria é protegida: o painel soma estas
+    linhas e elas não podem sumir junto com uma categoria excluída.
+    """
+    arquivo = models.ForeignKey(EventoArquivado, on_delete=models.CASCADE, related_name="categorias")
+    mes = models.DateField(db_index=True)
+    categoria = models.ForeignKey("fichas.Categoria", on_delete=models.PROTECT, related_name="+")
+    custo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    preco_venda = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lucro = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["arquivo", "categoria"], name="arquivo_categoria_unico"),
+        ]
@@ -0,0 +1,308 @@
+"""
+Resumos financeiros (rollup) de eventos por evento, mês e categoria.
+
+Os totais de cada evento são calculados com o catálogo de custos do processo
+(mesmas fórmulas de ``Evento``/``ItemCardapio``) e gravados em
+``ResumoEvento``/``ResumoEventoCategoria``; os meses afetados são então
+reagregados em ``ResumoMensal``/``ResumoMensalCategoria`` com uma consulta
+agregada por tabela. O painel lê só as tabelas mensais.
+
+Manutenção incremental: os sinais ligados em ``EventosConfig.ready`` anotam o
+que mudou (eventos, receitas, ingredientes, funções, meses) e o recálculo roda
+uma vez, após o commit da transação. Eventos fechados entram com os números
+da fotografia (``eventos.fechamento``), não com os preços atuais; eventos
+arquivados (``eventos.arquivo``) entram pelas suas linhas de resumo.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from cozinha.referencias import CATEGORIAS
+from equipe.models import FuncaoEquipe
+from fichas.aritmetica import q, ZERO
+from fichas.custos import CATALOGO
+from fichas.models import ComponenteReceita, Ingrediente, ItemReceita, Receita
+from .fechamento import ler_fotografia
+from .models import (
+    Evento, EventoArquivado, EventoArquivadoCategoria, FechamentoEvento, ItemCardapio, ParticipacaoEquipe,
+    ResumoEvento, ResumoEventoCategoria, ResumoMensal, ResumoMensalCategoria,
+)
+
+LOTE = 500
+
+SOMAS = ("custo_receitas", "custo_mao_obra", "custo_indireto", "custo_total", "preco_venda_total", "lucro_estimado")
+SOMAS_CATEGORIA = ("custo", "preco_venda", "lucro")
+
+
+def primeiro_dia(data):
+    return data.replace(day=1)
+
+
+# ------------------- Cálculo -------------------
+
+def calcular_resumo(evento, catalogo):
+    """(ResumoEvento, [ResumoEventoCategoria]) ainda não gravados; ``evento`` com itens e participações pré-carregados."""
+    fotografia = ler_fotografia(evento)
+    if fotografia is not None:
+        return resumo_fechado(evento, fotografia)
+    mes = primeiro_dia(evento.data)
+    margem = 1 + (evento.margem_lucro / 100)
+    por_categoria = {}
+    custo_receitas = ZERO
+    for item in evento.itens.all():
+        custo_porcao = catalogo.custo_por_porcao(item.receita_id)
+        custo = q(custo_porcao * evento.numero_pessoas * item.porcoes_por_pessoa, 2) if custo_porcao else ZERO
+        custo_receitas += custo
+        categoria_id = catalogo.receitas[item.receita_id].categoria_id
+        por_categoria[categoria_id] = por_categoria.get(categoria_id, ZERO) + custo
+
+    custo_mao_obra = sum((p.custo_total for p in evento.participacoes.all()), ZERO)
+    custo_total = q(custo_receitas + custo_mao_obra + evento.custo_indireto, 2)
+    preco_venda = q(custo_total * margem, 2)
+    resumo = ResumoEvento(
+        evento=evento,
+        mes=mes,
+        numero_pessoas=evento.numero_pessoas,
+        custo_receitas=q(custo_receitas, 2),
+        custo_mao_obra=q(custo_mao_obra, 2),
+        custo_indireto=q(evento.custo_indireto, 2),
+        custo_total=custo_total,
+        preco_venda_total=preco_venda,
+        lucro_estimado=q(preco_venda - custo_total, 2),
+    )
+    return resumo, linhas_categoria(evento, mes, margem, por_categoria)
+
+
+def linhas_categoria(evento, mes, margem, por_categoria):
+    categorias = []
+    for categoria_id, custo in por_categoria.items():
+        venda = q(custo * margem, 2)
+        categorias.append(ResumoEventoCategoria(
+            evento=evento, mes=mes, categoria_id=categoria_id,
+            custo=q(custo, 2), preco_venda=venda, lucro=q(venda - custo, 2),
+        ))
+    return categorias
+
+
+def resumo_fechado(evento, fotografia):
+    """Resumo a partir da fotografia do fechamento (números congelados)."""
+    mes = primeiro_dia(evento.data)
+    totais = fotografia["totais"]
+    margem = 1 + (totais["margem_lucro"] / 100)
+    existentes = {categoria.pk for categoria in CATEGORIAS.obter()}  # categorias removidas após o fechamento saem
+    por_categoria = {}
+    for item in fotografia["itens"]:
+        if item["categoria_id"] in existentes:
+            por_categoria[item["categoria_id"]] = por_categoria.get(item["categoria_id"], ZERO) + item["custo_total"]
+    resumo = ResumoEvento(
+        evento=evento,
+        mes=mes,
+        numero_pessoas=fotografia["numero_pessoas"],
+        custo_receitas=totais["custo_receitas"],
+        custo_mao_obra=totais["custo_mao_obra_total"],
+        custo_indireto=totais["custo_indireto"],
+        custo_total=totais["custo_total"],
+        preco_venda_total=totais["preco_venda_total"],
+        lucro_estimado=totais["lucro_estimado"],
+    )
+    return resumo, linhas_categoria(evento, mes, margem, por_categoria)
+
+
+@transaction.atomic
+def atualizar_resumos(evento_ids=(), meses=()):
+    """Recalcula os resumos dos eventos informados e reagrega os meses afetados."""
+    evento_ids = list(set(evento_ids))
+    meses = set(meses)
+    catalogo = CATALOGO.obter()
+    total = 0
+    for inicio in range(0, len(evento_ids), LOTE):
+        lote = evento_ids[inicio:inicio + LOTE]
+        meses.update(ResumoEvento.objects.filter(evento_id__in=lote).values_list("mes", flat=True))
+        eventos = (Evento.objects.filter(pk__in=lote).select_related("fechamento")
+                   .prefetch_related("itens", "participacoes__funcao"))
+        resumos, categorias = [], []
+        for evento in eventos:
+            resumo, linhas = calcular_resumo(evento, catalogo)
+            resumos.append(resumo)
+            categorias.extend(linhas)
+            meses.add(resumo.mes)
+        ResumoEvento.objects.filter(evento_id__in=lote).delete()
+        ResumoEventoCategoria.objects.filter(evento_id__in=lote).delete()
+        ResumoEvento.objects.bulk_create(resumos)
+        ResumoEventoCategoria.objects.bulk_create(categorias)
+        total += len(resumos)
+    atualizar_meses(meses)
+    return total
+
+
+def atualizar_meses(meses):
+    """Reagrega ``ResumoMensal``/``ResumoMensalCategoria`` a partir dos resumos dos eventos."""
+    meses = list(meses)
+    if not meses:
+        return
+    ResumoMensal.objects.filter(mes__in=meses).delete()
+    ResumoMensalCategoria.objects.filter(mes__in=meses).delete()
+    mensais, por_categoria = somas_mensais(meses)
+    ResumoMensal.objects.bulk_create([ResumoMensal(**linha) for linha in mensais.values()])
+    ResumoMensalCategoria.objects.bulk_create([ResumoMensalCategoria(**linha) for linha in por_categoria.values()])
+
+
+def somas_mensais(meses):
+    """
+    ({mes: campos de ResumoMensal}, {(mes, categoria_id): campos de ResumoMensalCategoria})
+    somados dos resumos dos eventos ativos e dos arquivados (``eventos.arquivo``).
+    """
+    mensais = {}
+    for origem in (ResumoEvento, EventoArquivado):
+        linhas = (origem.objects.filter(mes__in=meses).order_by().values("mes")
+                  .annotate(eventos=Count("pk"), pessoas=Sum("numero_pessoas"), **{c: Sum(c) for c in SOMAS}))
+        for linha in linhas:
+            somar_linha(mensais, linha["mes"], linha)
+    for linha in mensais.values():
+        linha.update({c: q(linha[c], 2) for c in SOMAS})
+
+    por_categoria = {}
+    for origem in (ResumoEventoCategoria, EventoArquivadoCategoria):
+        linhas = (origem.objects.filter(mes__in=meses).order_by().values("mes", "categoria_id")
+                  .annotate(custo=Sum("custo"), preco_venda=Sum("preco_venda"), lucro=Sum("lucro")))
+        for linha in linhas:
+            somar_linha(por_categoria, (linha["mes"], linha["categoria_id"]), linha)
+    for linha in por_categoria.values():
+        linha.update({c: q(linha[c], 2) for c in SOMAS_CATEGORIA})
+    return mensais, por_categoria
+
+
+def somar_linha(destino, chave, linha):
+    """Acumula em ``destino[chave]`` os valores numéricos de uma linha agregada."""
+    atual = destino.get(chave)
+    if atual is None:
+        destino[chave] = dict(linha)
+        return
+    for campo, valor in linha.items():
+        if campo not in ("mes", "categoria_id"):
+            atual[campo] += valor
+
+
+def reconstruir(de=None, ate=None):
+    """Recalcula todos os eventos com data em [de, ate] (mês inteiro) e os meses do intervalo."""
+    eventos = Evento.objects.all()
+    resumos = ResumoMensal.objects.all()
+    if de:
+        eventos = eventos.filter(data__gte=primeiro_dia(de))
+        resumos = resumos.filter(mes__gte=primeiro_dia(de))
+    if ate:
+        eventos = eventos.filter(data__lt=proximo_mes(ate))
+        resumos = resumos.filter(mes__lte=primeiro_dia(ate))
+    meses = set(resumos.values_list("mes", flat=True))  # meses que podem ter ficado sem eventos
+    return atualizar_resumos(eventos.values_list("pk", flat=True), meses)
+
+
+def proximo_mes(data):
+    data = primeiro_dia(data)
+    return data.replace(year=data.year + 1, month=1) if data.month == 12 else data.replace(month=data.month + 1)
+
+
+# ------------------- Manutenção incremental -------------------
+
+def eventos_afetados(receita_ids=(), ingrediente_ids=(), funcao_ids=()):
+    """Eventos cujo custo depende das receitas (inclusive como sub-receita), ingredientes ou funções."""
+    receitas = set(receita_ids)
+    if ingrediente_ids:
+        receitas.update(ItemReceita.objects.filter(ingrediente_id__in=ingrediente_ids)
+                        .values_list("receita_id", flat=True))
+    fronteira = set(receitas)
+    while fronteira:
+        fronteira = set(ComponenteReceita.objects.filter(sub_receita_id__in=fronteira)
+                        .values_list("receita_id", flat=True)) - receitas
+        receitas |= fronteira
+
+    eventos = set()
+    if receitas:
+        eventos.update(ItemCardapio.objects.filter(receita_id__in=receitas).values_list("evento_id", flat=True))
+    if funcao_ids:
+        eventos.update(ParticipacaoEquipe.objects.filter(funcao_id__in=funcao_ids).values_list("evento_id", flat=True))
+    return eventos
+
+
+class Pendencias(threading.local):
+    """O que mudou na transação corrente (por thread), recalculado após o commit."""
+
+    def __init__(self):
+        self.limpar()
+
+    def limpar(self):
+        self.eventos, self.meses = set(), set()
+        self.receitas, self.ingredientes, self.funcoes = set(), set(), set()
+
+    def vazia(self):
+        return not (self.eventos or self.meses or self.receitas or self.ingredientes or self.funcoes)
+
+
+PENDENTES = Pendencias()
+
+
+def agendar(**alteracoes):
+    """Anota alterações (``eventos=``, ``meses=``, ``receitas=``...) e agenda o recálculo para o commit."""
+    for nome, valores in alteracoes.items():
+        getattr(PENDENTES, nome).update(v for v in valores if v is not None)
+    # Cada chamada registra o callback; o primeiro a rodar consome tudo e os demais saem cedo.
+    # Se a transação for desfeita, o anotado fica para o próximo commit que agendar algo: ids que
+    # não existem mais são ignorados e o resto é só recalculado a mais. Não há cache envolvido
+    # (o catálogo é invalidado no callback, veja cozinha.referencias).
+    transaction.on_commit(processar_pendentes)
+
+
+def processar_pendentes():
+    if PENDENTES.vazia():
+        return
+    if PENDENTES.receitas or PENDENTES.ingredientes:
+        CATALOGO.invalidar()  # não depende da ordem dos receptores de fichas
+    eventos = set(PENDENTES.eventos)
+    eventos |= eventos_afetados(PENDENTES.receitas, PENDENTES.ingredientes, PENDENTES.funcoes)
+    meses = set(PENDENTES.meses)
+    PENDENTES.limpar()
+    atualizar_resumos(eventos, meses)
+
+
+# Receptores dos sinais (ligados em EventosConfig.ready)
+
+def ao_salvar_evento(sender, instance, **kwargs):
+    agendar(eventos=[instance.pk])
+
+
+def ao_excluir_evento(sender, instance, **kwargs):
+    agendar(meses=[primeiro_dia(instance.data)])
+
+
+def ao_alterar_item_evento(sender, instance, **kwargs):
+    agendar(eventos=[instance.evento_id])
+
+
+def ao_alterar_funcao(sender, instance, **kwargs):
+    agendar(funcoes=[instance.pk])
+
+
+def ao_alterar_ingrediente(sender, instance, **kwargs):
+    agendar(ingredientes=[instance.pk])
+
+
+def ao_alterar_receita(sender, instance, **kwargs):
+    agendar(receitas=[instance.pk])
+
+
+def ao_alterar_linha_receita(sender, instance, **kwargs):
+    agendar(receitas=[instance.receita_id])
+
+
+RECEPTORES = (
+    (Evento, ao_salvar_evento, ao_excluir_evento),
+    (ItemCardapio, ao_alterar_item_evento, ao_alterar_item_evento),
+    (ParticipacaoEquipe, ao_alterar_item_evento, ao_alterar_item_evento),
+    (FechamentoEvento, ao_alterar_item_evento, ao_alterar_item_evento),
+    (FuncaoEquipe, ao_alterar_funcao, ao_alterar_funcao),
+    (Ingrediente, ao_alterar_ingrediente, ao_alterar_ingrediente),
+    (Receita, ao_alterar_receita, ao_alterar_receita),
+    (ItemReceita, ao_alterar_linha_receita, ao_alterar_linha_receita),
+    (ComponenteReceita, ao_alterar_linha_receita, ao_alterar_linha_receita),
+)
@@ -0,0 +1,73 @@
+"""
+Sensibilidade dos próximos eventos a choques de preço.
+
+A variação de todas as receitas sai de um produto matriz-vetor
+(``fichas.sensibilidade``); cada ``ItemCardapio`` é recalculado com o novo
+custo por porção da sua receita, com os mesmos arredondamentos do custo
+do evento (custo por porção em centavos × porções servidas), para que o
+novo total bata com o que o evento mostrará depois do reajuste.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from fichas.aritmetica import q, ZERO
+from fichas.custos import CATALOGO
+from fichas.sensibilidade import matriz_uso, variacoes_receitas
+from .fechamento import custo_item_cardapio, linhas_evento
+from .models import Evento
+
+
+def proximos_eventos(dias=None):
+    """Eventos abertos de hoje em diante (até ``dias`` à frente); os fechados têm preços congelados."""
+    hoje = timezone.localdate()
+    eventos = Evento.objects.filter(data__gte=hoje, fechamento__isnull=True)
+    if dias is not None:
+        eventos = eventos.filter(data__lte=hoje + timedelta(days=dias))
+    return list(eventos.prefetch_related("itens", "participacoes__funcao").order_by("data", "pk"))
+
+
+def simular_eventos(choques, eventos=None, catalogo=None):
+    """Variação de custo e de preço de venda dos próximos eventos, dos mais afetados para os menos."""
+    catalogo = catalogo or CATALOGO.obter()
+    eventos = proximos_eventos() if eventos is None else eventos
+    matriz = matriz_uso(catalogo)
+    variacoes = variacoes_receitas(choques, catalogo)
+
+    novos_por_porcao = {}
+
+    def novo_por_porcao(receita_id):
+        if receita_id not in novos_por_porcao:
+            porcoes = catalogo.numero_porcoes(receita_id)
+            variacao = Decimal(float(variacoes[matriz.linha[receita_id]]))
+            novos_por_porcao[receita_id] = (
+                q((catalogo.custo_total(receita_id) + variacao) / porcoes, 2) if porcoes and porcoes > 0 else None
+            )
+        return novos_por_porcao[receita_id]
+
+    resultado = []
+    for evento in eventos:
+        variacao = ZERO
+        for item in evento.itens.all():
+            novo = novo_por_porcao(item.receita_id)
+            if novo is not None:
+                novo = q(novo * evento.numero_pessoas * item.porcoes_por_pessoa, 2)
+                variacao += novo - custo_item_cardapio(catalogo, item, evento.numero_pessoas)
+        if not variacao:
+            continue
+        totais = linhas_evento(evento, catalogo)[2]
+        novo_custo = totais["custo_total"] + variacao
+        pessoas = evento.numero_pessoas or 0
+        resultado.append({
+            "evento": evento,
+            "custo_total": totais["custo_total"],
+            "variacao": variacao,
+            "novo_custo": novo_custo,
+            "percentual": q(variacao * 100 / totais["custo_total"], 1) if totais["custo_total"] else None,
+            "preco_venda_total": totais["preco_venda_total"],
+            "novo_preco_venda": q(novo_custo * (1 + Decimal(str(evento.margem_lucro)) / 100), 2),
+            "novo_custo_por_pessoa": q(novo_custo / pessoas, 2) if pessoas else None,
+        })
+    resultado.sort(key=lambda r: (-abs(r["variacao"]), r["evento"].data))
+    return resultado
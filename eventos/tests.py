@@ -1,3 +1,410 @@
-from django.test import TestCase
+"""
+Orçamento de consultas e de tempo das páginas de eventos.
 
-# Create your tests here.
+Mesmo esquema de ``fichas.tests``: mede a página, aumenta os eventos (mais
+pratos, sub-receitas mais profundas, mais funções na equipe, mais eventos na
+listagem) e exige o mesmo número de consultas.
+"""
+import itertools
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.db.models import ProtectedError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from cozinha.site_estatico import gerar_site
+from equipe.models import FuncaoEquipe
+from fichas.aritmetica import q
+from fichas.custos import Catalogo
+from fichas.models import Categoria, ComponenteReceita, Ingrediente, ItemReceita, Receita
+from fichas.sensibilidade import Choque, variacoes_receitas
+from fichas.tests import OrcamentoConsultasMixin, criar_ingredientes, montar_cadeia
+from .arquivo import arquivar_eventos, restaurar
+from .auditoria import auditar
+from .compras import lista_compras
+from .embalagens import Embalagem, Tabela
+from .fechamento import fechar_evento, linhas_evento
+from .models import (
+    Evento, EventoArquivado, EventoArquivadoCategoria, ItemCardapio, ParticipacaoEquipe, ResumoMensal,
+    ResumoMensalCategoria,
+)
+from .resumos import reconstruir
+from .sensibilidade import simular_eventos
+
+TETO_LISTA_COMPRAS = 3.0
+
+
+def montar_evento(nome, receitas, funcoes, numero_pessoas=80):
+    evento = Evento.objects.create(nome=nome, data=date(2026, 11, 5), numero_pessoas=numero_pessoas,
+                                   custo_indireto=Decimal("150.00"), margem_lucro=Decimal("30.00"))
+    ItemCardapio.objects.bulk_create([
+        ItemCardapio(evento=evento, receita=receita, porcoes_por_pessoa=Decimal("0.50"))
+        for receita in receitas
+    ])
+    ParticipacaoEquipe.objects.bulk_create([
+        ParticipacaoEquipe(evento=evento, funcao=funcao, quantidade=2, horas=Decimal("6.00"))
+        for funcao in funcoes
+    ])
+    return evento
+
+
+class ConsultasEventosTests(OrcamentoConsultasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = Categoria.objects.create(nome="Pratos")
+        self.ingredientes = criar_ingredientes(3)
+        self.funcoes = [FuncaoEquipe.objects.create(nome="Cozinheiro", valor_hora_padrao=Decimal("25.00"))]
+        self.receitas = [montar_cadeia(self.categoria, self.ingredientes, 2)]
+        self.evento = montar_evento("Jantar", self.receitas, self.funcoes)
+
+    def crescer(self):
+        """Mais pratos (com sub-receitas profundas) e mais funções no evento, e mais eventos na listagem."""
+        mais = criar_ingredientes(5, inicio=3)
+        receitas = [montar_cadeia(self.categoria, self.ingredientes + mais, 6, prefixo=f"Prato {i}") for i in range(4)]
+        funcoes = [FuncaoEquipe.objects.create(nome=f"Função {i}", valor_hora_padrao=Decimal("30.00"))
+                   for i in range(3)]
+        ItemCardapio.objects.bulk_create([
+            ItemCardapio(evento=self.evento, receita=receita, porcoes_por_pessoa=Decimal("1.00"))
+            for receita in receitas
+        ])
+        ParticipacaoEquipe.objects.bulk_create([
+            ParticipacaoEquipe(evento=self.evento, funcao=funcao, quantidade=1, horas=Decimal("4.00"))
+            for funcao in funcoes
+        ])
+        for indice in range(5):
+            montar_evento(f"Evento {indice}", receitas[:indice + 1], funcoes)
+
+    def test_lista_de_eventos(self):
+        self.assertConsultasConstantes(reverse("eventos:lista_eventos"), self.crescer)
+
+    def test_detalhe_do_evento(self):
+        self.assertConsultasConstantes(reverse("eventos:detalhe_evento", args=[self.evento.pk]), self.crescer)
+
+    def test_detalhe_do_evento_fechado(self):
+        def crescer():
+            self.crescer()
+            fechar_evento(self.evento)
+        fechar_evento(self.evento)
+        self.assertConsultasConstantes(reverse("eventos:detalhe_evento", args=[self.evento.pk]), crescer)
+
+    def test_detalhe_e_lista_de_eventos_arquivados(self):
+        def crescer():
+            restaurar(EventoArquivado.objects.get(pk=self.evento.pk))
+            self.crescer()
+            arquivar_eventos(Evento.objects.values_list("pk", flat=True))
+        arquivar_eventos([self.evento.pk])
+        self.assertConsultasConstantes(reverse("eventos:detalhe_evento", args=[self.evento.pk]), crescer)
+        self.assertConsultasConstantes(reverse("eventos:lista_eventos") + "?arquivados=1", lambda: None)
+
+    def test_admin_eventos(self):
+        self.assertConsultasConstantes(reverse("admin:eventos_evento_changelist"), self.crescer)
+
+    def test_admin_evento_edicao(self):
+        self.assertConsultasConstantes(reverse("admin:eventos_evento_change", args=[self.evento.pk]), self.crescer)
+
+    def test_admin_funcoes(self):
+        self.assertConsultasConstantes(reverse("admin:equipe_funcaoequipe_changelist"), self.crescer)
+
+    def test_totais_iguais_aos_do_modelo(self):
+        self.crescer()
+        resposta = self.client.get(reverse("eventos:detalhe_evento", args=[self.evento.pk]))
+        totais = resposta.context["totais"]
+        for campo in ("custo_receitas", "custo_mao_obra_total", "custo_total", "lucro_estimado", "custo_por_pessoa"):
+            self.assertEqual(totais[campo], getattr(self.evento, campo), campo)
+
+
+class TempoListaComprasTests(TestCase):
+
+    def test_evento_com_muitos_pratos_dentro_do_teto(self):
+        categoria = Categoria.objects.create(nome="Pratos")
+        ingredientes = criar_ingredientes(10)
+        receitas = [montar_cadeia(categoria, ingredientes, 8, prefixo=f"Prato {i}") for i in range(30)]
+        evento = montar_evento("Casamento", receitas, [], numero_pessoas=300)
+
+        inicio = time.perf_counter()
+        linhas = lista_compras(evento)
+        decorrido = time.perf_counter() - inicio
+
+        self.assertEqual(len(linhas), len(ingredientes))
+        self.assertTrue(all(linha["quantidade"] > 0 for linha in linhas))
+        self.assertLess(decorrido, TETO_LISTA_COMPRAS, f"lista de compras de 30 pratos levou {decorrido:.2f}s")
+
+
+class AuditoriaCustosTests(TestCase):
+
+    def test_alteracao_de_preco_sem_sinais_e_corrigida(self):
+        categoria = Categoria.objects.create(nome="Pratos")
+        ingredientes = criar_ingredientes(3)
+        receitas = [montar_cadeia(categoria, ingredientes, 3, prefixo=f"Prato {i}") for i in range(3)]
+        funcoes = [FuncaoEquipe.objects.create(nome="Cozinheiro", valor_hora_padrao=Decimal("25.00"))]
+        evento = montar_evento("Jantar", receitas[:2], funcoes)
+        montar_evento("Almoço", receitas[2:], funcoes)
+        reconstruir()
+        self.assertEqual(auditar(processos=1)["divergencias"], [])
+
+        # update() não dispara sinais: resumos do evento e do mês ficam velhos
+        Ingrediente.objects.filter(pk=ingredientes[0].pk).update(custo_por_unidade=Decimal("99.0000"))
+        ResumoMensal.objects.update(eventos=7)
+        resultado = auditar(processos=1)
+        self.assertEqual(resultado["receitas"], 3 * 3)
+        self.assertEqual({d.chave for d in resultado["divergencias"] if d.tipo == "evento"},
+                         set(Evento.objects.values_list("pk", flat=True)))
+        self.assertIn("eventos", {d.campo for d in resultado["divergencias"] if d.tipo == "mes"})
+        self.assertEqual(resultado["custos"][receitas[0].pk].custo_total,
+                         Receita.objects.get(pk=receitas[0].pk).custo_total)
+
+        corrigido = auditar(processos=1, corrigir=True)
+        self.assertEqual(corrigido["corrigidos"], 2)
+        self.assertEqual(auditar(processos=1)["divergencias"], [])
+        evento.refresh_from_db()
+        self.assertEqual(evento.resumo.custo_total, evento.custo_total)
+
+
+class ArquivoEventosTests(TestCase):
+    """Arquivar, excluir receita e função usadas pelo evento, restaurar: os totais congelados não mudam."""
+
+    def setUp(self):
+        ingredientes = criar_ingredientes(3)
+        self.pratos, self.sobremesas = Categoria.objects.create(nome="Pratos"), Categoria.objects.create(nome="Sobremesas")
+        self.prato = montar_cadeia(self.pratos, ingredientes, 2, prefixo="Prato")
+        self.doce = montar_cadeia(self.sobremesas, ingredientes[:1], 1, prefixo="Doce")
+        self.garcom = FuncaoEquipe.objects.create(nome="Garçom", valor_hora_padrao=Decimal("18.00"))
+        funcoes = [FuncaoEquipe.objects.create(nome="Cozinheiro", valor_hora_padrao=Decimal("25.00")), self.garcom]
+        self.evento = montar_evento("Jantar", [self.prato, self.doce], funcoes)
+        reconstruir()
+
+    def painel(self):
+        mensal = ResumoMensal.objects.values("eventos", "pessoas", "custo_receitas", "custo_mao_obra",
+                                             "custo_total", "preco_venda_total", "lucro_estimado").get()
+        return mensal, sorted(ResumoMensalCategoria.objects.values_list("categoria__nome", "custo", "preco_venda"))
+
+    def test_exclusoes_durante_o_arquivo(self):
+        antes = self.painel()
+        custo_total = self.evento.resumo.custo_total
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(arquivar_eventos([self.evento.pk]), 1)
+        self.assertEqual(self.painel(), antes)
+
+        self.doce.delete()
+        self.garcom.delete()
+        with self.assertRaises(ProtectedError):  # a linha do arquivo segura a categoria
+            self.sobremesas.delete()
+        self.assertEqual(EventoArquivadoCategoria.objects.count(), 2)
+        reconstruir()
+        self.assertEqual(self.painel(), antes)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fora = restaurar(EventoArquivado.objects.get(pk=self.evento.pk))
+        self.assertEqual(fora, 2)  # o item do doce e a linha do garçom
+        evento = Evento.objects.get(pk=self.evento.pk)
+        self.assertEqual(list(evento.itens.values_list("receita", flat=True)), [self.prato.pk])
+        self.assertEqual(evento.participacoes.count(), 1)
+        self.assertFalse(EventoArquivado.objects.exists() or EventoArquivadoCategoria.objects.exists())
+        self.assertEqual(evento.resumo.custo_total, custo_total)  # fechado com a fotografia do arquivo
+        self.assertEqual(self.painel(), antes)
+
+
+class PainelFinanceiroTests(TestCase):
+
+    def setUp(self):
+        receita = montar_cadeia(Categoria.objects.create(nome="Pratos"), criar_ingredientes(2), 1)
+        montar_evento("Jantar", [receita], [])  # novembro de 2026
+        reconstruir()
+
+    def painel(self, **parametros):
+        resposta = self.client.get(reverse("eventos:painel"), parametros)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.context
+
+    def test_intervalo_padrao_de_doze_meses(self):
+        contexto = self.painel(ate="2027-10")
+        self.assertEqual((contexto["de"], contexto["ate"]), (date(2026, 11, 1), date(2027, 10, 1)))
+        self.assertEqual(contexto["totais"]["eventos"], 1)
+        self.assertEqual(self.painel(ate="2027-11")["totais"]["eventos"], 0)
+
+    def test_inicio_do_calendario(self):
+        contexto = self.painel(ate="0001-05")
+        self.assertEqual((contexto["de"], contexto["ate"]), (date(1, 1, 1), date(1, 5, 1)))
+        contexto = self.painel(de="0001-01", ate="2026-11")
+        self.assertEqual(contexto["totais"]["eventos"], 1)
+
+
+class SensibilidadeTests(TestCase):
+    """O produto matriz-vetor prevê o que o catálogo calcula depois do reajuste de verdade."""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nome="Molhos")
+        self.tomate = Ingrediente.objects.create(nome="Tomate", unidade_base="kg", custo_por_unidade=Decimal("6.5000"))
+        sal = Ingrediente.objects.create(nome="Sal", unidade_base="kg", custo_por_unidade=Decimal("2.0000"))
+        caldo = Receita.objects.create(titulo="Caldo", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                       unidade_rendimento="l")
+        ItemReceita.objects.create(receita=caldo, ingrediente=self.tomate, unidade="g", peso_liquido=Decimal("200"))
+        self.molho = Receita.objects.create(titulo="Molho", categoria=categoria, rendimento_total=Decimal("2.000"),
+                                            unidade_rendimento="kg", peso_por_porcao=Decimal("0.150"))
+        ItemReceita.objects.create(receita=self.molho, ingrediente=self.tomate, unidade="kg",
+                                   peso_liquido=Decimal("1.350"))
+        ItemReceita.objects.create(receita=self.molho, ingrediente=sal, unidade="g", peso_liquido=Decimal("15"))
+        ComponenteReceita.objects.create(receita=self.molho, sub_receita=caldo, quantidade=Decimal("750"), unidade="ml")
+        self.salgado = Receita.objects.create(titulo="Salmoura", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                              unidade_rendimento="l", peso_por_porcao=Decimal("0.100"))
+        ItemReceita.objects.create(receita=self.salgado, ingrediente=sal, unidade="g", peso_liquido=Decimal("90"))
+        self.receitas = (caldo, self.molho, self.salgado)
+        self.evento = montar_evento("Jantar", [self.molho, self.salgado], [], numero_pessoas=37)
+        self.evento.data = timezone.localdate() + timedelta(days=10)
+        self.evento.save()
+
+    def test_variacoes_batem_com_o_reajuste(self):
+        catalogo = Catalogo.carregar()
+        choques = [Choque(self.tomate.pk, Decimal("20"))]
+        variacoes = variacoes_receitas(choques, catalogo)
+        linha = {receita_id: i for i, receita_id in enumerate(catalogo.receitas)}
+        previsto = {r.pk: catalogo.custo_total(r.pk) + q(Decimal(float(variacoes[linha[r.pk]])), 2)
+                    for r in self.receitas}
+        [simulado] = simular_eventos(choques, [self.evento], catalogo)
+
+        Ingrediente.objects.filter(pk=self.tomate.pk).update(custo_por_unidade=Decimal("7.8000"))
+        depois = Catalogo.carregar()
+        for receita in self.receitas:
+            # cada item é arredondado ao centavo antes e depois: sobra no máximo um centavo por lado
+            self.assertAlmostEqual(previsto[receita.pk], depois.custo_total(receita.pk), delta=Decimal("0.02"))
+        self.assertEqual(variacoes[linha[self.salgado.pk]], 0)
+        # tomate: 1,35 kg + 0,2 kg × 0,75 (caldo em g, fração em ml) = 1,5 kg × R$ 1,30
+        self.assertAlmostEqual(variacoes[linha[self.molho.pk]], 1.95)
+        self.assertEqual(simulado["novo_custo"], linhas_evento(self.evento, depois)[2]["custo_total"])
+
+    def test_percentuais_fora_da_faixa(self):
+        url = reverse("eventos:sensibilidade")
+        for percentual in ("NaN", "Infinity", "-Infinity", "sNaN", "1e400", "-150", "1001"):
+            resposta = self.client.get(url, {"ingrediente": self.tomate.pk, "percentual": percentual})
+            self.assertEqual(resposta.status_code, 200, percentual)
+            self.assertIn("erro", resposta.context, percentual)
+        resposta = self.client.get(url, {"ingrediente": self.tomate.pk, "percentual": "20"})
+        self.assertNotIn("erro", resposta.context)
+        self.assertEqual({r["receita_id"] for r in resposta.context["receitas"]}, {self.molho.pk, self.receitas[0].pk})
+        self.assertEqual(len(resposta.context["eventos"]), 1)
+
+
+class SiteEstaticoTests(TestCase):
+    """``gerar_site`` incremental: só as páginas cujas dependências mudaram são renderizadas de novo."""
+
+    def setUp(self):
+        self.saida = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.saida, ignore_errors=True)
+        categoria = Categoria.objects.create(nome="Pratos")
+        self.tomate, queijo, sal = criar_ingredientes(3)
+        molho = Receita.objects.create(titulo="Molho", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                       unidade_rendimento="kg")
+        ItemReceita.objects.create(receita=molho, ingrediente=self.tomate, unidade="kg", peso_liquido=Decimal("1.2"))
+        pizza = Receita.objects.create(titulo="Pizza", categoria=categoria, rendimento_total=Decimal("2.000"),
+                                       unidade_rendimento="kg", peso_por_porcao=Decimal("0.250"))
+        ItemReceita.objects.create(receita=pizza, ingrediente=queijo, unidade="g", peso_liquido=Decimal("600"))
+        ComponenteReceita.objects.create(receita=pizza, sub_receita=molho, quantidade=Decimal("400"), unidade="g")
+        self.salada = Receita.objects.create(titulo="Salada", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                             unidade_rendimento="kg", peso_por_porcao=Decimal("0.200"))
+        ItemReceita.objects.create(receita=self.salada, ingrediente=sal, unidade="g", peso_liquido=Decimal("10"))
+        self.jantar = montar_evento("Jantar", [pizza], [])
+        self.almoco = montar_evento("Almoço", [self.salada], [])
+        Evento.objects.update(data=timezone.localdate() + timedelta(days=10))
+
+    def gerar(self):
+        return gerar_site(self.saida, processos=1)
+
+    def test_geracao_incremental(self):
+        # listas (geral e da categoria) + 3 fichas + 2 eventos
+        resumo = self.gerar()
+        self.assertEqual((resumo["renderizadas"], resumo["mantidas"]), (7, 0))
+        resumo = self.gerar()
+        self.assertEqual((resumo["renderizadas"], resumo["mantidas"]), (0, 7))
+
+        self.salada.modo_preparo = "Temperar na hora."
+        self.salada.save()
+        resumo = self.gerar()  # a ficha da salada e o almoço, que a serve
+        self.assertEqual((resumo["renderizadas"], resumo["mantidas"], resumo["removidas"]), (2, 5, []))
+        ficha = reverse("fichas:ficha", args=[self.salada.pk]).strip("/")
+        self.assertIn("Temperar na hora.", (self.saida / ficha / "index.html").read_text(encoding="utf-8"))
+
+        # Preço do tomate: molho, pizza (pela sub-receita), o jantar e as duas listas (custo no cartão)
+        self.tomate.custo_por_unidade += Decimal("1.5000")
+        self.tomate.save()
+        resumo = self.gerar()
+        self.assertEqual((resumo["renderizadas"], resumo["mantidas"], resumo["removidas"]), (5, 2, []))
+
+        caminho = reverse("eventos:detalhe_evento", args=[self.almoco.pk])
+        self.almoco.delete()
+        resumo = self.gerar()
+        self.assertEqual((resumo["renderizadas"], resumo["mantidas"], resumo["removidas"]), (0, 6, [caminho]))
+        self.assertFalse((self.saida / caminho.strip("/")).exists())
+        jantar = reverse("eventos:detalhe_evento", args=[self.jantar.pk]).strip("/")
+        self.assertTrue((self.saida / jantar / "index.html").is_file())
+
+
+def embalagens(*pares):
+    """Embalagens (quantidade, preço) a partir de strings, na ordem dada."""
+    return [Embalagem(i, f"{quantidade} kg", "", Decimal(quantidade), Decimal(preco))
+            for i, (quantidade, preco) in enumerate(pares)]
+
+
+class TabelaEmbalagensTests(SimpleTestCase):
+
+    def custo(self, tabela, escolha):
+        return sum(tabela.embalagens[i].preco * unidades for i, unidades in escolha.items())
+
+    def coberto(self, tabela, escolha):
+        return sum(tabela.embalagens[i].quantidade * unidades for i, unidades in escolha.items())
+
+    def forca_bruta(self, tabela, quantidade, limites):
+        """Menor custo entre todas as combinações com até ``limites[i]`` unidades de cada embalagem."""
+        return min(self.custo(tabela, dict(enumerate(unidades)))
+                   for unidades in itertools.product(*(range(limite + 1) for limite in limites))
+                   if self.coberto(tabela, dict(enumerate(unidades))) >= quantidade)
+
+    def test_cobertura_exata(self):
+        tabela = Tabela(embalagens(("1", "5.00"), ("5", "20.00"), ("25", "90.00")))
+        self.assertEqual(tabela.resolver(Decimal("31")), {0: 1, 1: 1, 2: 1})
+        self.assertEqual(tabela.resolver(Decimal("50")), {2: 2})
+        self.assertEqual(tabela.resolver(Decimal("4")), {0: 4})  # empata com 5 kg: fica a cobertura exata
+        self.assertEqual(tabela.resolver(Decimal("24")), {2: 1})  # sobrar 1 kg sai mais barato
+        for quantidade in range(1, 61):
+            escolha = tabela.resolver(Decimal(quantidade))
+            self.assertEqual(self.custo(tabela, escolha), self.forca_bruta(tabela, quantidade, (4, 12, 3)), quantidade)
+
+    def test_empate_fica_com_a_menor_sobra(self):
+        tabela = Tabela(embalagens(("2", "5.00"), ("1", "5.00")))
+        self.assertEqual(tabela.resolver(Decimal("1")), {1: 1})
+        self.assertEqual(tabela.resolver(Decimal("3")), {0: 1, 1: 1})
+        self.assertEqual(tabela.resolver(Decimal("4")), {0: 2})
+
+    def test_acima_da_tabela_completa_com_a_melhor(self):
+        tabela = Tabela(embalagens(("1", "5.00"), ("3", "12.00")))
+        self.assertEqual(len(tabela.custo) - 1, 12)  # maior × melhor + melhor
+        escolha = tabela.resolver(Decimal("1000"))
+        self.assertEqual(escolha, {1: 333, 0: 1})
+        self.assertEqual(self.custo(tabela, escolha), Decimal("4001.00"))
+
+        with mock.patch("eventos.embalagens.LIMITE_TABELA", 4):
+            cortada = Tabela(embalagens(("1", "5.00"), ("3", "12.00")))
+        self.assertEqual(len(cortada.custo) - 1, 4)
+        escolha = cortada.resolver(Decimal("50"))
+        self.assertGreaterEqual(self.coberto(cortada, escolha), 50)  # continua cobrindo, sem garantia de ótimo
+        self.assertGreaterEqual(escolha[1], 15)
+
+    def test_grade_de_embalagens_quebradas(self):
+        tabela = Tabela(embalagens(("0.250", "3.00"), ("1.500", "15.00")))
+        self.assertEqual((tabela.passo, tabela.tamanhos), (250, [1, 6]))
+        self.assertEqual(tabela.resolver(Decimal("1.6")), {0: 1, 1: 1})
+        self.assertEqual(tabela.resolver(Decimal("0.1")), {0: 1})
+
+        tabela = Tabela(embalagens(("0.333", "2.00"), ("1", "7.00")))
+        self.assertEqual((tabela.passo, tabela.tamanhos), (1, [333, 1000]))
+        self.assertEqual(tabela.resolver(Decimal("0.999")), {0: 3})
+        self.assertEqual(tabela.resolver(Decimal("1")), {1: 1})
+        self.assertEqual(tabela.resolver(Decimal("0.3335")), {0: 2})
+        self.assertEqual(tabela.resolver(Decimal("1.333")), {0: 1, 1: 1})
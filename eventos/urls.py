@@ -7,6 +7,12 @@ urlpatterns = [
     # Página principal — lista todos os eventos
     path("", views.EventoListView.as_view(), name="lista_eventos"),
 
+    # Painel financeiro (resumos por mês e categoria)
+    path("painel/", views.PainelFinanceiroView.as_view(), name="painel"),
+
+    # Choques de preço: receitas mais expostas e próximos eventos
+    path("sensibilidade/", views.SensibilidadeView.as_view(), name="sensibilidade"),
+
     # Detalhe de um evento específico
     path("<int:pk>/", views.EventoDetailView.as_view(), name="detalhe_evento"),
 ]
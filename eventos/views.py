@@ -1,8 +1,20 @@
-from collections import defaultdict
-from decimal import Decimal
-from django.views.generic import ListView, DetailView
-from fichas.models import Ingrediente
-from .models import Evento
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Sum
+from django.http import Http404
+from django.utils import timezone
+from django.views.generic import ListView, DetailView, TemplateView
+from fichas.explicacao import resposta_json
+from fichas.custos import CATALOGO
+from fichas.sensibilidade import ler_choque, simular_receitas
+from .arquivo import ler_arquivo, totais_arquivo
+from .embalagens import embalar
+from .explicacao import explicar_evento
+from .fechamento import calcular_fotografia, comparar, contexto_fotografia, ler_fotografia, totais_evento
+from .models import Evento, EventoArquivado, ResumoMensal, ResumoMensalCategoria
+from .resumos import primeiro_dia
+from .sensibilidade import simular_eventos
 
 
 # ---------------------------------------------------------------------
@@ -21,13 +33,34 @@ class EventoListView(ListView):
     def get_queryset(self):
         """
         Permite filtrar eventos por nome (busca simples).
+        Cardápio, equipe e fechamento vêm junto, para os totais da página.
+        ``?arquivados=1`` lista os eventos arquivados (só a linha de resumo).
         """
-        queryset = super().get_queryset()
+        if self.request.GET.get("arquivados"):
+            queryset = EventoArquivado.objects.defer("fotografia", "dados").order_by(*self.ordering)
+        else:
+            queryset = (super().get_queryset().select_related("fechamento")
+                        .prefetch_related("itens", "participacoes__funcao"))
         busca = self.request.GET.get("q")
         if busca:
             queryset = queryset.filter(nome__icontains=busca)
         return queryset
 
+    def get_context_data(self, **kwargs):
+        """
+        Totais de cada evento da página pelo catálogo do processo (ou da fotografia, se fechado).
+        """
+        context = super().get_context_data(**kwargs)
+        context["arquivados"] = bool(self.request.GET.get("arquivados"))
+        if context["arquivados"]:
+            for evento in context["eventos"]:
+                evento.totais = totais_arquivo(evento)
+            return context
+        catalogo = CATALOGO.obter()
+        for evento in context["eventos"]:
+            evento.totais = totais_evento(evento, catalogo)
+        return context
+
 
 # ---------------------------------------------------------------------
 # 📋 DETALHE DO EVENTO + LISTA DE COMPRAS
@@ -35,81 +68,147 @@ class EventoListView(ListView):
 class EventoDetailView(DetailView):
     """
     Exibe os detalhes completos de um evento (ficha técnica e lista de compras).
+    Eventos fechados são exibidos a partir da fotografia do fechamento;
+    eventos arquivados, a partir da fotografia guardada no arquivo.
     """
     model = Evento
     template_name = "eventos/evento.html"
     context_object_name = "evento"
+    queryset = Evento.objects.select_related("fechamento").prefetch_related("itens", "participacoes__funcao")
+
+    def get(self, request, *args, **kwargs):
+        """
+        ``?explicar=json`` (equipe): exporta a árvore explicada do custo do evento.
+        """
+        if request.GET.get("explicar") == "json" and request.user.is_staff:
+            evento = self.get_object()
+            if isinstance(evento, EventoArquivado):
+                raise Http404("Evento arquivado: restaure-o para explicar o custo.")
+            return resposta_json(explicar_evento(evento), f"custo-evento-{evento.pk}.json")
+        return super().get(request, *args, **kwargs)
+
+    def get_object(self, queryset=None):
+        """Evento ativo ou, se já foi arquivado, a sua linha do arquivo (somente leitura)."""
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            arquivo = EventoArquivado.objects.filter(pk=self.kwargs["pk"]).first()
+            if arquivo is None:
+                raise
+            return arquivo
 
     def get_context_data(self, **kwargs):
-        from fichas.models import ItemReceita  # evita import circular
         context = super().get_context_data(**kwargs)
         evento = self.object
 
-        context["itens"] = evento.itens.select_related("receita")
-        context["participacoes"] = evento.participacoes.select_related("funcao")
-
-        # ------------------------------------------------------
-        # 🧾 LISTA DE COMPRAS (precisa de Decimal para precisão)
-        # ------------------------------------------------------
-        lista = defaultdict(lambda: {
-            "quantidade": Decimal("0.0"),
-            "unidade": "",
-            "custo_unit": Decimal("0.0")
-        })
-
-        for item_evento in evento.itens.all():
-            receita = item_evento.receita
-            rendimento = receita.rendimento_total or Decimal("1.0")
-
-            # fator = porções por pessoa × nº de pessoas ÷ rendimento da receita
-            fator = (
-                Decimal(item_evento.porcoes_por_pessoa or 0)
-                * Decimal(evento.numero_pessoas or 0)
-                / Decimal(rendimento)
-            )
-
-            # Ingredientes diretos
-            for item in receita.itens.select_related("ingrediente"):
-                ing = item.ingrediente
-                if not ing:
-                    continue
-
-                peso_liquido = Decimal(item.peso_liquido or 0)
-                custo_unit = Decimal(ing.custo_por_unidade or 0)
-
-                lista[ing.nome]["quantidade"] += peso_liquido * fator
-                lista[ing.nome]["unidade"] = ing.unidade_base
-                lista[ing.nome]["custo_unit"] = custo_unit
-
-            # Sub-receitas (componentes)
-            for componente in receita.componentes.select_related("sub_receita"):
-                sub = componente.sub_receita
-                if sub and sub.rendimento_total:
-                    fator_sub = (
-                        fator * Decimal(componente.quantidade or 0)
-                        / Decimal(sub.rendimento_total)
-                    )
-                    for sub_item in sub.itens.select_related("ingrediente"):
-                        ing = sub_item.ingrediente
-                        if not ing:
-                            continue
-
-                        peso_liquido = Decimal(sub_item.peso_liquido or 0)
-                        custo_unit = Decimal(ing.custo_por_unidade or 0)
-
-                        lista[ing.nome]["quantidade"] += peso_liquido * fator_sub
-                        lista[ing.nome]["unidade"] = ing.unidade_base
-                        lista[ing.nome]["custo_unit"] = custo_unit
-
-        # Converte o dicionário em lista ordenada
-        context["lista_compras"] = [
-            {
-                "ingrediente": nome,
-                "quantidade": round(data["quantidade"], 3),
-                "unidade": data["unidade"],
-                "custo_total": round(data["quantidade"] * data["custo_unit"], 2),
-            }
-            for nome, data in sorted(lista.items())
-        ]
+        # 📦 Arquivado: exibido como fechado, pela fotografia do arquivo
+        if isinstance(evento, EventoArquivado):
+            context["arquivo"] = context["fechamento"] = evento
+            context.update(contexto_fotografia(ler_arquivo(evento)))
+            context["compra_embalagens"] = embalar(context["lista_compras"])
+            return context
+
+        # 🔒 Evento fechado: tudo vem da fotografia (?comparar=1 confronta com o recálculo ao vivo)
+        fotografia = ler_fotografia(evento)
+        if fotografia is not None:
+            context["fechamento"] = evento.fechamento
+            if self.request.user.is_staff and self.request.GET.get("comparar"):
+                context["comparacao"] = comparar(evento)
+        else:
+            # Aberto: a mesma fotografia, calculada agora pelo catálogo
+            # (inclui a lista de compras: árvore de receitas expandida, menos o estoque)
+            fotografia = calcular_fotografia(evento)
+        context.update(contexto_fotografia(fotografia))
+
+        # 📦 A mesma lista em embalagens do fornecedor (sobras e diferença de custo)
+        context["compra_embalagens"] = embalar(context["lista_compras"])
+
+        # 🔍 Explicação do custo (?explicar=1), só para a equipe
+        if self.request.user.is_staff and self.request.GET.get("explicar"):
+            context["explicacao"] = explicar_evento(evento)
+
+        return context
+
+
+# ---------------------------------------------------------------------
+# 📊 PAINEL FINANCEIRO (resumos mensais)
+# ---------------------------------------------------------------------
+class PainelFinanceiroView(TemplateView):
+    """
+    Receita, custo e lucro por mês e por categoria, lidos das tabelas de
+    resumo (sem recalcular eventos). Intervalo em ?de=AAAA-MM&ate=AAAA-MM;
+    padrão: últimos 12 meses.
+    """
+    template_name = "eventos/painel.html"
+
+    def mes_param(self, nome, padrao):
+        try:
+            return datetime.strptime(self.request.GET.get(nome, ""), "%Y-%m").date()
+        except ValueError:
+            return padrao
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        atual = primeiro_dia(timezone.localdate())
+        ate = self.mes_param("ate", atual)
+        de = self.mes_param("de", None)
+        if de is None:  # 12 meses terminando em "ate" (a partir de janeiro do ano 1)
+            indice = max(ate.year * 12 + ate.month - 1 - 11, 12)
+            de = date(indice // 12, indice % 12 + 1, 1)
+        if de > ate:
+            de, ate = ate, de
+
+        meses = list(ResumoMensal.objects.filter(mes__range=(de, ate)))
+        context["meses"] = meses
+        context["totais"] = {
+            campo: sum((getattr(m, campo) for m in meses), 0)
+            for campo in ("eventos", "pessoas", "custo_total", "preco_venda_total", "lucro_estimado")
+        }
+        maior = max((m.preco_venda_total for m in meses), default=0)
+        for m in meses:
+            m.barra = int(m.preco_venda_total * 100 / maior) if maior else 0
+
+        context["categorias"] = (
+            ResumoMensalCategoria.objects.filter(mes__range=(de, ate))
+            .values("categoria__nome")
+            .annotate(custo=Sum("custo"), preco_venda=Sum("preco_venda"), lucro=Sum("lucro"))
+            .order_by("-preco_venda")
+        )
+        context["de"], context["ate"] = de, ate
+        return context
+
 
+# ---------------------------------------------------------------------
+# 📈 SENSIBILIDADE A PREÇOS
+# ---------------------------------------------------------------------
+class SensibilidadeView(TemplateView):
+    """
+    Simula choques de preço (?ingrediente=<id>&percentual=20, repetíveis) e
+    mostra as receitas mais expostas e a variação dos próximos eventos.
+    """
+    template_name = "eventos/sensibilidade.html"
+    linhas_formulario = 3
+    limite_receitas = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        catalogo = CATALOGO.obter()
+        pares = [
+            (ingrediente, percentual)
+            for ingrediente, percentual in zip(self.request.GET.getlist("ingrediente"),
+                                               self.request.GET.getlist("percentual"))
+            if ingrediente and percentual
+        ]
+        try:
+            choques = [ler_choque(f"{ingrediente}={percentual}", catalogo) for ingrediente, percentual in pares]
+        except ValidationError as erro:
+            context["erro"], choques = erro.messages[0], []
+
+        if choques:
+            context["receitas"] = simular_receitas(choques, catalogo, limite=self.limite_receitas)
+            context["eventos"] = simular_eventos(choques, catalogo=catalogo)
+        context["choques"] = [
+            {"ingrediente_id": c.ingrediente_id, "percentual": c.percentual} for c in choques
+        ] + [{}] * max(self.linhas_formulario - len(choques), 1)
+        context["ingredientes"] = sorted(catalogo.ingredientes.values(), key=lambda ing: ing.nome.casefold())
         return context
@@ -1,22 +1,224 @@
-from django.contrib import admin
+from decimal import Decimal, InvalidOperation
+
+from django.contrib import admin, messages
+from django import forms
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.forms.models import BaseInlineFormSet
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import path, reverse
+from django.utils.decorators import method_decorator
 from django.utils.formats import number_format
 from django.utils.html import format_html
-from .models import Categoria, Ingrediente, Receita, ItemReceita, ComponenteReceita
+from django.views.decorators.http import require_POST
+from cozinha.midia import url_midia
+from cozinha.referencias import CATEGORIAS, escolhas
+from .busca import ROTULOS, filtrar_prefixo
+from .custos import CATALOGO, catalogo_da_receita
+from .duplicados import candidatos, grupos, mesclar, sugerir_mantido
+from .models import (
+    ROTULOS_ALERGENOS, Categoria, EmbalagemIngrediente, Ingrediente, Receita, ItemReceita, ComponenteReceita,
+)
+
+
+def formatar_moeda(valor):
+    """R$ 1.234,56 (ou '-' quando não há valor)."""
+    if valor is None:
+        return "-"
+    return f"R$ {number_format(valor, decimal_pos=2, use_l10n=True)}"
+
+
+def eh_autocomplete(request):
+    """Indica se a busca vem do endpoint de autocomplete do admin."""
+    return getattr(request.resolver_match, "url_name", None) == "autocomplete"
+
+
+# ------------------- PRÉVIA DE CUSTOS -------------------
+
+# Teto dos campos de quantidade (10 dígitos, 3 casas): acima disso o formulário recusa de qualquer jeito
+LIMITE_QUANTIDADE = Decimal("1e7")
+
+
+def ler_decimal(texto):
+    """'1,5' / '1.5' / '1.234,5' → Decimal; vazio, inválido, não finito ou fora dos campos → None."""
+    texto = (texto or "").strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        valor = Decimal(texto) if texto else None
+    except InvalidOperation:
+        return None
+    if valor is not None and (not valor.is_finite() or abs(valor) >= LIMITE_QUANTIDADE):
+        return None
+    return valor
+
+
+def ler_id(texto):
+    try:
+        return int(texto)
+    except (TypeError, ValueError):
+        return None
+
+
+def linhas_formset(dados, prefixo):
+    """Gera (chave, campos) das linhas não removidas de um formset do POST."""
+    total = ler_id(dados.get(f"{prefixo}-TOTAL_FORMS")) or 0
+    for i in range(total):
+        chave = f"{prefixo}-{i}"
+        if dados.get(f"{chave}-DELETE"):
+            continue
+        yield chave, lambda campo, chave=chave: dados.get(f"{chave}-{campo}")
+
+
+def ler_rascunho(dados, receita_id=None):
+    """Monta o rascunho de ``Catalogo.custo_rascunho`` a partir do POST do formulário do admin."""
+    itens = [
+        {
+            "chave": chave,
+            "ingrediente_id": ler_id(campo("ingrediente")),
+            "unidade": campo("unidade"),
+            "peso_bruto": ler_decimal(campo("peso_bruto")),
+            "peso_liquido": ler_decimal(campo("peso_liquido")),
+            "fator_correcao": ler_decimal(campo("fator_correcao")),
+        }
+        for chave, campo in linhas_formset(dados, ItemReceita._meta.get_field("receita").remote_field.get_accessor_name())
+    ]
+    componentes = [
+        {
+            "chave": chave,
+            "sub_receita_id": ler_id(campo("sub_receita")),
+            "quantidade": ler_decimal(campo("quantidade")),
+            "unidade": campo("unidade"),
+        }
+        for chave, campo in linhas_formset(dados, ComponenteReceita._meta.get_field("receita").remote_field.get_accessor_name())
+    ]
+    return {
+        "receita_id": receita_id,
+        "rendimento_total": ler_decimal(dados.get("rendimento_total")),
+        "unidade_rendimento": dados.get("unidade_rendimento"),
+        "peso_por_porcao": ler_decimal(dados.get("peso_por_porcao")),
+        "itens": itens,
+        "componentes": componentes,
+    }
+
+
+# ------------------- SELETORES -------------------
+
+class AutocompleteComCache(AutocompleteSelect):
+    """
+    AutocompleteSelect que busca o rótulo da opção escolhida no cache do worker,
+    em vez de uma consulta por linha do inline.
+    """
+
+    def optgroups(self, name, value, attr=None):
+        opcoes = []
+        if not self.is_required:
+            opcoes.append(self.create_option(name, "", "", False, 0))
+        pks = []
+        for valor in value:
+            try:
+                pks.append(int(valor))
+            except (TypeError, ValueError):
+                continue
+        for pk, rotulo in ROTULOS.obter(self.choices.queryset, pks):
+            opcoes.append(self.create_option(name, pk, rotulo, {str(pk)}, len(opcoes)))
+        return [(None, opcoes, 0)]
+
+
+class AutocompleteComCacheMixin:
+    """Usa ``AutocompleteComCache`` nos campos de ``autocomplete_fields``."""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs["widget"] = AutocompleteComCache(db_field, self.admin_site, using=kwargs.get("using"))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class EscolhasEmCacheMixin:
+    """
+    Monta os selects de tabelas de referência (``escolhas_em_cache``: campo →
+    cache) a partir do cache do worker, sem uma consulta por formulário.
+    """
+    escolhas_em_cache = {}
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        campo = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        cache = self.escolhas_em_cache.get(db_field.name)
+        if cache is not None and campo is not None:
+            campo.choices = escolhas(cache, campo.empty_label)
+        return campo
 
 
 # ------------------- INLINES -------------------
 
-class ItemInline(admin.TabularInline):
+class FormSetComCustos(BaseInlineFormSet):
+    """
+    Calcula o custo de todas as linhas do inline de uma vez, a partir do
+    catálogo da receita, e pré-carrega os rótulos dos seletores.
+    """
+    metodo_custo = None
+    campo_escolhido = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.instance.pk and not getattr(self, "_custos_calculados", False):
+            self._custos_calculados = True
+            catalogo = catalogo_da_receita(self.instance)
+            calcular = getattr(catalogo, self.metodo_custo)
+            for obj in queryset:
+                try:
+                    obj.custo_calculado = calcular(obj.pk)
+                except KeyError:  # linha criada depois da leitura do catálogo
+                    obj.custo_calculado = None
+            campo = self.model._meta.get_field(self.campo_escolhido)
+            ROTULOS.obter(campo.related_model._default_manager.all(),
+                          [getattr(obj, campo.attname) for obj in queryset])
+        return queryset
+
+
+class FormSetItens(FormSetComCustos):
+    metodo_custo = "custo_item"
+    campo_escolhido = "ingrediente"
+
+
+class FormSetComponentes(FormSetComCustos):
+    metodo_custo = "custo_componente"
+    campo_escolhido = "sub_receita"
+
+
+class CustoInlineMixin:
+    """Coluna de custo preenchida pelo ``FormSetComCustos``."""
+
+    def custo_formatado(self, obj):
+        return formatar_moeda(getattr(obj, "custo_calculado", None))
+    custo_formatado.short_description = "Custo"
+
+
+class ItemInline(AutocompleteComCacheMixin, CustoInlineMixin, admin.TabularInline):
     """Permite editar os ingredientes diretamente dentro da receita."""
     model = ItemReceita
+    formset = FormSetItens
     extra = 1
+    autocomplete_fields = ("ingrediente",)
+    readonly_fields = ("custo_formatado",)
 
 
-class ComponenteInline(admin.TabularInline):
+class ComponenteInline(AutocompleteComCacheMixin, CustoInlineMixin, admin.TabularInline):
     """Permite adicionar sub-receitas dentro de uma receita principal."""
     model = ComponenteReceita
+    formset = FormSetComponentes
     fk_name = "receita"
     extra = 0
+    autocomplete_fields = ("sub_receita",)
+    readonly_fields = ("custo_formatado",)
+
+
+class EmbalagemInline(admin.TabularInline):
+    """Embalagens em que o fornecedor vende o ingrediente (compra em embalagens)."""
+    model = EmbalagemIngrediente
+    extra = 0
+    fields = ("descricao", "fornecedor", "quantidade", "preco")
 
 
 # ------------------- CATEGORIA -------------------
@@ -30,6 +232,27 @@ class CategoriaAdmin(admin.ModelAdmin):
 
 # ------------------- INGREDIENTE -------------------
 
+class AlergenosField(forms.TypedMultipleChoiceField):
+    """Caixas de seleção para a máscara de bits ``Ingrediente.alergenos``."""
+    widget = forms.CheckboxSelectMultiple
+
+    def __init__(self, **kwargs):
+        kwargs.update(choices=[(int(a), rotulo) for a, rotulo in ROTULOS_ALERGENOS.items()],
+                      coerce=int, required=False)
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        if isinstance(value, int):
+            return [int(a) for a in ROTULOS_ALERGENOS if value & a]
+        return value
+
+    def clean(self, value):
+        return sum(set(super().clean(value)))
+
+    def has_changed(self, initial, data):
+        return set(self.prepare_value(initial or 0)) != {int(v) for v in data or ()}
+
+
 @admin.register(Ingrediente)
 class IngredienteAdmin(admin.ModelAdmin):
     """
@@ -37,13 +260,89 @@ class IngredienteAdmin(admin.ModelAdmin):
     e formatação do custo por unidade.
     """
     list_display = ("foto_preview", "nome", "unidade_base", "custo_por_unidade_formatado")
-    search_fields = ("nome",)
+    search_fields = ("nome", "nome_busca")
     readonly_fields = ("foto_preview",)
+    inlines = [EmbalagemInline]
+    fieldsets = (
+        (None, {"fields": ("nome", "unidade_base", "custo_por_unidade", "foto", "foto_preview")}),
+        ("Informação nutricional (por 100 g / 100 ml, ou por unidade)", {
+            "fields": (("kcal", "carboidratos", "proteinas"), ("gorduras", "fibras", "sodio"), "alergenos"),
+        }),
+    )
+
+    actions = ["mesclar_ingredientes"]
+    change_list_template = "admin/fichas/ingrediente/change_list.html"
+
+    def get_urls(self):
+        return [
+            path("duplicados/", self.admin_site.admin_view(self.duplicados_view), name="fichas_ingrediente_duplicados"),
+        ] + super().get_urls()
+
+    def duplicados_view(self, request):
+        """Grupos de nomes provavelmente duplicados, com link para mesclar cada grupo."""
+        try:
+            limiar = float(request.GET.get("limiar", 0.75))
+        except ValueError:
+            limiar = 0.75
+        pares = candidatos(limiar=limiar)
+        changelist = reverse("admin:fichas_ingrediente_changelist")
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Possíveis ingredientes duplicados",
+            limiar=limiar,
+            pares=pares,
+            grupos=[(grupo, f"{changelist}?id__in={','.join(str(id_) for id_, _ in grupo)}")
+                    for grupo in grupos(pares)],
+        )
+        return render(request, "admin/fichas/ingrediente/duplicados.html", context)
+
+    def mesclar_ingredientes(self, request, queryset):
+        """Página de confirmação: escolhe o ingrediente mantido e mescla os outros nele."""
+        selecionados = list(queryset.order_by("nome"))
+        if len(selecionados) < 2:
+            self.message_user(request, "Selecione ao menos dois ingredientes para mesclar.", messages.WARNING)
+            return None
+        if request.POST.get("confirmar"):
+            mantido = next((i for i in selecionados if str(i.pk) == request.POST.get("mantido")), None)
+            if mantido is None:
+                self.message_user(request, "Escolha o ingrediente que será mantido.", messages.WARNING)
+                return None
+            duplicados = [i for i in selecionados if i.pk != mantido.pk]
+            try:
+                contagem = mesclar(mantido, duplicados)
+            except ValidationError as erro:
+                self.message_user(request, erro.messages[0], messages.ERROR)
+                return None
+            self.message_user(request, f"{len(duplicados)} ingrediente(s) mesclado(s) em {mantido}: "
+                                       f"{contagem.get('fichas.itemreceita', 0)} item(ns) de receita reapontado(s).")
+            return None
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Mesclar ingredientes",
+            selecionados=selecionados,
+            sugerido=sugerir_mantido([i.pk for i in selecionados]),
+            action_checkbox_name=admin.helpers.ACTION_CHECKBOX_NAME,
+        )
+        return render(request, "admin/fichas/ingrediente/mesclar.html", context)
+    mesclar_ingredientes.short_description = "Mesclar ingredientes duplicados"
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "alergenos":
+            return AlergenosField(label="Alérgenos", help_text="Declaração obrigatória (RDC 26/2015)")
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        """No autocomplete: prefixo sem acentos pelo índice de ``nome_busca``."""
+        if search_term and eh_autocomplete(request):
+            return queryset.filter(filtrar_prefixo("nome_busca", search_term)).order_by("nome_busca"), False
+        return super().get_search_results(request, queryset, search_term)
 
     def foto_preview(self, obj):
         """Mostra miniatura da imagem no admin."""
         if obj.foto:
-            return format_html('<img src="{}" width="60" height="60" style="object-fit:cover;border-radius:6px"/>', obj.foto.url)
+            return format_html('<img src="{}" width="60" height="60" style="object-fit:cover;border-radius:6px"/>', url_midia(obj.foto))
         return "(sem imagem)"
     foto_preview.short_description = "Foto"
 
@@ -56,7 +355,7 @@ class IngredienteAdmin(admin.ModelAdmin):
 # ------------------- RECEITA -------------------
 
 @admin.register(Receita)
-class ReceitaAdmin(admin.ModelAdmin):
+class ReceitaAdmin(EscolhasEmCacheMixin, admin.ModelAdmin):
     """
     Admin completo da ficha técnica (receita).
     Exibe custos, porções e imagem do preparo.
@@ -69,8 +368,9 @@ class ReceitaAdmin(admin.ModelAdmin):
         "numero_porcoes_formatado",
         "custo_por_porcao_formatado",
     )
-    search_fields = ("titulo", "categoria__nome")
+    search_fields = ("titulo", "titulo_busca", "categoria__nome")
     list_filter = ("categoria",)
+    escolhas_em_cache = {"categoria": CATEGORIAS}
     inlines = [ItemInline, ComponenteInline]
 
     readonly_fields = (
@@ -99,23 +399,63 @@ class ReceitaAdmin(admin.ModelAdmin):
         }),
     )
 
+    class Media:
+        js = ("admin/js/vendor/jquery/jquery.js", "admin/js/jquery.init.js", "fichas/admin/custo_previa.js")
+
+    def get_urls(self):
+        previa = path("custo-previa/", self.admin_site.admin_view(self.custo_previa_view),
+                      name="fichas_receita_custo_previa")
+        return [previa] + super().get_urls()
+
+    def get_search_results(self, request, queryset, search_term):
+        """No autocomplete de sub-receitas: prefixo sem acentos pelo índice de ``titulo_busca``."""
+        if search_term and eh_autocomplete(request):
+            return queryset.filter(filtrar_prefixo("titulo_busca", search_term)).order_by("titulo_busca"), False
+        return super().get_search_results(request, queryset, search_term)
+
+    # ------------------- PRÉVIA DE CUSTOS -------------------
+
+    @method_decorator(require_POST)
+    def custo_previa_view(self, request):
+        """
+        Recalcula os custos do formulário em edição (POST do próprio formulário),
+        em memória e sem gravar nada, com o catálogo em cache do processo.
+        """
+        if not (self.has_change_permission(request) or self.has_add_permission(request)):
+            raise PermissionDenied
+        rascunho = ler_rascunho(request.POST, ler_id(request.POST.get("receita_id")))
+        custos = CATALOGO.obter().custo_rascunho(rascunho)
+        porcoes = custos["numero_porcoes"]
+        return JsonResponse({
+            "itens": {chave: formatar_moeda(custo) for chave, custo in custos["itens"].items()},
+            "componentes": {chave: formatar_moeda(custo) for chave, custo in custos["componentes"].items()},
+            "custo_total": formatar_moeda(custos["custo_total"]),
+            "numero_porcoes": "-" if porcoes is None else number_format(porcoes, decimal_pos=0, use_l10n=True),
+            "custo_por_porcao": formatar_moeda(custos["custo_por_porcao"]),
+            "erros": custos["erros"],
+        })
+
     # ------------------- CAMPOS FORMATADOS -------------------
 
     def foto_preview(self, obj):
         """Mostra uma miniatura da foto do preparo."""
         if obj.foto_preparo:
-            return format_html('<img src="{}" width="90" height="90" style="object-fit:cover;border-radius:6px"/>', obj.foto_preparo.url)
+            return format_html('<img src="{}" width="90" height="90" style="object-fit:cover;border-radius:6px"/>', url_midia(obj.foto_preparo))
         return "(sem imagem)"
     foto_preview.short_description = "Imagem do preparo"
 
     def custo_total_formatado(self, obj):
         """Formata custo total com símbolo monetário."""
-        return f"R$ {number_format(obj.custo_total, decimal_pos=2, use_l10n=True)}"
+        if obj.pk is None:
+            return "-"
+        return formatar_moeda(CATALOGO.obter().custo_total(obj.pk))
     custo_total_formatado.short_description = "Custo total"
 
     def custo_por_porcao_formatado(self, obj):
         """Formata custo por porção."""
-        return f"R$ {number_format(obj.custo_por_porcao, decimal_pos=2, use_l10n=True)}"
+        if obj.pk is None:
+            return "-"
+        return formatar_moeda(CATALOGO.obter().custo_por_porcao(obj.pk))
     custo_por_porcao_formatado.short_description = "Custo por porção"
 
     def numero_porcoes_formatado(self, obj):
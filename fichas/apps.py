@@ -4,3 +4,24 @@ from django.apps import AppConfig
 class FichasConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "fichas"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from cozinha.referencias import CATEGORIAS
+        from .busca import ROTULOS
+        from .custos import CATALOGO
+        from .models import Categoria, ComponenteReceita, Ingrediente, ItemReceita, Receita
+
+        # Rótulos dos seletores do admin: descarta o item alterado/removido
+        for modelo in (Ingrediente, Receita):
+            post_save.connect(ROTULOS.descartar, sender=modelo, dispatch_uid=f"rotulos_save_{modelo.__name__}")
+            post_delete.connect(ROTULOS.descartar, sender=modelo, dispatch_uid=f"rotulos_delete_{modelo.__name__}")
+
+        # Categorias (lista de fichas, select do admin): recarregadas em todos os workers
+        post_save.connect(CATEGORIAS.invalidar, sender=Categoria, dispatch_uid="categorias_save")
+        post_delete.connect(CATEGORIAS.invalidar, sender=Categoria, dispatch_uid="categorias_delete")
+
+        # Catálogo de custos do worker: descartado a cada alteração, em todos os workers
+        for modelo in (Ingrediente, Receita, ItemReceita, ComponenteReceita):
+            post_save.connect(CATALOGO.invalidar, sender=modelo, dispatch_uid=f"catalogo_save_{modelo.__name__}")
+            post_delete.connect(CATALOGO.invalidar, sender=modelo, dispatch_uid=f"catalogo_delete_{modelo.__name__}")
@@ -0,0 +1,145 @@
+"""
+Aritmética de ponto fixo para custos e quantidades.
+
+Valores monetários circulam como centavos (int) e quantidades como milésimos
+da unidade (int: g quando a base é kg, mg quando é g, ml quando é l).
+Preços de ingredientes usam décimos de milésimo, como o campo
+``Ingrediente.custo_por_unidade`` (4 casas).
+
+A conversão para ``Decimal`` acontece só nas bordas (models, views, templates)
+e todo arredondamento é ROUND_HALF_UP, idêntico ao antigo ``q()``.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+
+# ------------------- Escalas e quantizadores -------------------
+ESCALA_CENTAVOS = 100
+ESCALA_MILESIMOS = 1000
+ESCALA_PRECO = 10000
+
+# Quantizadores pré-calculados: QUANTIZADORES[2] == Decimal("0.01")
+QUANTIZADORES = tuple(Decimal(1).scaleb(-casas) for casas in range(9))
+CENTAVOS = QUANTIZADORES[2]
+MILESIMOS = QUANTIZADORES[3]
+
+ZERO = Decimal("0.00")
+
+# qtd (milésimos) × fator (milésimos) × preço (1/10000) → centavos
+DIVISOR_ITEM = ESCALA_MILESIMOS * ESCALA_MILESIMOS * ESCALA_PRECO // ESCALA_CENTAVOS
+
+_LIMITE_INT64 = 2 ** 63 - 1
+
+
+def numpy():
+    """
+    Importa o NumPy sob demanda (é opcional e custa ~100 ms no import do worker).
+    Retorna None quando não está instalado.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# ------------------- Arredondamento Decimal -------------------
+def q(value, places=2):
+    """Arredonda valores decimais com precisão configurável."""
+    if value is None:
+        return None
+    if value.__class__ is not Decimal:
+        value = Decimal(value)
+    if 0 <= places < len(QUANTIZADORES):
+        quantizador = QUANTIZADORES[places]
+    else:
+        quantizador = Decimal(10) ** -places
+    return value.quantize(quantizador, rounding=ROUND_HALF_UP)
+
+
+# ------------------- Conversões de borda -------------------
+def para_inteiro(valor, escala):
+    """Converte um valor decimal para inteiro na escala dada (HALF_UP)."""
+    if valor is None:
+        return None
+    return int((Decimal(valor) * escala).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def para_centavos(valor):
+    """R$ 12,34 → 1234."""
+    return para_inteiro(valor, ESCALA_CENTAVOS)
+
+
+def para_milesimos(valor):
+    """1,5 kg → 1500 (g)."""
+    return para_inteiro(valor, ESCALA_MILESIMOS)
+
+
+def para_preco(valor):
+    """Custo por unidade com 4 casas → inteiro em décimos de milésimo."""
+    return para_inteiro(valor, ESCALA_PRECO)
+
+
+def de_centavos(n):
+    """1234 → Decimal("12.34")."""
+    return None if n is None else Decimal(n).scaleb(-2)
+
+
+def de_milesimos(n):
+    """1500 → Decimal("1.500")."""
+    return None if n is None else Decimal(n).scaleb(-3)
+
+
+def exato(valor, casas):
+    """Indica se o Decimal cabe na escala sem perda (ex.: 3 casas para milésimos)."""
+    return valor.as_tuple().exponent >= -casas
+
+
+# ------------------- Operações inteiras -------------------
+def dividir(numerador, denominador):
+    """Divisão inteira com arredondamento HALF_UP (meio para longe do zero)."""
+    quociente, resto = divmod(abs(numerador), denominador)
+    if resto * 2 >= denominador:
+        quociente += 1
+    return quociente if numerador >= 0 else -quociente
+
+
+def custo_centavos(qtd, fator, preco):
+    """
+    Custo de um item em centavos.
+    ``qtd`` e ``fator`` em milésimos, ``preco`` em décimos de milésimo.
+    Equivale a ``q(qtd * fator * preco, 2)`` com os valores em Decimal.
+    """
+    return dividir(qtd * fator * preco, DIVISOR_ITEM)
+
+
+def custos_centavos(quantidades, fatores, precos):
+    """
+    Versão em lote de ``custo_centavos``.
+    Aceita listas de int (retorna lista) ou arrays NumPy int64 (retorna array).
+    """
+    if type(quantidades).__module__ == "numpy":
+        return _custos_centavos_numpy(quantidades, fatores, precos)
+    return [custo_centavos(a, b, c) for a, b, c in zip(quantidades, fatores, precos)]
+
+
+def _custos_centavos_numpy(quantidades, fatores, precos):
+    """Lote vetorizado; linhas que estourariam int64 são calculadas com int do Python."""
+    np = numpy()
+    quantidades = np.asarray(quantidades, dtype=np.int64)
+    fatores = np.asarray(fatores, dtype=np.int64)
+    precos = np.asarray(precos, dtype=np.int64)
+
+    # Estimativa em float (com folga) de quais produtos não cabem em int64
+    estimativa = (np.abs(quantidades).astype(np.float64)
+                  * np.abs(fatores) * np.abs(precos))
+    arriscado = 2 * estimativa + DIVISOR_ITEM > _LIMITE_INT64 / 4
+
+    seguros = np.where(arriscado, 0, quantidades)
+    produto = seguros * fatores * precos
+    absoluto = np.abs(produto)
+    arredondado = (2 * absoluto + DIVISOR_ITEM) // (2 * DIVISOR_ITEM)
+    resultado = np.where(produto < 0, -arredondado, arredondado)
+
+    for i in np.flatnonzero(arriscado):
+        resultado[i] = custo_centavos(int(quantidades[i]), int(fatores[i]), int(precos[i]))
+    return resultado
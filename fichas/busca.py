@@ -0,0 +1,143 @@
+"""
+Busca por nome sem acentos e sem diferença de maiúsculas.
+
+``normalizar`` gera a chave gravada em ``Ingrediente.nome_busca`` e
+``Receita.titulo_busca`` (colunas indexadas). ``filtrar_prefixo`` transforma
+um prefixo em intervalo ``[p, p + U+FFFF)``, que o índice resolve sem
+varrer a tabela (ao contrário de ``LIKE '%...%'``).
+
+``IndiceTrigramas`` casa nomes digitados com erros (importação de planilhas)
+por semelhança de trigramas, com um índice invertido em memória.
+
+``ROTULOS`` guarda, por worker, o texto exibido para cada pk escolhido nos
+seletores do admin, evitando uma consulta por linha de inline; é esvaziado
+quando o carimbo "catalogo" muda (alteração em qualquer worker).
+"""
+import unicodedata
+from collections import defaultdict, namedtuple
+
+from django.db.models import Q
+
+from cozinha.referencias import Versao
+
+
+def normalizar(texto):
+    """'  Cebola   Roxa ' → 'cebola roxa'; 'Feijão' → 'feijao'."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def filtrar_prefixo(campo, termo):
+    """Q() de prefixo indexável sobre um campo normalizado."""
+    prefixo = normalizar(termo)
+    return Q(**{f"{campo}__gte": prefixo, f"{campo}__lt": prefixo + "￿"})
+
+
+# ------------------- Semelhança por trigramas -------------------
+
+Casamento = namedtuple("Casamento", "situacao id nome semelhanca candidatos")
+
+EXATO, APROXIMADO, AMBIGUO, AUSENTE = "exato", "aproximado", "ambíguo", "não encontrado"
+
+
+def trigramas(texto):
+    """Trigramas do nome normalizado, com bordas de palavra ('  to', 'tom', ...)."""
+    chave = f"  {normalizar(texto)} "
+    return {chave[i:i + 3] for i in range(len(chave) - 2)}
+
+
+class IndiceTrigramas:
+    """
+    Nomes (id, nome) indexados pelo nome normalizado e por trigramas.
+    ``procurar`` devolve o casamento exato (sem acentos/maiúsculas) ou o mais
+    parecido pelo coeficiente de Dice dos trigramas, se passar de ``limiar``
+    e se destacar do segundo por ``margem`` (senão é ambíguo).
+    """
+
+    def __init__(self, nomes, limiar=0.6, margem=0.08):
+        self.limiar = limiar
+        self.margem = margem
+        self.exatos = defaultdict(list)
+        self.nomes = {}
+        self.trigramas = {}
+        self.postagens = defaultdict(set)
+        for id_, nome in nomes:
+            self.adicionar(id_, nome)
+
+    def adicionar(self, id_, nome):
+        self.nomes[id_] = nome
+        self.exatos[normalizar(nome)].append(id_)
+        self.trigramas[id_] = trigramas(nome)
+        for trigrama in self.trigramas[id_]:
+            self.postagens[trigrama].add(id_)
+
+    def semelhantes(self, texto, quantidade=3):
+        """[(semelhança, id)] dos mais parecidos, do maior para o menor."""
+        procurados = trigramas(texto)
+        comuns = defaultdict(int)
+        for trigrama in procurados:
+            for id_ in self.postagens.get(trigrama, ()):
+                comuns[id_] += 1
+        notas = sorted(
+            ((2 * n / (len(procurados) + len(self.trigramas[id_])), id_) for id_, n in comuns.items()),
+            key=lambda par: (-par[0], self.nomes[par[1]]),
+        )
+        return notas[:quantidade]
+
+    def procurar(self, texto):
+        exatos = self.exatos.get(normalizar(texto), [])
+        if len(exatos) == 1:
+            return Casamento(EXATO, exatos[0], self.nomes[exatos[0]], 1.0, [])
+        if exatos:
+            return Casamento(AMBIGUO, None, None, 1.0, [self.nomes[i] for i in exatos])
+
+        notas = self.semelhantes(texto)
+        candidatos = [self.nomes[id_] for nota, id_ in notas if nota >= self.limiar / 2]
+        if not notas or notas[0][0] < self.limiar:
+            return Casamento(AUSENTE, None, None, notas[0][0] if notas else 0.0, candidatos)
+        melhor, id_ = notas[0]
+        if len(notas) > 1 and melhor - notas[1][0] < self.margem:
+            return Casamento(AMBIGUO, None, None, melhor, candidatos)
+        return Casamento(APROXIMADO, id_, self.nomes[id_], melhor, candidatos)
+
+
+class RotulosCache:
+    """Rótulos (``str(obj)``) por (model, pk), compartilhados pelas requisições do worker."""
+
+    def __init__(self, limite=50000, versao="catalogo"):
+        self.limite = limite
+        self.versao = Versao(versao)
+        self._carimbo = None
+        self._rotulos = {}
+
+    def sincronizar(self):
+        carimbo = self.versao.atual()
+        if carimbo != self._carimbo:
+            self._rotulos.clear()
+            self._carimbo = carimbo
+
+    def obter(self, queryset, pks):
+        """[(pk, rótulo)] para os pks pedidos, consultando só os que faltam."""
+        self.sincronizar()
+        modelo = queryset.model._meta.label
+        faltando = [pk for pk in pks if (modelo, pk) not in self._rotulos]
+        if faltando:
+            self.carregar(queryset.filter(pk__in=faltando))
+        return [(pk, self._rotulos[(modelo, pk)]) for pk in pks if (modelo, pk) in self._rotulos]
+
+    def carregar(self, queryset):
+        """Pré-carrega os rótulos de um queryset inteiro (uma consulta)."""
+        self.sincronizar()
+        if len(self._rotulos) > self.limite:
+            self._rotulos.clear()
+        modelo = queryset.model._meta.label
+        for obj in queryset:
+            self._rotulos[(modelo, obj.pk)] = str(obj)
+
+    def descartar(self, sender, instance, **kwargs):
+        """Receptor de post_save/post_delete."""
+        self._rotulos.pop((sender._meta.label, instance.pk), None)
+
+
+ROTULOS = RotulosCache()
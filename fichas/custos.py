@@ -0,0 +1,318 @@
+"""
+Motor de custos em lote.
+
+``Catalogo`` é uma fotografia em memória de ingredientes, receitas, itens e
+componentes, lida com ``values_list`` (sem instâncias de model). Os custos usam
+as mesmas funções puras dos models (``calcular_custo_item``,
+``fracao_componente``...) e são memorizados por receita: cada sub-receita é
+avaliada uma única vez por fotografia, em vez de uma árvore de consultas por
+linha exibida.
+
+Os itens de receita são custeados num único lote pelo núcleo inteiro de
+``fichas.aritmetica`` (quantidade e fator em milésimos, preço em décimos de
+milésimo, resultado em centavos) e somados como inteiros; itens fora dessas
+escalas caem no caminho ``Decimal`` de ``calcular_custo_item``, com o mesmo
+arredondamento.
+
+``CATALOGO`` guarda o catálogo completo por worker (descartado pelos sinais
+de alteração em todos os workers, via ``cozinha.referencias``) e serve a
+prévia de custos de receitas ainda não salvas.
+"""
+import threading
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from cozinha.metricas import BALDES_SEGUNDOS, METRICAS
+from cozinha.referencias import CacheCompartilhado
+from .aritmetica import (
+    ESCALA_MILESIMOS, ESCALA_PRECO, ZERO, custos_centavos, de_centavos, exato, para_centavos, para_inteiro, q,
+)
+from .models import (
+    CONVERSOES, ComponenteReceita, Ingrediente, ItemReceita, Receita, Unidade,
+    calcular_custo_item, calcular_numero_porcoes, fracao_componente, quantidade_liquida,
+)
+
+Ing = namedtuple("Ing", "id nome unidade_base custo_por_unidade "
+                       "kcal proteinas gorduras carboidratos fibras sodio alergenos")
+Rec = namedtuple("Rec", "id titulo categoria_id rendimento_total unidade_rendimento peso_por_porcao")
+Item = namedtuple("Item", "id receita_id ingrediente_id unidade peso_bruto peso_liquido fator_correcao")
+Comp = namedtuple("Comp", "id receita_id sub_receita_id quantidade unidade")
+
+
+class Catalogo:
+    """Fotografia do catálogo com custos memorizados por receita."""
+
+    def __init__(self):
+        self.ingredientes = {}
+        self.receitas = {}
+        self.itens = {}
+        self.componentes = {}
+        self.itens_por_receita = defaultdict(list)
+        self.componentes_por_receita = defaultdict(list)
+        self._custos = {}
+        self._centavos_itens = None  # {item_id: centavos}, calculado em lote na primeira avaliação
+        self.arvores = {}  # árvores resolvidas para escala (fichas/escala.py), por receita
+        self.nutricao = None  # tabela nutricional de todas as receitas (fichas/nutricao.py)
+        self.uso = None  # matriz de uso de ingredientes por receita (fichas/sensibilidade.py)
+        self._local = threading.local()  # receitas em cálculo (detecção de ciclo) por thread
+
+    # ------------------- Carga -------------------
+
+    @classmethod
+    def carregar(cls, receita_ids=None):
+        """
+        Sem argumentos carrega o catálogo inteiro (4 consultas).
+        Com ``receita_ids`` carrega só essas receitas e suas sub-receitas,
+        um nível da árvore por vez (3 consultas por nível + 1).
+        """
+        catalogo = cls()
+        if receita_ids is None:
+            catalogo._adicionar(Receita.objects.all(), ItemReceita.objects.all(), ComponenteReceita.objects.all())
+            catalogo._adicionar_ingredientes(Ingrediente.objects.all())
+            return catalogo
+
+        pendentes = set(receita_ids)
+        while pendentes:
+            catalogo._adicionar(
+                Receita.objects.filter(pk__in=pendentes),
+                ItemReceita.objects.filter(receita_id__in=pendentes),
+                ComponenteReceita.objects.filter(receita_id__in=pendentes),
+            )
+            pendentes = {c.sub_receita_id for c in catalogo.componentes.values()} - catalogo.receitas.keys()
+
+        ingrediente_ids = {item.ingrediente_id for item in catalogo.itens.values()}
+        catalogo._adicionar_ingredientes(Ingrediente.objects.filter(pk__in=ingrediente_ids))
+        return catalogo
+
+    def _adicionar(self, receitas, itens, componentes):
+        for linha in receitas.values_list(*Rec._fields):
+            self.receitas[linha[0]] = Rec(*linha)
+        for linha in itens.order_by("pk").values_list(*Item._fields):
+            item = Item(*linha)
+            self.itens[item.id] = item
+            self.itens_por_receita[item.receita_id].append(item)
+        for linha in componentes.order_by("pk").values_list(*Comp._fields):
+            comp = Comp(*linha)
+            self.componentes[comp.id] = comp
+            self.componentes_por_receita[comp.receita_id].append(comp)
+
+    def _adicionar_ingredientes(self, ingredientes):
+        for linha in ingredientes.values_list(*Ing._fields):
+            self.ingredientes[linha[0]] = Ing(*linha)
+
+    # ------------------- Custos -------------------
+
+    def custo_item(self, item):
+        """Custo de um ItemReceita (id ou linha)."""
+        if not isinstance(item, Item):
+            item = self.itens[item]
+        centavos = self.centavos_itens().get(item.id)
+        if centavos is not None and self.itens.get(item.id) == item:
+            return de_centavos(centavos)
+        return self.custo_item_decimal(item)
+
+    def custo_item_decimal(self, item):
+        """Caminho ``Decimal`` de um item (fora das escalas do núcleo inteiro)."""
+        if item.unidade == Unidade.QB:
+            return ZERO
+        ing = self.ingredientes[item.ingrediente_id]
+        qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+        return calcular_custo_item(item.unidade, qtd, ing.unidade_base, ing.custo_por_unidade)
+
+    def entradas_item(self, item):
+        """(quantidade, fator, preço) inteiros do item para ``custos_centavos``, ou None se não cabem nas escalas."""
+        if item.unidade == Unidade.QB:
+            return 0, 0, 0
+        ing = self.ingredientes[item.ingrediente_id]
+        qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+        if qtd is None:
+            return 0, 0, 0
+        # sem conversão: proporção direta, como em calcular_custo_item
+        fator = CONVERSOES.get((item.unidade, ing.unidade_base), 1) if item.unidade != ing.unidade_base else 1
+        qtd, fator, preco = Decimal(qtd), Decimal(fator), Decimal(ing.custo_por_unidade)
+        if not (exato(qtd, 3) and exato(fator, 3) and exato(preco, 4)):
+            return None
+        return (para_inteiro(qtd, ESCALA_MILESIMOS), para_inteiro(fator, ESCALA_MILESIMOS),
+                para_inteiro(preco, ESCALA_PRECO))
+
+    def centavos_itens(self):
+        """{item_id: custo em centavos} de todos os itens do catálogo, num lote (memorizado)."""
+        centavos = self._centavos_itens
+        if centavos is None:
+            ids, quantidades, fatores, precos = [], [], [], []
+            centavos = {}
+            for item in self.itens.values():
+                entradas = self.entradas_item(item)
+                if entradas is None:
+                    centavos[item.id] = para_centavos(self.custo_item_decimal(item))
+                    continue
+                ids.append(item.id)
+                quantidades.append(entradas[0])
+                fatores.append(entradas[1])
+                precos.append(entradas[2])
+            centavos.update(zip(ids, custos_centavos(quantidades, fatores, precos)))
+            self._centavos_itens = centavos
+        return centavos
+
+    def custo_componente(self, comp):
+        """Custo proporcional de um ComponenteReceita (id ou linha)."""
+        if not isinstance(comp, Comp):
+            comp = self.componentes[comp]
+        sub = self.receitas[comp.sub_receita_id]
+        frac = fracao_componente(comp.quantidade, comp.unidade, sub.unidade_rendimento, sub.rendimento_total)
+        if frac is None:
+            return ZERO
+        return q(self.custo_total(sub.id) * frac, 2)
+
+    def custo_total(self, receita_id):
+        """Soma o custo dos itens e sub-receitas (igual a ``Receita.custo_total``)."""
+        custo = self._custos.get(receita_id)
+        if custo is not None:
+            return custo
+
+        em_calculo = self._local.__dict__.setdefault("em_calculo", set())
+        if receita_id in em_calculo:
+            raise ValidationError(f"Ciclo de sub-receitas envolvendo '{self.receitas[receita_id].titulo}'.")
+        raiz = not em_calculo
+        if raiz:  # métricas só na receita de fora (as sub-receitas entram na contagem dela)
+            memorizadas, inicio = len(self._custos), time.perf_counter()
+        em_calculo.add(receita_id)
+        try:
+            centavos = self.centavos_itens()
+            total = de_centavos(sum(centavos[item.id] for item in self.itens_por_receita.get(receita_id, ())))
+            for comp in self.componentes_por_receita.get(receita_id, ()):
+                total += self.custo_componente(comp)
+            custo = q(total, 2)
+        finally:
+            em_calculo.discard(receita_id)
+        self._custos[receita_id] = custo
+        if raiz:
+            METRICAS.somar("cozinha_custos_avaliacoes_total", len(self._custos) - memorizadas)
+            METRICAS.observar("cozinha_custos_avaliacao_segundos", time.perf_counter() - inicio, BALDES_SEGUNDOS)
+        return custo
+
+    def memorizadas(self):
+        """Ids das receitas com custo já memorizado nesta fotografia."""
+        return frozenset(self._custos)
+
+    def numero_porcoes(self, receita_id):
+        rec = self.receitas[receita_id]
+        return calcular_numero_porcoes(rec.rendimento_total, rec.peso_por_porcao)
+
+    def custo_por_porcao(self, receita_id):
+        """Custo total ÷ número de porções (igual a ``Receita.custo_por_porcao``)."""
+        porcoes = self.numero_porcoes(receita_id)
+        if porcoes and porcoes > 0:
+            return q(self.custo_total(receita_id) / porcoes, 2)
+        return None
+
+
+    def usa_receita(self, receita_id, procurada):
+        """Indica se ``procurada`` aparece na árvore de sub-receitas de ``receita_id``."""
+        pendentes, vistas = [receita_id], set()
+        while pendentes:
+            atual = pendentes.pop()
+            if atual == procurada:
+                return True
+            if atual not in vistas:
+                vistas.add(atual)
+                pendentes.extend(c.sub_receita_id for c in self.componentes_por_receita.get(atual, ()))
+        return False
+
+    def alturas(self):
+        """Altura de cada receita na árvore de sub-receitas (0 = sem componentes), sem recursão."""
+        altura, em_curso = {}, set()
+        for raiz in self.receitas:
+            pilha = [raiz]
+            while pilha:
+                atual = pilha[-1]
+                if atual in altura:
+                    pilha.pop()
+                    continue
+                em_curso.add(atual)
+                subs = [c.sub_receita_id for c in self.componentes_por_receita.get(atual, ())]
+                pendentes = [s for s in subs if s not in altura]
+                for sub in pendentes:
+                    if sub in em_curso:
+                        raise ValidationError(f"Ciclo de sub-receitas envolvendo '{self.receitas[sub].titulo}'.")
+                if pendentes:
+                    pilha.extend(pendentes)
+                    continue
+                altura[atual] = 1 + max((altura[s] for s in subs), default=-1)
+                em_curso.discard(atual)
+                pilha.pop()
+        return altura
+
+    # ------------------- Prévia -------------------
+
+    def custo_rascunho(self, rascunho):
+        """
+        Custos de uma receita ainda não salva, sem tocar no banco.
+
+        ``rascunho`` traz ``receita_id`` (None na inclusão), ``rendimento_total``,
+        ``unidade_rendimento``, ``peso_por_porcao`` e as listas ``itens``
+        (``chave``, ``ingrediente_id``, ``unidade``, ``peso_bruto``,
+        ``peso_liquido``, ``fator_correcao``) e ``componentes`` (``chave``,
+        ``sub_receita_id``, ``quantidade``, ``unidade``). Preços e custos das
+        sub-receitas vêm do catálogo; linhas impossíveis de calcular voltam None.
+        """
+        resultado = {"itens": {}, "componentes": {}, "erros": []}
+        total = ZERO
+
+        for linha in rascunho["itens"]:
+            ing = self.ingredientes.get(linha["ingrediente_id"])
+            custo = None
+            if ing is not None:
+                qtd = quantidade_liquida(linha["peso_bruto"], linha["peso_liquido"], linha["fator_correcao"])
+                custo = calcular_custo_item(linha["unidade"], qtd, ing.unidade_base, ing.custo_por_unidade)
+                total += custo
+            resultado["itens"][linha["chave"]] = custo
+
+        receita_id = rascunho.get("receita_id")
+        for linha in rascunho["componentes"]:
+            sub = self.receitas.get(linha["sub_receita_id"])
+            custo = None
+            if sub is not None and receita_id is not None and self.usa_receita(sub.id, receita_id):
+                resultado["erros"].append(f"'{sub.titulo}' usa esta receita: ciclo de sub-receitas.")
+            elif sub is not None and linha["quantidade"] is not None:
+                frac = fracao_componente(linha["quantidade"], linha["unidade"], sub.unidade_rendimento,
+                                         sub.rendimento_total)
+                custo = ZERO if frac is None else q(self.custo_total(sub.id) * frac, 2)
+                total += custo
+            resultado["componentes"][linha["chave"]] = custo
+
+        resultado["custo_total"] = custo_total = q(total, 2)
+        porcoes = None
+        if rascunho["rendimento_total"] is not None:
+            porcoes = calcular_numero_porcoes(rascunho["rendimento_total"], rascunho["peso_por_porcao"])
+        resultado["numero_porcoes"] = porcoes
+        resultado["custo_por_porcao"] = q(custo_total / porcoes, 2) if porcoes and porcoes > 0 else None
+        return resultado
+
+
+# ------------------- Cache do processo -------------------
+
+# Catálogo completo compartilhado pelas requisições do worker; cada alteração troca
+# o carimbo "catalogo" e todos os workers recarregam na requisição seguinte.
+CATALOGO = CacheCompartilhado("catalogo", Catalogo.carregar)
+
+
+def anotar_custos(receitas, catalogo=None):
+    """Preenche ``custo_calculado`` e ``custo_porcao_calculado`` das receitas de uma listagem (sem consultas)."""
+    catalogo = catalogo or CATALOGO.obter()
+    for receita in receitas:
+        receita.custo_calculado = catalogo.custo_total(receita.pk)
+        receita.custo_porcao_calculado = catalogo.custo_por_porcao(receita.pk)
+    return receitas
+
+
+def catalogo_da_receita(receita):
+    """Catálogo parcial da receita, guardado na própria instância (reusado na mesma requisição)."""
+    catalogo = getattr(receita, "_catalogo_custos", None)
+    if catalogo is None:
+        catalogo = Catalogo.carregar([receita.pk])
+        receita._catalogo_custos = catalogo
+    return catalogo
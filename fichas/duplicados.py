@@ -0,0 +1,221 @@
+"""
+Ingredientes duplicados ("Cebola", "cebola ", "Cebolas", "Cebola branca").
+
+``candidatos`` propõe pares para mesclar sem comparar todos com todos:
+
+- blocagem: cada nome entra nos blocos das suas palavras normalizadas, sem
+  palavras de ligação (sem o "s" final e cortadas em ``PREFIXO_BLOCO``
+  letras, o que junta singular e plural); só nomes do mesmo bloco são
+  comparados, e blocos maiores que ``LIMITE_BLOCO`` (palavras genéricas)
+  são ignorados;
+- semelhança: coeficiente de Dice dos trigramas (``busca.trigramas``), com
+  os trigramas de cada nome calculados uma vez; um nome cujas palavras estão
+  todas no outro é proposto com semelhança um pouco menor ("cebola" ⊂
+  "cebola branca").
+
+``mesclar`` aponta para o ingrediente mantido tudo o que referencia os
+duplicados (itens de receita, embalagens, movimentos e saldos de estoque e
+qualquer outra chave estrangeira para ``Ingrediente``), convertendo as
+quantidades gravadas na unidade base, e exclui os duplicados, numa transação.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F
+
+from cozinha.referencias import invalidar_todos
+from .busca import normalizar, trigramas
+from .models import Ingrediente, converter
+from .nutricao import NUTRIENTES
+
+PREFIXO_BLOCO = 5
+LIMITE_BLOCO = 300
+FOLGA_CONTIDO = 0.75  # "contido" aceita semelhança até 25% abaixo do limiar ("cebola" × "cebola branca")
+LIGACAO = {"a", "o", "e", "de", "da", "do", "das", "dos", "em", "com", "sem", "para", "tipo"}
+
+IDENTICO, PARECIDO, CONTIDO = "idêntico", "parecido", "contido"
+
+Candidato = namedtuple("Candidato", "semelhanca motivo primeiro segundo compativeis")
+
+# Campos gravados na unidade base do ingrediente (convertidos quando as bases diferem)
+QUANTIDADES = {
+    "fichas.embalagemingrediente": ("quantidade",),
+    "estoque.movimentoestoque": ("quantidade",),
+    "estoque.saldoestoque": ("saldo",),
+}
+# Uma linha por (campo, ingrediente): as linhas que colidiriam somam as quantidades na do mantido
+UNICOS = {"estoque.saldoestoque": "ate_movimento"}
+
+
+# ------------------- Candidatos -------------------
+
+def palavras(nome):
+    return [p for p in normalizar(nome).replace(",", " ").replace("-", " ").split() if p not in LIGACAO]
+
+
+def chave_bloco(palavra):
+    """'Cebolas' → 'cebol'; 'ovos' → 'ovo'."""
+    return palavra.removesuffix("s")[:PREFIXO_BLOCO]
+
+
+def contido(menor, maior):
+    """Todas as palavras de ``menor`` (pela chave do bloco) aparecem em ``maior``."""
+    chaves = {chave_bloco(p) for p in maior}
+    return bool(menor) and all(chave_bloco(p) in chaves for p in menor)
+
+
+def fator_conversao(de, para):
+    """Fator de ``de`` para ``para`` (unidades base), ou None se não há conversão."""
+    try:
+        return converter(Decimal(1), de, para)
+    except ValidationError:
+        return None
+
+
+def candidatos(ingredientes=None, limiar=0.75):
+    """
+    Pares de ingredientes provavelmente duplicados, dos mais parecidos para os
+    menos. ``ingredientes``: [(id, nome, unidade_base)] (padrão: todos).
+    """
+    if ingredientes is None:
+        ingredientes = Ingrediente.objects.values_list("id", "nome", "unidade_base")
+    nomes, unidades, tokens, grams = {}, {}, {}, {}
+    blocos = defaultdict(list)
+    for id_, nome, unidade in ingredientes:
+        nomes[id_], unidades[id_] = nome, unidade
+        tokens[id_] = palavras(nome)
+        grams[id_] = trigramas(nome)
+        for chave in {chave_bloco(p) for p in tokens[id_] if len(p) >= 3}:
+            blocos[chave].append(id_)
+
+    pares = set()
+    for membros in blocos.values():
+        if len(membros) > LIMITE_BLOCO:
+            continue
+        for i, a in enumerate(membros):
+            for b in membros[i + 1:]:
+                pares.add((a, b) if a < b else (b, a))
+
+    resultado = []
+    for a, b in pares:
+        if normalizar(nomes[a]) == normalizar(nomes[b]):
+            semelhanca, motivo = 1.0, IDENTICO
+        else:
+            semelhanca = 2 * len(grams[a] & grams[b]) / (len(grams[a]) + len(grams[b]))
+            if semelhanca >= limiar:
+                motivo = PARECIDO
+            elif semelhanca >= limiar * FOLGA_CONTIDO and (contido(tokens[a], tokens[b]) or
+                                                           contido(tokens[b], tokens[a])):
+                motivo = CONTIDO
+            else:
+                continue
+        compativeis = fator_conversao(unidades[b], unidades[a]) is not None
+        resultado.append(Candidato(round(semelhanca, 3), motivo, (a, nomes[a]), (b, nomes[b]), compativeis))
+    resultado.sort(key=lambda c: (c.motivo != IDENTICO, -c.semelhanca, normalizar(c.primeiro[1])))
+    return resultado
+
+
+def grupos(pares):
+    """Junta os pares em grupos (componentes conexos): [[(id, nome), ...]]."""
+    pai = {}
+
+    def raiz(x):
+        while pai.setdefault(x, x) != x:
+            pai[x] = pai[pai[x]]
+            x = pai[x]
+        return x
+
+    nomes = {}
+    for par in pares:
+        nomes.update([par.primeiro, par.segundo])
+        pai[raiz(par.primeiro[0])] = raiz(par.segundo[0])
+    por_raiz = defaultdict(list)
+    for id_ in nomes:
+        por_raiz[raiz(id_)].append((id_, nomes[id_]))
+    return sorted((sorted(g, key=lambda m: normalizar(m[1])) for g in por_raiz.values()),
+                  key=lambda g: normalizar(g[0][1]))
+
+
+def sugerir_mantido(ids):
+    """O ingrediente mais usado em receitas (no empate, o mais antigo) fica; os outros são mesclados nele."""
+    usos = dict(Ingrediente.objects.filter(pk__in=ids).annotate(usos=Count("itemreceita"))
+                .values_list("pk", "usos"))
+    return min(usos, key=lambda pk: (-usos[pk], pk))
+
+
+# ------------------- Mesclagem -------------------
+
+def referencias():
+    """(modelo, campo) de todas as chaves estrangeiras para ``Ingrediente``."""
+    return [(rel.related_model, rel.field) for rel in Ingrediente._meta.related_objects
+            if rel.one_to_many or rel.one_to_one]
+
+
+def juntar_colisoes(modelo, campo, duplicado, mantido, chave, quantidades, fator):
+    """Soma, nas linhas do mantido, as do duplicado com a mesma ``chave`` e apaga estas."""
+    chave = modelo._meta.get_field(chave).attname
+    existentes = dict(modelo._base_manager.filter(**{campo.name: mantido}).values_list(chave, "pk"))
+    colisoes = list(modelo._base_manager.filter(**{campo.name: duplicado, f"{chave}__in": list(existentes)}))
+    if not colisoes:
+        return 0
+    destinos = modelo._base_manager.in_bulk([existentes[getattr(linha, chave)] for linha in colisoes])
+    for linha in colisoes:
+        destino = destinos[existentes[getattr(linha, chave)]]
+        for nome in quantidades:
+            setattr(destino, nome, getattr(destino, nome) + getattr(linha, nome) * fator)
+    modelo._base_manager.bulk_update(destinos.values(), list(quantidades))
+    modelo._base_manager.filter(pk__in=[linha.pk for linha in colisoes]).delete()
+    return len(colisoes)
+
+
+def completar(mantido, duplicado):
+    """Alérgenos somam (OU); nutrientes vazios no mantido vêm do duplicado."""
+    mantido.alergenos |= duplicado.alergenos
+    if mantido.kcal is None and duplicado.kcal is not None:
+        for nutriente in NUTRIENTES:
+            setattr(mantido, nutriente.campo, getattr(duplicado, nutriente.campo))
+
+
+@transaction.atomic
+def mesclar(mantido, duplicados):
+    """
+    Mescla ``duplicados`` em ``mantido`` e os exclui. Devolve
+    {rótulo do modelo: linhas reapontadas}. Falha (sem alterar nada) se a
+    unidade base de algum duplicado não converte para a do mantido.
+    """
+    duplicados = [d for d in duplicados if d.pk != mantido.pk]
+    fatores = {}
+    for duplicado in duplicados:
+        fator = fator_conversao(duplicado.unidade_base, mantido.unidade_base)
+        if fator is None:
+            raise ValidationError(
+                f"{duplicado} ({duplicado.unidade_base}) não pode ser mesclado em {mantido} "
+                f"({mantido.unidade_base}): unidades sem conversão."
+            )
+        fatores[duplicado.pk] = fator
+
+    contagem = defaultdict(int)
+    for modelo, campo in referencias():
+        rotulo = modelo._meta.label_lower
+        quantidades = QUANTIDADES.get(rotulo, ())
+        for duplicado in duplicados:
+            fator = fatores[duplicado.pk]
+            if rotulo in UNICOS:
+                contagem[rotulo] += juntar_colisoes(modelo, campo, duplicado, mantido, UNICOS[rotulo],
+                                                    quantidades, fator)
+            alteracao = {campo.attname: mantido.pk}
+            if fator != 1:
+                alteracao.update({nome: F(nome) * fator for nome in quantidades})
+            # update() em lote: não passa por save() (movimentos de estoque são imutáveis por save)
+            contagem[rotulo] += modelo._base_manager.filter(**{campo.name: duplicado}).update(**alteracao)
+
+    for duplicado in duplicados:
+        completar(mantido, duplicado)
+    Ingrediente.objects.filter(pk__in=[d.pk for d in duplicados]).delete()
+    mantido.save()  # recalcula os resumos dos eventos que agora usam o mantido
+
+    # update() e bulk_update() não disparam sinais
+    invalidar_todos()
+    return dict(contagem)
@@ -0,0 +1,180 @@
+"""
+Escala de fichas técnicas para outro rendimento (``?rendimento=12&unidade=kg``
+ou ``?porcoes=80`` na ficha).
+
+A árvore da receita (itens e sub-receitas, com a fração de cada sub-receita
+já resolvida) é montada uma vez e memorizada no ``Catalogo`` do processo;
+qualquer fator de escala é só uma passada em memória sobre ela, que converte
+as quantidades para unidades de leitura (g → kg, ml → l, colheres/xícaras) e
+recalcula os custos.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+
+from .aritmetica import q, ZERO
+from .custos import CATALOGO
+from .models import CONVERSOES, Unidade, calcular_custo_item, converter, fracao_componente, quantidade_liquida
+
+NoItem = namedtuple("NoItem", "nome unidade quantidade unidade_base preco")
+NoComponente = namedtuple("NoComponente", "nome quantidade unidade fracao arvore")
+Arvore = namedtuple("Arvore", "receita_id itens componentes")
+
+# Tamanho de cada unidade na unidade de referência da família (g ou ml)
+EM_GRAMAS = {
+    Unidade.KG: CONVERSOES[("kg", "g")],
+    Unidade.G: Decimal("1"),
+    Unidade.MG: CONVERSOES[("mg", "g")],
+}
+EM_ML = {
+    Unidade.L: CONVERSOES[("l", "ml")],
+    Unidade.DL: CONVERSOES[("dl", "cl")] * CONVERSOES[("cl", "ml")],
+    Unidade.CL: CONVERSOES[("cl", "ml")],
+    Unidade.ML: Decimal("1"),
+    Unidade.XIC: CONVERSOES[("xic", "ml")],
+    Unidade.CS: CONVERSOES[("cs", "ml")],
+    Unidade.CC: CONVERSOES[("cc", "ml")],
+}
+CASEIRAS = (Unidade.XIC, Unidade.CS, Unidade.CC)
+# Fator máximo de escala: acima disso as quantidades estouram a precisão do Decimal (q() falha)
+ESCALA_MAXIMA = Decimal("10000")
+# Opções do formulário de escala (montadas uma vez por processo)
+UNIDADES_ESCALA = [c for c in Unidade.choices if c[0] not in (Unidade.QB, Unidade.PT, Unidade.GT)]
+
+
+# ------------------- Árvore resolvida -------------------
+
+def arvore(catalogo, receita_id, caminho=()):
+    """Árvore resolvida da receita, memorizada no catálogo (uma vez por receita e fotografia)."""
+    if receita_id in caminho:
+        raise ValidationError(f"Ciclo de sub-receitas envolvendo '{catalogo.receitas[receita_id].titulo}'.")
+    pronta = catalogo.arvores.get(receita_id)
+    if pronta is not None:
+        return pronta
+
+    itens = []
+    for item in catalogo.itens_por_receita.get(receita_id, ()):
+        ing = catalogo.ingredientes[item.ingrediente_id]
+        qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+        itens.append(NoItem(ing.nome, item.unidade, qtd, ing.unidade_base, ing.custo_por_unidade))
+
+    componentes = []
+    for comp in catalogo.componentes_por_receita.get(receita_id, ()):
+        sub = catalogo.receitas[comp.sub_receita_id]
+        fracao = fracao_componente(comp.quantidade, comp.unidade, sub.unidade_rendimento, sub.rendimento_total)
+        filhos = arvore(catalogo, sub.id, caminho + (receita_id,)) if fracao is not None else None
+        componentes.append(NoComponente(sub.titulo, comp.quantidade, comp.unidade, fracao, filhos))
+
+    pronta = catalogo.arvores[receita_id] = Arvore(receita_id, tuple(itens), tuple(componentes))
+    return pronta
+
+
+# ------------------- Unidades de leitura -------------------
+
+def para_exibicao(quantidade, unidade):
+    """(quantidade, unidade) legível: 1500 g → 1,5 kg; 0,75 l → 750 ml; 45 ml de colher → 3 cs."""
+    if quantidade is None or unidade in (Unidade.QB, Unidade.PT, Unidade.GT):
+        return quantidade, unidade
+    if unidade in EM_GRAMAS:
+        gramas = quantidade * EM_GRAMAS[unidade]
+        if gramas >= 1000:
+            return q(gramas / 1000, 3), Unidade.KG
+        if gramas < 1:
+            return q(gramas * 1000, 0), Unidade.MG
+        return q(gramas, 1), Unidade.G
+    if unidade in EM_ML:
+        ml = quantidade * EM_ML[unidade]
+        if ml >= 1000:
+            return q(ml / 1000, 3), Unidade.L
+        if unidade in CASEIRAS:
+            for caseira in CASEIRAS:  # maior medida caseira com pelo menos uma unidade inteira
+                if ml >= EM_ML[caseira]:
+                    return q(ml / EM_ML[caseira] * 4, 0) / 4, caseira
+            return q(ml / EM_ML[Unidade.CC] * 4, 0) / 4 or Decimal("0.25"), Unidade.CC
+        return q(ml, 1), Unidade.ML
+    if unidade == Unidade.UND and quantidade >= 24 and quantidade % 12 == 0:
+        return q(quantidade / 12, 0), Unidade.DZ
+    return q(quantidade, 2), unidade
+
+
+# ------------------- Passada de escala -------------------
+
+def escalar(no, fator, nivel=0, linhas=None):
+    """Acrescenta em ``linhas`` os itens/sub-receitas de ``no`` × ``fator``; devolve (linhas, custo)."""
+    linhas = [] if linhas is None else linhas
+    custo = ZERO
+    for item in no.itens:
+        qtd = None if item.quantidade is None else item.quantidade * fator
+        valor = calcular_custo_item(item.unidade, qtd, item.unidade_base, item.preco)
+        quantidade, unidade = para_exibicao(qtd, item.unidade)
+        linhas.append({"tipo": "item", "nivel": nivel, "nome": item.nome, "quantidade": quantidade,
+                       "unidade": unidade, "custo": valor})
+        custo += valor
+
+    for comp in no.componentes:
+        quantidade, unidade = para_exibicao(comp.quantidade * fator, comp.unidade)
+        linha = {"tipo": "componente", "nivel": nivel, "nome": comp.nome, "quantidade": quantidade,
+                 "unidade": unidade, "custo": ZERO}
+        linhas.append(linha)
+        if comp.arvore is not None:
+            _, linha["custo"] = escalar(comp.arvore, fator * comp.fracao, nivel + 1, linhas)
+        custo += linha["custo"]
+    return linhas, q(custo, 2)
+
+
+def ler_decimal(texto):
+    try:
+        valor = Decimal(str(texto).replace(",", "."))
+    except (InvalidOperation, ValueError):
+        return None
+    return valor if valor.is_finite() and valor > 0 else None
+
+
+def fator_pedido(receita, parametros):
+    """Fator de escala a partir de ``rendimento``/``unidade`` ou ``porcoes``; ValidationError se impossível."""
+    if parametros.get("porcoes"):
+        porcoes = ler_decimal(parametros["porcoes"])
+        if porcoes is None:
+            raise ValidationError("Informe um número de porções maior que zero.")
+        if not receita.numero_porcoes:
+            raise ValidationError("A ficha não tem peso por porção: escale pelo rendimento.")
+        return porcoes / receita.numero_porcoes
+
+    rendimento = ler_decimal(parametros.get("rendimento"))
+    if rendimento is None:
+        raise ValidationError("Informe um rendimento maior que zero.")
+    unidade = parametros.get("unidade") or receita.unidade_rendimento
+    if unidade != receita.unidade_rendimento:
+        rendimento = na_unidade(rendimento, unidade, receita.unidade_rendimento)
+    if not receita.rendimento_total:
+        raise ValidationError("A ficha não tem rendimento total.")
+    return rendimento / receita.rendimento_total
+
+
+def na_unidade(quantidade, de, para):
+    """Converte usando as famílias g/ml (ex.: kg → g, l → xic); ValidationError entre famílias."""
+    for familia in (EM_GRAMAS, EM_ML):
+        if de in familia and para in familia:
+            return quantidade * familia[de] / familia[para]
+    return converter(quantidade, de, para)
+
+
+def escalar_receita(receita, parametros, catalogo=None):
+    """Contexto da ficha escalada: fator, rendimento/porções novos, linhas e custos."""
+    fator = fator_pedido(receita, parametros)
+    if fator > ESCALA_MAXIMA:
+        raise ValidationError(f"Escala grande demais: no máximo {ESCALA_MAXIMA:f} vezes o rendimento da ficha.")
+    catalogo = catalogo or CATALOGO.obter()
+    linhas, custo_total = escalar(arvore(catalogo, receita.pk), fator)
+    rendimento, unidade = para_exibicao(receita.rendimento_total * fator, receita.unidade_rendimento)
+    porcoes = q(receita.numero_porcoes * fator, 2) if receita.numero_porcoes else None
+    return {
+        "fator": q(fator, 4),
+        "rendimento": rendimento,
+        "unidade": unidade,
+        "porcoes": porcoes,
+        "linhas": linhas,
+        "custo_total": custo_total,
+        "custo_por_porcao": q(custo_total / porcoes, 2) if porcoes else None,
+    }
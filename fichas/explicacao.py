@@ -0,0 +1,143 @@
+"""
+Explicação do custo de uma receita ("explain").
+
+Percorre a árvore avaliada pelo ``Catalogo`` e devolve, para cada nó (item,
+sub-receita), a quantidade após a conversão, o caminho de conversão usado
+(``g → kg ×0.001``, ``direta`` ou o fallback de proporção direta), o custo, a
+participação no total, se o valor já estava memorizado no catálogo e o tempo
+gasto. Na raiz, ``avaliacao_ms`` mede só a avaliação do custo (quase zero quando
+vem do cache) e ``tempo_ms`` a avaliação mais a montagem da explicação; nos
+demais nós, ``tempo_ms`` é o custo de explicar o nó. O resultado é um
+dicionário simples, exportável como JSON.
+"""
+import time
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+
+from .aritmetica import q, ZERO
+from .custos import CATALOGO
+from .models import CONVERSOES, Unidade, fracao_componente, quantidade_liquida
+
+
+def caminho_conversao(de, para):
+    """(fator, descrição, fallback) da conversão usada por ``converter``."""
+    if de == para:
+        return Decimal("1"), "direta", False
+    fator = CONVERSOES.get((de, para))
+    if fator is None:
+        return Decimal("1"), f"{de} → {para}: sem conversão (proporção direta)", True
+    return fator, f"{de} → {para} (×{fator})", False
+
+
+def _ms(inicio):
+    return round((time.perf_counter() - inicio) * 1000, 3)
+
+
+class Explicador:
+    """Monta a árvore explicada sobre um ``Catalogo`` (de preferência o do processo)."""
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self.memorizadas = catalogo.memorizadas()  # "cache": já calculadas antes desta explicação
+
+    def receita(self, receita_id):
+        """Nó raiz da receita, com percentuais sobre o custo total."""
+        em_cache = receita_id in self.memorizadas
+        rec = self.catalogo.receitas[receita_id]
+        inicio = time.perf_counter()
+        custo = self.catalogo.custo_total(receita_id)
+        avaliacao_ms = _ms(inicio)
+        no = {
+            "tipo": "receita",
+            "id": receita_id,
+            "nome": rec.titulo,
+            "quantidade": rec.rendimento_total,
+            "unidade": rec.unidade_rendimento,
+            "custo": custo,
+            "numero_porcoes": self.catalogo.numero_porcoes(receita_id),
+            "custo_por_porcao": self.catalogo.custo_por_porcao(receita_id),
+            "cache": em_cache,
+            "avaliacao_ms": avaliacao_ms,
+            "filhos": self.filhos(receita_id, Decimal("1"), (receita_id,)),
+        }
+        no["tempo_ms"] = _ms(inicio)
+        definir_percentuais(no, custo)
+        return no
+
+    def filhos(self, receita_id, fator, caminho):
+        """Itens e sub-receitas de ``receita_id`` na proporção ``fator`` do rendimento."""
+        nos = [self.item(item, fator) for item in self.catalogo.itens_por_receita.get(receita_id, ())]
+        nos += [self.componente(comp, fator, caminho) for comp in self.catalogo.componentes_por_receita.get(receita_id, ())]
+        return nos
+
+    def item(self, item, fator):
+        inicio = time.perf_counter()
+        ing = self.catalogo.ingredientes[item.ingrediente_id]
+        qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+        no = {
+            "tipo": "item",
+            "id": item.id,
+            "nome": ing.nome,
+            "quantidade": None if qtd is None else q(qtd * fator, 3),
+            "unidade": item.unidade,
+            "quantidade_convertida": None,
+            "unidade_convertida": ing.unidade_base,
+            "conversao": "q.b. (sem custo)" if item.unidade == Unidade.QB else "sem quantidade",
+            "fallback": False,
+            "custo": q(self.catalogo.custo_item(item) * fator, 4),
+            "cache": False,
+        }
+        if item.unidade != Unidade.QB and qtd is not None:
+            conv, descricao, fallback = caminho_conversao(item.unidade, ing.unidade_base)
+            no["quantidade_convertida"] = q(qtd * conv * fator, 3)
+            no["conversao"] = descricao
+            no["fallback"] = fallback
+        no["tempo_ms"] = _ms(inicio)
+        return no
+
+    def componente(self, comp, fator, caminho):
+        inicio = time.perf_counter()
+        sub = self.catalogo.receitas[comp.sub_receita_id]
+        em_cache = sub.id in self.memorizadas
+        conv, descricao, fallback = caminho_conversao(comp.unidade, sub.unidade_rendimento)
+        frac = fracao_componente(comp.quantidade, comp.unidade, sub.unidade_rendimento, sub.rendimento_total)
+        no = {
+            "tipo": "componente",
+            "id": comp.id,
+            "receita_id": sub.id,
+            "nome": sub.titulo,
+            "quantidade": q(comp.quantidade * fator, 3),
+            "unidade": comp.unidade,
+            "quantidade_convertida": None if fallback else q(comp.quantidade * conv * fator, 3),
+            "unidade_convertida": sub.unidade_rendimento,
+            "conversao": descricao if not fallback else f"{comp.unidade} → {sub.unidade_rendimento}: sem conversão (custo zero)",
+            "fallback": fallback,
+            "custo": q(self.catalogo.custo_componente(comp) * fator, 4),
+            "cache": em_cache,
+            "filhos": [],
+        }
+        if frac is not None and sub.id not in caminho:
+            no["filhos"] = self.filhos(sub.id, fator * frac, caminho + (sub.id,))
+        no["tempo_ms"] = _ms(inicio)
+        return no
+
+
+def definir_percentuais(no, total):
+    """Grava em cada nó a participação (%) no ``total`` da raiz."""
+    no["percentual"] = q(no["custo"] * 100 / total, 2) if total else ZERO
+    for filho in no.get("filhos", ()):
+        definir_percentuais(filho, total)
+
+
+def explicar_receita(receita_id, catalogo=None):
+    """Árvore explicada do custo da receita (usa o catálogo do processo por padrão)."""
+    return Explicador(catalogo or CATALOGO.obter()).receita(receita_id)
+
+
+def resposta_json(arvore, nome_arquivo):
+    """Exporta a árvore explicada como anexo JSON."""
+    resposta = JsonResponse(arvore, encoder=DjangoJSONEncoder, json_dumps_params={"ensure_ascii": False, "indent": 2})
+    resposta["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return resposta
@@ -0,0 +1,361 @@
+"""
+Exportação/importação do catálogo entre instalações (JSON Lines).
+
+Pacote = diretório com ``catalogo.jsonl`` (ou ``.jsonl.gz``/``.jsonl.xz``) e
+``fotos/``, com as imagens referenciadas nos mesmos caminhos de MEDIA_ROOT.
+A primeira linha é um cabeçalho; as demais são registros em ordem de
+dependência (categorias, ingredientes, funções, receitas, itens, componentes,
+eventos, cardápio, equipe)::
+
+    {"modelo": "fichas.receita", "chave": ["Molho", "Molhos"], "campos": {...}, "filhos": {"itens": true, ...}}
+    {"modelo": "fichas.itemreceita", "pai": ["Molho", "Molhos"], "ordem": 0, "campos": {...}}
+
+Entidades são identificadas pela chave natural (nomes) e gravadas com upsert.
+Linhas (itens, componentes, cardápio, equipe) são identificadas pelo pai e
+pela posição e sincronizadas: atualiza, cria as que faltam e remove as
+excedentes. FKs viajam como chave natural. Os dois lados trabalham em lotes
+(``iterator``, ``bulk_create``/``bulk_update``), com memória constante.
+"""
+import gzip
+import json
+import lzma
+import os
+import shutil
+from collections import Counter, defaultdict
+from itertools import groupby
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils._os import safe_join
+
+from equipe.models import FuncaoEquipe
+from eventos.models import Evento, ItemCardapio, ParticipacaoEquipe
+from .models import Categoria, ComponenteReceita, Ingrediente, ItemReceita, Receita
+
+FORMATO = "catalogo-fichas"
+VERSAO = 1
+NOMES_ARQUIVO = ("catalogo.jsonl", "catalogo.jsonl.gz", "catalogo.jsonl.xz")
+PASTA_FOTOS = "fotos"
+
+# Chave natural de cada entidade (lookups a partir do próprio model)
+CHAVES = {
+    Categoria: ("nome",),
+    Ingrediente: ("nome",),
+    FuncaoEquipe: ("nome",),
+    Receita: ("titulo", "categoria__nome"),
+    Evento: ("nome", "data"),
+}
+
+# Ordem de dependência: (model, FK para o pai) — pai None = entidade
+ORDEM = (
+    (Categoria, None),
+    (Ingrediente, None),
+    (FuncaoEquipe, None),
+    (Receita, None),
+    (ItemReceita, "receita"),
+    (ComponenteReceita, "receita"),
+    (Evento, None),
+    (ItemCardapio, "evento"),
+    (ParticipacaoEquipe, "evento"),
+)
+MODELOS = {modelo._meta.label_lower: (modelo, pai) for modelo, pai in ORDEM}
+
+
+def filhos_de(modelo):
+    """[(nome da relação, model da linha, FK para o pai)] das linhas de uma entidade."""
+    relacoes = []
+    for linha, pai in ORDEM:
+        if pai and linha._meta.get_field(pai).related_model is modelo:
+            relacoes.append((linha._meta.get_field(pai).remote_field.get_accessor_name(), linha, pai))
+    return relacoes
+
+
+def campos_simples(modelo):
+    return [f for f in modelo._meta.concrete_fields if not f.primary_key and not f.is_relation and f.editable]
+
+
+def campos_fk(modelo):
+    return [f for f in modelo._meta.concrete_fields if f.is_relation]
+
+
+def campos_foto(modelo):
+    return [f for f in campos_simples(modelo) if f.get_internal_type() in ("FileField", "ImageField")]
+
+
+def chave(valores):
+    """Chave natural comparável (datas e números viram texto, como no JSON)."""
+    return tuple(str(v) for v in valores)
+
+
+def abrir(caminho, modo):
+    """Abre .jsonl, .jsonl.gz ou .jsonl.xz em modo texto."""
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, modo + "t", encoding="utf-8")
+    if caminho.endswith(".xz"):
+        return lzma.open(caminho, modo + "t", encoding="utf-8")
+    return open(caminho, modo, encoding="utf-8")
+
+
+def copiar_se_diferente(origem, destino):
+    """Copia o arquivo se o destino não existir ou tiver outro tamanho. Retorna True se copiou."""
+    try:
+        if os.path.getsize(origem) == os.path.getsize(destino):
+            return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    shutil.copyfile(origem, destino)
+    return True
+
+
+# ------------------- Exportação -------------------
+
+def registros(modelo, pai=None):
+    """Gera os registros de um model, lidos em blocos do banco."""
+    simples = campos_simples(modelo)
+    relacoes = [(f, [f"{f.name}__{c}" for c in CHAVES[f.related_model]]) for f in campos_fk(modelo)]
+    colunas = [f.attname for f in simples] + [c for _, lookups in relacoes for c in lookups]
+    rotulo = modelo._meta.label_lower
+    queryset = modelo.objects.all()
+
+    if pai is None:
+        chave_natural = CHAVES[modelo]
+        colunas += [c for c in chave_natural if c not in colunas]
+        filhos = {
+            f"tem_{nome}": Exists(linha.objects.filter(**{pai_linha: OuterRef("pk")}))
+            for nome, linha, pai_linha in filhos_de(modelo)
+        }
+        queryset = queryset.annotate(**filhos).order_by("pk")
+        colunas += list(filhos)
+    else:
+        queryset = queryset.order_by(f"{pai}_id", "pk")
+        colunas.append(f"{pai}_id")
+
+    dono_anterior, ordem = None, 0
+    for linha in queryset.values(*colunas).iterator(chunk_size=2000):
+        campos = {f.name: linha[f.attname] for f in simples}
+        for f, lookups in relacoes:
+            valores = [linha[c] for c in lookups]
+            campos[f.name] = None if valores[0] is None else valores
+
+        if pai is None:
+            registro = {"modelo": rotulo, "chave": [linha[c] for c in chave_natural], "campos": campos}
+            if filhos:
+                registro["filhos"] = {nome.removeprefix("tem_"): linha[nome] for nome in filhos}
+        else:
+            dono = linha[f"{pai}_id"]
+            ordem = ordem + 1 if dono == dono_anterior else 0
+            dono_anterior = dono
+            registro = {"modelo": rotulo, "pai": campos.pop(pai), "ordem": ordem, "campos": campos}
+        yield registro
+
+
+def exportar(destino, compactar="gz", fotos=True):
+    """Grava o pacote em ``destino``. Retorna Counter de registros por model (e ``fotos``)."""
+    os.makedirs(destino, exist_ok=True)
+    nome = "catalogo.jsonl" + (f".{compactar}" if compactar else "")
+    contagem = Counter()
+    with abrir(os.path.join(destino, nome), "w") as arquivo:
+        cabecalho = {"formato": FORMATO, "versao": VERSAO, "gerado_em": timezone.now()}
+        arquivo.write(json.dumps(cabecalho, cls=DjangoJSONEncoder) + "\n")
+        for modelo, pai in ORDEM:
+            arquivos = campos_foto(modelo) if fotos else []
+            for registro in registros(modelo, pai):
+                arquivo.write(json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+                contagem[registro["modelo"]] += 1
+                for campo in arquivos:
+                    caminho = registro["campos"][campo.name]
+                    if caminho and os.path.isfile(safe_join(settings.MEDIA_ROOT, caminho)):
+                        contagem["fotos"] += copiar_se_diferente(
+                            safe_join(settings.MEDIA_ROOT, caminho), safe_join(destino, PASTA_FOTOS, caminho)
+                        )
+    return contagem
+
+
+# ------------------- Importação -------------------
+
+def localizar(origem):
+    """(arquivo .jsonl[.gz|.xz], pasta do pacote) a partir de um diretório ou do próprio arquivo."""
+    if os.path.isfile(origem):
+        return origem, os.path.dirname(os.path.abspath(origem))
+    for nome in NOMES_ARQUIVO:
+        caminho = os.path.join(origem, nome)
+        if os.path.isfile(caminho):
+            return caminho, origem
+    raise FileNotFoundError(f"Nenhum {' / '.join(NOMES_ARQUIVO)} em {origem}")
+
+
+def lotes(registros, tamanho, pai=False):
+    """Agrupa em listas de ~``tamanho``; com ``pai`` nunca divide as linhas de um mesmo pai."""
+    lote = []
+    for registro in registros:
+        if len(lote) >= tamanho and (not pai or registro["pai"] != lote[-1]["pai"]):
+            yield lote
+            lote = []
+        lote.append(registro)
+    if lote:
+        yield lote
+
+
+class Importador:
+    """Lê o pacote em fluxo e grava por lotes; ``contagem[model][criados|atualizados|removidos|ignorados]``."""
+
+    def __init__(self, origem, lote=500, fotos=True):
+        self.arquivo, self.pasta = localizar(origem)
+        self.lote = lote
+        self.fotos = fotos
+        self.contagem = defaultdict(Counter)
+        self.avisos = []
+
+    def importar(self):
+        with abrir(self.arquivo, "r") as arquivo:
+            cabecalho = json.loads(next(arquivo, "{}"))
+            if cabecalho.get("formato") != FORMATO or cabecalho.get("versao", 0) > VERSAO:
+                raise ValueError(f"{self.arquivo} não é um pacote de catálogo compatível.")
+            linhas = (json.loads(linha) for linha in arquivo if linha.strip())
+            with transaction.atomic():
+                for rotulo, grupo in groupby(linhas, key=lambda registro: registro["modelo"]):
+                    if rotulo not in MODELOS:
+                        self.avisos.append(f"Model desconhecido ignorado: {rotulo}")
+                        continue
+                    modelo, pai = MODELOS[rotulo]
+                    for lote in lotes(grupo, self.lote, pai=bool(pai)):
+                        if self.fotos:
+                            self.copiar_fotos(modelo, lote)
+                        if pai:
+                            self.importar_linhas(modelo, pai, lote)
+                        else:
+                            self.importar_entidades(modelo, lote)
+        return self.contagem
+
+    # --- chaves naturais ---
+
+    def resolver(self, modelo, chaves):
+        """{chave natural: pk} das chaves que já existem (em duplicidade, vale o menor pk)."""
+        chaves = set(chaves)
+        if not chaves:
+            return {}
+        lookups = CHAVES[modelo]
+        mapa = {}
+        existentes = (modelo.objects.filter(**{f"{lookups[0]}__in": {c[0] for c in chaves}})
+                      .order_by("-pk").values_list(*lookups, "pk"))
+        for linha in existentes:
+            encontrada = chave(linha[:-1])
+            if encontrada in chaves:
+                mapa[encontrada] = linha[-1]
+        return mapa
+
+    def resolver_fks(self, modelo, lote, ignorar=None):
+        mapas = {}
+        for campo in campos_fk(modelo):
+            if campo.name != ignorar:
+                valores = (r["campos"].get(campo.name) for r in lote)
+                mapas[campo.name] = self.resolver(campo.related_model, {chave(v) for v in valores if v})
+        return mapas
+
+    def instanciar(self, modelo, registro, mapas):
+        """Instância (sem gravar) ou None se alguma FK obrigatória não existir no destino."""
+        campos = registro["campos"]
+        dados = {f.attname: f.to_python(campos[f.name]) for f in campos_simples(modelo) if f.name in campos}
+        for nome, mapa in mapas.items():
+            valor = campos.get(nome)
+            pk = mapa.get(chave(valor)) if valor else None
+            campo = modelo._meta.get_field(nome)
+            if pk is None and valor and not campo.null:
+                self.avisos.append(f"{modelo._meta.verbose_name} {registro.get('chave') or registro.get('pai')}: "
+                                   f"{nome} {valor} não encontrado")
+                return None
+            dados[campo.attname] = pk
+        obj = modelo(**dados)
+        if hasattr(obj, "preencher_busca"):
+            obj.preencher_busca()
+        return obj
+
+    def campos_gravados(self, modelo, lote):
+        presentes = set().union(*(r["campos"] for r in lote))
+        nomes = [f.name for f in campos_simples(modelo) + campos_fk(modelo) if f.name in presentes]
+        nomes += [f.name for f in modelo._meta.concrete_fields if f.name.endswith("_busca")]
+        return nomes
+
+    # --- gravação ---
+
+    def importar_entidades(self, modelo, lote):
+        rotulo = modelo._meta.label_lower
+        por_chave = {chave(r["chave"]): r for r in lote}  # repetida no lote: vale a última
+        existentes = self.resolver(modelo, por_chave)
+        mapas = self.resolver_fks(modelo, por_chave.values())
+
+        novos, alterados = [], []
+        for chave_natural, registro in por_chave.items():
+            obj = self.instanciar(modelo, registro, mapas)
+            if obj is None:
+                self.contagem[rotulo]["ignorados"] += 1
+                continue
+            obj.pk = existentes.get(chave_natural)
+            (alterados if obj.pk else novos).append(obj)
+        modelo.objects.bulk_create(novos, batch_size=self.lote)
+        if alterados:
+            modelo.objects.bulk_update(alterados, self.campos_gravados(modelo, lote), batch_size=self.lote)
+        self.contagem[rotulo]["criados"] += len(novos)
+        self.contagem[rotulo]["atualizados"] += len(alterados)
+
+        # Entidades que ficaram sem linhas de um tipo: as linhas antigas saem aqui
+        for nome, linha, pai in filhos_de(modelo):
+            vazias = [existentes[c] for c, r in por_chave.items()
+                      if c in existentes and not r.get("filhos", {}).get(nome, True)]
+            if vazias:
+                removidas, _ = linha.objects.filter(**{f"{pai}_id__in": vazias}).delete()
+                self.contagem[linha._meta.label_lower]["removidos"] += removidas
+
+    def importar_linhas(self, modelo, pai, lote):
+        rotulo = modelo._meta.label_lower
+        fk_pai = modelo._meta.get_field(pai)
+        donos = self.resolver(fk_pai.related_model, {chave(r["pai"]) for r in lote})
+        mapas = self.resolver_fks(modelo, lote, ignorar=pai)
+
+        existentes = defaultdict(list)
+        atuais = (modelo.objects.filter(**{f"{pai}_id__in": donos.values()})
+                  .order_by(fk_pai.attname, "pk").values_list(fk_pai.attname, "pk"))
+        for dono, pk in atuais:
+            existentes[dono].append(pk)
+
+        novos, alterados, quantidade = [], [], Counter()
+        for registro in lote:
+            dono = donos.get(chave(registro["pai"]))
+            obj = self.instanciar(modelo, registro, mapas) if dono else None
+            if obj is None:
+                self.contagem[rotulo]["ignorados"] += 1
+                continue
+            setattr(obj, fk_pai.attname, dono)
+            atuais = existentes[dono]
+            if registro["ordem"] < len(atuais):
+                obj.pk = atuais[registro["ordem"]]
+                alterados.append(obj)
+            else:
+                novos.append(obj)
+            quantidade[dono] = max(quantidade[dono], registro["ordem"] + 1)
+
+        modelo.objects.bulk_create(novos, batch_size=self.lote)
+        if alterados:
+            modelo.objects.bulk_update(alterados, self.campos_gravados(modelo, lote), batch_size=self.lote)
+        excedentes = [pk for dono, n in quantidade.items() for pk in existentes[dono][n:]]
+        if excedentes:
+            modelo.objects.filter(pk__in=excedentes).delete()
+        self.contagem[rotulo]["criados"] += len(novos)
+        self.contagem[rotulo]["atualizados"] += len(alterados)
+        self.contagem[rotulo]["removidos"] += len(excedentes)
+
+    def copiar_fotos(self, modelo, lote):
+        for campo in campos_foto(modelo):
+            for registro in lote:
+                caminho = registro["campos"].get(campo.name)
+                if not caminho:
+                    continue
+                origem = safe_join(self.pasta, PASTA_FOTOS, caminho)
+                if os.path.isfile(origem):
+                    self.contagem["fotos"]["copiadas"] += copiar_se_diferente(
+                        origem, safe_join(settings.MEDIA_ROOT, caminho)
+                    )
@@ -0,0 +1,74 @@
+import random
+import timeit
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fichas import aritmetica
+from fichas.aritmetica import (
+    q, custos_centavos, de_centavos, para_milesimos, para_preco,
+)
+
+
+def q_legado(value, places=2):
+    """Cópia do q() antigo, mantida só como referência de comparação."""
+    return (Decimal(value).quantize(Decimal(10) ** -places, rounding=ROUND_HALF_UP)
+            if value is not None else None)
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark do núcleo de aritmética (q() antigo × novo × lote em centavos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--itens", type=int, default=20000, help="Quantidade de itens sorteados.")
+        parser.add_argument("--repeticoes", type=int, default=5)
+        parser.add_argument("--semente", type=int, default=42)
+
+    def handle(self, *args, **options):
+        n = options["itens"]
+        repeticoes = options["repeticoes"]
+        rnd = random.Random(options["semente"])
+
+        # Quantidades com 3 casas, fatores de CONVERSOES e preços com 4 casas
+        fatores = [Decimal("1"), Decimal("1000"), Decimal("0.001"), Decimal("15"), Decimal("0.15")]
+        qtds = [Decimal(rnd.randint(0, 5_000_000)).scaleb(-3) for _ in range(n)]
+        fats = [rnd.choice(fatores) for _ in range(n)]
+        precos = [Decimal(rnd.randint(0, 2_000_000)).scaleb(-4) for _ in range(n)]
+
+        # --- Conferência: mesmos resultados que o caminho Decimal legado ---
+        esperado = [q_legado(a * b * c, 2) for a, b, c in zip(qtds, fats, precos)]
+        novo_q = [q(a * b * c, 2) for a, b, c in zip(qtds, fats, precos)]
+
+        qtd_int = [para_milesimos(v) for v in qtds]
+        fat_int = [para_milesimos(v) for v in fats]
+        preco_int = [para_preco(v) for v in precos]
+        lote = [de_centavos(c) for c in custos_centavos(qtd_int, fat_int, preco_int)]
+
+        if novo_q != esperado or lote != esperado:
+            raise CommandError("Divergência de arredondamento entre o q() legado e o núcleo novo!")
+
+        # --- Tempos ---
+        def medir(func):
+            return min(timeit.repeat(func, number=1, repeat=repeticoes))
+
+        resultados = [
+            ("q() legado (Decimal)", medir(lambda: [q_legado(a * b * c, 2) for a, b, c in zip(qtds, fats, precos)])),
+            ("q() com quantizador pré-calculado", medir(lambda: [q(a * b * c, 2) for a, b, c in zip(qtds, fats, precos)])),
+            ("lote em centavos (int)", medir(lambda: custos_centavos(qtd_int, fat_int, preco_int))),
+        ]
+
+        np = aritmetica.numpy()
+        if np is not None:
+            arr_q = np.array(qtd_int, dtype=np.int64)
+            arr_f = np.array(fat_int, dtype=np.int64)
+            arr_p = np.array(preco_int, dtype=np.int64)
+            vetor = custos_centavos(arr_q, arr_f, arr_p)
+            if [de_centavos(int(c)) for c in vetor] != esperado:
+                raise CommandError("Divergência de arredondamento no caminho NumPy!")
+            resultados.append(("lote em centavos (NumPy int64)", medir(lambda: custos_centavos(arr_q, arr_f, arr_p))))
+
+        base = resultados[0][1]
+        self.stdout.write(f"{n} itens, melhor de {repeticoes} execuções:")
+        for nome, tempo in resultados:
+            self.stdout.write(f"  {nome:<36} {tempo * 1000:9.2f} ms  ({base / tempo:5.1f}x)")
+        self.stdout.write(self.style.SUCCESS("Arredondamento idêntico em todos os caminhos."))
@@ -0,0 +1,51 @@
+import shutil
+import subprocess
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+URL_ALPINE = "https://cdn.jsdelivr.net/npm/alpinejs@{versao}/dist/cdn.min.js"
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera static/css/app.css com o Tailwind (CLI standalone) a partir dos templates "
+        "e baixa o Alpine.js fixado para static/js/. Rode antes do collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tailwind", default=settings.TAILWIND_CLI,
+                            help="Executável do Tailwind CLI standalone (v3).")
+        parser.add_argument("--sem-alpine", action="store_true", help="Não baixa o Alpine.js.")
+
+    def handle(self, *args, **options):
+        base = Path(settings.BASE_DIR)
+        estaticos = base / "static"
+
+        cli = shutil.which(options["tailwind"])
+        if cli is None:
+            raise CommandError(
+                f"Tailwind CLI '{options['tailwind']}' não encontrado. Baixe o executável standalone "
+                "(github.com/tailwindlabs/tailwindcss/releases, v3.4) e informe o caminho em "
+                "TAILWIND_CLI ou --tailwind."
+            )
+
+        saida_css = estaticos / "css" / "app.css"
+        saida_css.parent.mkdir(parents=True, exist_ok=True)
+        subprocess.run(
+            [cli, "-c", str(base / "tailwind.config.js"),
+             "-i", str(estaticos / "src" / "app.css"), "-o", str(saida_css), "--minify"],
+            cwd=base, check=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f"CSS gerado: {saida_css} ({saida_css.stat().st_size} bytes)"))
+
+        if options["sem_alpine"]:
+            return
+        saida_js = estaticos / "js" / "alpine.min.js"
+        saida_js.parent.mkdir(parents=True, exist_ok=True)
+        url = URL_ALPINE.format(versao=settings.ALPINE_VERSAO)
+        with urllib.request.urlopen(url, timeout=30) as resposta:
+            saida_js.write_bytes(resposta.read())
+        self.stdout.write(self.style.SUCCESS(f"Alpine.js {settings.ALPINE_VERSAO} salvo em {saida_js}"))
@@ -0,0 +1,49 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from fichas.duplicados import candidatos, grupos, mesclar
+from fichas.models import Ingrediente
+
+
+class Command(BaseCommand):
+    help = (
+        "Lista pares de ingredientes com nomes parecidos (blocagem por palavra + trigramas). "
+        "Com --mesclar MANTIDO DUPLICADO..., mescla os duplicados no mantido numa transação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limiar", type=float, default=0.75,
+                            help="Semelhança mínima (0 a 1) dos trigramas para propor um par (padrão: 0,75).")
+        parser.add_argument("--grupos", action="store_true", help="Agrupa os pares em grupos de duplicados.")
+        parser.add_argument("--mesclar", nargs="+", type=int, metavar="ID",
+                            help="Id do ingrediente mantido seguido dos ids dos duplicados.")
+
+    def handle(self, *args, **options):
+        if options["mesclar"]:
+            return self.mesclar(options["mesclar"])
+
+        pares = candidatos(limiar=options["limiar"])
+        if options["grupos"]:
+            for grupo in grupos(pares):
+                self.stdout.write(" · ".join(f"{nome} [{id_}]" for id_, nome in grupo))
+        else:
+            for par in pares:
+                aviso = "" if par.compativeis else "  (unidades sem conversão)"
+                self.stdout.write(f"{par.semelhanca:.2f}  {par.motivo:<9} {par.primeiro[1]} [{par.primeiro[0]}]"
+                                  f"  ~  {par.segundo[1]} [{par.segundo[0]}]{aviso}")
+        self.stdout.write(self.style.SUCCESS(f"{len(pares)} par(es) candidato(s)."))
+
+    def mesclar(self, ids):
+        if len(ids) < 2:
+            raise CommandError("Informe o id do mantido e ao menos um duplicado.")
+        encontrados = Ingrediente.objects.in_bulk(ids)
+        faltando = [str(id_) for id_ in ids if id_ not in encontrados]
+        if faltando:
+            raise CommandError(f"Ingredientes não encontrados: {', '.join(faltando)}.")
+        mantido = encontrados[ids[0]]
+        try:
+            contagem = mesclar(mantido, [encontrados[id_] for id_ in ids[1:]])
+        except ValidationError as erro:
+            raise CommandError(erro.messages[0])
+        detalhes = ", ".join(f"{rotulo}: {n}" for rotulo, n in sorted(contagem.items()) if n)
+        self.stdout.write(self.style.SUCCESS(f"Mesclados em {mantido}. Linhas reapontadas: {detalhes or 'nenhuma'}."))
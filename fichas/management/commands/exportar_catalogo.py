@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from fichas.intercambio import exportar
+
+
+class Command(BaseCommand):
+    help = "Exporta o catálogo (fichas, equipe e eventos) em JSON Lines, com as fotos, para outra instalação."
+
+    def add_arguments(self, parser):
+        parser.add_argument("destino", help="Diretório do pacote (criado se não existir).")
+        parser.add_argument("--compactar", choices=("gz", "xz", "nenhuma"), default="gz",
+                            help="Compressão do catalogo.jsonl (padrão: gz).")
+        parser.add_argument("--sem-fotos", action="store_true", help="Não copia as imagens para o pacote.")
+
+    def handle(self, *args, **options):
+        compactar = None if options["compactar"] == "nenhuma" else options["compactar"]
+        contagem = exportar(options["destino"], compactar=compactar, fotos=not options["sem_fotos"])
+        for rotulo, total in contagem.items():
+            self.stdout.write(f"  {rotulo:<30} {total:>8}")
+        self.stdout.write(self.style.SUCCESS(f"Pacote gravado em {options['destino']}"))
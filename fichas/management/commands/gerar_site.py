@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cozinha.site_estatico import gerar_site
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera o site estático dos tablets (fichas, listas por categoria e próximos eventos) em "
+        "SITE_ESTATICO_DIR. Sem --completo, só renderiza as páginas cujas dependências mudaram."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--saida", default=settings.SITE_ESTATICO_DIR, help="Pasta de saída.")
+        parser.add_argument("--completo", action="store_true", help="Renderiza todas as páginas de novo.")
+        parser.add_argument("--processos", type=int, default=None,
+                            help="Processos em paralelo (padrão: número de CPUs).")
+
+    def handle(self, *args, **options):
+        resumo = gerar_site(options["saida"], completo=options["completo"], processos=options["processos"])
+        for caminho in resumo["removidas"]:
+            self.stdout.write(f"  removida {caminho}")
+        for url in resumo["faltando"]:
+            self.stdout.write(self.style.WARNING(f"  arquivo não encontrado: {url}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumo['renderizadas']} página(s) renderizada(s) em {resumo['processos']} processo(s), "
+            f"{resumo['mantidas']} mantida(s), {len(resumo['removidas'])} removida(s) → {options['saida']}"
+        ))
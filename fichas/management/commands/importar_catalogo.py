@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cozinha.referencias import invalidar_todos
+from eventos.resumos import reconstruir
+from fichas.intercambio import Importador
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa um pacote de exportar_catalogo: upsert por chave natural (nomes), "
+        "linhas sincronizadas por posição, gravação em lotes numa única transação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("origem", help="Diretório do pacote ou o próprio catalogo.jsonl[.gz|.xz].")
+        parser.add_argument("--lote", type=int, default=500, help="Registros por lote (padrão: 500).")
+        parser.add_argument("--sem-fotos", action="store_true", help="Não copia as imagens do pacote.")
+        parser.add_argument("--sem-resumos", action="store_true",
+                            help="Não recalcula os resumos financeiros ao final.")
+
+    def handle(self, *args, **options):
+        try:
+            importador = Importador(options["origem"], lote=options["lote"], fotos=not options["sem_fotos"])
+            contagem = importador.importar()
+        except (FileNotFoundError, ValueError) as erro:
+            raise CommandError(str(erro))
+
+        # bulk_create/bulk_update não disparam sinais: caches e resumos são refeitos aqui
+        invalidar_todos()
+        for rotulo, totais in contagem.items():
+            detalhes = ", ".join(f"{nome} {total}" for nome, total in sorted(totais.items()))
+            self.stdout.write(f"  {rotulo:<30} {detalhes}")
+        for aviso in importador.avisos[:50]:
+            self.stdout.write(self.style.WARNING(f"  ! {aviso}"))
+        if len(importador.avisos) > 50:
+            self.stdout.write(self.style.WARNING(f"  ... e mais {len(importador.avisos) - 50} avisos"))
+        if not options["sem_resumos"]:
+            self.stdout.write(f"Resumos financeiros: {reconstruir()} eventos recalculados.")
+        self.stdout.write(self.style.SUCCESS("Importação concluída."))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cozinha.referencias import invalidar_todos
+from fichas.planilhas import ImportadorPlanilhas
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa fichas técnicas de planilhas no modelo SENAC (.csv; .xlsx com openpyxl), "
+        "casando ingredientes por nome aproximado. Uma transação por arquivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivos", nargs="+", help="Planilhas .csv ou .xlsx.")
+        parser.add_argument("--categoria", help="Categoria das fichas que não informam a sua.")
+        parser.add_argument("--limiar", type=float, default=0.6,
+                            help="Semelhança mínima (0 a 1) para aceitar um nome aproximado (padrão: 0,6).")
+        parser.add_argument("--parcial", action="store_true",
+                            help="Importa fichas com linhas não resolvidas, sem essas linhas.")
+        parser.add_argument("--simular", action="store_true", help="Só lê e gera o relatório, sem gravar.")
+        parser.add_argument("--relatorio", help="Grava o relatório (CSV com ';') neste arquivo.")
+
+    def handle(self, *args, **options):
+        importador = ImportadorPlanilhas(categoria_padrao=options["categoria"], limiar=options["limiar"],
+                                         parcial=options["parcial"], simular=options["simular"])
+        for caminho in options["arquivos"]:
+            try:
+                gravadas = importador.importar(caminho)
+            except (FileNotFoundError, ValueError) as erro:
+                raise CommandError(str(erro))
+            self.stdout.write(f"  {caminho}: {gravadas} fichas")
+
+        # bulk_create não dispara sinais: os caches dos workers são descartados aqui
+        if not options["simular"]:
+            invalidar_todos()
+
+        if options["relatorio"]:
+            with open(options["relatorio"], "w", newline="", encoding="utf-8-sig") as destino:
+                importador.escrever_relatorio(destino)
+        elif importador.ocorrencias:
+            self.stdout.write(importador.relatorio_texto(), ending="")
+
+        contagem = importador.contagem
+        resumo = (f"{contagem['fichas']} fichas, {contagem['itens']} itens, {contagem['componentes']} sub-receitas; "
+                  f"{contagem['ignoradas']} fichas não importadas, {len(importador.ocorrencias)} ocorrências no relatório")
+        if options["simular"]:
+            self.stdout.write(self.style.WARNING(f"Simulação (nada gravado): {resumo}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Importação concluída: {resumo}"))
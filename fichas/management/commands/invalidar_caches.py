@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cozinha.referencias import CacheCompartilhado, invalidar_todos
+
+
+class Command(BaseCommand):
+    help = (
+        "Troca os carimbos de versão dos caches compartilhados (categorias, funções, catálogo de custos): "
+        "todos os workers recarregam na próxima requisição. Use após alterações feitas direto no banco."
+    )
+
+    def handle(self, *args, **options):
+        invalidar_todos()
+        nomes = ", ".join(cache.nome for cache in CacheCompartilhado.TODOS)
+        self.stdout.write(self.style.SUCCESS(f"Caches invalidados: {nomes}."))
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Reproduz a carga de um worker do Passenger (passenger_wsgi.py) em um processo limpo
+CODIGO_WORKER = """
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+"""
+
+CODIGO_AQUECIMENTO = """
+from cozinha.aquecimento import aquecer
+aquecer()
+"""
+
+
+def ler_importtime(saida):
+    """
+    Converte a saída de ``-X importtime`` em tuplas (módulo, self_us, cumulativo_us, nível).
+    O nível é a indentação do nome: 0 para imports feitos diretamente pelo worker.
+    """
+    linhas = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "[us]" in linha:
+            continue
+        try:
+            proprio, cumulativo, nome = linha[len("import time:"):].split("|", 2)
+            proprio, cumulativo = int(proprio), int(cumulativo)
+        except ValueError:
+            continue
+        nivel = (len(nome) - len(nome.lstrip(" ")) - 1) // 2
+        linhas.append((nome.strip(), proprio, cumulativo, max(nivel, 0)))
+    return linhas
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de importação de um worker (python -X importtime) "
+        "e resume os módulos e pacotes mais caros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Quantidade de linhas por ranking.")
+        parser.add_argument("--sem-aquecimento", action="store_true",
+                            help="Mede só a carga da aplicação, sem rodar aquecer().")
+        parser.add_argument("--bruto", help="Salva a saída original do importtime neste arquivo.")
+
+    def handle(self, *args, **options):
+        codigo = CODIGO_WORKER if options["sem_aquecimento"] else CODIGO_WORKER + CODIGO_AQUECIMENTO
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "cozinha.settings"))
+        processo = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", codigo],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if processo.returncode != 0:
+            raise CommandError(f"O processo medido falhou:\n{processo.stderr[-2000:]}")
+
+        if options["bruto"]:
+            with open(options["bruto"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(processo.stderr)
+
+        linhas = ler_importtime(processo.stderr)
+        if not linhas:
+            raise CommandError("Nenhuma linha de importtime encontrada.")
+
+        top = options["top"]
+        total = sum(proprio for _, proprio, _, _ in linhas)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Importação: {len(linhas)} módulos, {total / 1000:.1f} ms no total"
+        ))
+
+        # Pacotes de primeiro nível (django, fichas, PIL...) somando o tempo próprio
+        por_pacote = defaultdict(int)
+        for nome, proprio, _, _ in linhas:
+            por_pacote[nome.split(".", 1)[0]] += proprio
+        self.stdout.write(self.style.MIGRATE_HEADING("\nPor pacote (tempo próprio):"))
+        for pacote, tempo in sorted(por_pacote.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+            self.stdout.write(f"  {tempo / 1000:8.1f} ms  {tempo * 100 / total:5.1f}%  {pacote}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nImports diretos mais caros (cumulativo):"))
+        diretos = [linha for linha in linhas if linha[3] == 0]
+        for nome, _, cumulativo, _ in sorted(diretos, key=lambda l: l[2], reverse=True)[:top]:
+            self.stdout.write(f"  {cumulativo / 1000:8.1f} ms  {nome}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nMódulos mais caros (tempo próprio):"))
+        for nome, proprio, _, _ in sorted(linhas, key=lambda l: l[1], reverse=True)[:top]:
+            self.stdout.write(f"  {proprio / 1000:8.1f} ms  {nome}")
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+from fichas.busca import normalizar
+
+
+def preencher_busca(apps, schema_editor):
+    Ingrediente = apps.get_model("fichas", "Ingrediente")
+    Receita = apps.get_model("fichas", "Receita")
+    ingredientes = list(Ingrediente.objects.only("nome"))
+    for ing in ingredientes:
+        ing.nome_busca = normalizar(ing.nome)
+    Ingrediente.objects.bulk_update(ingredientes, ["nome_busca"], batch_size=500)
+    receitas = list(Receita.objects.only("titulo"))
+    for rec in receitas:
+        rec.titulo_busca = normalizar(rec.titulo)
+    Receita.objects.bulk_update(receitas, ["titulo_busca"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fichas", "0002_remove_receita_foto_ingrediente_foto_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingrediente",
+            name="nome_busca",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="Nome normalizado (sem acentos/maiúsculas) para busca por prefixo",
+                max_length=150,
+            ),
+        ),
+        migrations.AddField(
+            model_name="receita",
+            name="titulo_busca",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="Título normalizado (sem acentos/maiúsculas) para busca por prefixo",
+                max_length=160,
+            ),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fichas", "0003_busca_normalizada"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmbalagemIngrediente",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "descricao",
+                    models.CharField(
+                        help_text="Ex.: Saco 25 kg, Caixa c/ 12", max_length=60
+                    ),
+                ),
+                ("fornecedor", models.CharField(blank=True, max_length=120)),
+                (
+                    "quantidade",
+                    models.DecimalField(
+                        decimal_places=3,
+                        help_text="Conteúdo na unidade base do ingrediente",
+                        max_digits=10,
+                    ),
+                ),
+                ("preco", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "ingrediente",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="embalagens",
+                        to="fichas.ingrediente",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "embalagem do fornecedor",
+                "verbose_name_plural": "embalagens do fornecedor",
+                "ordering": ["ingrediente", "quantidade"],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(("quantidade__gt", 0)),
+                        name="embalagem_quantidade_positiva",
+                    )
+                ],
+            },
+        ),
+    ]
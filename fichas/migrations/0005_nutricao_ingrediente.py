@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fichas", "0004_embalagens_fornecedor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingrediente",
+            name="alergenos",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Alérgenos presentes (máscara de ``Alergeno``)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingrediente",
+            name="carboidratos",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=8,
+                null=True,
+                verbose_name="Carboidratos (g)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingrediente",
+            name="fibras",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=8,
+                null=True,
+                verbose_name="Fibras (g)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingrediente",
+            name="gorduras",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=8,
+                null=True,
+                verbose_name="Gorduras totais (g)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingrediente",
+            name="kcal",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Vazio = ingrediente sem informação nutricional",
+                max_digits=8,
+                null=True,
+                verbose_name="Energia (kcal)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingrediente",
+            name="proteinas",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=8,
+                null=True,
+                verbose_name="Proteínas (g)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingrediente",
+            name="sodio",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=8,
+                null=True,
+                verbose_name="Sódio (mg)",
+            ),
+        ),
+    ]
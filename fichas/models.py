@@ -1,13 +1,10 @@
-from decimal import Decimal, ROUND_HALF_UP
+import enum
+from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.db import models
 
-
-# ------------------- Função utilitária -------------------
-def q(value, places=2):
-    """Arredonda valores decimais com precisão configurável."""
-    return (Decimal(value).quantize(Decimal(10) ** -places, rounding=ROUND_HALF_UP)
-            if value is not None else None)
+from .aritmetica import q, ZERO
+from .busca import normalizar
 
 
 # ------------------- Unidades -------------------
@@ -79,6 +76,82 @@ def converter(qtd, de, para):
     return (qtd * fator) if qtd is not None else None
 
 
+# ------------------- Cálculos de custo -------------------
+# Funções puras usadas pelos models e pelo motor em lote (fichas/custos.py)
+
+def quantidade_liquida(peso_bruto, peso_liquido, fator_correcao):
+    """Peso líquido informado ou peso bruto × fator de correção."""
+    if peso_liquido is not None:
+        return peso_liquido
+    if peso_bruto is not None and fator_correcao:
+        return q(peso_bruto * fator_correcao, 3)
+    return peso_bruto
+
+
+def calcular_custo_item(unidade, qtd_liquida, unidade_base, custo_por_unidade):
+    """Custo do ingrediente proporcional à quantidade usada."""
+    if unidade == Unidade.QB or qtd_liquida is None:
+        return ZERO
+
+    qtd = Decimal(qtd_liquida)
+    if unidade != unidade_base:
+        try:
+            qtd = converter(qtd, unidade, unidade_base)
+        except ValidationError:
+            pass  # fallback: assume proporção direta
+    return q(qtd * custo_por_unidade, 2)
+
+
+def fracao_componente(quantidade, unidade, unidade_rendimento, rendimento_total):
+    """Fração do rendimento da sub-receita usada pelo componente (None se não convertível)."""
+    try:
+        qtd_na_base = converter(quantidade, unidade, unidade_rendimento)
+    except ValidationError:
+        return None
+    if not qtd_na_base or rendimento_total == 0:
+        return None
+    return Decimal(qtd_na_base) / Decimal(rendimento_total)
+
+
+def calcular_numero_porcoes(rendimento_total, peso_por_porcao):
+    """Rendimento ÷ peso por porção."""
+    if peso_por_porcao and peso_por_porcao > 0:
+        return q(rendimento_total / peso_por_porcao, 2)
+    return None
+
+
+# ------------------- Alérgenos -------------------
+class Alergeno(enum.IntFlag):
+    """Alérgenos de declaração obrigatória (RDC 26/2015): um bit cada em ``Ingrediente.alergenos``."""
+    GLUTEN = 1 << 0
+    CRUSTACEOS = 1 << 1
+    OVOS = 1 << 2
+    PEIXES = 1 << 3
+    AMENDOIM = 1 << 4
+    SOJA = 1 << 5
+    LEITE = 1 << 6
+    CASTANHAS = 1 << 7
+    LATEX = 1 << 8
+
+
+ROTULOS_ALERGENOS = {
+    Alergeno.GLUTEN: "Glúten (trigo, centeio, cevada, aveia)",
+    Alergeno.CRUSTACEOS: "Crustáceos",
+    Alergeno.OVOS: "Ovos",
+    Alergeno.PEIXES: "Peixes",
+    Alergeno.AMENDOIM: "Amendoim",
+    Alergeno.SOJA: "Soja",
+    Alergeno.LEITE: "Leite",
+    Alergeno.CASTANHAS: "Castanhas, nozes e amêndoas",
+    Alergeno.LATEX: "Látex natural",
+}
+
+
+def nomes_alergenos(mascara):
+    """Rótulos dos alérgenos presentes na máscara, na ordem da RDC."""
+    return [rotulo for alergeno, rotulo in ROTULOS_ALERGENOS.items() if mascara & alergeno]
+
+
 # ------------------- Categoria -------------------
 class Categoria(models.Model):
     """Classificação geral das receitas."""
@@ -93,19 +166,63 @@ class Categoria(models.Model):
 class Ingrediente(models.Model):
     """Cadastro de ingredientes com unidade base e custo."""
     nome = models.CharField(max_length=150, unique=True)
+    nome_busca = models.CharField(max_length=150, db_index=True, editable=False, default="",
+                                  help_text="Nome normalizado (sem acentos/maiúsculas) para busca por prefixo")
     unidade_base = models.CharField(max_length=5, choices=Unidade.choices, default=Unidade.KG)
     custo_por_unidade = models.DecimalField(max_digits=12, decimal_places=4)
     foto = models.ImageField(upload_to="ingredientes/", blank=True, null=True,
                              help_text="Foto ilustrativa do ingrediente")  # ✅ NOVO
 
+    # Informação nutricional por 100 g ou 100 ml (por unidade quando a receita usa und/dz)
+    kcal = models.DecimalField("Energia (kcal)", max_digits=8, decimal_places=2, null=True, blank=True,
+                               help_text="Vazio = ingrediente sem informação nutricional")
+    proteinas = models.DecimalField("Proteínas (g)", max_digits=8, decimal_places=2, null=True, blank=True)
+    gorduras = models.DecimalField("Gorduras totais (g)", max_digits=8, decimal_places=2, null=True, blank=True)
+    carboidratos = models.DecimalField("Carboidratos (g)", max_digits=8, decimal_places=2, null=True, blank=True)
+    fibras = models.DecimalField("Fibras (g)", max_digits=8, decimal_places=2, null=True, blank=True)
+    sodio = models.DecimalField("Sódio (mg)", max_digits=8, decimal_places=2, null=True, blank=True)
+    alergenos = models.PositiveIntegerField(default=0, help_text="Alérgenos presentes (máscara de ``Alergeno``)")
+
     def __str__(self):
         return self.nome
 
+    def preencher_busca(self):
+        """Atualiza ``nome_busca`` (chamar antes de bulk_create/bulk_update, que não passam por save)."""
+        self.nome_busca = normalizar(self.nome)
+
+    def save(self, *args, **kwargs):
+        self.preencher_busca()
+        super().save(*args, **kwargs)
+
+
+# ------------------- Embalagens do fornecedor -------------------
+class EmbalagemIngrediente(models.Model):
+    """Embalagem em que o ingrediente é comprado (saco de 25 kg, caixa com 12...)."""
+    ingrediente = models.ForeignKey(Ingrediente, on_delete=models.CASCADE, related_name="embalagens")
+    descricao = models.CharField(max_length=60, help_text="Ex.: Saco 25 kg, Caixa c/ 12")
+    fornecedor = models.CharField(max_length=120, blank=True)
+    quantidade = models.DecimalField(max_digits=10, decimal_places=3,
+                                     help_text="Conteúdo na unidade base do ingrediente")
+    preco = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ["ingrediente", "quantidade"]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(quantidade__gt=0), name="embalagem_quantidade_positiva"),
+        ]
+        verbose_name = "embalagem do fornecedor"
+        verbose_name_plural = "embalagens do fornecedor"
+
+    def __str__(self):
+        return f"{self.descricao} de {self.ingrediente}"
+
 
 # ------------------- Receita -------------------
 class Receita(models.Model):
     """Ficha técnica padrão SENAC: define ingredientes, preparo e custo."""
     titulo = models.CharField(max_length=160)
+    titulo_busca = models.CharField(max_length=160, db_index=True, editable=False, default="",
+                                    help_text="Título normalizado (sem acentos/maiúsculas) para busca por prefixo")
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name="receitas")
     disciplina = models.CharField(max_length=120, blank=True, help_text="Ex.: Cozinha Fria, Padaria")
     tipo_coccao = models.CharField(max_length=120, blank=True, help_text="Ex.: Processador, Assar, Cozinhar")
@@ -124,6 +241,14 @@ class Receita(models.Model):
     def __str__(self):
         return self.titulo
 
+    def preencher_busca(self):
+        """Atualiza ``titulo_busca`` (chamar antes de bulk_create/bulk_update, que não passam por save)."""
+        self.titulo_busca = normalizar(self.titulo)
+
+    def save(self, *args, **kwargs):
+        self.preencher_busca()
+        super().save(*args, **kwargs)
+
     # --- Cálculos automáticos ---
     @property
     def custo_total(self):
@@ -138,9 +263,7 @@ class Receita(models.Model):
     @property
     def numero_porcoes(self):
         """Calcula o número de porções baseado no peso por porção."""
-        if self.peso_por_porcao and self.peso_por_porcao > 0:
-            return q(self.rendimento_total / self.peso_por_porcao, 2)
-        return None
+        return calcular_numero_porcoes(self.rendimento_total, self.peso_por_porcao)
 
     @property
     def custo_por_porcao(self):
@@ -167,32 +290,15 @@ class ItemReceita(models.Model):
     @property
     def quantidade_liquida(self):
         """Calcula o peso líquido considerando fator de correção."""
-        if self.peso_liquido is not None:
-            return self.peso_liquido
-        if self.peso_bruto is not None and self.fator_correcao:
-            return q(self.peso_bruto * self.fator_correcao, 3)
-        return self.peso_bruto
+        return quantidade_liquida(self.peso_bruto, self.peso_liquido, self.fator_correcao)
 
     @property
     def custo_total(self):
         """Calcula o custo do ingrediente proporcional à quantidade usada."""
         if self.unidade == Unidade.QB or self.quantidade_liquida is None:
-            return Decimal("0.00")
-
-        qtd = Decimal(self.quantidade_liquida)
+            return ZERO
         ing = self.ingrediente
-
-        # Se a unidade já é a base
-        if self.unidade == ing.unidade_base:
-            qtd_na_base = qtd
-        else:
-            try:
-                qtd_na_base = converter(qtd, self.unidade, ing.unidade_base)
-            except ValidationError:
-                # fallback: assume proporção direta
-                return q(qtd * ing.custo_por_unidade, 2)
-
-        return q(qtd_na_base * ing.custo_por_unidade, 2)
+        return calcular_custo_item(self.unidade, self.quantidade_liquida, ing.unidade_base, ing.custo_por_unidade)
 
 
 # ------------------- Sub-receitas -------------------
@@ -210,13 +316,7 @@ class ComponenteReceita(models.Model):
     def custo_total(self):
         """Custo proporcional da sub-receita."""
         sub = self.sub_receita
-        try:
-            qtd_na_base = converter(self.quantidade, self.unidade, sub.unidade_rendimento)
-        except ValidationError:
-            qtd_na_base = self.quantidade if self.unidade == sub.unidade_rendimento else None
-
-        if not qtd_na_base or sub.rendimento_total == 0:
-            return Decimal("0.00")
-
-        frac = Decimal(qtd_na_base) / Decimal(sub.rendimento_total)
+        frac = fracao_componente(self.quantidade, self.unidade, sub.unidade_rendimento, sub.rendimento_total)
+        if frac is None:
+            return ZERO
         return q(sub.custo_total * frac, 2)
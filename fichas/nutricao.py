@@ -0,0 +1,156 @@
+"""
+Informação nutricional e alérgenos das receitas.
+
+Cada ``Ingrediente`` tem um vetor de nutrientes por 100 g/100 ml (ou por
+unidade, quando a receita o usa em und/dz) e uma máscara de ``Alergeno``.
+``calcular`` monta a tabela de todas as receitas do catálogo de uma vez, com
+NumPy:
+
+- parte direta: cada item vira um fator (quantidade na base do vetor) e a
+  soma ``fator × vetor do ingrediente`` é acumulada por receita
+  (``np.add.at``, o produto da matriz esparsa itens × ingredientes);
+- sub-receitas: as receitas são processadas por altura na árvore (folhas
+  primeiro), somando ``fração × linha da sub-receita`` em cada nível;
+- alérgenos combinam por OU bit a bit (inclusive itens q.b. e componentes
+  cuja fração não é convertível) e a marca de dado incompleto se propaga
+  da mesma forma.
+
+A tabela fica memorizada no ``Catalogo`` (``catalogo.nutricao``), junto dos
+custos: é descartada pelos mesmos sinais que descartam o catálogo. Sem o
+NumPy (dependência opcional) não há tabela: ``nutricao_receita`` devolve
+None e a ficha omite o bloco.
+"""
+from collections import namedtuple
+
+from .aritmetica import numpy
+from .custos import CATALOGO
+from .escala import EM_GRAMAS, EM_ML
+from .models import Unidade, fracao_componente, nomes_alergenos, quantidade_liquida
+
+Nutriente = namedtuple("Nutriente", "campo rotulo unidade casas")
+
+NUTRIENTES = (
+    Nutriente("kcal", "Valor energético", "kcal", 0),
+    Nutriente("carboidratos", "Carboidratos", "g", 1),
+    Nutriente("proteinas", "Proteínas", "g", 1),
+    Nutriente("gorduras", "Gorduras totais", "g", 1),
+    Nutriente("fibras", "Fibras", "g", 1),
+    Nutriente("sodio", "Sódio", "mg", 0),
+)
+
+
+def em_referencia(quantidade, unidade):
+    """Quantidade na base dos valores nutricionais (100 g, 100 ml ou 1 unidade); q.b. e pitadas contam 0."""
+    if quantidade is None:
+        return 0.0
+    if unidade in EM_GRAMAS:
+        return float(quantidade * EM_GRAMAS[unidade]) / 100
+    if unidade in EM_ML:
+        return float(quantidade * EM_ML[unidade]) / 100
+    if unidade == Unidade.UND:
+        return float(quantidade)
+    if unidade == Unidade.DZ:
+        return float(quantidade) * 12
+    return 0.0
+
+
+# ------------------- Tabela do catálogo -------------------
+
+class TabelaNutricional:
+    """Nutrientes (receita inteira), máscara de alérgenos e marca de incompleta por receita."""
+
+    def __init__(self, indice, totais, alergenos, incompletas):
+        self.indice = indice  # receita_id → linha
+        self.totais = totais  # receitas × NUTRIENTES
+        self.alergenos = alergenos
+        self.incompletas = incompletas
+
+
+def calcular(catalogo):
+    """Tabela nutricional de todas as receitas do catálogo (None sem o NumPy)."""
+    np = numpy()  # sob demanda: o módulo é importado pelas views de todo worker
+    if np is None:
+        return None
+    receitas = list(catalogo.receitas)
+    indice = {receita_id: linha for linha, receita_id in enumerate(receitas)}
+    ingredientes = list(catalogo.ingredientes.values())
+    posicao = {ing.id: linha for linha, ing in enumerate(ingredientes)}
+
+    vetores = np.array([[float(getattr(ing, n.campo) or 0) for n in NUTRIENTES] for ing in ingredientes],
+                       dtype=float).reshape(len(ingredientes), len(NUTRIENTES))
+    mascaras = np.array([ing.alergenos for ing in ingredientes], dtype=np.int64)
+    sem_dados = np.array([ing.kcal is None for ing in ingredientes], dtype=bool)
+
+    totais = np.zeros((len(receitas), len(NUTRIENTES)))
+    alergenos = np.zeros(len(receitas), dtype=np.int64)
+    incompletas = np.zeros(len(receitas), dtype=bool)
+
+    # Parte direta: matriz esparsa itens × ingredientes
+    linhas, colunas, fatores = [], [], []
+    for item in catalogo.itens.values():
+        if item.ingrediente_id not in posicao or item.receita_id not in indice:
+            continue
+        qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+        linhas.append(indice[item.receita_id])
+        colunas.append(posicao[item.ingrediente_id])
+        fatores.append(em_referencia(qtd, item.unidade))
+    if linhas:
+        linhas, colunas, fatores = np.array(linhas), np.array(colunas), np.array(fatores)
+        np.add.at(totais, linhas, fatores[:, None] * vetores[colunas])
+        np.bitwise_or.at(alergenos, linhas, mascaras[colunas])
+        conta = fatores > 0
+        np.logical_or.at(incompletas, linhas[conta], sem_dados[colunas[conta]])
+
+    # Sub-receitas, das folhas para o topo
+    por_altura = {}
+    altura = catalogo.alturas()
+    for comp in catalogo.componentes.values():
+        sub = catalogo.receitas.get(comp.sub_receita_id)
+        if sub is None or comp.receita_id not in indice:
+            continue
+        fracao = fracao_componente(comp.quantidade, comp.unidade, sub.unidade_rendimento, sub.rendimento_total)
+        por_altura.setdefault(altura[comp.receita_id], []).append(
+            (indice[comp.receita_id], indice[sub.id], float(fracao or 0))
+        )
+    for nivel in sorted(por_altura):
+        pais, subs, fracoes = (np.array(coluna) for coluna in zip(*por_altura[nivel]))
+        np.add.at(totais, pais, fracoes[:, None] * totais[subs])
+        np.bitwise_or.at(alergenos, pais, alergenos[subs])
+        np.logical_or.at(incompletas, pais, incompletas[subs])
+
+    return TabelaNutricional(indice, totais, alergenos, incompletas)
+
+
+def tabela_nutricional(catalogo=None):
+    """Tabela do catálogo, calculada uma vez por fotografia."""
+    catalogo = catalogo or CATALOGO.obter()
+    if catalogo.nutricao is None:
+        catalogo.nutricao = calcular(catalogo)
+    return catalogo.nutricao
+
+
+# ------------------- Ficha -------------------
+
+def nutricao_receita(receita_id, catalogo=None):
+    """Nutrientes da receita inteira e por porção, alérgenos e se falta informação de algum ingrediente."""
+    catalogo = catalogo or CATALOGO.obter()
+    tabela = tabela_nutricional(catalogo)
+    if tabela is None:
+        return None
+    linha = tabela.indice[receita_id]
+    porcoes = catalogo.numero_porcoes(receita_id)
+    nutrientes = []
+    for coluna, nutriente in enumerate(NUTRIENTES):
+        total = float(tabela.totais[linha, coluna])
+        nutrientes.append({
+            "rotulo": nutriente.rotulo,
+            "unidade": nutriente.unidade,
+            "casas": nutriente.casas,
+            "total": total,
+            "porcao": total / float(porcoes) if porcoes else None,
+        })
+    return {
+        "nutrientes": nutrientes,
+        "alergenos": nomes_alergenos(int(tabela.alergenos[linha])),
+        "incompleta": bool(tabela.incompletas[linha]),
+    }
@@ -0,0 +1,468 @@
+"""
+Importação de fichas técnicas em planilha no modelo SENAC (CSV ou XLSX).
+
+Cada arquivo (ou aba) pode trazer várias fichas, uma depois da outra::
+
+    Ficha;Molho de tomate
+    Categoria;Molhos
+    Rendimento;2;kg
+    Peso por porção;0,100
+    Ingrediente;Unidade;Peso bruto;Peso líquido;Fator de correção;Medida caseira
+    Tomate;kg;2,5;;0,9;
+    Cebola;g;;300;;1 unidade média
+    Sub-receita: Caldo de legumes;ml;500
+    Modo de preparo;Refogar a cebola...
+
+Os rótulos são lidos sem acentos/maiúsculas, a tabela de ingredientes é
+mapeada pelo cabeçalho e uma nova linha "Ficha" começa a ficha seguinte.
+As linhas são lidas em fluxo (``csv``, ou ``openpyxl`` em modo somente
+leitura — dependência opcional, só para .xlsx).
+
+Os nomes de ingredientes são casados com ``IndiceTrigramas`` (exato sem
+acentos ou aproximado acima do limiar); uma linha que não casa com
+ingrediente mas casa com o título de uma receita (do banco ou do próprio
+arquivo), ou que começa com "Sub-receita:", vira ``ComponenteReceita``.
+Cada arquivo é gravado com ``bulk_create`` numa transação; fichas com linhas
+não resolvidas ficam de fora (ou entram sem essas linhas, com ``parcial``)
+e tudo vai para o relatório. Os arquivos seguintes só enxergam as fichas de
+um arquivo depois do commit: numa simulação (``simular``), cada arquivo é
+conferido contra o banco como ele está.
+"""
+import csv
+import io
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.db import transaction
+
+from .busca import APROXIMADO, AUSENTE, EXATO, IndiceTrigramas, normalizar
+from .models import Categoria, ComponenteReceita, Ingrediente, ItemReceita, Receita, Unidade
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl é opcional: sem ele só CSV
+    openpyxl = None
+
+Ocorrencia = namedtuple("Ocorrencia", "arquivo linha ficha texto situacao detalhe")
+
+ROTULOS_FICHA = {"ficha", "ficha tecnica", "receita", "preparacao", "nome da preparacao"}
+CAMPOS = {
+    "categoria": "categoria",
+    "disciplina": "disciplina",
+    "tipo de coccao": "tipo_coccao",
+    "rendimento": "rendimento",
+    "rendimento total": "rendimento",
+    "unidade de rendimento": "unidade_rendimento",
+    "peso por porcao": "peso_por_porcao",
+    "porcao": "peso_por_porcao",
+    "tempo de preparo": "tempo_preparo_min",
+    "tempo de coccao": "tempo_coccao_min",
+    "modo de preparo": "modo_preparo",
+    "observacoes": "observacoes",
+}
+COLUNAS = {
+    "ingrediente": "nome", "ingredientes": "nome", "insumo": "nome",
+    "unidade": "unidade", "un": "unidade", "unid": "unidade",
+    "peso bruto": "peso_bruto", "pb": "peso_bruto",
+    "peso liquido": "peso_liquido", "pl": "peso_liquido",
+    "fator de correcao": "fator_correcao", "fc": "fator_correcao",
+    "medida caseira": "medida_caseira",
+}
+UNIDADES = {
+    "kg": Unidade.KG, "quilo": Unidade.KG, "kilo": Unidade.KG,
+    "g": Unidade.G, "gr": Unidade.G, "grama": Unidade.G, "gramas": Unidade.G,
+    "mg": Unidade.MG,
+    "l": Unidade.L, "lt": Unidade.L, "litro": Unidade.L, "litros": Unidade.L,
+    "dl": Unidade.DL, "cl": Unidade.CL, "ml": Unidade.ML,
+    "cs": Unidade.CS, "colher de sopa": Unidade.CS, "c. sopa": Unidade.CS,
+    "cc": Unidade.CC, "colher de cha": Unidade.CC, "c. cha": Unidade.CC,
+    "xic": Unidade.XIC, "xicara": Unidade.XIC, "xicaras": Unidade.XIC,
+    "pt": Unidade.PT, "pitada": Unidade.PT,
+    "gt": Unidade.GT, "gota": Unidade.GT, "gotas": Unidade.GT,
+    "und": Unidade.UND, "un": Unidade.UND, "unid": Unidade.UND, "unidade": Unidade.UND, "unidades": Unidade.UND,
+    "dz": Unidade.DZ, "duzia": Unidade.DZ,
+    "qb": Unidade.QB, "q.b.": Unidade.QB, "q.b": Unidade.QB, "quanto baste": Unidade.QB,
+}
+PREFIXOS_COMPONENTE = ("sub-receita:", "sub receita:", "subreceita:")
+
+
+# ------------------- Leitura em fluxo -------------------
+
+def linhas_csv(caminho):
+    """(número, células) de um CSV em UTF-8 ou Windows-1252, separado por ';' ou ','."""
+    with open(caminho, "rb") as arquivo:
+        inicio = arquivo.read(64 * 1024)
+    try:
+        inicio.decode("utf-8")
+        codificacao = "utf-8-sig"
+    except UnicodeDecodeError as erro:
+        codificacao = "utf-8-sig" if erro.start > len(inicio) - 4 else "cp1252"  # corte no meio de um caractere
+    amostra = inicio.decode(codificacao, errors="ignore")
+    separador = ";" if amostra.count(";") >= amostra.count(",") else ","
+    with open(caminho, newline="", encoding=codificacao) as arquivo:
+        for numero, celulas in enumerate(csv.reader(arquivo, delimiter=separador), start=1):
+            yield numero, celulas
+
+
+def linhas_xlsx(caminho):
+    """(aba:número, células) de todas as abas; uma linha vazia separa as abas."""
+    if openpyxl is None:
+        raise ValueError("Para ler .xlsx instale o openpyxl (pip install openpyxl) ou exporte a planilha em CSV.")
+    pasta = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        for aba in pasta.worksheets:
+            for numero, celulas in enumerate(aba.iter_rows(values_only=True), start=1):
+                yield f"{aba.title}:{numero}", list(celulas)
+            yield f"{aba.title}:fim", []
+    finally:
+        pasta.close()
+
+
+def ler_linhas(caminho):
+    sufixo = Path(caminho).suffix.lower()
+    if sufixo in (".xlsx", ".xlsm"):
+        return linhas_xlsx(caminho)
+    if sufixo in (".csv", ".txt"):
+        return linhas_csv(caminho)
+    raise ValueError(f"{caminho}: formato não suportado (use .csv ou .xlsx).")
+
+
+def texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+
+def rotulo(valor):
+    return normalizar(texto(valor)).rstrip(":").strip()
+
+
+def numero(valor):
+    """Decimal de 2,5 / 1.234,5 / 2.5 / células numéricas; None se vazio."""
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, (int, float, Decimal)):
+        return Decimal(str(valor))
+    bruto = texto(valor).replace(" ", "")
+    if "," in bruto:
+        bruto = bruto.replace(".", "").replace(",", ".")
+    try:
+        return Decimal(bruto)
+    except InvalidOperation:
+        raise ValueError(f"número inválido: '{texto(valor)}'")
+
+
+def unidade(valor):
+    chave = rotulo(valor)
+    if chave not in UNIDADES:
+        raise ValueError(f"unidade desconhecida: '{texto(valor)}'")
+    return UNIDADES[chave]
+
+
+def ler_fichas(linhas):
+    """Fichas (dicts) de uma sequência de (número, células), em uma passada."""
+    ficha, colunas = None, None
+    for numero_linha, celulas in linhas:
+        celulas = [c for c in celulas]
+        while celulas and texto(celulas[-1]) == "":
+            celulas.pop()
+        if not celulas:
+            colunas = None  # linha vazia fecha a tabela de ingredientes
+            continue
+        chave = rotulo(celulas[0])
+        valores = [c for c in celulas[1:] if texto(c) != ""]
+
+        if chave in ROTULOS_FICHA and valores:
+            if ficha is not None:
+                yield ficha
+            ficha = {"titulo": texto(valores[0]), "linha": numero_linha, "campos": {}, "linhas": []}
+            colunas = None
+        elif ficha is None:
+            continue
+        elif chave in COLUNAS and COLUNAS[chave] == "nome":
+            colunas = {COLUNAS[rotulo(c)]: i for i, c in enumerate(celulas) if rotulo(c) in COLUNAS}
+        elif chave in CAMPOS and (colunas is None or chave in ("modo de preparo", "observacoes")):
+            colunas = None
+            ficha["campos"][CAMPOS[chave]] = (numero_linha, valores)
+        elif colunas is not None:
+            linha = {campo: (celulas[i] if i < len(celulas) else None) for campo, i in colunas.items()}
+            linha["linha"] = numero_linha
+            ficha["linhas"].append(linha)
+    if ficha is not None:
+        yield ficha
+
+
+# ------------------- Importação -------------------
+
+def recarregar_pks(modelo, objetos, *campos):
+    """Preenche o pk dos objetos que o ``bulk_create`` deixou sem, relendo pela chave natural.
+
+    PostgreSQL, SQLite e MariaDB devolvem os pks do INSERT em lote; o MySQL do
+    XAMPP não, e os itens e componentes ficariam sem receita. Em duplicidade
+    vale o maior pk (a linha que acabou de entrar).
+    """
+    sem_pk = [obj for obj in objetos if obj.pk is None]
+    if not sem_pk:
+        return
+    filtro = {f"{campo}__in": {getattr(obj, campo) for obj in sem_pk} for campo in campos}
+    pks = {tuple(linha[:-1]): linha[-1]
+           for linha in modelo.objects.filter(**filtro).order_by("pk").values_list(*campos, "pk")}
+    for obj in sem_pk:
+        obj.pk = pks[tuple(getattr(obj, campo) for campo in campos)]
+
+
+class ImportadorPlanilhas:
+    """Lê e grava fichas de planilhas; ``ocorrencias`` guarda o relatório de todos os arquivos."""
+
+    def __init__(self, categoria_padrao=None, limiar=0.6, parcial=False, simular=False):
+        self.categoria_padrao = categoria_padrao
+        self.parcial = parcial
+        self.simular = simular
+        self.ingredientes = IndiceTrigramas(Ingrediente.objects.values_list("id", "nome"), limiar=limiar)
+        self.receitas = IndiceTrigramas(Receita.objects.values_list("id", "titulo"), limiar=limiar)
+        self.existentes = set(Receita.objects.values_list("titulo_busca", "categoria__nome"))
+        self.categorias = {normalizar(c.nome): c for c in Categoria.objects.all()}
+        self.ocorrencias = []
+        self.contagem = {"fichas": 0, "itens": 0, "componentes": 0, "ignoradas": 0}
+
+    def anotar(self, arquivo, linha, ficha, texto_linha, situacao, detalhe=""):
+        self.ocorrencias.append(Ocorrencia(arquivo, linha, ficha, texto_linha, situacao, detalhe))
+
+    def importar(self, caminho):
+        """Importa um arquivo numa transação; devolve o número de fichas gravadas."""
+        arquivo = Path(caminho).name
+        lidas = []
+        for ficha in ler_fichas(ler_linhas(caminho)):
+            preparada = self.preparar(arquivo, ficha)
+            if preparada is not None:
+                lidas.append(preparada)
+        lidas = self.resolver_componentes(arquivo, lidas)
+        novas = list({normalizar(f["receita"].categoria.nome): f["receita"].categoria
+                      for f in lidas if f["receita"].categoria.pk is None}.values())
+        gravou = False
+        try:
+            with transaction.atomic():
+                gravadas = self.gravar(lidas, novas)
+                if self.simular:
+                    transaction.set_rollback(True)
+                gravou = not self.simular
+        finally:
+            if not gravou:  # desfeitas: as categorias novas voltam a ser "a criar" no próximo arquivo
+                for categoria in novas:
+                    categoria.pk = None
+        # Só receitas confirmadas entram nos índices: desfeitas deixariam "já existe" e pks inexistentes
+        if gravou:
+            for ficha in lidas:
+                receita = ficha["receita"]
+                self.existentes.add((receita.titulo_busca, receita.categoria.nome))
+                self.receitas.adicionar(receita.pk, receita.titulo)
+        return gravadas
+
+    def preparar(self, arquivo, ficha):
+        """Ficha lida → Receita (não salva) + itens e componentes pendentes; None se inválida."""
+        titulo = ficha["titulo"]
+        campos = {campo: valores for campo, (_, valores) in ficha["campos"].items()}
+        erros = []
+
+        def valor(campo, conversor=texto):
+            valores = campos.get(campo) or [None]
+            try:
+                return conversor(valores[0])
+            except ValueError as erro:
+                erros.append(f"{campo}: {erro}")
+
+        nome_categoria = valor("categoria") or self.categoria_padrao
+        if len(campos.get("rendimento", ())) == 1 and " " in texto(campos["rendimento"][0]):  # "2 kg" numa célula
+            campos["rendimento"] = texto(campos["rendimento"][0]).split(None, 1)
+        rendimento = valor("rendimento", numero)
+        unidade_rendimento = Unidade.KG
+        if len(campos.get("rendimento", ())) > 1:  # "Rendimento;2;kg"
+            campos.setdefault("unidade_rendimento", campos["rendimento"][1:])
+        if campos.get("unidade_rendimento"):
+            unidade_rendimento = valor("unidade_rendimento", unidade) or unidade_rendimento
+        if not nome_categoria:
+            erros.append("sem categoria (informe na planilha ou use --categoria)")
+        if rendimento is None:
+            erros.append("sem rendimento")
+        if erros:
+            self.anotar(arquivo, ficha["linha"], titulo, titulo, "ficha inválida", "; ".join(erros))
+            self.contagem["ignoradas"] += 1
+            return None
+        existente = self.categorias.get(normalizar(nome_categoria))
+        if existente is not None and (normalizar(titulo), existente.nome) in self.existentes:
+            self.anotar(arquivo, ficha["linha"], titulo, titulo, "já existe", f"categoria {nome_categoria}")
+            self.contagem["ignoradas"] += 1
+            return None
+
+        receita = Receita(
+            titulo=titulo,
+            categoria=self.categoria(nome_categoria),
+            disciplina=valor("disciplina")[:120],
+            tipo_coccao=valor("tipo_coccao")[:120],
+            tempo_preparo_min=int(valor("tempo_preparo_min", numero) or 0),
+            tempo_coccao_min=int(valor("tempo_coccao_min", numero) or 0),
+            modo_preparo="\n".join(texto(v) for v in campos.get("modo_preparo", ())),
+            observacoes="\n".join(texto(v) for v in campos.get("observacoes", ())),
+            rendimento_total=rendimento,
+            unidade_rendimento=unidade_rendimento,
+            peso_por_porcao=valor("peso_por_porcao", numero),
+        )
+        receita.preencher_busca()
+        preparada = {"receita": receita, "titulo": titulo, "linha": ficha["linha"],
+                     "itens": [], "componentes": [], "pendentes": [], "com_erro": False}
+        for linha in ficha["linhas"]:
+            self.preparar_linha(arquivo, preparada, linha)
+        return preparada
+
+    def preparar_linha(self, arquivo, preparada, linha):
+        nome = texto(linha.get("nome"))
+        if not nome:
+            return
+        titulo = preparada["titulo"]
+        try:
+            dados = {
+                "unidade": unidade(linha.get("unidade")),
+                "peso_bruto": numero(linha.get("peso_bruto")),
+                "peso_liquido": numero(linha.get("peso_liquido")),
+                "fator_correcao": numero(linha.get("fator_correcao")),
+            }
+        except ValueError as erro:
+            self.anotar(arquivo, linha["linha"], titulo, nome, "linha inválida", str(erro))
+            preparada["com_erro"] = True
+            return
+
+        if normalizar(nome).startswith(PREFIXOS_COMPONENTE):
+            sub = nome.split(":", 1)[1].strip()
+            preparada["pendentes"].append((linha["linha"], sub, dados, True, None))
+            return
+
+        casamento = self.ingredientes.procurar(nome)
+        if casamento.situacao in (EXATO, APROXIMADO):
+            if casamento.situacao == APROXIMADO:
+                self.anotar(arquivo, linha["linha"], titulo, nome, APROXIMADO,
+                            f"→ {casamento.nome} ({casamento.semelhanca:.0%})")
+            preparada["itens"].append(ItemReceita(
+                ingrediente_id=casamento.id, medida_caseira=texto(linha.get("medida_caseira"))[:60], **dados,
+            ))
+        else:
+            # Pode ser uma sub-receita listada como ingrediente (decidido com as fichas do arquivo)
+            preparada["pendentes"].append((linha["linha"], nome, dados, False, casamento))
+
+    def resolver_componentes(self, arquivo, lidas):
+        """Liga as linhas pendentes às receitas do banco ou do arquivo e descarta fichas com erro."""
+        do_arquivo = {normalizar(ficha["titulo"]): ficha for ficha in lidas}
+        for ficha in lidas:
+            for numero_linha, nome, dados, explicito, casamento in ficha["pendentes"]:
+                quantidade = dados["peso_liquido"] if dados["peso_liquido"] is not None else dados["peso_bruto"]
+                alvo = do_arquivo.get(normalizar(nome))
+                if alvo is None:
+                    da_receita = self.receitas.procurar(nome)
+                    if da_receita.situacao == EXATO or (explicito and da_receita.situacao == APROXIMADO):
+                        alvo = da_receita.id
+                if alvo is None or alvo is ficha:
+                    if explicito:
+                        self.anotar(arquivo, numero_linha, ficha["titulo"], nome, AUSENTE, "sub-receita não encontrada")
+                    else:
+                        detalhe = ", ".join(casamento.candidatos) if casamento.candidatos else ""
+                        self.anotar(arquivo, numero_linha, ficha["titulo"], nome, casamento.situacao,
+                                    f"sugestões: {detalhe}" if detalhe else "")
+                    ficha["com_erro"] = True
+                elif quantidade is None:
+                    self.anotar(arquivo, numero_linha, ficha["titulo"], nome, "linha inválida", "sem quantidade")
+                    ficha["com_erro"] = True
+                else:
+                    ficha["componentes"].append((alvo, quantidade, dados["unidade"]))
+
+        ciclicas = self.ciclos(lidas)
+        aceitas = []
+        for ficha in lidas:
+            if id(ficha) in ciclicas:
+                self.anotar(arquivo, ficha["linha"], ficha["titulo"], ficha["titulo"], "ficha inválida",
+                            "ciclo de sub-receitas no arquivo")
+            elif ficha["com_erro"] and not self.parcial:
+                self.anotar(arquivo, ficha["linha"], ficha["titulo"], ficha["titulo"], "não importada",
+                            "há linhas não resolvidas (use --parcial para importar sem elas)")
+            else:
+                aceitas.append(ficha)
+                continue
+            self.contagem["ignoradas"] += 1
+        # Fichas que dependem de uma ficha descartada também ficam de fora
+        descartadas = {id(f) for f in lidas} - {id(f) for f in aceitas}
+        while True:
+            dependentes = [f for f in aceitas
+                           if any(isinstance(alvo, dict) and id(alvo) in descartadas for alvo, _, _ in f["componentes"])]
+            if not dependentes:
+                return aceitas
+            for ficha in dependentes:
+                self.anotar(arquivo, ficha["linha"], ficha["titulo"], ficha["titulo"], "não importada",
+                            "usa uma sub-receita do arquivo que não foi importada")
+                self.contagem["ignoradas"] += 1
+                descartadas.add(id(ficha))
+            aceitas = [f for f in aceitas if id(f) not in descartadas]
+
+    @staticmethod
+    def ciclos(lidas):
+        """ids das fichas do arquivo que participam de ciclos de sub-receitas entre si."""
+        ciclicas, estado = set(), {}
+
+        def visitar(ficha, caminho):
+            estado[id(ficha)] = "visitando"
+            for alvo, _, _ in ficha["componentes"]:
+                if not isinstance(alvo, dict):
+                    continue
+                if estado.get(id(alvo)) == "visitando":
+                    ciclicas.update(id(f) for f in caminho[caminho.index(alvo):])
+                elif id(alvo) not in estado:
+                    visitar(alvo, caminho + [alvo])
+            estado[id(ficha)] = "feito"
+
+        for ficha in lidas:
+            if id(ficha) not in estado:
+                visitar(ficha, [ficha])
+        return ciclicas
+
+    def categoria(self, nome):
+        chave = normalizar(nome)
+        if chave not in self.categorias:
+            self.categorias[chave] = Categoria(nome=nome.strip())
+        return self.categorias[chave]
+
+    def gravar(self, lidas, novas):
+        Categoria.objects.bulk_create(novas)
+        recarregar_pks(Categoria, novas, "nome")
+        for ficha in lidas:
+            ficha["receita"].categoria_id = ficha["receita"].categoria.pk  # categorias recém-criadas
+        receitas = [ficha["receita"] for ficha in lidas]
+        Receita.objects.bulk_create(receitas)
+        recarregar_pks(Receita, receitas, "titulo_busca", "categoria_id")
+
+        itens, componentes = [], []
+        for ficha in lidas:
+            receita = ficha["receita"]
+            for item in ficha["itens"]:
+                item.receita = receita
+                itens.append(item)
+            for alvo, quantidade, unidade_comp in ficha["componentes"]:
+                sub_id = alvo["receita"].pk if isinstance(alvo, dict) else alvo
+                componentes.append(ComponenteReceita(receita=receita, sub_receita_id=sub_id,
+                                                     quantidade=quantidade, unidade=unidade_comp))
+        ItemReceita.objects.bulk_create(itens, batch_size=500)
+        ComponenteReceita.objects.bulk_create(componentes, batch_size=500)
+
+        self.contagem["fichas"] += len(lidas)
+        self.contagem["itens"] += len(itens)
+        self.contagem["componentes"] += len(componentes)
+        return len(lidas)
+
+    # ------------------- Relatório -------------------
+
+    def escrever_relatorio(self, destino):
+        """Relatório em CSV (;) para abrir na planilha."""
+        escritor = csv.writer(destino, delimiter=";")
+        escritor.writerow(["arquivo", "linha", "ficha", "texto", "situação", "detalhe"])
+        for ocorrencia in sorted(self.ocorrencias, key=lambda o: (o.arquivo, str(o.linha).rjust(20))):
+            escritor.writerow(ocorrencia)
+
+    def relatorio_texto(self):
+        saida = io.StringIO()
+        self.escrever_relatorio(saida)
+        return saida.getvalue()
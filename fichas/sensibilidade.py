@@ -0,0 +1,177 @@
+"""
+Sensibilidade dos custos a choques de preço de ingredientes.
+
+``MatrizUso`` é a matriz esparsa receitas × ingredientes com o uso achatado
+de cada ingrediente na receita inteira, já na unidade base do ingrediente
+(sub-receitas expandidas pela fração do componente, com as mesmas regras de
+``Catalogo.custo_total``). O custo da receita é ``uso · preços``; um cenário
+de choque vira um vetor ``Δpreço`` e a variação de todas as receitas sai de
+um único produto matriz-vetor (``np.bincount`` sobre as coordenadas da
+matriz).
+
+A matriz fica memorizada no ``Catalogo`` (``catalogo.uso``), como a tabela
+nutricional; ``eventos.sensibilidade`` leva a variação das receitas aos
+próximos eventos.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+
+from .aritmetica import numpy, q
+from .busca import normalizar
+from .custos import CATALOGO
+from .models import Unidade, converter, fracao_componente, quantidade_liquida
+
+Choque = namedtuple("Choque", "ingrediente_id percentual")
+
+# Faixa aceita para um choque: até zerar o preço ou multiplicá-lo por 11
+PERCENTUAL_MINIMO = Decimal("-100")
+PERCENTUAL_MAXIMO = Decimal("1000")
+
+
+class MatrizUso:
+    """
+    Uso de ingredientes por receita (rendimento inteiro) em formato CSR.
+
+    O NumPy é obtido sob demanda (``numpy()``) em cada método: este módulo é
+    importado pelas views de todo worker.
+    """
+
+    def __init__(self, receitas, ingredientes, inicio, colunas, valores):
+        self.receitas = receitas  # linha → receita_id
+        self.ingredientes = ingredientes  # coluna → ingrediente_id
+        self.linha = {receita_id: i for i, receita_id in enumerate(receitas)}
+        self.coluna = {ingrediente_id: j for j, ingrediente_id in enumerate(ingredientes)}
+        self.inicio = inicio  # linha i ocupa colunas/valores[inicio[i]:inicio[i + 1]]
+        self.colunas = colunas
+        self.valores = valores
+        np = numpy()
+        self.linhas = np.repeat(np.arange(len(receitas)), np.diff(inicio))
+
+    @classmethod
+    def montar(cls, catalogo):
+        ingredientes = list(catalogo.ingredientes)
+        coluna = {ingrediente_id: j for j, ingrediente_id in enumerate(ingredientes)}
+        altura = catalogo.alturas()
+        uso = {}
+        for receita_id in sorted(catalogo.receitas, key=altura.__getitem__):  # folhas primeiro
+            linha = {}
+            for item in catalogo.itens_por_receita.get(receita_id, ()):
+                qtd = quantidade_liquida(item.peso_bruto, item.peso_liquido, item.fator_correcao)
+                if item.unidade == Unidade.QB or qtd is None or item.ingrediente_id not in coluna:
+                    continue
+                ing = catalogo.ingredientes[item.ingrediente_id]
+                if item.unidade != ing.unidade_base:
+                    try:
+                        qtd = converter(qtd, item.unidade, ing.unidade_base)
+                    except ValidationError:
+                        pass  # mesma proporção direta de calcular_custo_item
+                j = coluna[item.ingrediente_id]
+                linha[j] = linha.get(j, 0.0) + float(qtd)
+            for comp in catalogo.componentes_por_receita.get(receita_id, ()):
+                sub = catalogo.receitas[comp.sub_receita_id]
+                fracao = fracao_componente(comp.quantidade, comp.unidade, sub.unidade_rendimento,
+                                           sub.rendimento_total)
+                if fracao is None:
+                    continue
+                fracao = float(fracao)
+                for j, qtd in uso[sub.id].items():
+                    linha[j] = linha.get(j, 0.0) + fracao * qtd
+            uso[receita_id] = linha
+
+        receitas = list(catalogo.receitas)
+        np = numpy()
+        inicio = np.zeros(len(receitas) + 1, dtype=np.int64)
+        inicio[1:] = np.cumsum([len(uso[r]) for r in receitas])
+        colunas = np.fromiter((j for r in receitas for j in uso[r]), dtype=np.int64, count=inicio[-1])
+        valores = np.fromiter((v for r in receitas for v in uso[r].values()), dtype=float, count=inicio[-1])
+        return cls(receitas, ingredientes, inicio, colunas, valores)
+
+    def produto(self, vetor):
+        """Uso × vetor (um valor por ingrediente) para todas as receitas."""
+        return numpy().bincount(self.linhas, weights=self.valores * vetor[self.colunas], minlength=len(self.receitas))
+
+
+def matriz_uso(catalogo=None):
+    """Matriz do catálogo, montada uma vez por fotografia."""
+    catalogo = catalogo or CATALOGO.obter()
+    if catalogo.uso is None:
+        catalogo.uso = MatrizUso.montar(catalogo)
+    return catalogo.uso
+
+
+# ------------------- Cenários -------------------
+
+def resolver_ingrediente(texto, catalogo):
+    """Id do ingrediente pelo id ou pelo nome (sem acentos/maiúsculas)."""
+    texto = str(texto).strip()
+    if texto.isdigit() and int(texto) in catalogo.ingredientes:
+        return int(texto)
+    procurado = normalizar(texto)
+    for ing in catalogo.ingredientes.values():
+        if normalizar(ing.nome) == procurado:
+            return ing.id
+    raise ValidationError(f"Ingrediente '{texto}' não encontrado.")
+
+
+def ler_choque(texto, catalogo=None):
+    """'Tomate=+20%' ou '12=-5' → ``Choque`` (variação percentual do preço)."""
+    catalogo = catalogo or CATALOGO.obter()
+    nome, separador, valor = str(texto).rpartition("=")
+    if not separador:
+        raise ValidationError(f"Choque '{texto}' inválido: use ingrediente=percentual (ex.: Tomate=+20%).")
+    try:
+        percentual = Decimal(valor.strip().rstrip("%").replace(",", "."))
+    except InvalidOperation:
+        raise ValidationError(f"Percentual inválido em '{texto}'.")
+    if not percentual.is_finite() or not PERCENTUAL_MINIMO <= percentual <= PERCENTUAL_MAXIMO:
+        raise ValidationError(f"Percentual fora da faixa em '{texto}': use de {PERCENTUAL_MINIMO}% a "
+                              f"+{PERCENTUAL_MAXIMO}%.")
+    return Choque(resolver_ingrediente(nome, catalogo), percentual)
+
+
+def vetor_choques(choques, matriz, catalogo):
+    """Δpreço por coluna da matriz (preço atual × percentual)."""
+    delta = numpy().zeros(len(matriz.ingredientes))
+    for choque in choques:
+        preco = catalogo.ingredientes[choque.ingrediente_id].custo_por_unidade or 0
+        delta[matriz.coluna[choque.ingrediente_id]] += float(preco) * float(choque.percentual) / 100
+    return delta
+
+
+def variacoes_receitas(choques, catalogo=None):
+    """Variação do custo total de cada receita (na ordem de ``matriz_uso().receitas``)."""
+    catalogo = catalogo or CATALOGO.obter()
+    matriz = matriz_uso(catalogo)
+    return matriz.produto(vetor_choques(choques, matriz, catalogo))
+
+
+def simular_receitas(choques, catalogo=None, limite=None):
+    """
+    Receitas afetadas pelos choques, das mais expostas (maior variação
+    percentual do custo) para as menos: custo atual, variação e novo custo,
+    no total e por porção.
+    """
+    catalogo = catalogo or CATALOGO.obter()
+    matriz = matriz_uso(catalogo)
+    variacoes = variacoes_receitas(choques, catalogo)
+    resultado = []
+    np = numpy()
+    for i in np.flatnonzero(np.abs(variacoes) >= 0.005):
+        receita_id = matriz.receitas[i]
+        custo = catalogo.custo_total(receita_id)
+        variacao = q(Decimal(float(variacoes[i])), 2)
+        porcoes = catalogo.numero_porcoes(receita_id)
+        resultado.append({
+            "receita_id": receita_id,
+            "titulo": catalogo.receitas[receita_id].titulo,
+            "custo_total": custo,
+            "variacao_total": variacao,
+            "novo_total": custo + variacao,
+            "custo_por_porcao": catalogo.custo_por_porcao(receita_id),
+            "novo_por_porcao": q((custo + variacao) / porcoes, 2) if porcoes else None,
+            "percentual": q(variacao * 100 / custo, 1) if custo else None,
+        })
+    resultado.sort(key=lambda r: (-abs(r["percentual"] or 0), -abs(r["variacao_total"]), r["titulo"]))
+    return resultado[:limite] if limite else resultado
@@ -0,0 +1,66 @@
+/*
+ * Prévia de custos da ficha técnica no admin.
+ * A cada alteração do formulário envia os campos (sem arquivos) para
+ * "custo-previa/", que recalcula em memória sem gravar, e atualiza as colunas
+ * de custo dos inlines e os totais da seção "Rendimento e Custos".
+ */
+(function ($) {
+    "use strict";
+
+    $(function () {
+        const form = document.getElementById("receita_form");
+        if (!form) {
+            return;
+        }
+        const caminho = window.location.pathname;
+        const encontrado = caminho.match(/\/(\d+)\/change\/$/);
+        const url = caminho.replace(/(\d+\/change|add)\/$/, "custo-previa/");
+        let espera = null;
+        let pedido = null;
+
+        function mostrar(seletor, texto) {
+            const alvo = form.querySelector(seletor);
+            if (alvo) {
+                alvo.textContent = texto;
+            }
+        }
+
+        function atualizar() {
+            const dados = new FormData(form);
+            form.querySelectorAll("input[type=file]").forEach(function (campo) {
+                dados.delete(campo.name);
+            });
+            if (encontrado) {
+                dados.set("receita_id", encontrado[1]);
+            }
+            if (pedido) {
+                pedido.abort();
+            }
+            pedido = new AbortController();
+            fetch(url, {method: "POST", body: dados, signal: pedido.signal, credentials: "same-origin"})
+                .then(function (resposta) { return resposta.ok ? resposta.json() : null; })
+                .then(function (custos) {
+                    if (!custos) {
+                        return;
+                    }
+                    const linhas = Object.assign({}, custos.itens, custos.componentes);
+                    Object.keys(linhas).forEach(function (chave) {
+                        mostrar("#" + chave + " td.field-custo_formatado p", linhas[chave]);
+                    });
+                    mostrar(".field-custo_total_formatado .readonly", custos.custo_total);
+                    mostrar(".field-numero_porcoes_formatado .readonly", custos.numero_porcoes);
+                    mostrar(".field-custo_por_porcao_formatado .readonly", custos.custo_por_porcao);
+                })
+                .catch(function () { /* pedido substituído por um mais novo */ });
+        }
+
+        function agendar() {
+            clearTimeout(espera);
+            espera = setTimeout(atualizar, 300);
+        }
+
+        // jQuery também recebe o "change" disparado pelo select2 dos autocompletes
+        $(form).on("input change", "input, select, textarea", agendar);
+        document.addEventListener("formset:removed", agendar);
+    });
+})(django.jQuery);
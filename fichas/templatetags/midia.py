@@ -0,0 +1,6 @@
+from django import template
+
+from cozinha.midia import url_midia
+
+register = template.Library()
+register.filter("url_midia", url_midia)
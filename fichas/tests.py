@@ -1,3 +1,656 @@
-from django.test import TestCase
+"""
+Orçamento de consultas e de tempo das páginas de fichas.
 
-# Create your tests here.
+Cada teste mede uma página com um catálogo pequeno, aumenta o catálogo
+(mais receitas, sub-receitas mais profundas) e mede de novo: o número de
+consultas não pode crescer com o tamanho. As medições são feitas depois de
+uma requisição de aquecimento, que carrega os caches do worker (catálogo,
+categorias, rótulos) uma vez, como em produção.
+"""
+import io
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cozinha.referencias import CATEGORIAS, invalidar_todos, trocar_pendentes
+from estoque.models import MovimentoEstoque, SaldoEstoque
+from estoque.operacoes import fechar_saldos, saldos_atuais
+from . import aritmetica
+from .admin import ler_decimal
+from .aritmetica import custo_centavos, custos_centavos, de_centavos, para_milesimos, para_preco, q
+from .custos import Catalogo
+from .duplicados import mesclar
+from .escala import escalar_receita
+from .explicacao import explicar_receita
+from .models import (
+    Alergeno, Categoria, ComponenteReceita, EmbalagemIngrediente, Ingrediente, ItemReceita, Receita, nomes_alergenos,
+)
+from .nutricao import nutricao_receita
+from .planilhas import ImportadorPlanilhas
+
+# Tetos de tempo (segundos) dos motores, folgados para máquinas lentas de CI
+TETO_CATALOGO = 3.0
+
+
+def montar_cadeia(categoria, ingredientes, profundidade, prefixo="Receita"):
+    """
+    Cadeia de ``profundidade`` receitas, cada uma com todos os ``ingredientes``
+    e a anterior como sub-receita; devolve a receita do topo.
+    """
+    anterior = None
+    for nivel in range(profundidade):
+        receita = Receita.objects.create(
+            titulo=f"{prefixo} {nivel}", categoria=categoria, rendimento_total=Decimal("2.000"),
+            unidade_rendimento="kg", peso_por_porcao=Decimal("0.200"),
+        )
+        ItemReceita.objects.bulk_create([
+            ItemReceita(receita=receita, ingrediente=ing, unidade="g", peso_liquido=Decimal("150"))
+            for ing in ingredientes
+        ])
+        if anterior is not None:
+            ComponenteReceita.objects.create(receita=receita, sub_receita=anterior,
+                                             quantidade=Decimal("500"), unidade="g")
+        anterior = receita
+    return anterior
+
+
+def criar_ingredientes(quantidade, inicio=0):
+    return [
+        Ingrediente.objects.create(nome=f"Ingrediente {i}", unidade_base="kg",
+                                   custo_por_unidade=Decimal("3.5000") + i)
+        for i in range(inicio, inicio + quantidade)
+    ]
+
+
+class OrcamentoConsultasMixin:
+    """Mede consultas de uma página depois do aquecimento dos caches."""
+
+    def setUp(self):
+        super().setUp()
+        invalidar_todos()  # os caches do worker sobrevivem ao rollback entre testes
+        usuario = get_user_model().objects.create_superuser("admin", "admin@example.com", "senha")
+        self.client.force_login(usuario)
+
+    def consultas(self, url):
+        trocar_pendentes()  # o TestCase nunca confirma: os dados do teste contam como já gravados
+        self.assertEqual(self.client.get(url).status_code, 200)  # aquecimento
+        with CaptureQueriesContext(connection) as capturadas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(capturadas)
+
+    def assertConsultasConstantes(self, url, crescer):
+        """Mesmo número de consultas em ``url`` antes e depois de ``crescer()``."""
+        antes = self.consultas(url() if callable(url) else url)
+        crescer()
+        depois = self.consultas(url() if callable(url) else url)
+        self.assertEqual(antes, depois, f"{url}: {antes} consultas com o catálogo pequeno, {depois} com o grande")
+
+
+class ConsultasFichasTests(OrcamentoConsultasMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.categoria = Categoria.objects.create(nome="Pratos")
+        self.ingredientes = criar_ingredientes(3)
+        self.topo = montar_cadeia(self.categoria, self.ingredientes, 2)
+
+    def crescer(self):
+        """Mais ingredientes por receita, cadeias mais profundas e mais receitas na listagem."""
+        mais = criar_ingredientes(5, inicio=3)
+        for indice in range(3):
+            self.topo = montar_cadeia(self.categoria, self.ingredientes + mais, 8, prefixo=f"Grande {indice}")
+
+    def test_lista_de_fichas(self):
+        self.assertConsultasConstantes(reverse("fichas:lista_fichas"), self.crescer)
+
+    def test_ficha_com_sub_receitas_profundas(self):
+        self.assertConsultasConstantes(lambda: reverse("fichas:ficha", args=[self.topo.pk]), self.crescer)
+
+    def test_lista_de_ingredientes(self):
+        self.assertConsultasConstantes(reverse("fichas:lista_ingredientes"), self.crescer)
+
+    def test_admin_receitas(self):
+        self.assertConsultasConstantes(reverse("admin:fichas_receita_changelist"), self.crescer)
+
+    def test_admin_ingredientes(self):
+        self.assertConsultasConstantes(reverse("admin:fichas_ingrediente_changelist"), self.crescer)
+
+    def test_admin_categorias(self):
+        def crescer():
+            Categoria.objects.bulk_create([Categoria(nome=f"Categoria {i}") for i in range(30)])
+        self.assertConsultasConstantes(reverse("admin:fichas_categoria_changelist"), crescer)
+
+    def test_ficha_mostra_custos_do_catalogo(self):
+        resposta = self.client.get(reverse("fichas:ficha", args=[self.topo.pk]))
+        self.assertEqual(resposta.context["custo_total"], self.topo.custo_total)
+        self.assertEqual(resposta.context["custo_por_porcao"], self.topo.custo_por_porcao)
+        for comp in resposta.context["componentes"]:
+            self.assertEqual(comp.custo_calculado, comp.custo_total)
+
+
+class TempoCatalogoTests(TestCase):
+
+    def test_catalogo_grande_dentro_do_teto(self):
+        categoria = Categoria.objects.create(nome="Pratos")
+        ingredientes = criar_ingredientes(10)
+        topos = [montar_cadeia(categoria, ingredientes, 10, prefixo=f"Cadeia {i}") for i in range(20)]
+
+        inicio = time.perf_counter()
+        catalogo = Catalogo.carregar()
+        custos = {receita_id: catalogo.custo_total(receita_id) for receita_id in catalogo.receitas}
+        decorrido = time.perf_counter() - inicio
+
+        self.assertEqual(len(custos), 200)
+        self.assertEqual(custos[topos[0].pk], topos[0].custo_total)
+        self.assertLess(decorrido, TETO_CATALOGO, f"catálogo de 200 receitas levou {decorrido:.2f}s")
+
+    def test_explicacao_cronometra_a_avaliacao_da_raiz(self):
+        categoria = Categoria.objects.create(nome="Pratos")
+        topo = montar_cadeia(categoria, criar_ingredientes(10), 10)
+        catalogo = Catalogo.carregar()
+
+        fria = explicar_receita(topo.pk, catalogo)
+        self.assertFalse(fria["cache"])
+        self.assertGreater(fria["avaliacao_ms"], 0)
+        self.assertLessEqual(fria["avaliacao_ms"], fria["tempo_ms"])
+        self.assertEqual(fria["custo"], topo.custo_total)
+
+        self.assertTrue(explicar_receita(topo.pk, catalogo)["cache"])
+
+
+class NucleoCentavosTests(SimpleTestCase):
+    """O núcleo inteiro arredonda exatamente como ``q()`` (ROUND_HALF_UP) sobre os mesmos valores."""
+
+    def entradas(self):
+        sorteio = random.Random(26)
+        fatores = [Decimal("1"), Decimal("1000"), Decimal("0.001"), Decimal("15"), Decimal("0.15"), Decimal("0.005")]
+        linhas = [(Decimal(sorteio.randint(0, 5_000_000)).scaleb(-3), sorteio.choice(fatores),
+                   Decimal(sorteio.randint(0, 2_000_000)).scaleb(-4)) for _ in range(2000)]
+        # empates exatos em meio centavo: 0,005 sobe para 0,01; 0,015 para 0,02
+        linhas += [(Decimal("0.001"), Decimal("1"), Decimal("5.0000")), (Decimal("0.003"), Decimal("1"),
+                                                                         Decimal("5.0000"))]
+        return linhas
+
+    def test_custo_centavos_igual_a_q(self):
+        for qtd, fator, preco in self.entradas():
+            esperado = q(qtd * fator * preco, 2)
+            obtido = de_centavos(custo_centavos(para_milesimos(qtd), para_milesimos(fator), para_preco(preco)))
+            self.assertEqual(obtido, esperado, (qtd, fator, preco))
+
+    def test_lote_em_listas_e_numpy(self):
+        linhas = self.entradas()
+        esperado = [q(qtd * fator * preco, 2) for qtd, fator, preco in linhas]
+        colunas = ([para_milesimos(l[0]) for l in linhas], [para_milesimos(l[1]) for l in linhas],
+                   [para_preco(l[2]) for l in linhas])
+        self.assertEqual([de_centavos(c) for c in custos_centavos(*colunas)], esperado)
+        np = aritmetica.numpy()
+        if np is not None:
+            vetor = custos_centavos(*(np.array(coluna, dtype=np.int64) for coluna in colunas))
+            self.assertEqual([de_centavos(int(c)) for c in vetor], esperado)
+
+
+class ImportacaoNumpyTests(SimpleTestCase):
+    """Os módulos carregados por todo worker não importam o NumPy (``aritmetica.numpy()`` sob demanda)."""
+
+    def test_views_nao_importam_numpy(self):
+        codigo = ("import sys, django; django.setup(); "
+                  "import fichas.views, eventos.views, fichas.duplicados, fichas.nutricao, fichas.sensibilidade; "
+                  "print('numpy' in sys.modules)")
+        saida = subprocess.run([sys.executable, "-c", codigo], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                               env={**os.environ, "DJANGO_SETTINGS_MODULE": "cozinha.settings"}, check=True)
+        self.assertEqual(saida.stdout.strip(), "False")
+
+
+class CatalogoCentavosTests(TestCase):
+
+    def test_catalogo_igual_ao_modelo(self):
+        categoria = Categoria.objects.create(nome="Pratos")
+        oleo = Ingrediente.objects.create(nome="Óleo", unidade_base="l", custo_por_unidade=Decimal("9.9900"))
+        cebola = Ingrediente.objects.create(nome="Cebola", unidade_base="kg", custo_por_unidade=Decimal("4.2050"))
+        receita = Receita.objects.create(titulo="Refogado", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                         unidade_rendimento="kg", peso_por_porcao=Decimal("0.150"))
+        ItemReceita.objects.bulk_create([
+            ItemReceita(receita=receita, ingrediente=oleo, unidade="ml", peso_liquido=Decimal("45")),
+            ItemReceita(receita=receita, ingrediente=oleo, unidade="cs", peso_liquido=Decimal("3")),  # sem conversão
+            ItemReceita(receita=receita, ingrediente=cebola, unidade="und_cebola", peso_bruto=Decimal("3"),
+                        fator_correcao=Decimal("0.855")),
+            ItemReceita(receita=receita, ingrediente=cebola, unidade="g", peso_bruto=Decimal("333"),
+                        fator_correcao=Decimal("1.115")),
+            ItemReceita(receita=receita, ingrediente=cebola, unidade="qb"),
+        ])
+        catalogo = Catalogo.carregar()
+        self.assertEqual(catalogo.custo_total(receita.pk), receita.custo_total)
+        for item in receita.itens.all():
+            self.assertEqual(catalogo.custo_item(item.pk), item.custo_total, item.unidade)
+
+
+class IntercambioTests(TestCase):
+    """``exportar_catalogo`` → ``importar_catalogo`` num banco vazio reproduz o catálogo."""
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, ignore_errors=True)
+
+    def fotografia(self):
+        catalogo = Catalogo.carregar()
+        return {
+            "ingredientes": sorted(Ingrediente.objects.values_list("nome", "unidade_base", "custo_por_unidade")),
+            "itens": sorted(ItemReceita.objects.values_list(
+                "receita__titulo", "receita__categoria__nome", "ingrediente__nome", "unidade",
+                "peso_bruto", "peso_liquido", "fator_correcao")),
+            "componentes": sorted(ComponenteReceita.objects.values_list(
+                "receita__titulo", "sub_receita__titulo", "sub_receita__categoria__nome", "quantidade", "unidade")),
+            "custos": {(titulo, categoria): catalogo.custo_total(pk) for pk, titulo, categoria
+                       in Receita.objects.values_list("pk", "titulo", "categoria__nome")},
+        }
+
+    def test_ida_e_volta_num_banco_vazio(self):
+        ingredientes = criar_ingredientes(4)
+        montar_cadeia(Categoria.objects.create(nome="Molhos"), ingredientes[:2], 3, prefixo="Molho")
+        topo = montar_cadeia(Categoria.objects.create(nome="Pratos"), ingredientes[2:], 2, prefixo="Prato")
+        ComponenteReceita.objects.create(receita=topo, sub_receita=Receita.objects.get(titulo="Molho 2"),
+                                         quantidade=Decimal("0.250"), unidade="kg")
+        ItemReceita.objects.create(receita=topo, ingrediente=ingredientes[0], unidade="g",
+                                   peso_bruto=Decimal("333"), fator_correcao=Decimal("1.115"))
+        ItemReceita.objects.create(receita=topo, ingrediente=ingredientes[1], unidade="qb")
+        antes = self.fotografia()
+        self.assertEqual(len(antes["custos"]), 5)
+
+        call_command("exportar_catalogo", self.pasta, "--sem-fotos", stdout=io.StringIO())
+        ComponenteReceita.objects.all().delete()
+        Receita.objects.all().delete()
+        Ingrediente.objects.all().delete()
+        Categoria.objects.all().delete()
+        invalidar_todos()
+        self.assertFalse(Catalogo.carregar().receitas)
+
+        call_command("importar_catalogo", self.pasta, "--sem-fotos", stdout=io.StringIO())
+        self.assertEqual(self.fotografia(), antes)
+
+
+class CacheTransacaoTests(TransactionTestCase):
+    """Leituras dentro da transação veem as próprias alterações, mas só o commit as guarda no cache."""
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        configuracao = override_settings(CACHE_VERSOES_DIR=pasta)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        Categoria.objects.create(nome="Molhos")
+        invalidar_todos()
+        self.nomes = lambda: [categoria.nome for categoria in CATEGORIAS.obter()]
+
+    def test_rollback_nao_deixa_fantasma(self):
+        self.assertEqual(self.nomes(), ["Molhos"])
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Categoria.objects.create(nome="Fantasma")
+            self.assertEqual(self.nomes(), ["Fantasma", "Molhos"])
+            raise RuntimeError
+        self.assertEqual(self.nomes(), ["Molhos"])
+
+        # savepoint desfeito dentro de uma transação que segue: a anotação não vale mais
+        with transaction.atomic():
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Categoria.objects.create(nome="Fantasma")
+                raise RuntimeError
+            falhas = CATEGORIAS.falhas
+            self.assertEqual(self.nomes(), ["Molhos"])
+            self.assertEqual(self.nomes(), ["Molhos"])
+            self.assertEqual(CATEGORIAS.falhas, falhas + 1)
+
+    def test_commit_recarrega(self):
+        self.assertEqual(self.nomes(), ["Molhos"])
+        carimbo = CATEGORIAS.versao.atual()
+        with transaction.atomic():
+            Categoria.objects.create(nome="Sobremesas")
+            self.assertEqual(self.nomes(), ["Molhos", "Sobremesas"])
+            self.assertEqual(CATEGORIAS.versao.atual(), carimbo)
+        self.assertNotEqual(CATEGORIAS.versao.atual(), carimbo)
+        falhas = CATEGORIAS.falhas
+        self.assertEqual(self.nomes(), ["Molhos", "Sobremesas"])
+        self.assertEqual(self.nomes(), ["Molhos", "Sobremesas"])
+        self.assertEqual(CATEGORIAS.falhas, falhas + 1)
+
+
+class PlanilhasTests(TestCase):
+    """``ImportadorPlanilhas``: simulação sem efeito nos índices e sub-receitas já cadastradas."""
+
+    MOLHO = """Ficha;Molho de tomate
+Categoria;Molhos
+Rendimento;2;kg
+Ingrediente;Unidade;Peso bruto;Peso líquido;Fator de correção
+Tomate;kg;2,5;;0,9
+Cebola;g;;300
+"""
+    LASANHA = """Ficha;Lasanha
+Categoria;Massas
+Rendimento;3;kg
+Ingrediente;Unidade;Peso bruto;Peso líquido;Fator de correção
+Sub-receita: Molho de tomate;g;500
+Tomate;kg;;1
+"""
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        self.pasta = Path(pasta)
+        Ingrediente.objects.create(nome="Tomate", unidade_base="kg", custo_por_unidade=Decimal("6.5000"))
+        Ingrediente.objects.create(nome="Cebola", unidade_base="kg", custo_por_unidade=Decimal("4.2000"))
+
+    def planilha(self, nome, conteudo):
+        caminho = self.pasta / nome
+        caminho.write_text(conteudo, encoding="utf-8")
+        return caminho
+
+    def test_simulacao_seguida_da_importacao(self):
+        molho, lasanha = self.planilha("molho.csv", self.MOLHO), self.planilha("lasanha.csv", self.LASANHA)
+        importador = ImportadorPlanilhas(simular=True)
+        self.assertEqual(importador.importar(molho), 1)
+        self.assertEqual(importador.importar(lasanha), 0)  # o molho simulado não existe para o arquivo seguinte
+        self.assertIn("sub-receita não encontrada", [o.detalhe for o in importador.ocorrencias])
+        self.assertFalse(Receita.objects.exists())
+        self.assertFalse(Categoria.objects.exists())
+
+        importador.simular = False
+        importador.ocorrencias.clear()
+        self.assertEqual(importador.importar(molho), 1)
+        self.assertEqual(importador.importar(lasanha), 1)
+        self.assertEqual(importador.ocorrencias, [])
+        componente = ComponenteReceita.objects.get()
+        self.assertEqual((componente.receita.titulo, componente.sub_receita.titulo), ("Lasanha", "Molho de tomate"))
+        self.assertEqual((componente.quantidade, componente.unidade), (Decimal("500"), "g"))
+
+        self.assertEqual(importador.importar(molho), 0)  # agora, sim, já existe
+        self.assertEqual(importador.ocorrencias[-1].situacao, "já existe")
+
+    def test_banco_sem_pks_no_insert_em_lote(self):
+        """MySQL (XAMPP): ``bulk_create`` não devolve pks; itens e componentes ainda acham a receita."""
+        Categoria.objects.create(nome="Molhos")
+        arquivo = self.planilha("fichas.csv", self.MOLHO + "\n" + self.LASANHA)
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            self.assertEqual(ImportadorPlanilhas().importar(arquivo), 2)
+        molho = Receita.objects.get(titulo="Molho de tomate", categoria__nome="Molhos")
+        lasanha = Receita.objects.get(titulo="Lasanha")
+        self.assertEqual(lasanha.categoria.nome, "Massas")
+        self.assertEqual(sorted(molho.itens.values_list("ingrediente__nome", flat=True)), ["Cebola", "Tomate"])
+        self.assertEqual(list(lasanha.itens.values_list("ingrediente__nome", flat=True)), ["Tomate"])
+        self.assertEqual(ComponenteReceita.objects.get().sub_receita, molho)
+
+    def test_sub_receita_cadastrada_nas_fichas(self):
+        caldo = Receita.objects.create(titulo="Caldo de legumes", categoria=Categoria.objects.create(nome="Bases"),
+                                       rendimento_total=Decimal("5.000"), unidade_rendimento="l")
+        sopa = self.planilha("sopa.csv", """Ficha;Sopa de tomate
+Categoria;Sopas
+Rendimento;4;l
+Ingrediente;Unidade;Peso bruto;Peso líquido;Fator de correção
+Tomate;kg;1,2;;
+Sub-receita: Caldo de legumes;ml;2000
+Caldo de Legumes;ml;;250
+""")
+        importador = ImportadorPlanilhas()
+        self.assertEqual(importador.importar(sopa), 1)
+        receita = Receita.objects.get(titulo="Sopa de tomate")
+        self.assertEqual(sorted(receita.componentes.values_list("sub_receita", "quantidade", "unidade")),
+                         [(caldo.pk, Decimal("250"), "ml"), (caldo.pk, Decimal("2000"), "ml")])
+        self.assertEqual(receita.itens.get().ingrediente.nome, "Tomate")
+        self.assertEqual(Catalogo.carregar().custo_total(receita.pk), receita.custo_total)
+
+
+class MesclagemTests(TestCase):
+    """``mesclar``: quantidades convertidas para a base do mantido, saldos somados e nada feito se não converte."""
+
+    def setUp(self):
+        self.cebola = Ingrediente.objects.create(nome="Cebola", unidade_base="kg", custo_por_unidade=Decimal("4.2000"))
+        self.cebolas = Ingrediente.objects.create(nome="cebolas", unidade_base="g", custo_por_unidade=Decimal("0.0045"))
+        receita = Receita.objects.create(titulo="Refogado", categoria=Categoria.objects.create(nome="Bases"),
+                                         rendimento_total=Decimal("1.000"), unidade_rendimento="kg")
+        self.item = ItemReceita.objects.create(receita=receita, ingrediente=self.cebolas, unidade="g",
+                                               peso_liquido=Decimal("300"))
+        EmbalagemIngrediente.objects.create(ingrediente=self.cebolas, descricao="Pacote 750 g", quantidade=Decimal("750"),
+                                            preco=Decimal("3.20"))
+        MovimentoEstoque.objects.create(ingrediente=self.cebola, tipo=MovimentoEstoque.Tipo.COMPRA,
+                                        quantidade=Decimal("1.000"))
+        MovimentoEstoque.objects.create(ingrediente=self.cebolas, tipo=MovimentoEstoque.Tipo.COMPRA,
+                                        quantidade=Decimal("2000"))
+        fechar_saldos()  # um saldo de cada no mesmo fechamento: colidem na mesclagem
+        MovimentoEstoque.objects.create(ingrediente=self.cebolas, tipo=MovimentoEstoque.Tipo.PERDA,
+                                        quantidade=Decimal("250"))
+
+    def test_converte_e_junta_saldos(self):
+        contagem = mesclar(self.cebola, [self.cebolas])
+
+        self.assertFalse(Ingrediente.objects.filter(pk=self.cebolas.pk).exists())
+        self.assertEqual(contagem["estoque.saldoestoque"], 1)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.ingrediente_id, self.item.unidade, self.item.peso_liquido),
+                         (self.cebola.pk, "g", Decimal("300")))  # o item tem unidade própria: não converte
+        self.assertEqual(EmbalagemIngrediente.objects.get().quantidade, Decimal("0.750"))
+        self.assertEqual(sorted(self.cebola.movimentos.values_list("quantidade", flat=True)),
+                         [Decimal("-0.250"), Decimal("1.000"), Decimal("2.000")])
+        self.assertEqual(SaldoEstoque.objects.get().saldo, Decimal("3.000"))
+        self.assertEqual(saldos_atuais(), {self.cebola.pk: Decimal("2.750")})
+
+    def test_unidade_sem_conversao_nao_altera_nada(self):
+        cebola_und = Ingrediente.objects.create(nome="Cebola (und)", unidade_base="und",
+                                                custo_por_unidade=Decimal("0.9000"))
+        antes = (list(MovimentoEstoque.objects.values_list("ingrediente", "quantidade")),
+                 list(SaldoEstoque.objects.values_list("ingrediente", "saldo")),
+                 list(EmbalagemIngrediente.objects.values_list("ingrediente", "quantidade")),
+                 list(ItemReceita.objects.values_list("ingrediente", flat=True)))
+
+        with self.assertRaisesMessage(ValidationError, "unidades sem conversão"):
+            mesclar(self.cebola, [self.cebolas, cebola_und])  # o primeiro converteria
+
+        self.assertEqual(Ingrediente.objects.count(), 3)
+        self.assertEqual((list(MovimentoEstoque.objects.values_list("ingrediente", "quantidade")),
+                          list(SaldoEstoque.objects.values_list("ingrediente", "saldo")),
+                          list(EmbalagemIngrediente.objects.values_list("ingrediente", "quantidade")),
+                          list(ItemReceita.objects.values_list("ingrediente", flat=True))), antes)
+
+
+class EscalaTests(TestCase):
+    """Escala da ficha: fator, conversão de unidade, unidades de leitura e custos recalculados."""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nome="Molhos")
+        tomate = Ingrediente.objects.create(nome="Tomate", unidade_base="kg", custo_por_unidade=Decimal("6.5000"))
+        sal = Ingrediente.objects.create(nome="Sal", unidade_base="kg", custo_por_unidade=Decimal("2.0000"))
+        oleo = Ingrediente.objects.create(nome="Óleo", unidade_base="l", custo_por_unidade=Decimal("9.9900"))
+        cebola = Ingrediente.objects.create(nome="Cebola", unidade_base="kg", custo_por_unidade=Decimal("4.0000"))
+        caldo = Receita.objects.create(titulo="Caldo", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                       unidade_rendimento="l")
+        ItemReceita.objects.create(receita=caldo, ingrediente=cebola, unidade="kg", peso_liquido=Decimal("0.500"))
+        self.molho = Receita.objects.create(titulo="Molho", categoria=categoria, rendimento_total=Decimal("2.000"),
+                                            unidade_rendimento="kg", peso_por_porcao=Decimal("0.100"))
+        ItemReceita.objects.bulk_create([
+            ItemReceita(receita=self.molho, ingrediente=tomate, unidade="kg", peso_liquido=Decimal("2.500")),
+            ItemReceita(receita=self.molho, ingrediente=sal, unidade="g", peso_liquido=Decimal("12")),
+            ItemReceita(receita=self.molho, ingrediente=oleo, unidade="ml", peso_liquido=Decimal("45")),
+        ])
+        ComponenteReceita.objects.create(receita=self.molho, sub_receita=caldo, quantidade=Decimal("500"), unidade="ml")
+        invalidar_todos()
+
+    def linhas(self, escala):
+        return {linha["nome"]: (linha["quantidade"], linha["unidade"], linha["custo"]) for linha in escala["linhas"]}
+
+    def test_porcoes_dobram_a_receita(self):
+        escala = escalar_receita(self.molho, {"porcoes": "40"}, Catalogo.carregar())
+        self.assertEqual((escala["fator"], escala["rendimento"], escala["unidade"], escala["porcoes"]),
+                         (Decimal("2.0000"), Decimal("4.000"), "kg", Decimal("40.00")))
+        self.assertEqual(self.linhas(escala), {
+            "Tomate": (Decimal("5.000"), "kg", Decimal("32.50")),
+            "Sal": (Decimal("24.0"), "g", Decimal("0.05")),
+            "Óleo": (Decimal("90.0"), "ml", Decimal("0.90")),
+            "Caldo": (Decimal("1.000"), "l", Decimal("2.00")),  # 1000 ml → 1 l
+            "Cebola": (Decimal("500.0"), "g", Decimal("2.00")),  # 0,5 kg → 500 g
+        })
+        self.assertEqual((escala["custo_total"], escala["custo_por_porcao"]), (Decimal("35.45"), Decimal("0.89")))
+
+    def test_rendimento_em_outra_unidade(self):
+        escala = escalar_receita(self.molho, {"rendimento": "200", "unidade": "kg"}, Catalogo.carregar())
+        self.assertEqual(escala["fator"], Decimal("100.0000"))
+        self.assertEqual(self.linhas(escala)["Sal"][:2], (Decimal("1.200"), "kg"))  # 1200 g → 1,2 kg
+        self.assertEqual(escalar_receita(self.molho, {"rendimento": "500", "unidade": "g"})["fator"],
+                         Decimal("0.2500"))
+
+    def test_pedidos_invalidos_viram_erro_na_pagina(self):
+        url = reverse("fichas:ficha", args=[self.molho.pk])
+        for parametros in ({"porcoes": "1e30"}, {"rendimento": "1e40"}, {"rendimento": "1e40", "unidade": "g"},
+                           {"porcoes": "0"}, {"porcoes": "abc"}, {"porcoes": "NaN"}, {"rendimento": "2", "unidade": "und"}):
+            resposta = self.client.get(url, parametros)
+            self.assertEqual(resposta.status_code, 200, parametros)
+            self.assertIn("erro_escala", resposta.context, parametros)
+            self.assertNotIn("escala", resposta.context, parametros)
+
+
+class NutricaoTests(TestCase):
+    """Nutrientes por porção e alérgenos somados através de sub-receita, contra valores calculados à mão."""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nome="Tortas")
+        nutrientes = ("kcal", "proteinas", "gorduras", "carboidratos", "fibras", "sodio")
+
+        def ingrediente(nome, unidade_base, valores, alergenos=0):
+            campos = dict(zip(nutrientes, (Decimal(v) for v in valores))) if valores else {}
+            return Ingrediente.objects.create(nome=nome, unidade_base=unidade_base, custo_por_unidade=Decimal("1"),
+                                              alergenos=alergenos, **campos)
+
+        farinha = ingrediente("Farinha", "kg", ("360", "10", "1", "75", "3", "2"), Alergeno.GLUTEN)
+        leite = ingrediente("Leite", "l", ("60", "3.2", "3.3", "4.8", "0", "50"), Alergeno.LEITE)
+        ovo = ingrediente("Ovo", "und", ("70", "6", "5", "0.5", "0", "70"), Alergeno.OVOS)
+        shoyu = ingrediente("Shoyu", "l", None, Alergeno.SOJA)  # q.b. e sem dados: só o alérgeno conta
+
+        massa = Receita.objects.create(titulo="Massa", categoria=categoria, rendimento_total=Decimal("1.000"),
+                                       unidade_rendimento="kg")
+        ItemReceita.objects.bulk_create([
+            ItemReceita(receita=massa, ingrediente=farinha, unidade="g", peso_liquido=Decimal("600")),
+            ItemReceita(receita=massa, ingrediente=leite, unidade="ml", peso_liquido=Decimal("500")),
+            ItemReceita(receita=massa, ingrediente=ovo, unidade="und", peso_liquido=Decimal("2")),
+            ItemReceita(receita=massa, ingrediente=shoyu, unidade="qb"),
+        ])
+        self.torta = Receita.objects.create(titulo="Torta", categoria=categoria, rendimento_total=Decimal("2.000"),
+                                            unidade_rendimento="kg", peso_por_porcao=Decimal("0.250"))
+        ItemReceita.objects.create(receita=self.torta, ingrediente=leite, unidade="l", peso_liquido=Decimal("0.25"))
+        ComponenteReceita.objects.create(receita=self.torta, sub_receita=massa, quantidade=Decimal("500"), unidade="g")
+        trocar_pendentes()
+
+    def test_porcao_e_alergenos_pela_sub_receita(self):
+        nutricao = nutricao_receita(self.torta.pk, Catalogo.carregar())
+        # massa inteira: kcal 6×360 + 5×60 + 2×70 = 2600 (metade entra na torta); leite direto: 2,5×60 = 150
+        totais = [1450, 249.5, 52, 24.5, 9, 326]  # ordem de NUTRIENTES
+        for nutriente, total in zip(nutricao["nutrientes"], totais):
+            self.assertAlmostEqual(nutriente["total"], total, msg=nutriente["rotulo"])
+            self.assertAlmostEqual(nutriente["porcao"], total / 8, msg=nutriente["rotulo"])
+        self.assertEqual(nutricao["alergenos"], nomes_alergenos(Alergeno.GLUTEN | Alergeno.OVOS | Alergeno.SOJA
+                                                                | Alergeno.LEITE))
+        self.assertFalse(nutricao["incompleta"])
+
+    def test_ficha_sem_numpy(self):
+        with mock.patch("fichas.nutricao.numpy", return_value=None):
+            resposta = self.client.get(reverse("fichas:ficha", args=[self.torta.pk]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIsNone(resposta.context["nutricao"])
+        self.assertNotContains(resposta, "Informação nutricional")
+
+
+class PreviaCustosTests(TestCase):
+    """Prévia de custos do admin com números que o formulário recusaria."""
+
+    def test_ler_decimal(self):
+        self.assertEqual(ler_decimal("1.234,5"), Decimal("1234.5"))
+        self.assertEqual(ler_decimal(" 0.250 "), Decimal("0.250"))
+        for texto in ("", "abc", "NaN", "-Infinity", "sNaN", "1e400", "10000000"):
+            self.assertIsNone(ler_decimal(texto), texto)
+
+    def test_previa_com_valores_nao_finitos(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "senha"))
+        tomate = Ingrediente.objects.create(nome="Tomate", unidade_base="kg", custo_por_unidade=Decimal("6.5000"))
+        url = reverse("admin:fichas_receita_custo_previa")
+        for valor in ("NaN", "Infinity", "sNaN", "1e400"):
+            resposta = self.client.post(url, {
+                "rendimento_total": valor, "unidade_rendimento": "kg", "peso_por_porcao": valor,
+                "itens-TOTAL_FORMS": "2",
+                "itens-0-ingrediente": tomate.pk, "itens-0-unidade": "kg", "itens-0-peso_liquido": valor,
+                "itens-1-ingrediente": tomate.pk, "itens-1-unidade": "g", "itens-1-peso_bruto": "500",
+                "itens-1-fator_correcao": valor,
+                "componentes-TOTAL_FORMS": "0",
+            })
+            self.assertEqual(resposta.status_code, 200, valor)
+            # a linha com o número inválido fica sem custo; a outra, sem fator, usa o peso bruto
+            self.assertEqual(resposta.json()["custo_total"], "R$ 3,25", valor)
+
+
+class MidiaTests(TestCase):
+    """``servir_midia``: URL versionada, Range, If-None-Match e envio pelo front-end."""
+
+    CONTEUDO = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta)
+        configuracao = override_settings(MEDIA_ROOT=self.pasta)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        (Path(self.pasta) / "receitas").mkdir()
+        (Path(self.pasta) / "receitas" / "molho.jpg").write_bytes(self.CONTEUDO)
+        self.receita = Receita.objects.create(
+            titulo="Molho", categoria=Categoria.objects.create(nome="Molhos"), rendimento_total=Decimal("1"),
+            unidade_rendimento="kg", foto_preparo="receitas/molho.jpg",
+        )
+        self.url = "/media/receitas/molho.jpg"
+
+    def test_ficha_usa_url_versionada_com_cache_imutavel(self):
+        pagina = self.client.get(reverse("fichas:ficha", args=[self.receita.pk])).content.decode()
+        url = next(parte.split('"')[0] for parte in pagina.split('src="')[1:] if parte.startswith(self.url))
+        self.assertIn("?v=", url)
+        resposta = self.client.get(url)
+        self.assertEqual(resposta["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(b"".join(resposta.streaming_content), self.CONTEUDO)
+        self.assertNotIn("immutable", self.client.get(self.url + "?v=velho")["Cache-Control"])
+
+    def test_range_parcial_e_insatisfazivel(self):
+        resposta = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(resposta.status_code, 206)
+        self.assertEqual(resposta["Content-Range"], f"bytes 10-19/{len(self.CONTEUDO)}")
+        self.assertEqual(b"".join(resposta.streaming_content), self.CONTEUDO[10:20])
+
+        sufixo = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(sufixo.streaming_content), self.CONTEUDO[-5:])
+
+        fora = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.CONTEUDO)}-")
+        self.assertEqual(fora.status_code, 416)
+        self.assertEqual(fora["Content-Range"], f"bytes */{len(self.CONTEUDO)}")
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"outro"').status_code, 200)
+
+    def test_envio_pelo_front_end(self):
+        with override_settings(MIDIA_SENDFILE="x-sendfile"):
+            resposta = self.client.get(self.url)
+        self.assertEqual(resposta["X-Sendfile"], str(Path(self.pasta) / "receitas" / "molho.jpg"))
+        self.assertEqual(resposta.content, b"")
+        self.assertIn("ETag", resposta)
+        with override_settings(MIDIA_SENDFILE="x-accel-redirect"):
+            resposta = self.client.get(self.url)
+        self.assertEqual(resposta["X-Accel-Redirect"], "/midia-protegida/receitas/molho.jpg")
@@ -5,6 +5,7 @@ app_name = "fichas"
 
 urlpatterns = [
     path("", views.ReceitaListView.as_view(), name="lista_fichas"),
+    path("categoria/<int:categoria_id>/", views.ReceitaListView.as_view(), name="lista_categoria"),
     path("<int:pk>/", views.ReceitaDetailView.as_view(), name="ficha"),
      path("ingredientes/", views.IngredienteListView.as_view(), name="lista_ingredientes"),
 ]
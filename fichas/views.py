@@ -1,12 +1,19 @@
+from django.core.exceptions import ValidationError
 from django.views.generic import ListView, DetailView
 from django.shortcuts import get_object_or_404
-from .models import Receita, Categoria, Ingrediente
+from cozinha.referencias import CATEGORIAS
+from .custos import CATALOGO, anotar_custos
+from .escala import UNIDADES_ESCALA, escalar_receita
+from .explicacao import explicar_receita, resposta_json
+from .models import Receita, Ingrediente
+from .nutricao import nutricao_receita
 
 
 class ReceitaListView(ListView):
     """
     Exibe a lista paginada de fichas técnicas de receitas (padrão SENAC).
-    Permite filtrar por categoria via ?categoria=<id>.
+    Permite filtrar por categoria via ?categoria=<id> ou /fichas/categoria/<id>/.
+    No site estático (``request.site_estatico``) a lista sai inteira, sem paginação.
     """
     model = Receita
     template_name = "fichas/lista_fichas.html"
@@ -18,20 +25,29 @@ class ReceitaListView(ListView):
         Filtra e ordena receitas por categoria e título.
         """
         queryset = Receita.objects.select_related("categoria").order_by("categoria__nome", "titulo")
-        categoria_id = self.request.GET.get("categoria")
+        categoria_id = self.categoria_selecionada()
 
         if categoria_id:
             queryset = queryset.filter(categoria_id=categoria_id)
 
         return queryset
 
+    def categoria_selecionada(self):
+        categoria_id = self.kwargs.get("categoria_id")
+        return str(categoria_id) if categoria_id else self.request.GET.get("categoria")
+
+    def get_paginate_by(self, queryset):
+        return None if getattr(self.request, "site_estatico", False) else self.paginate_by
+
     def get_context_data(self, **kwargs):
         """
         Adiciona lista de categorias e filtro ativo ao contexto.
+        Os custos da página vêm do catálogo do processo.
         """
         context = super().get_context_data(**kwargs)
-        context["categorias"] = Categoria.objects.all().order_by("nome")
-        context["categoria_selecionada"] = self.request.GET.get("categoria")
+        anotar_custos(context["receitas"])
+        context["categorias"] = CATEGORIAS.obter()
+        context["categoria_selecionada"] = self.categoria_selecionada()
         return context
 
 
@@ -41,11 +57,22 @@ class ReceitaDetailView(DetailView):
     - Ingredientes detalhados
     - Sub-receitas (componentes)
     - Custos total e por porção
+    - Informação nutricional e alérgenos
     - Rendimento e preparo
     """
     model = Receita
     template_name = "fichas/ficha.html"
     context_object_name = "receita"
+    queryset = Receita.objects.select_related("categoria")
+
+    def get(self, request, *args, **kwargs):
+        """
+        ``?explicar=json`` (equipe): exporta a árvore explicada do custo.
+        """
+        if request.GET.get("explicar") == "json" and request.user.is_staff:
+            receita = self.get_object()
+            return resposta_json(explicar_receita(receita.pk), f"custo-receita-{receita.pk}.json")
+        return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         """
@@ -53,17 +80,37 @@ class ReceitaDetailView(DetailView):
         """
         context = super().get_context_data(**kwargs)
         receita = self.object
+        catalogo = CATALOGO.obter()
 
         # Ingredientes da receita
-        context["itens"] = receita.itens.select_related("ingrediente")
+        itens = list(receita.itens.select_related("ingrediente"))
+        for item in itens:
+            item.custo_calculado = catalogo.custo_item(item.pk)
+        context["itens"] = itens
 
         # Sub-receitas (componentes)
-        context["componentes"] = receita.componentes.select_related("sub_receita")
+        componentes = list(receita.componentes.select_related("sub_receita"))
+        for comp in componentes:
+            comp.custo_calculado = catalogo.custo_componente(comp.pk)
+        context["componentes"] = componentes
 
-        # Cálculos de custo
-        context["custo_total"] = receita.custo_total
+        # Cálculos de custo (catálogo do processo: a árvore de sub-receitas não é percorrida no banco)
+        context["custo_total"] = catalogo.custo_total(receita.pk)
         context["numero_porcoes"] = receita.numero_porcoes
-        context["custo_por_porcao"] = receita.custo_por_porcao
+        context["custo_por_porcao"] = catalogo.custo_por_porcao(receita.pk)
+        context["nutricao"] = nutricao_receita(receita.pk, catalogo)
+
+        # Escala para outro rendimento (?rendimento=12&unidade=kg ou ?porcoes=80)
+        context["unidades_escala"] = UNIDADES_ESCALA
+        if self.request.GET.get("rendimento") or self.request.GET.get("porcoes"):
+            try:
+                context["escala"] = escalar_receita(receita, self.request.GET)
+            except ValidationError as erro:
+                context["erro_escala"] = erro.messages[0]
+
+        # Explicação do custo (?explicar=1), só para a equipe
+        if self.request.user.is_staff and self.request.GET.get("explicar"):
+            context["explicacao"] = explicar_receita(receita.pk)
 
         return context
 
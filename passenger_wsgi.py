@@ -15,4 +15,11 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'cozinha.settings'
 
 # Carrega a aplicação WSGI do Django
 from django.core.wsgi import get_wsgi_application
-application = get_wsgi_application()
+from cozinha.estaticos import ServidorEstaticos
+
+# Estáticos com hash, pré-comprimidos (br/gzip) e cache longo, servidos antes do Django
+application = ServidorEstaticos(get_wsgi_application())
+
+# Pré-aquece URLs, templates e caches antes da primeira requisição do worker
+from cozinha.aquecimento import aquecer
+aquecer()
@@ -0,0 +1,8 @@
+/** Tailwind v3 (CLI standalone) — usado por `python manage.py construir_estaticos`. */
+module.exports = {
+  content: ["./templates/**/*.html", "./*/templates/**/*.html"],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};